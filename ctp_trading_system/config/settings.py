@@ -3,7 +3,7 @@
 符合评估表要求：阈值设置、连接配置
 """
 from dataclasses import dataclass, field
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import yaml
 import os
 
@@ -19,6 +19,23 @@ class ConnectionConfig:
     trade_front: str = "tcp://180.168.146.187:10201"     # 交易前置（SimNow）
     md_front: str = "tcp://180.168.146.187:10211"        # 行情前置（SimNow）
     flow_path: str = "./flow/"                           # 流文件路径
+    query_rate: float = 1.0                              # 查询流控（每秒查询数）
+    query_max_inflight: int = 1                          # 同时在途的查询数
+    query_response_timeout: float = 30.0                 # 查询无响应超时（秒），超时释放在途名额
+    order_action_rate: float = 6.0                       # 撤单流控（每秒撤单数，按柜台 FTD 流控设置）
+    order_archive_size: int = 2000                       # 内存中保留的终态报单数（更早的只在交易日志中）
+    trade_fronts: List[str] = field(default_factory=list)  # 交易前置列表（为空时只用 trade_front），按测速排序、故障切换
+    md_fronts: List[str] = field(default_factory=list)     # 行情前置列表（为空时只用 md_front）
+    md_standby: bool = False                             # 行情热备：在另一个行情前置上保持第二个会话
+    front_probe_timeout: float = 3.0                     # 前置测速超时（秒）
+
+    def get_trade_fronts(self) -> List[str]:
+        """交易前置列表 (配置顺序，已去重)"""
+        return list(dict.fromkeys(self.trade_fronts or [self.trade_front]))
+
+    def get_md_fronts(self) -> List[str]:
+        """行情前置列表 (配置顺序，已去重)"""
+        return list(dict.fromkeys(self.md_fronts or [self.md_front]))
 
 
 @dataclass
@@ -112,6 +129,9 @@ class Settings:
                 'auth_code': self.connection.auth_code,
                 'trade_front': self.connection.trade_front,
                 'md_front': self.connection.md_front,
+                'trade_fronts': list(self.connection.trade_fronts),
+                'md_fronts': list(self.connection.md_fronts),
+                'md_standby': self.connection.md_standby,
             },
             'threshold': {
                 'repeat_open_threshold': self.threshold.repeat_open_threshold,
@@ -1,2 +1,3 @@
 # Core module - CTP Gateway
 from .ctp_gateway import CtpGateway
+from .md_dispatcher import MdDispatcher, DeliveryPolicy, ConsumerStats
@@ -0,0 +1,304 @@
+"""
+账户资金状态服务
+由报单/成交回报与行情增量维护资金快照，读取不访问柜台
+
+功能:
+- 基准: 最近一次 ReqQryTradingAccount + ReqQryInvestorPosition 的结果 (reconcile)
+- 持仓、占用保证金、平仓盈亏与持仓盈亏取自 PositionBook (成交回报与行情增量维护)
+- 成交回报: 手续费
+- 报单回报: 未成交开仓单的冻结保证金、冻结手续费
+- get_snapshot: 返回预先构建好的快照字典，O(1) 且不阻塞
+- 定期或按需与柜台对账，对账期间有新成交时放弃本次结果
+
+本地计算为近似值 (保证金按合约保证金率，手续费按 set_commission_rate 设置的费率)，
+以柜台对账结果为准
+"""
+
+import re
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from .position_book import PositionBook
+
+_PRODUCT_RE = re.compile(r'[A-Za-z]*')
+
+# 报单终态: 全部成交 / 部分成交不在队列 / 未成交不在队列 / 撤单
+_ORDER_DONE = frozenset('0245')
+
+
+class AccountService:
+    """
+    账户资金状态服务
+
+    用法:
+        book = PositionBook(gateway)
+        service = AccountService(gateway, position_book=book)   # 注册 on_order / on_trade 回调
+        service.reconcile()                     # 登录后对账一次 (同时加载持仓簿)
+        service.start(interval=60)              # 定期对账
+        md_gateway.register_market_data_callback(book.on_tick, DeliveryPolicy.CONFLATE)
+        service.get_snapshot()                  # 任意线程读取
+    """
+
+    SNAPSHOT_FIELDS = (
+        'account_id', 'balance', 'available', 'frozen_cash', 'frozen_margin',
+        'frozen_commission', 'curr_margin', 'close_profit', 'position_profit',
+        'commission', 'withdraw_quota',
+    )
+
+    def __init__(self, gateway=None,
+                 instrument_info: Optional[Callable[[str], Optional[dict]]] = None,
+                 position_book: Optional[PositionBook] = None):
+        """
+        Args:
+            gateway: CtpGateway，用于注册回报回调与对账查询 (None 时只做本地计算)
+            instrument_info: 合约信息查询 (合约乘数、保证金率)，默认读取 gateway.settings.instruments
+            position_book: 共享的持仓簿 (自行接收成交回报)；None 时内部创建，成交由本服务转交
+        """
+        self.gateway = gateway
+        if instrument_info is None and gateway is not None:
+            instrument_info = lambda inst: gateway.settings.instruments.get(inst)
+        self._instrument_info = instrument_info or (lambda inst: None)
+
+        self._owns_book = position_book is None
+        self.positions = position_book or PositionBook(instrument_info=self._instrument_info)
+
+        self._commission_rates: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+        # 柜台基准
+        self._base: Dict[str, Any] = {name: 0.0 for name in self.SNAPSHOT_FIELDS}
+        self._base['account_id'] = ''
+        self._reconciled_at = 0.0
+
+        # 本地状态
+        # (FrontID, SessionID, OrderRef) -> (冻结保证金, 冻结手续费)；私有流含本投资者全部会话的报单
+        self._orders: Dict[tuple, tuple] = {}
+        self._trade_seq = 0
+
+        # 基准以来的增量 (持仓簿的平仓盈亏、保证金与对账时刻的差值)
+        self._d_commission = 0.0
+        self._close_profit_at_reconcile = 0.0
+        self._margin_at_reconcile = 0.0
+        self._frozen_margin = 0.0
+        self._frozen_commission = 0.0
+        self._frozen_at_reconcile = 0.0
+
+        self._snapshot: Dict[str, Any] = {}
+        self._loading = False
+        self._publish_locked()
+        self.positions.add_listener(self._on_positions_changed)
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        if gateway is not None:
+            gateway.register_callback("on_order", self.on_order)
+            gateway.register_callback("on_trade", self.on_trade)
+
+    # ==================== 费率 ====================
+
+    def set_commission_rate(self, instrument_id: str, rate: dict):
+        """
+        设置手续费率 (字段同 CtpGateway.query_commission_rate，可按品种代码设置)
+        """
+        self._commission_rates[instrument_id] = rate
+
+    def _rate(self, instrument_id: str) -> Optional[dict]:
+        rate = self._commission_rates.get(instrument_id)
+        if rate is None:
+            rate = self._commission_rates.get(_PRODUCT_RE.match(instrument_id).group(0))
+        return rate
+
+    def _multiplier(self, instrument_id: str) -> float:
+        info = self._instrument_info(instrument_id) or {}
+        return info.get('volume_multiple') or 1
+
+    def _margin(self, instrument_id: str, direction: str, price: float, volume: int) -> float:
+        info = self._instrument_info(instrument_id) or {}
+        ratio = info.get('long_margin_ratio' if direction == '0' else 'short_margin_ratio') or 0.0
+        return price * volume * (info.get('volume_multiple') or 1) * ratio
+
+    def _commission(self, instrument_id: str, offset: str, price: float, volume: int) -> float:
+        rate = self._rate(instrument_id)
+        if not rate:
+            return 0.0
+        prefix = {'0': 'open', '3': 'close_today'}.get(offset, 'close')
+        turnover = price * volume * self._multiplier(instrument_id)
+        return (turnover * (rate.get(f'{prefix}_ratio_by_money') or 0.0)
+                + volume * (rate.get(f'{prefix}_ratio_by_volume') or 0.0))
+
+    # ==================== 回报 ====================
+
+    def on_order(self, order: dict):
+        """报单回报: 更新未成交部分的冻结资金"""
+        order_ref = order.get('OrderRef', '')
+        if not order_ref:
+            return
+        key = (int(order.get('FrontID') or 0), int(order.get('SessionID') or 0), order_ref)
+        instrument_id = order.get('InstrumentID', '')
+        status = order.get('OrderStatus', '')
+        remaining = 0 if status in _ORDER_DONE else int(order.get('VolumeTotal') or 0)
+        price = float(order.get('LimitPrice') or 0.0)
+        offset = order.get('CombOffsetFlag', '0')[:1] or '0'
+
+        frozen_margin = 0.0
+        if remaining and offset == '0':
+            frozen_margin = self._margin(instrument_id, order.get('Direction', '0'), price, remaining)
+        frozen_commission = self._commission(instrument_id, offset, price, remaining) if remaining else 0.0
+
+        with self._lock:
+            old_margin, old_commission = self._orders.pop(key, (0.0, 0.0))
+            if remaining:
+                self._orders[key] = (frozen_margin, frozen_commission)
+            self._frozen_margin += frozen_margin - old_margin
+            self._frozen_commission += frozen_commission - old_commission
+            self._publish_locked()
+
+    def on_trade(self, trade: dict):
+        """
+        成交回报: 累计手续费 (持仓与保证金由持仓簿维护)
+
+        重复回报由网关的 ReturnDeduper 过滤 (交易日切换时重置)，这里不再按 TradeID 去重:
+        TradeID 只在一个交易日内唯一，跨夜运行时本地集合会误丢次日的成交
+        """
+        instrument_id = trade.get('InstrumentID', '')
+        price = float(trade.get('Price') or 0.0)
+        volume = int(trade.get('Volume') or 0)
+        if not instrument_id or volume <= 0:
+            return
+        commission = self._commission(instrument_id, trade.get('OffsetFlag', '0'), price, volume)
+
+        with self._lock:
+            self._trade_seq += 1
+            self._d_commission += commission
+            if not self._owns_book:
+                self._publish_locked()
+        if self._owns_book:
+            # 持仓簿变化后通知重建快照
+            self.positions.on_trade(trade)
+
+    def on_tick(self, tick):
+        """行情: 转交持仓簿重算该合约的持仓盈亏"""
+        self.positions.on_tick(tick)
+
+    def _on_positions_changed(self):
+        if self._loading:
+            return
+        with self._lock:
+            self._publish_locked()
+
+    # ==================== 快照 ====================
+
+    def _publish_locked(self):
+        """构建新快照 (读方直接取引用)"""
+        base = self._base
+        book = self.positions
+        d_close_profit = book.close_profit - self._close_profit_at_reconcile
+        d_margin = book.margin - self._margin_at_reconcile
+        if book.all_priced():
+            position_profit = book.position_profit
+        else:
+            # 尚有持仓未收到行情时沿用柜台值
+            position_profit = base['position_profit']
+        frozen = self._frozen_margin + self._frozen_commission
+        balance = (base['balance'] + d_close_profit - self._d_commission
+                   + position_profit - base['position_profit'])
+        available = (base['available'] + (balance - base['balance']) - d_margin
+                     - (frozen - self._frozen_at_reconcile))
+        self._snapshot = {
+            'account_id': base['account_id'],
+            'balance': balance,
+            'available': available,
+            'frozen_cash': base['frozen_cash'] + frozen - self._frozen_at_reconcile,
+            'frozen_margin': self._frozen_margin,
+            'frozen_commission': self._frozen_commission,
+            'curr_margin': base['curr_margin'] + d_margin,
+            'close_profit': base['close_profit'] + d_close_profit,
+            'position_profit': position_profit,
+            'commission': base['commission'] + self._d_commission,
+            'withdraw_quota': base['withdraw_quota'],
+            'reconciled_at': self._reconciled_at,
+            'updated_at': time.time(),
+        }
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """当前资金快照 (只读，字段同 CtpGateway.query_account，另含冻结明细与对账时间)"""
+        return self._snapshot
+
+    def is_reconciled(self) -> bool:
+        """是否已与柜台对账过"""
+        return self._reconciled_at > 0
+
+    # ==================== 对账 ====================
+
+    def apply_counter_state(self, account: dict, positions: Optional[dict] = None):
+        """
+        以柜台查询结果为新基准
+
+        Args:
+            account: CtpGateway.query_account 结果
+            positions: CtpGateway.query_position 结果 (重新加载持仓簿)，None 时保留本地持仓
+        """
+        if positions is not None:
+            # 加载期间不按旧基准重建快照
+            self._loading = True
+            try:
+                self.positions.load(positions)
+            finally:
+                self._loading = False
+        with self._lock:
+            self._base = {name: account.get(name, '' if name == 'account_id' else 0.0)
+                          for name in self.SNAPSHOT_FIELDS}
+            self._close_profit_at_reconcile = self.positions.close_profit
+            self._margin_at_reconcile = self.positions.margin
+            self._d_commission = 0.0
+            self._frozen_at_reconcile = self._frozen_margin + self._frozen_commission
+            self._reconciled_at = time.time()
+            self._publish_locked()
+
+    def reconcile(self, timeout: float = 10) -> bool:
+        """
+        与柜台对账 (资金 + 持仓)
+
+        Returns:
+            是否已应用对账结果 (查询失败或期间有新成交时返回 False)
+        """
+        gateway = self.gateway
+        if gateway is None or not gateway.is_logged_in():
+            return False
+        seq = self._trade_seq
+        account_future = gateway.submit_query_account()
+        position_future = gateway.submit_query_position()
+        account = account_future.result(timeout)
+        positions = position_future.result(timeout)
+        if account is None or not position_future.ok():
+            return False
+        if self._trade_seq != seq:
+            # 查询期间的成交可能已计入柜台结果，也可能没有，等下一次对账
+            return False
+        self.apply_counter_state(account, positions)
+        return True
+
+    def start(self, interval: float = 60.0):
+        """启动定期对账线程"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.reconcile()
+                except Exception:
+                    pass
+
+        self._thread = threading.Thread(target=run, name="account-reconcile", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止定期对账"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
@@ -10,6 +10,7 @@ CTP网关核心模块
 import os
 import sys
 import time
+import itertools
 import threading
 from typing import Optional, Dict, Callable, Any, List
 from enum import Enum
@@ -31,6 +32,7 @@ try:
         VolumeCondition as CTPVolumeCondition,
         OrderStatus as CTPOrderStatus,
         ResumeType,
+        OrderInsertArgs,
     )
     CTP_API_AVAILABLE = True
 except ImportError as e:
@@ -41,9 +43,23 @@ except ImportError as e:
 try:
     from ..config.settings import Settings, ConnectionConfig
     from ..trade_logging.trade_logger import get_logger, TradeLogger
+    from ..trade_logging.audit_writer import AsyncAuditWriter
+    from .query_scheduler import QueryScheduler, QueryFuture, last_item, keyed_items
+    from .order_fast_path import (OrderTemplateCache, LatencyStats, DIRECTION_BYTES,
+                                  OFFSET_BYTES, now_ns)
+    from .order_events import OrderEvent, TradeEvent, ReturnDeduper
+    from .order_store import OrderStore
+    from .front_selector import FrontSelector
 except ImportError:
     from config.settings import Settings, ConnectionConfig
     from trade_logging.trade_logger import get_logger, TradeLogger
+    from trade_logging.audit_writer import AsyncAuditWriter
+    from core.query_scheduler import QueryScheduler, QueryFuture, last_item, keyed_items
+    from core.order_fast_path import (OrderTemplateCache, LatencyStats, DIRECTION_BYTES,
+                                      OFFSET_BYTES, now_ns)
+    from core.order_events import OrderEvent, TradeEvent, ReturnDeduper
+    from core.order_store import OrderStore
+    from core.front_selector import FrontSelector
 
 
 class Direction(Enum):
@@ -61,6 +77,18 @@ class OffsetFlag(Enum):
     CLOSE_YESTERDAY = '4' # 平昨
 
 
+# 网关枚举 -> CTP API 枚举 (旧版 wrapper 的 ReqOrderInsert 回退路径)
+if CTP_API_AVAILABLE:
+    _CTP_DIRECTION = {Direction.BUY: CTPDirection.BUY, Direction.SELL: CTPDirection.SELL}
+    _CTP_OFFSET = {
+        OffsetFlag.OPEN: CTPOffsetFlag.OPEN,
+        OffsetFlag.CLOSE: CTPOffsetFlag.CLOSE,
+        OffsetFlag.CLOSE_TODAY: CTPOffsetFlag.CLOSE_TODAY,
+        OffsetFlag.CLOSE_YESTERDAY: CTPOffsetFlag.CLOSE_YESTERDAY,
+        OffsetFlag.FORCE_CLOSE: CTPOffsetFlag.FORCE_CLOSE,
+    }
+
+
 class OrderStatus(Enum):
     """订单状态"""
     ALL_TRADED = '0'          # 全部成交
@@ -74,6 +102,38 @@ class OrderStatus(Enum):
     TOUCHED = 'c'             # 已触发
 
 
+def split_today_position(position: int, yd_position: int,
+                         today_position: Optional[int] = None, position_date: str = '') -> int:
+    """
+    持仓查询的一条记录 -> 今仓手数 (其余为昨仓)
+
+    YdPosition 是上日结算后的静态持仓，盘中平昨不会减少，不能用 Position - YdPosition 拆分:
+    - 上期所/能源中心分今仓 (PositionDate='1') 与历史仓 ('2') 两条返回，按 PositionDate 整条归属
+    - 其他交易所只有一条 (PositionDate='1')，今仓取 TodayPosition
+    - 旧版 wrapper 不提供这两个字段时近似为 Position - min(YdPosition, Position)
+    """
+    if position_date == '2':
+        return 0
+    if today_position is not None:
+        return min(max(int(today_position), 0), position)
+    return position - min(yd_position, position)
+
+
+def merge_positions(items: list) -> Dict[str, Any]:
+    """
+    持仓分页 -> 字典 (上期所/能源中心的今仓、昨仓分两条返回，同一方向合并为一条)
+    """
+    positions: Dict[str, Any] = {}
+    for key, item in items:
+        merged = positions.get(key)
+        if merged is None:
+            positions[key] = dict(item)
+            continue
+        for name in ("position", "yd_position", "today_position", "position_cost", "use_margin"):
+            merged[name] += item[name]
+    return positions
+
+
 @dataclass
 class OrderRequest:
     """报单请求"""
@@ -109,39 +169,50 @@ class CtpGateway:
         # API实例
         self._api: Optional[CTPTraderApi] = None
 
+        # 交易前置 (多前置时按测速排序，重连时切换)
+        self.front_selector = FrontSelector(
+            self.config.get_trade_fronts(),
+            probe_timeout=self.config.front_probe_timeout,
+            logger=self.logger,
+        )
+        self._front = ""
+
         # 状态
         self._connected = False
         self._authenticated = False
         self._logged_in = False
         self._trading_enabled = True
 
+        # 断线恢复: 首次登录成功后，连上即自动认证→登录→确认结算单 (在回调线程中逐步发出)；
+        # 重建 API 时私有/公有流按 RESUME 续传，重复回报按序号丢弃
+        self._auto_login = False
+        self._resume_streams = False
+        self._returns = ReturnDeduper()
+        self._timeline: Dict[str, float] = {}
+        self._last_recovery: Optional[Dict[str, Any]] = None
+
         # 会话信息
         self._front_id = 0
         self._session_id = 0
         self._trading_day = ""
-        self._order_ref = 0
-        self._request_id = 0
+        # itertools.count 的 next() 在 GIL 下是原子的，报单/请求编号无需加锁
+        self._order_refs = itertools.count(1)
+        self._request_ids = itertools.count(1)
 
         # 数据缓存
         self._instruments: Dict[str, Any] = {}
         self._positions: Dict[str, Any] = {}
         self._account: Optional[Dict] = None
-        self._orders: Dict[str, Any] = {}
-        self._trades: Dict[str, Any] = {}
-        self._exchanges: List[Dict] = []
-        self._products: List[Dict] = []
-        self._position_details: List[Dict] = []
-        self._investor_info: Optional[Dict] = None
-        self._trading_codes: List[Dict] = []
-        self._order_comm_rate: Optional[Dict] = None
+        self._orders = OrderStore(
+            max_done=self.config.order_archive_size,
+            journal=lambda order: self._audit.submit(self._journal_order, order))
         self._instrument_status: Dict[str, Any] = {}
-        self._margin_rate: Optional[Dict] = None
-        self._commission_rate: Optional[Dict] = None
 
         # 回调
         self._callbacks: Dict[str, List[Callable]] = {
             "on_connected": [],
             "on_disconnected": [],
+            "on_login": [],
             "on_order": [],
             "on_trade": [],
             "on_error": [],
@@ -152,34 +223,37 @@ class CtpGateway:
         self._auth_event = threading.Event()
         self._login_event = threading.Event()
         self._settlement_event = threading.Event()
-        self._instrument_event = threading.Event()
-        self._account_event = threading.Event()
-        self._position_event = threading.Event()
-        self._exchange_event = threading.Event()
-        self._product_event = threading.Event()
-        self._position_detail_event = threading.Event()
-        self._investor_event = threading.Event()
-        self._trading_code_event = threading.Event()
-        self._order_comm_rate_event = threading.Event()
-        self._order_event = threading.Event()
-        self._trade_event = threading.Event()
-        self._margin_rate_event = threading.Event()
-        self._commission_rate_event = threading.Event()
-
-        # 锁
-        self._lock = threading.Lock()
+
+        # 报单快速路径: 预编码模板、延迟统计、异步审计日志
+        self._order_templates = OrderTemplateCache()
+        self._order_latency = LatencyStats()
+        self._audit = AsyncAuditWriter(
+            name="order-audit",
+            on_error=lambda e: self.logger.log_exception(e, "order audit"))
+
+        # 查询调度 (按 request_id 跟踪，遵守查询流控)
+        self._query_scheduler = QueryScheduler(
+            self._get_request_id,
+            max_per_second=self.config.query_rate,
+            max_inflight=self.config.query_max_inflight,
+            response_timeout=self.config.query_response_timeout,
+            logger=self.logger,
+        )
 
     def _get_request_id(self) -> int:
         """获取请求ID"""
-        with self._lock:
-            self._request_id += 1
-            return self._request_id
+        return next(self._request_ids)
+
+    def _mark(self, phase: str):
+        """记录连接恢复阶段的时间点"""
+        self._timeline[phase] = time.perf_counter()
 
-    def _get_order_ref(self) -> str:
-        """获取报单引用"""
-        with self._lock:
-            self._order_ref += 1
-            return str(self._order_ref)
+    def _fire(self, event: str, *args):
+        for callback in self._callbacks.get(event, []):
+            try:
+                callback(*args)
+            except Exception as e:
+                self.logger.log_exception(e, f"{event} callback")
 
     def _setup_callbacks(self):
         """设置API回调"""
@@ -188,14 +262,13 @@ class CtpGateway:
 
         # 连接回调
         def on_connected():
-            self.logger.log_connection("CONNECTED", self.config.trade_front)
+            self._mark("connected")
+            self.logger.log_connection("CONNECTED", self._front)
             self._connected = True
             self._connect_event.set()
-            for callback in self._callbacks.get("on_connected", []):
-                try:
-                    callback()
-                except Exception as e:
-                    self.logger.log_exception(e, "on_connected callback")
+            if self._auto_login:
+                self._send_authenticate()
+            self._fire("on_connected")
 
         def on_disconnected(reason):
             reason_map = {
@@ -206,10 +279,16 @@ class CtpGateway:
                 0x2003: "收到错误报文",
             }
             reason_msg = reason_map.get(reason, f"未知原因({reason})")
+            self._timeline = {"disconnected": time.perf_counter()}
             self.logger.log_connection("DISCONNECTED", error_msg=reason_msg)
             self._connected = False
             self._authenticated = False
             self._logged_in = False
+            self._connect_event.clear()
+            self._auth_event.clear()
+            self._login_event.clear()
+            # 断线后在途查询不会再有响应
+            self._query_scheduler.fail_all(f"连接断开: {reason_msg}")
             for callback in self._callbacks.get("on_disconnected", []):
                 try:
                     callback(reason)
@@ -225,8 +304,11 @@ class CtpGateway:
                 self.logger.log_authenticate(success=False, error_msg=error_msg, error_code=error_id)
                 self._authenticated = False
             else:
+                self._mark("authenticated")
                 self.logger.log_authenticate(success=True)
                 self._authenticated = True
+                if self._auto_login:
+                    self._send_login()
             self._auth_event.set()
 
         # 登录回调
@@ -248,16 +330,33 @@ class CtpGateway:
                     front_id=front_id,
                     session_id=session_id
                 )
+                self._mark("logged_in")
                 self._logged_in = True
                 self._front_id = front_id
                 self._session_id = session_id
+                self._orders.set_session(front_id, session_id)
+                if self._trading_day and trading_day != self._trading_day:
+                    self._returns.reset()
                 self._trading_day = trading_day
                 if max_order_ref:
                     try:
-                        self._order_ref = int(max_order_ref)
+                        self._order_refs = itertools.count(int(max_order_ref) + 1)
                     except:
                         pass
+                self._order_templates.reset(self.config.broker_id, self.config.investor_id)
+                if "login_sent" in self._timeline:
+                    self.front_selector.record(
+                        self._front,
+                        login_ms=(self._timeline["logged_in"] - self._timeline["login_sent"]) * 1000)
+                # 之后的连接 (CTP 自动重连或重建 API) 自动登录并续传
+                self._resume_streams = True
+                if self._auto_login:
+                    self._send_settlement_confirm()
+                if "disconnected" in self._timeline:
+                    self._finish_recovery()
             self._login_event.set()
+            if error_id == 0:
+                self._fire("on_login")
 
         def on_logout(broker_id, user_id, error_id, error_msg, request_id, is_last):
             self.logger.log_system("用户登出", {"investor_id": user_id})
@@ -265,6 +364,7 @@ class CtpGateway:
         # 结算确认回调
         def on_settlement_confirm(broker_id, investor_id, confirm_date, confirm_time,
                                   error_id, error_msg, request_id, is_last):
+            self._mark("confirmed")
             self.logger.log_system("结算单确认完成")
             self._settlement_event.set()
 
@@ -309,7 +409,8 @@ class CtpGateway:
                 )
                 for callback in self._callbacks.get("on_error", []):
                     try:
-                        callback("cancel_error", {"order_ref": order_ref},
+                        callback("cancel_error",
+                                {"order_ref": order_ref, "front_id": front_id, "session_id": session_id},
                                 {"ErrorID": error_id, "ErrorMsg": error_msg})
                     except Exception as e:
                         self.logger.log_exception(e, "on_error callback")
@@ -322,83 +423,48 @@ class CtpGateway:
                 return chr(val[0]) if val else ''
             return str(val)
 
-        def on_rtn_order(broker_id, investor_id, instrument_id, order_ref, user_id,
-                        direction, offset_flag, price, volume_total, volume_traded,
-                        order_status, order_sys_id, front_id, session_id,
-                        insert_date, insert_time, status_msg):
-            dir_char = _to_char(direction)
-            offset_char = _to_char(offset_flag)
-            status_char = _to_char(order_status)
-
-            self.logger.log_order_status(
-                order_ref=order_ref,
-                status=status_char,
-                status_msg=status_msg,
-                instrument_id=instrument_id,
-                direction=dir_char,
-                offset=offset_char,
-                volume_total=volume_total,
-                volume_traded=volume_traded
-            )
-            order_data = {
-                "OrderRef": order_ref,
-                "InstrumentID": instrument_id,
-                "Direction": dir_char,
-                "CombOffsetFlag": offset_char,
-                "LimitPrice": price,
-                "VolumeTotal": volume_total,
-                "VolumeTraded": volume_traded,
-                "OrderStatus": status_char,
-                "OrderSysID": order_sys_id,
-                "FrontID": front_id,
-                "SessionID": session_id,
-                "StatusMsg": status_msg,
-            }
-            self._orders[order_ref] = order_data
+        # 报单/成交回报: 原始字节构建一个事件对象，日志交给异步审计线程 (延迟字段在该线程解码)
+        def on_rtn_order(*fields, sequence_no=0):
+            order = OrderEvent(*fields)
+            if not self._returns.accept_order(order, sequence_no):
+                return
+            self._audit.submit(self._log_order_event, order)
+            self._orders.update(order)
             for callback in self._callbacks.get("on_order", []):
                 try:
-                    callback(order_data)
+                    callback(order)
                 except Exception as e:
                     self.logger.log_exception(e, "on_order callback")
 
-        def on_rtn_trade(broker_id, investor_id, instrument_id, order_ref, user_id,
-                        trade_id, direction, offset_flag, price, volume,
-                        trade_date, trade_time, order_sys_id):
-            dir_char = _to_char(direction)
-            offset_char = _to_char(offset_flag)
-
-            self.logger.log_trade(
-                instrument_id=instrument_id,
-                direction=dir_char,
-                offset=offset_char,
-                price=price,
-                volume=volume,
-                trade_id=trade_id,
-                order_ref=order_ref
+        def on_rtn_trade(*fields, sequence_no=0):
+            trade = TradeEvent(*fields)
+            if not self._returns.accept_trade(trade):
+                return
+            self._audit.submit(
+                self.logger.log_trade,
+                instrument_id=trade.instrument_id,
+                direction=trade.direction,
+                offset=trade.offset,
+                price=trade.price,
+                volume=trade.volume,
+                trade_id=trade.trade_id,
+                order_ref=trade.order_ref
             )
-            trade_data = {
-                "TradeID": trade_id,
-                "InstrumentID": instrument_id,
-                "Direction": dir_char,
-                "OffsetFlag": offset_char,
-                "Price": price,
-                "Volume": volume,
-                "OrderRef": order_ref,
-                "TradeDate": trade_date,
-                "TradeTime": trade_time,
-            }
             for callback in self._callbacks.get("on_trade", []):
                 try:
-                    callback(trade_data)
+                    callback(trade)
                 except Exception as e:
                     self.logger.log_exception(e, "on_trade callback")
 
-        # 查询回调
+        # 查询回调: 每页数据交给查询调度器，按 request_id 累积到对应的 QueryFuture
+        respond = self._query_scheduler.on_response
+
         def on_qry_instrument(instrument_id, exchange_id, instrument_name, product_id,
                              volume_multiple, price_tick, long_margin_ratio, short_margin_ratio,
                              is_trading, error_id, error_msg, request_id, is_last):
+            item = None
             if instrument_id:
-                self._instruments[instrument_id] = {
+                item = (instrument_id, {
                     "instrument_id": instrument_id,
                     "exchange_id": exchange_id,
                     "instrument_name": instrument_name,
@@ -408,17 +474,16 @@ class CtpGateway:
                     "long_margin_ratio": long_margin_ratio,
                     "short_margin_ratio": short_margin_ratio,
                     "is_trading": is_trading,
-                }
-            if is_last:
-                self.settings.instruments = self._instruments
-                self._instrument_event.set()
+                })
+            respond(request_id, item, error_id, error_msg, is_last)
 
         def on_qry_trading_account(broker_id, account_id, balance, available, frozen_cash,
                                    curr_margin, close_profit, position_profit,
                                    commission, withdraw_quota,
                                    error_id, error_msg, request_id, is_last):
+            item = None
             if account_id:
-                self._account = {
+                item = {
                     "account_id": account_id,
                     "balance": balance,
                     "available": available,
@@ -429,41 +494,44 @@ class CtpGateway:
                     "commission": commission,
                     "withdraw_quota": withdraw_quota,
                 }
-            if is_last:
-                self._account_event.set()
+            respond(request_id, item, error_id, error_msg, is_last)
 
         def on_qry_position(broker_id, investor_id, instrument_id, position_direction,
                            position, yd_position, position_cost, open_cost,
                            use_margin, frozen_margin,
-                           error_id, error_msg, request_id, is_last):
+                           error_id, error_msg, request_id, is_last,
+                           today_position=None, position_date=''):
+            item = None
             if instrument_id and position > 0:
-                key = f"{instrument_id}_{chr(position_direction) if isinstance(position_direction, int) else position_direction}"
-                self._positions[key] = {
+                dir_char = chr(position_direction) if isinstance(position_direction, int) else position_direction
+                today = split_today_position(position, yd_position, today_position, position_date)
+                item = (f"{instrument_id}_{dir_char}", {
                     "instrument_id": instrument_id,
-                    "direction": chr(position_direction) if isinstance(position_direction, int) else position_direction,
+                    "direction": dir_char,
                     "position": position,
-                    "yd_position": yd_position,
-                    "today_position": position - yd_position,
+                    "yd_position": position - today,
+                    "today_position": today,
                     "position_cost": position_cost,
                     "use_margin": use_margin,
-                }
-            if is_last:
-                self._position_event.set()
+                })
+            respond(request_id, item, error_id, error_msg, is_last)
 
         def on_error(error_id, error_msg, request_id, is_last):
             self.logger.log_error("CTP错误", error_code=error_id, error_msg=error_msg)
+            self._query_scheduler.on_error(request_id, error_id, error_msg)
 
         # 查询订单回调
         def on_qry_order(broker_id, investor_id, instrument_id, order_ref,
                          direction, offset_flag, price, volume_total, volume_traded,
                          order_status, order_sys_id, insert_date, insert_time,
                          error_id, error_msg, request_id, is_last):
+            item = None
             if instrument_id:
                 dir_char = _to_char(direction) if direction else '0'
                 offset_char = _to_char(offset_flag) if offset_flag else '0'
                 status_char = _to_char(order_status) if order_status else 'a'
                 key = order_ref or order_sys_id or f"{instrument_id}_{insert_time}"
-                self._orders[key] = {
+                item = (key, {
                     "OrderRef": order_ref,
                     "InstrumentID": instrument_id,
                     "Direction": dir_char,
@@ -475,19 +543,19 @@ class CtpGateway:
                     "OrderSysID": order_sys_id,
                     "InsertDate": insert_date,
                     "InsertTime": insert_time,
-                }
-            if is_last:
-                self._order_event.set()
+                })
+            respond(request_id, item, error_id, error_msg, is_last)
 
         # 查询成交回调
         def on_qry_trade(broker_id, investor_id, instrument_id, trade_id,
                          direction, offset_flag, price, volume,
                          trade_date, trade_time,
                          error_id, error_msg, request_id, is_last):
+            item = None
             if instrument_id:
                 dir_char = _to_char(direction) if direction else '0'
                 offset_char = _to_char(offset_flag) if offset_flag else '0'
-                self._trades[trade_id] = {
+                item = (trade_id, {
                     "TradeID": trade_id,
                     "InstrumentID": instrument_id,
                     "Direction": dir_char,
@@ -496,44 +564,44 @@ class CtpGateway:
                     "Volume": volume,
                     "TradeDate": trade_date,
                     "TradeTime": trade_time,
-                }
-            if is_last:
-                self._trade_event.set()
+                })
+            respond(request_id, item, error_id, error_msg, is_last)
 
         # 扩展查询回调
         def on_qry_exchange(exchange_id, exchange_name,
                             error_id, error_msg, request_id, is_last):
+            item = None
             if exchange_id:
-                self._exchanges.append({
+                item = {
                     "exchange_id": exchange_id,
                     "exchange_name": exchange_name,
-                })
-            if is_last:
-                self._exchange_event.set()
+                }
+            respond(request_id, item, error_id, error_msg, is_last)
 
         def on_qry_product(product_id, product_name, exchange_id, product_class,
                            volume_multiple, price_tick,
                            error_id, error_msg, request_id, is_last):
+            item = None
             if product_id:
-                self._products.append({
+                item = {
                     "product_id": product_id,
                     "product_name": product_name,
                     "exchange_id": exchange_id,
                     "product_class": product_class,
                     "volume_multiple": volume_multiple,
                     "price_tick": price_tick,
-                })
-            if is_last:
-                self._product_event.set()
+                }
+            respond(request_id, item, error_id, error_msg, is_last)
 
         def on_qry_position_detail(broker_id, investor_id, instrument_id, exchange_id,
                                     direction, open_date, trade_id, volume,
                                     open_price, margin, close_profit, position_profit,
                                     trading_day,
                                     error_id, error_msg, request_id, is_last):
+            item = None
             if instrument_id and volume > 0:
                 dir_char = _to_char(direction) if direction else '0'
-                self._position_details.append({
+                item = {
                     "instrument_id": instrument_id,
                     "exchange_id": exchange_id,
                     "direction": dir_char,
@@ -545,48 +613,47 @@ class CtpGateway:
                     "close_profit": close_profit,
                     "position_profit": position_profit,
                     "trading_day": trading_day,
-                })
-            if is_last:
-                self._position_detail_event.set()
+                }
+            respond(request_id, item, error_id, error_msg, is_last)
 
         def on_qry_investor(broker_id, investor_id, investor_name, id_card_no,
                             investor_type,
                             error_id, error_msg, request_id, is_last):
+            item = None
             if investor_id:
-                self._investor_info = {
+                item = {
                     "broker_id": broker_id,
                     "investor_id": investor_id,
                     "investor_name": investor_name,
                     "id_card_no": id_card_no,
                     "investor_type": investor_type,
                 }
-            if is_last:
-                self._investor_event.set()
+            respond(request_id, item, error_id, error_msg, is_last)
 
         def on_qry_trading_code(broker_id, investor_id, exchange_id, client_id,
                                 client_id_type,
                                 error_id, error_msg, request_id, is_last):
+            item = None
             if exchange_id:
-                self._trading_codes.append({
+                item = {
                     "exchange_id": exchange_id,
                     "client_id": client_id,
                     "client_id_type": client_id_type,
-                })
-            if is_last:
-                self._trading_code_event.set()
+                }
+            respond(request_id, item, error_id, error_msg, is_last)
 
         def on_qry_order_comm_rate(broker_id, investor_id, instrument_id,
                                     order_comm, action_comm, exchange_id,
                                     error_id, error_msg, request_id, is_last):
+            item = None
             if instrument_id:
-                self._order_comm_rate = {
+                item = {
                     "instrument_id": instrument_id,
                     "order_comm_by_volume": order_comm,
                     "order_action_comm_by_volume": action_comm,
                     "exchange_id": exchange_id,
                 }
-            if is_last:
-                self._order_comm_rate_event.set()
+            respond(request_id, item, error_id, error_msg, is_last)
 
         def on_rtn_instrument_status(exchange_id, instrument_id, instrument_status,
                                       enter_time, enter_reason):
@@ -603,24 +670,25 @@ class CtpGateway:
                                long_margin_ratio_by_money, long_margin_ratio_by_volume,
                                short_margin_ratio_by_money, short_margin_ratio_by_volume,
                                error_id, error_msg, request_id, is_last):
+            item = None
             if instrument_id:
-                self._margin_rate = {
+                item = {
                     "instrument_id": instrument_id,
                     "long_margin_ratio_by_money": long_margin_ratio_by_money,
                     "long_margin_ratio_by_volume": long_margin_ratio_by_volume,
                     "short_margin_ratio_by_money": short_margin_ratio_by_money,
                     "short_margin_ratio_by_volume": short_margin_ratio_by_volume,
                 }
-            if is_last:
-                self._margin_rate_event.set()
+            respond(request_id, item, error_id, error_msg, is_last)
 
         def on_qry_commission_rate(broker_id, investor_id, instrument_id,
                                     open_ratio_by_money, open_ratio_by_volume,
                                     close_ratio_by_money, close_ratio_by_volume,
                                     close_today_ratio_by_money, close_today_ratio_by_volume,
                                     error_id, error_msg, request_id, is_last):
+            item = None
             if instrument_id:
-                self._commission_rate = {
+                item = {
                     "instrument_id": instrument_id,
                     "open_ratio_by_money": open_ratio_by_money,
                     "open_ratio_by_volume": open_ratio_by_volume,
@@ -629,8 +697,33 @@ class CtpGateway:
                     "close_today_ratio_by_money": close_today_ratio_by_money,
                     "close_today_ratio_by_volume": close_today_ratio_by_volume,
                 }
-            if is_last:
-                self._commission_rate_event.set()
+            respond(request_id, item, error_id, error_msg, is_last)
+
+        def on_qry_depth_market_data(inst_id, exchange_id, last_price, pre_settlement_price,
+                                     open_price, highest_price, lowest_price,
+                                     volume, turnover, open_interest,
+                                     bid_price1, bid_volume1, ask_price1, ask_volume1,
+                                     update_time, error_id, error_msg, request_id, is_last):
+            item = None
+            if inst_id:
+                item = {
+                    "instrument_id": inst_id,
+                    "exchange_id": exchange_id,
+                    "last_price": last_price,
+                    "pre_settlement_price": pre_settlement_price,
+                    "open_price": open_price,
+                    "highest_price": highest_price,
+                    "lowest_price": lowest_price,
+                    "volume": volume,
+                    "turnover": turnover,
+                    "open_interest": open_interest,
+                    "bid_price1": bid_price1,
+                    "bid_volume1": bid_volume1,
+                    "ask_price1": ask_price1,
+                    "ask_volume1": ask_volume1,
+                    "update_time": update_time
+                }
+            respond(request_id, item, error_id, error_msg, is_last)
 
         # 注册回调
         self._api.on_front_connected = on_connected
@@ -642,8 +735,8 @@ class CtpGateway:
         self._api.on_rsp_settlement_info_confirm = on_settlement_confirm
         self._api.on_rsp_order_insert = on_order_insert
         self._api.on_rsp_order_action = on_order_action
-        self._api.on_rtn_order = on_rtn_order
-        self._api.on_rtn_trade = on_rtn_trade
+        self._api.on_rtn_order_raw = on_rtn_order
+        self._api.on_rtn_trade_raw = on_rtn_trade
         self._api.on_rsp_qry_instrument = on_qry_instrument
         self._api.on_rsp_qry_trading_account = on_qry_trading_account
         self._api.on_rsp_qry_investor_position = on_qry_position
@@ -659,9 +752,27 @@ class CtpGateway:
         self._api.on_rtn_instrument_status = on_rtn_instrument_status
         self._api.on_rsp_qry_instrument_margin_rate = on_qry_margin_rate
         self._api.on_rsp_qry_instrument_commission_rate = on_qry_commission_rate
+        self._api.on_rsp_qry_depth_market_data = on_qry_depth_market_data
 
     # ==================== 连接管理 ====================
 
+    def _log_order_event(self, order: OrderEvent):
+        """订单状态日志 (审计线程)"""
+        self.logger.log_order_status(
+            order_ref=order.order_ref,
+            status=order.status,
+            status_msg=order.status_msg,
+            instrument_id=order.instrument_id,
+            direction=order.direction,
+            offset=order.offset,
+            volume_total=order.volume_total,
+            volume_traded=order.volume_traded
+        )
+
+    def _journal_order(self, order: OrderEvent):
+        """终态报单写入报单流水 (审计线程)"""
+        self.logger.log_order_archive(order.to_dict())
+
     def connect(self, timeout: int = 30) -> bool:
         """
         连接到CTP服务器
@@ -677,10 +788,21 @@ class CtpGateway:
             self.logger.log_error("CTP API 未加载")
             return False
 
+        # 前置选择 (配置可能已被修改；多前置首次连接时并行测速)
+        self.front_selector.set_fronts(self.config.get_trade_fronts())
+        if not self.front_selector.probed:
+            self.front_selector.probe()
+        front = self._front = self.front_selector.current()
+
         self.logger.log_system("开始连接CTP服务器", {
-            "trade_front": self.config.trade_front
+            "trade_front": front
         })
 
+        # 重连时释放旧实例，避免其继续重连原前置
+        if self._api:
+            self._api.release()
+            self._api = None
+
         # 创建流文件目录
         flow_path = self.config.flow_path
         os.makedirs(flow_path, exist_ok=True)
@@ -688,19 +810,25 @@ class CtpGateway:
         # 创建API实例
         self._api = CTPTraderApi()
         self._api.create_api(flow_path)
+        self._order_templates.args_type = (
+            OrderInsertArgs if self._api.supports_order_args() else None)
 
         # 设置回调
         self._setup_callbacks()
 
         # 注册前置
-        self._api.register_front(self.config.trade_front)
+        self._api.register_front(front)
 
-        # 订阅私有流和公有流
-        self._api.subscribe_private_topic(ResumeType.QUICK)
-        self._api.subscribe_public_topic(ResumeType.QUICK)
+        # 订阅私有流和公有流: 首次连接只收登录后的内容 (持仓资金由查询对账)，
+        # 登录过之后重建 API 时从上次收到处续传，断线期间的回报不丢失
+        resume = ResumeType.RESUME if self._resume_streams else ResumeType.QUICK
+        self._api.subscribe_private_topic(resume)
+        self._api.subscribe_public_topic(resume)
 
         # 初始化连接
         self._connect_event.clear()
+        self._mark("connecting")
+        start = time.perf_counter()
         self._api.init()
 
         # 等待连接
@@ -708,6 +836,7 @@ class CtpGateway:
             self.logger.log_error("连接超时")
             return False
 
+        self.front_selector.record(front, connect_ms=(time.perf_counter() - start) * 1000)
         return self._connected
 
     # ==================== 认证登录 ====================
@@ -729,17 +858,7 @@ class CtpGateway:
 
         self.logger.log_system("开始客户端认证")
 
-        self._auth_event.clear()
-        ret = self._api.req_authenticate(
-            broker_id=self.config.broker_id,
-            user_id=self.config.investor_id,
-            app_id=self.config.app_id,
-            auth_code=self.config.auth_code,
-            request_id=self._get_request_id()
-        )
-
-        if ret != 0:
-            self.logger.log_error("认证请求发送失败", error_code=ret)
+        if not self._send_authenticate():
             return False
 
         if not self._auth_event.wait(timeout):
@@ -767,22 +886,15 @@ class CtpGateway:
             "investor_id": self.config.investor_id
         })
 
-        self._login_event.clear()
-        ret = self._api.req_user_login(
-            broker_id=self.config.broker_id,
-            user_id=self.config.investor_id,
-            password=self.config.password,
-            request_id=self._get_request_id()
-        )
-
-        if ret != 0:
-            self.logger.log_error("登录请求发送失败", error_code=ret)
+        if not self._send_login():
             return False
 
         if not self._login_event.wait(timeout):
             self.logger.log_error("登录超时")
             return False
 
+        if self._logged_in:
+            self._auto_login = True
         return self._logged_in
 
     def confirm_settlement(self, timeout: int = 10) -> bool:
@@ -790,17 +902,87 @@ class CtpGateway:
         if not self._logged_in:
             return False
 
+        if not self._send_settlement_confirm():
+            return False
+
+        return self._settlement_event.wait(timeout)
+
+    # ==================== 断线恢复 ====================
+
+    def _send_authenticate(self) -> bool:
+        """发送认证请求 (不等待应答)"""
+        self._auth_event.clear()
+        self._mark("auth_sent")
+        ret = self._api.req_authenticate(
+            broker_id=self.config.broker_id,
+            user_id=self.config.investor_id,
+            app_id=self.config.app_id,
+            auth_code=self.config.auth_code,
+            request_id=self._get_request_id()
+        )
+        if ret != 0:
+            self.logger.log_error("认证请求发送失败", error_code=ret)
+        return ret == 0
+
+    def _send_login(self) -> bool:
+        """发送登录请求 (不等待应答)"""
+        self._login_event.clear()
+        self._mark("login_sent")
+        ret = self._api.req_user_login(
+            broker_id=self.config.broker_id,
+            user_id=self.config.investor_id,
+            password=self.config.password,
+            request_id=self._get_request_id()
+        )
+        if ret != 0:
+            self.logger.log_error("登录请求发送失败", error_code=ret)
+        return ret == 0
+
+    def _send_settlement_confirm(self) -> bool:
+        """发送结算单确认请求 (不等待应答)"""
         self._settlement_event.clear()
         ret = self._api.req_settlement_info_confirm(
             broker_id=self.config.broker_id,
             investor_id=self.config.investor_id,
             request_id=self._get_request_id()
         )
+        return ret == 0
+
+    _RECOVERY_PHASES = ("disconnected", "connecting", "connected", "auth_sent",
+                        "authenticated", "login_sent", "logged_in")
+
+    def _finish_recovery(self):
+        """断线后重新登录: 统计各阶段耗时"""
+        timeline = self._timeline
+        marks = [(phase, timeline[phase]) for phase in self._RECOVERY_PHASES if phase in timeline]
+        start = marks[0][1]
+        self._last_recovery = {
+            "time_to_trading_ms": (timeline["logged_in"] - start) * 1000,
+            "phases_ms": {phase: (t - prev) * 1000
+                          for (_, prev), (phase, t) in zip(marks, marks[1:])},
+            "front": self._front,
+            "recreated": "connecting" in timeline,
+        }
+        self.logger.log_system("断线恢复完成", self._last_recovery)
 
-        if ret != 0:
-            return False
+    def wait_logged_in(self, timeout: float) -> bool:
+        """等待登录完成 (断线后由自动登录完成)，登录失败或超时返回 False"""
+        if self._logged_in:
+            return True
+        self._login_event.wait(timeout)
+        return self._logged_in
 
-        return self._settlement_event.wait(timeout)
+    def is_auto_login(self) -> bool:
+        """连上后是否自动认证登录 (首次手动登录成功后开启)"""
+        return self._auto_login
+
+    def get_recovery_timing(self) -> Optional[Dict[str, Any]]:
+        """最近一次断线恢复的各阶段耗时 (毫秒)"""
+        return self._last_recovery
+
+    def get_return_stats(self) -> Dict[str, int]:
+        """续传后被丢弃的重复报单/成交回报数"""
+        return self._returns.get_stats()
 
     # ==================== 交易功能 ====================
 
@@ -810,7 +992,8 @@ class CtpGateway:
                       order_price_type: str = '2',
                       time_condition: str = '3',
                       volume_condition: str = '1',
-                      min_volume: int = 1) -> Optional[str]:
+                      min_volume: int = 1,
+                      signal_ns: Optional[int] = None) -> Optional[str]:
         """
         开仓
         满足评估表第2项：开仓指令
@@ -820,6 +1003,7 @@ class CtpGateway:
             direction: 买卖方向
             price: 价格
             volume: 数量
+            signal_ns: 信号时间 (order_fast_path.now_ns)，用于延迟统计
 
         Returns:
             报单引用，失败返回None
@@ -833,6 +1017,7 @@ class CtpGateway:
             order_price_type=order_price_type,
             time_condition=time_condition,
             volume_condition=volume_condition,
+            signal_ns=signal_ns,
         )
 
     def close_position(self, instrument_id: str, direction: Direction,
@@ -840,7 +1025,8 @@ class CtpGateway:
                        close_today: bool = False,
                        order_price_type: str = '2',
                        time_condition: str = '3',
-                       volume_condition: str = '1') -> Optional[str]:
+                       volume_condition: str = '1',
+                       signal_ns: Optional[int] = None) -> Optional[str]:
         """
         平仓
         满足评估表第3项：平仓指令
@@ -851,6 +1037,7 @@ class CtpGateway:
             price: 价格
             volume: 数量
             close_today: 是否平今
+            signal_ns: 信号时间 (order_fast_path.now_ns)，用于延迟统计
 
         Returns:
             报单引用，失败返回None
@@ -865,6 +1052,7 @@ class CtpGateway:
             order_price_type=order_price_type,
             time_condition=time_condition,
             volume_condition=volume_condition,
+            signal_ns=signal_ns,
         )
 
     def cancel_order(self, instrument_id: str, order_ref: str,
@@ -886,7 +1074,31 @@ class CtpGateway:
             self.logger.log_error("未登录或交易已禁用，无法撤单")
             return False
 
-        self.logger.log_order_cancel(
+        return self.send_cancel(instrument_id, order_ref, exchange_id, order_sys_id) == 0
+
+    def send_cancel(self, instrument_id: str, order_ref: str,
+                    exchange_id: str = "", order_sys_id: str = "",
+                    front_id: int = 0, session_id: int = 0) -> int:
+        """
+        发送撤单请求 (不检查交易开关: 暂停交易后仍需能撤掉挂单)
+
+        Args:
+            instrument_id: 合约代码
+            order_ref: 报单引用
+            exchange_id: 交易所代码
+            order_sys_id: 报单编号
+            front_id: 报单所属前置编号，0 表示本会话
+            session_id: 报单所属会话编号，0 表示本会话
+
+        Returns:
+            CTP 请求返回值，0 表示已发送 (-2/-3 为流控拒绝)
+        """
+        if not self._logged_in:
+            self.logger.log_error("未登录，无法撤单")
+            return -1
+
+        self._audit.submit(
+            self.logger.log_order_cancel,
             instrument_id=instrument_id,
             order_ref=order_ref,
             order_sys_id=order_sys_id
@@ -897,26 +1109,31 @@ class CtpGateway:
             investor_id=self.config.investor_id,
             instrument_id=instrument_id,
             order_ref=order_ref,
-            front_id=self._front_id,
-            session_id=self._session_id,
+            front_id=front_id or self._front_id,
+            session_id=session_id or self._session_id,
             exchange_id=exchange_id,
             order_sys_id=order_sys_id,
-            request_id=self._get_request_id()
+            request_id=next(self._request_ids)
         )
 
         if ret != 0:
-            self.logger.log_error("撤单请求发送失败", error_code=ret)
-            return False
+            self._audit.submit(self.logger.log_error, "撤单请求发送失败", error_code=ret)
 
-        return True
+        return ret
 
     def _send_order(self, instrument_id: str, direction: Direction,
                     offset: OffsetFlag, price: float, volume: int,
                     order_price_type: str = '2',
                     time_condition: str = '3',
-                    volume_condition: str = '1') -> Optional[str]:
-        """发送报单"""
-        import sys
+                    volume_condition: str = '1',
+                    signal_ns: Optional[int] = None) -> Optional[str]:
+        """
+        发送报单
+
+        wrapper 支持报单参数块时复制合约模板后经 ReqOrderInsertArgs 发送，
+        否则回退到逐字段编码的 ReqOrderInsert；审计日志在 ReqOrderInsert 返回后交给后台线程写入
+        """
+        start_ns = signal_ns or now_ns()
         if not self._logged_in:
             self.logger.log_error("未登录，无法报单")
             return None
@@ -925,9 +1142,33 @@ class CtpGateway:
             self.logger.log_error("交易已禁用，无法报单")
             return None
 
-        order_ref = self._get_order_ref()
+        order_ref = str(next(self._order_refs))
+        template = self._order_templates.get(
+            instrument_id, order_price_type, time_condition, volume_condition)
+
+        if template is not None:
+            args = template.build(order_ref.encode(), DIRECTION_BYTES[direction.value],
+                                  OFFSET_BYTES[offset.value], price, volume)
+            ret = self._api.req_order_insert_args(args, next(self._request_ids))
+        else:
+            ret = self._api.req_order_insert(
+                broker_id=self.config.broker_id,
+                investor_id=self.config.investor_id,
+                instrument_id=instrument_id,
+                order_ref=order_ref,
+                direction=_CTP_DIRECTION[direction],
+                offset_flag=_CTP_OFFSET.get(offset, CTPOffsetFlag.OPEN),
+                price=price,
+                volume=volume,
+                order_price_type=ord(order_price_type),
+                time_condition=ord(time_condition),
+                volume_condition=ord(volume_condition),
+                request_id=next(self._request_ids)
+            )
+        self._order_latency.record(now_ns() - start_ns)
 
-        self.logger.log_order_insert(
+        self._audit.submit(
+            self.logger.log_order_insert,
             instrument_id=instrument_id,
             direction=direction.value,
             offset=offset.value,
@@ -936,97 +1177,146 @@ class CtpGateway:
             order_ref=order_ref
         )
 
-        # 转换方向和开平标志
-        ctp_direction = CTPDirection.BUY if direction == Direction.BUY else CTPDirection.SELL
-
-        ctp_offset_map = {
-            OffsetFlag.OPEN: CTPOffsetFlag.OPEN,
-            OffsetFlag.CLOSE: CTPOffsetFlag.CLOSE,
-            OffsetFlag.CLOSE_TODAY: CTPOffsetFlag.CLOSE_TODAY,
-            OffsetFlag.CLOSE_YESTERDAY: CTPOffsetFlag.CLOSE_YESTERDAY,
-            OffsetFlag.FORCE_CLOSE: CTPOffsetFlag.FORCE_CLOSE,
-        }
-        ctp_offset = ctp_offset_map.get(offset, CTPOffsetFlag.OPEN)
-
-        ret = self._api.req_order_insert(
-            broker_id=self.config.broker_id,
-            investor_id=self.config.investor_id,
-            instrument_id=instrument_id,
-            order_ref=order_ref,
-            direction=ctp_direction,
-            offset_flag=ctp_offset,
-            price=price,
-            volume=volume,
-            order_price_type=ord(order_price_type),
-            time_condition=ord(time_condition),
-            volume_condition=ord(volume_condition),
-            request_id=self._get_request_id()
-        )
-
         if ret != 0:
-            self.logger.log_error("报单请求发送失败", error_code=ret)
+            self._audit.submit(self.logger.log_error, "报单请求发送失败", error_code=ret)
             return None
 
         return order_ref
 
+    def warm_up_orders(self, instrument_ids, order_price_type: str = '2',
+                       time_condition: str = '3', volume_condition: str = '1') -> int:
+        """预先创建报单模板 (登录后对策略合约调用)，返回模板数"""
+        return self._order_templates.warm_up(
+            instrument_ids, order_price_type, time_condition, volume_condition)
+
+    def get_order_latency(self) -> Dict[str, Any]:
+        """信号到 ReqOrderInsert 返回的延迟统计"""
+        stats = self._order_latency.summary()
+        stats["fast_path"] = self._order_templates.args_type is not None
+        stats["audit_pending"] = self._audit.pending()
+        return stats
+
     # ==================== 查询功能 ====================
+    #
+    # submit_* 提交查询并立即返回 QueryFuture，可同时提交多个查询后分别等待；
+    # query_* 为阻塞版本。查询由 QueryScheduler 按流控发送，
+    # 相同查询在完成前合并为一次请求。
+
+    def _submit_query(self, kind: str, method: str, reducer=list, default=None,
+                      investor: bool = True, **kwargs) -> QueryFuture:
+        """
+        提交查询
+
+        Args:
+            kind: 查询类型 (同时作为合并键的一部分)
+            method: CTPTraderApi 请求方法名
+            reducer: 分页数据 -> 结果
+            default: 失败或超时的返回值
+            investor: 是否附带 broker_id / investor_id
+            **kwargs: 请求参数
+        """
+        if investor:
+            kwargs = dict(broker_id=self.config.broker_id,
+                          investor_id=self.config.investor_id, **kwargs)
+        key = (kind,) + tuple(sorted(kwargs.items()))
+
+        def send(request_id: int) -> int:
+            api = self._api
+            if api is None or not self._logged_in:
+                return -1
+            return getattr(api, method)(request_id=request_id, **kwargs)
+
+        return self._query_scheduler.submit(kind, send, reducer, default, key=key)
+
+    def submit_query_instruments(self) -> QueryFuture:
+        return self._submit_query('instrument', 'req_qry_instrument', keyed_items, {},
+                                  investor=False, instrument_id="", exchange_id="", product_id="")
+
+    def submit_query_account(self) -> QueryFuture:
+        return self._submit_query('account', 'req_qry_trading_account', last_item, None)
+
+    def submit_query_position(self, instrument_id: str = "") -> QueryFuture:
+        return self._submit_query('position', 'req_qry_investor_position', merge_positions, {},
+                                  instrument_id=instrument_id)
+
+    def submit_query_market_data(self, instrument_id: str) -> QueryFuture:
+        return self._submit_query('market_data', 'req_qry_depth_market_data', last_item, None,
+                                  investor=False, instrument_id=instrument_id)
+
+    def submit_query_orders(self, instrument_id: str = "") -> QueryFuture:
+        return self._submit_query('order', 'req_qry_order', keyed_items, {},
+                                  instrument_id=instrument_id)
+
+    def submit_query_trades(self, instrument_id: str = "") -> QueryFuture:
+        return self._submit_query('trade', 'req_qry_trade', keyed_items, {},
+                                  instrument_id=instrument_id)
+
+    def submit_query_exchanges(self) -> QueryFuture:
+        return self._submit_query('exchange', 'req_qry_exchange', list, [], investor=False)
+
+    def submit_query_products(self, exchange_id: str = "") -> QueryFuture:
+        return self._submit_query('product', 'req_qry_product', list, [], investor=False,
+                                  exchange_id=exchange_id)
+
+    def submit_query_position_detail(self, instrument_id: str = "") -> QueryFuture:
+        return self._submit_query('position_detail', 'req_qry_investor_position_detail', list, [],
+                                  instrument_id=instrument_id)
+
+    def submit_query_investor(self) -> QueryFuture:
+        return self._submit_query('investor', 'req_qry_investor', last_item, None)
+
+    def submit_query_trading_codes(self) -> QueryFuture:
+        return self._submit_query('trading_code', 'req_qry_trading_code', list, [])
+
+    def submit_query_order_comm_rate(self, instrument_id: str) -> QueryFuture:
+        return self._submit_query('order_comm_rate', 'req_qry_instrument_order_comm_rate',
+                                  last_item, None, instrument_id=instrument_id)
+
+    def submit_query_margin_rate(self, instrument_id: str) -> QueryFuture:
+        return self._submit_query('margin_rate', 'req_qry_instrument_margin_rate',
+                                  last_item, None, instrument_id=instrument_id)
+
+    def submit_query_commission_rate(self, instrument_id: str) -> QueryFuture:
+        return self._submit_query('commission_rate', 'req_qry_instrument_commission_rate',
+                                  last_item, None, instrument_id=instrument_id)
+
+    def get_query_stats(self) -> Dict[str, Any]:
+        """查询调度统计 (排队/在途/重试/失败)"""
+        return self._query_scheduler.get_stats()
 
     def query_instruments(self, timeout: int = 30) -> Dict[str, Any]:
         """查询合约"""
         if not self._logged_in:
             return {}
+        future = self.submit_query_instruments()
+        instruments = future.result(timeout)
+        if future.ok():
+            self.set_instruments(instruments)
+        return instruments
 
-        self._instruments.clear()
-        self._instrument_event.clear()
-
-        ret = self._api.req_qry_instrument(
-            instrument_id="",
-            exchange_id="",
-            product_id="",
-            request_id=self._get_request_id()
-        )
-        if ret != 0:
-            return {}
-
-        self._instrument_event.wait(timeout)
-        return self._instruments
+    def set_instruments(self, instruments: Dict[str, Any]):
+        """设置合约信息 (查询结果或 InstrumentCatalog 缓存)"""
+        self._instruments = instruments
+        self.settings.instruments = instruments
 
     def query_account(self, timeout: int = 10) -> Optional[Dict]:
         """查询资金账户"""
         if not self._logged_in:
             return None
-
-        self._account_event.clear()
-        ret = self._api.req_qry_trading_account(
-            broker_id=self.config.broker_id,
-            investor_id=self.config.investor_id,
-            request_id=self._get_request_id()
-        )
-        if ret != 0:
-            return None
-
-        self._account_event.wait(timeout)
-        return self._account
+        account = self.submit_query_account().result(timeout)
+        if account is not None:
+            self._account = account
+        return account
 
     def query_position(self, timeout: int = 10) -> Dict[str, Any]:
         """查询持仓"""
         if not self._logged_in:
             return {}
-
-        self._positions.clear()
-        self._position_event.clear()
-
-        ret = self._api.req_qry_investor_position(
-            broker_id=self.config.broker_id,
-            investor_id=self.config.investor_id,
-            instrument_id="",
-            request_id=self._get_request_id()
-        )
-        if ret != 0:
-            return {}
-
-        self._position_event.wait(timeout)
-        return self._positions
+        future = self.submit_query_position()
+        positions = future.result(timeout)
+        if future.ok():
+            self._positions = positions
+        return positions
 
     def query_market_data(self, instrument_id: str, timeout: int = 5) -> Optional[Dict]:
         """
@@ -1041,215 +1331,89 @@ class CtpGateway:
         """
         if not self._logged_in:
             return None
-
-        self._market_data = None
-        self._market_data_event = threading.Event()
-
-        # 注册回调
-        def on_market_data(inst_id, exchange_id, last_price, pre_settlement_price,
-                          open_price, highest_price, lowest_price,
-                          volume, turnover, open_interest,
-                          bid_price1, bid_volume1, ask_price1, ask_volume1,
-                          update_time, error_id, error_msg, request_id, is_last):
-            if inst_id == instrument_id:
-                self._market_data = {
-                    "instrument_id": inst_id,
-                    "exchange_id": exchange_id,
-                    "last_price": last_price,
-                    "pre_settlement_price": pre_settlement_price,
-                    "open_price": open_price,
-                    "highest_price": highest_price,
-                    "lowest_price": lowest_price,
-                    "volume": volume,
-                    "turnover": turnover,
-                    "open_interest": open_interest,
-                    "bid_price1": bid_price1,
-                    "bid_volume1": bid_volume1,
-                    "ask_price1": ask_price1,
-                    "ask_volume1": ask_volume1,
-                    "update_time": update_time
-                }
-                self._market_data_event.set()
-
-        old_callback = self._api.on_rsp_qry_depth_market_data
-        self._api.on_rsp_qry_depth_market_data = on_market_data
-
-        try:
-            ret = self._api.req_qry_depth_market_data(
-                instrument_id=instrument_id,
-                request_id=self._get_request_id()
-            )
-            if ret != 0:
-                self.logger.log_error(f"查询行情失败: ret={ret}")
-                return None
-
-            self._market_data_event.wait(timeout)
-            return self._market_data
-        finally:
-            self._api.on_rsp_qry_depth_market_data = old_callback
+        return self.submit_query_market_data(instrument_id).result(timeout)
 
     def query_orders(self, instrument_id: str = "", timeout: int = 10) -> Dict[str, Any]:
         """查询订单列表"""
         if not self._logged_in:
             return {}
-        self._orders.clear()
-        self._order_event.clear()
-        ret = self._api.req_qry_order(
-            broker_id=self.config.broker_id,
-            investor_id=self.config.investor_id,
-            instrument_id=instrument_id,
-            request_id=self._get_request_id()
-        )
-        if ret != 0:
-            return {}
-        self._order_event.wait(timeout)
-        return self._orders
+        return self.submit_query_orders(instrument_id).result(timeout)
 
     def query_trades(self, instrument_id: str = "", timeout: int = 10) -> Dict[str, Any]:
         """查询成交列表"""
         if not self._logged_in:
             return {}
-        self._trades.clear()
-        self._trade_event.clear()
-        ret = self._api.req_qry_trade(
-            broker_id=self.config.broker_id,
-            investor_id=self.config.investor_id,
-            instrument_id=instrument_id,
-            request_id=self._get_request_id()
-        )
-        if ret != 0:
-            return {}
-        self._trade_event.wait(timeout)
-        return self._trades
+        return self.submit_query_trades(instrument_id).result(timeout)
 
     def query_exchanges(self, timeout: int = 10) -> List[Dict]:
         """查询交易所列表"""
         if not self._logged_in:
             return []
-        self._exchanges.clear()
-        self._exchange_event.clear()
-        ret = self._api.req_qry_exchange(
-            request_id=self._get_request_id()
-        )
-        if ret != 0:
-            return []
-        self._exchange_event.wait(timeout)
-        return self._exchanges
+        return self.submit_query_exchanges().result(timeout)
 
     def query_products(self, exchange_id: str = "", timeout: int = 10) -> List[Dict]:
         """查询产品列表"""
         if not self._logged_in:
             return []
-        self._products.clear()
-        self._product_event.clear()
-        ret = self._api.req_qry_product(
-            exchange_id=exchange_id,
-            request_id=self._get_request_id()
-        )
-        if ret != 0:
-            return []
-        self._product_event.wait(timeout)
-        return self._products
+        return self.submit_query_products(exchange_id).result(timeout)
 
     def query_position_detail(self, instrument_id: str = "", timeout: int = 10) -> List[Dict]:
         """查询持仓明细"""
         if not self._logged_in:
             return []
-        self._position_details.clear()
-        self._position_detail_event.clear()
-        ret = self._api.req_qry_investor_position_detail(
-            broker_id=self.config.broker_id,
-            investor_id=self.config.investor_id,
-            instrument_id=instrument_id,
-            request_id=self._get_request_id()
-        )
-        if ret != 0:
-            return []
-        self._position_detail_event.wait(timeout)
-        return self._position_details
+        return self.submit_query_position_detail(instrument_id).result(timeout)
 
     def query_investor(self, timeout: int = 10) -> Optional[Dict]:
         """查询投资者信息"""
         if not self._logged_in:
             return None
-        self._investor_info = None
-        self._investor_event.clear()
-        ret = self._api.req_qry_investor(
-            broker_id=self.config.broker_id,
-            investor_id=self.config.investor_id,
-            request_id=self._get_request_id()
-        )
-        if ret != 0:
-            return None
-        self._investor_event.wait(timeout)
-        return self._investor_info
+        return self.submit_query_investor().result(timeout)
 
     def query_trading_codes(self, timeout: int = 10) -> List[Dict]:
         """查询交易编码"""
         if not self._logged_in:
             return []
-        self._trading_codes.clear()
-        self._trading_code_event.clear()
-        ret = self._api.req_qry_trading_code(
-            broker_id=self.config.broker_id,
-            investor_id=self.config.investor_id,
-            request_id=self._get_request_id()
-        )
-        if ret != 0:
-            return []
-        self._trading_code_event.wait(timeout)
-        return self._trading_codes
+        return self.submit_query_trading_codes().result(timeout)
 
     def query_order_comm_rate(self, instrument_id: str, timeout: int = 10) -> Optional[Dict]:
         """查询报单手续费"""
         if not self._logged_in:
             return None
-        self._order_comm_rate = None
-        self._order_comm_rate_event.clear()
-        ret = self._api.req_qry_instrument_order_comm_rate(
-            broker_id=self.config.broker_id,
-            investor_id=self.config.investor_id,
-            instrument_id=instrument_id,
-            request_id=self._get_request_id()
-        )
-        if ret != 0:
-            return None
-        self._order_comm_rate_event.wait(timeout)
-        return self._order_comm_rate
+        return self.submit_query_order_comm_rate(instrument_id).result(timeout)
 
     def query_margin_rate(self, instrument_id: str, timeout: int = 10) -> Optional[Dict]:
         """查询保证金率"""
         if not self._logged_in:
             return None
-        self._margin_rate = None
-        self._margin_rate_event.clear()
-        ret = self._api.req_qry_instrument_margin_rate(
-            broker_id=self.config.broker_id,
-            investor_id=self.config.investor_id,
-            instrument_id=instrument_id,
-            request_id=self._get_request_id()
-        )
-        if ret != 0:
-            return None
-        self._margin_rate_event.wait(timeout)
-        return self._margin_rate
+        return self.submit_query_margin_rate(instrument_id).result(timeout)
 
     def query_commission_rate(self, instrument_id: str, timeout: int = 10) -> Optional[Dict]:
         """查询手续费率"""
         if not self._logged_in:
             return None
-        self._commission_rate = None
-        self._commission_rate_event.clear()
-        ret = self._api.req_qry_instrument_commission_rate(
-            broker_id=self.config.broker_id,
-            investor_id=self.config.investor_id,
-            instrument_id=instrument_id,
-            request_id=self._get_request_id()
-        )
-        if ret != 0:
-            return None
-        self._commission_rate_event.wait(timeout)
-        return self._commission_rate
+        return self.submit_query_commission_rate(instrument_id).result(timeout)
+
+    def get_order(self, order_ref: str, front_id: int = 0, session_id: int = 0):
+        """
+        查找报单 (在途或内存中保留的终态报单)
+
+        front_id/session_id 为 0 时按 OrderRef 查找: 优先本会话的报单，否则取最近一笔同号报单
+        """
+        if front_id or session_id:
+            return self._orders.get((front_id, session_id, order_ref))
+        return self._orders.get(order_ref)
+
+    def order_key(self, order_ref: str, front_id: int = 0, session_id: int = 0) -> tuple:
+        """报单键 (FrontID, SessionID, OrderRef)，front_id/session_id 为 0 时取本会话"""
+        return (front_id or self._front_id, session_id or self._session_id, order_ref)
+
+    def get_working_orders(self, instrument_id: Optional[str] = None) -> Dict[tuple, Any]:
+        """在途报单 {(FrontID, SessionID, OrderRef): OrderEvent}，按合约过滤时只取该合约的在途报单"""
+        return self._orders.live(instrument_id)
+
+    def get_order_by_sys_id(self, order_sys_id: str):
+        """按交易所报单编号查找报单 (在途或内存中保留的终态报单)"""
+        return self._orders.get_by_sys_id(order_sys_id)
 
     def get_instrument_status(self) -> Dict[str, Any]:
         """获取合约交易状态（从缓存）"""
@@ -1279,6 +1443,30 @@ class CtpGateway:
         """是否已登录"""
         return self._logged_in
 
+    def get_trading_day(self) -> str:
+        """当前交易日 (登录响应返回，YYYYMMDD)"""
+        return self._trading_day
+
+    def get_front(self) -> str:
+        """当前连接的交易前置"""
+        return self._front
+
+    def failover_front(self) -> str:
+        """
+        当前前置记一次失败并切换到排序中的下一个 (重连前调用)
+
+        Returns:
+            下次 connect 使用的前置 (只配置一个前置时不变)
+        """
+        front = self.front_selector.mark_failed(self._front or None)
+        if front != self._front:
+            self.logger.log_system("切换交易前置", {"from": self._front, "to": front})
+        return front
+
+    def get_front_stats(self) -> dict:
+        """交易前置测速与排序"""
+        return self.front_selector.to_dict()
+
     # ==================== 回调注册 ====================
 
     def register_callback(self, event: str, callback: Callable):
@@ -1296,6 +1484,9 @@ class CtpGateway:
     def close(self):
         """关闭连接"""
         self.logger.log_system("关闭CTP连接")
+        self._auto_login = False
+        self._query_scheduler.stop()
+        self._audit.stop()
         if self._api:
             self._api.release()
             self._api = None
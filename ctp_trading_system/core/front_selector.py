@@ -0,0 +1,227 @@
+"""
+前置地址选择
+CtpGateway / MdGateway 配置多个前置时，启动时并行测速排序，故障时切换到下一个
+
+功能:
+- 并行探测各前置的 TCP 建连耗时
+- 可选登录探测 (login_probe(front, timeout) -> 登录请求到应答的秒数)；实际会话的建连/登录耗时也由 record() 回填
+- 排序: 可达者优先，其次失败次数少者，再按 建连+登录 耗时
+- 故障切换: mark_failed() 记一次失败并返回排序中的下一个前置
+"""
+
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+def parse_front(front: str) -> Tuple[str, int]:
+    """前置地址 (tcp://host:port) -> (host, port)"""
+    parts = urlsplit(front if "://" in front else f"tcp://{front}")
+    if not parts.hostname or not parts.port:
+        raise ValueError(f"无效的前置地址: {front}")
+    return parts.hostname, parts.port
+
+
+def probe_tcp(front: str, timeout: float = 3.0) -> float:
+    """测量到前置的 TCP 建连耗时 (秒)，不可达时抛出 OSError"""
+    host, port = parse_front(front)
+    start = time.perf_counter()
+    sock = socket.create_connection((host, port), timeout=timeout)
+    elapsed = time.perf_counter() - start
+    sock.close()
+    return elapsed
+
+
+@dataclass
+class FrontStats:
+    """单个前置的测速结果"""
+    front: str
+    connect_ms: Optional[float] = None      # TCP 建连 (或会话建连) 耗时
+    login_ms: Optional[float] = None        # 登录耗时 (探测或实际会话)
+    failures: int = 0
+    error: str = ""
+
+    @property
+    def reachable(self) -> bool:
+        return self.connect_ms is not None
+
+    def sort_key(self) -> tuple:
+        latency = (self.connect_ms or 0.0) + (self.login_ms or 0.0)
+        return (not self.reachable, self.failures, latency)
+
+    def to_dict(self) -> dict:
+        return {
+            "front": self.front,
+            "connect_ms": self.connect_ms,
+            "login_ms": self.login_ms,
+            "failures": self.failures,
+            "error": self.error,
+        }
+
+
+class FrontSelector:
+    """
+    多前置选择器
+
+    用法:
+        selector = FrontSelector(config.get_trade_fronts(), probe_timeout=3.0)
+        selector.probe()                    # 并行测速 (只有一个前置时跳过)
+        front = selector.current()
+        front = selector.mark_failed(front) # 故障后切换到下一个
+    """
+
+    def __init__(self, fronts: List[str], probe_timeout: float = 3.0,
+                 login_probe: Optional[Callable[[str, float], Optional[float]]] = None,
+                 logger=None):
+        """
+        Args:
+            fronts: 前置地址列表 (按配置顺序，测速前即为排序)
+            probe_timeout: 单个前置的探测超时 (秒)
+            login_probe: 登录探测，返回登录耗时秒数，失败返回 None
+            logger: TradeLogger
+        """
+        self.probe_timeout = probe_timeout
+        self.login_probe = login_probe
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._stats: Dict[str, FrontStats] = {}
+        self._ranking: List[str] = []
+        self._current = ""
+        self.probed = False
+        self.set_fronts(fronts)
+
+    def set_fronts(self, fronts: List[str]):
+        """更新前置列表 (已有前置的测速结果保留)"""
+        fronts = list(dict.fromkeys(front for front in fronts if front))
+        with self._lock:
+            self._stats = {front: self._stats.get(front) or FrontStats(front) for front in fronts}
+            self._rank_locked()
+            if self._current not in self._stats:
+                self._current = self._ranking[0] if self._ranking else ""
+
+    def _rank_locked(self):
+        order = {front: i for i, front in enumerate(self._stats)}
+        self._ranking = sorted(self._stats,
+                               key=lambda front: self._stats[front].sort_key() + (order[front],))
+
+    # ==================== 测速 ====================
+
+    def _probe_one(self, front: str):
+        try:
+            connect = probe_tcp(front, self.probe_timeout)
+        except (OSError, ValueError) as e:
+            return None, None, str(e)
+        login = None
+        if self.login_probe is not None:
+            try:
+                login = self.login_probe(front, self.probe_timeout)
+            except Exception as e:
+                return connect, None, str(e)
+            if login is None:
+                return connect, None, "登录探测失败"
+        return connect, login, ""
+
+    def probe(self, force: bool = False) -> List[FrontStats]:
+        """
+        并行探测全部前置并重新排序，当前前置切换为最快者
+
+        Args:
+            force: 只有一个前置时也探测
+
+        Returns:
+            按排序的测速结果
+        """
+        fronts = list(self._stats)
+        if len(fronts) > 1 or force:
+            results: Dict[str, tuple] = {}
+
+            def run(front: str):
+                results[front] = self._probe_one(front)
+
+            threads = [threading.Thread(target=run, args=(front,), name="front-probe", daemon=True)
+                       for front in fronts]
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + self.probe_timeout * (2 if self.login_probe else 1) + 1.0
+            for thread in threads:
+                thread.join(max(deadline - time.monotonic(), 0.0))
+
+            with self._lock:
+                for front in fronts:
+                    stats = self._stats.get(front)
+                    if stats is None:
+                        continue
+                    connect, login, error = results.get(front, (None, None, "探测超时"))
+                    stats.connect_ms = connect * 1000 if connect is not None else None
+                    stats.login_ms = login * 1000 if login is not None else None
+                    stats.error = error
+                self._rank_locked()
+                if self._ranking:
+                    self._current = self._ranking[0]
+            if self.logger:
+                self.logger.log_system("前置测速", {"ranking": [s.to_dict() for s in self.get_stats()]})
+        self.probed = True
+        return self.get_stats()
+
+    def record(self, front: str, connect_ms: Optional[float] = None, login_ms: Optional[float] = None):
+        """回填实际会话的建连/登录耗时，成功登录时清零失败计数"""
+        with self._lock:
+            stats = self._stats.get(front)
+            if stats is None:
+                return
+            if connect_ms is not None:
+                stats.connect_ms = connect_ms
+                stats.error = ""
+            if login_ms is not None:
+                stats.login_ms = login_ms
+                stats.failures = 0
+            self._rank_locked()
+
+    # ==================== 选择 ====================
+
+    def current(self) -> str:
+        """当前使用的前置"""
+        return self._current
+
+    def ranked(self) -> List[str]:
+        """按排序的前置列表"""
+        return list(self._ranking)
+
+    def mark_failed(self, front: Optional[str] = None) -> str:
+        """
+        记一次失败并切换到排序中的下一个前置
+
+        Returns:
+            切换后的当前前置 (只有一个前置时不变)
+        """
+        with self._lock:
+            front = front or self._current
+            stats = self._stats.get(front)
+            if stats is not None:
+                stats.failures += 1
+            self._rank_locked()
+            others = [f for f in self._ranking if f != front]
+            self._current = others[0] if others else front
+            return self._current
+
+    def standby(self, exclude: str) -> str:
+        """排除指定前置后的最优可达前置 (热备会话使用)，没有时返回空串"""
+        with self._lock:
+            for front in self._ranking:
+                stats = self._stats[front]
+                if front != exclude and (stats.reachable or not self.probed):
+                    return front
+        return ""
+
+    def get_stats(self) -> List[FrontStats]:
+        with self._lock:
+            return [self._stats[front] for front in self._ranking]
+
+    def to_dict(self) -> dict:
+        return {
+            "current": self._current,
+            "ranking": [stats.to_dict() for stats in self.get_stats()],
+        }
@@ -0,0 +1,271 @@
+"""
+合约目录
+以 InstrumentStore 按交易日缓存合约信息与费率，启动时不必每次全量查询合约
+
+功能:
+- load: 当日缓存命中时直接读库；只有旧交易日缓存时先用旧数据，后台刷新；无缓存时同步查询
+- 索引: 按品种、交易所、交割月份查找合约
+- 费率: 保证金率、手续费率先读缓存，未命中时查询柜台并写库 (每交易日每合约只查一次)
+- 回调: 合约刷新 ("instruments")、新手续费率 ("commission_rate") 通知下游模块
+"""
+
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from ..storage.instrument_store import InstrumentStore, delivery_month
+
+_PRODUCT_RE = re.compile(r'[A-Za-z]*')
+
+
+def product_of(instrument_id: str) -> str:
+    """合约代码 -> 品种代码"""
+    return _PRODUCT_RE.match(instrument_id).group(0)
+
+
+class InstrumentCatalog:
+    """
+    合约目录
+
+    用法:
+        catalog = InstrumentCatalog(gateway)
+        catalog.register_callback("instruments", validator.update_instruments)
+        instruments = catalog.load(timeout=60)      # 当日缓存命中时毫秒级返回
+        catalog.by_product("rb")                    # ["rb2505", "rb2510", ...]
+        catalog.get_margin_rate("rb2505")           # 未命中时查询柜台并写库
+    """
+
+    def __init__(self, gateway, store: Optional[InstrumentStore] = None, keep_days: int = 5):
+        """
+        Args:
+            gateway: CtpGateway
+            store: 合约元数据库，None 时使用默认路径
+            keep_days: 数据库保留的交易日数
+        """
+        self.gateway = gateway
+        self.store = store or InstrumentStore()
+        self.keep_days = keep_days
+        self.logger = gateway.logger
+
+        self.trading_day = ""           # 当前数据所属交易日
+        self._instruments: Dict[str, dict] = {}
+        self._by_product: Dict[str, List[str]] = {}
+        self._by_exchange: Dict[str, List[str]] = {}
+        self._by_expiry: Dict[str, List[str]] = {}
+        self._margin_rates: Dict[str, dict] = {}
+        self._commission_rates: Dict[str, dict] = {}
+
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._callbacks: Dict[str, List[Callable]] = {
+            "instruments": [],
+            "commission_rate": [],
+        }
+
+    def register_callback(self, event: str, callback: Callable):
+        """注册回调: instruments(合约字典) / commission_rate(合约或品种, 费率)"""
+        if event in self._callbacks:
+            self._callbacks[event].append(callback)
+
+    def _emit(self, event: str, *args):
+        for callback in self._callbacks[event]:
+            try:
+                callback(*args)
+            except Exception as e:
+                self.logger.log_exception(e, f"instrument catalog {event} callback")
+
+    # ==================== 加载与刷新 ====================
+
+    def load(self, timeout: int = 60) -> Dict[str, dict]:
+        """
+        加载合约信息 (登录后调用)
+
+        Args:
+            timeout: 需要同步查询时的超时秒数
+
+        Returns:
+            instrument_id -> 合约信息
+        """
+        trading_day = self.gateway.get_trading_day()
+        if trading_day and self.store.has_trading_day(trading_day):
+            self._apply(trading_day, self.store.load_instruments(trading_day))
+            self.logger.log_system("合约信息从缓存加载", {
+                "trading_day": trading_day,
+                "count": len(self._instruments),
+            })
+            return self._instruments
+
+        days = self.store.get_trading_days()
+        if days:
+            # 先用最近交易日的缓存，后台刷新当日数据
+            self._apply(days[-1], self.store.load_instruments(days[-1]))
+            self.logger.log_system("合约信息使用旧交易日缓存，后台刷新", {
+                "cached_day": days[-1],
+                "trading_day": trading_day,
+            })
+            self.refresh_async(timeout)
+            return self._instruments
+
+        return self.refresh(timeout)
+
+    def refresh(self, timeout: int = 60) -> Dict[str, dict]:
+        """
+        查询柜台合约并写入当日缓存
+
+        Returns:
+            最新合约信息 (查询失败时为当前数据)
+        """
+        trading_day = self.gateway.get_trading_day()
+        if not self.gateway.is_logged_in():
+            return self._instruments
+        future = self.gateway.submit_query_instruments()
+        instruments = future.result(timeout)
+        if not future.ok() or not instruments:
+            self.logger.log_error("合约信息刷新失败", error_msg=future.error_msg)
+            return self._instruments
+
+        self.store.save_instruments(trading_day, instruments)
+        self.store.purge(self.keep_days)
+        self._apply(trading_day, {inst: dict(info, delivery_month=delivery_month(inst, trading_day))
+                                  for inst, info in instruments.items()})
+        self.logger.log_system("合约信息已刷新", {
+            "trading_day": trading_day,
+            "count": len(instruments),
+        })
+        return self._instruments
+
+    def refresh_async(self, timeout: int = 60):
+        """后台刷新 (已在刷新时忽略)"""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(
+            target=self.refresh, args=(timeout,), name="instrument-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def _apply(self, trading_day: str, instruments: Dict[str, dict]):
+        """替换当前数据并重建索引"""
+        by_product: Dict[str, List[str]] = {}
+        by_exchange: Dict[str, List[str]] = {}
+        by_expiry: Dict[str, List[str]] = {}
+        for inst in sorted(instruments):
+            info = instruments[inst]
+            by_product.setdefault((info.get('product_id') or product_of(inst)).lower(), []).append(inst)
+            by_exchange.setdefault(info.get('exchange_id') or '', []).append(inst)
+            by_expiry.setdefault(info.get('delivery_month') or '', []).append(inst)
+
+        same_day = trading_day == self.trading_day
+        with self._lock:
+            self.trading_day = trading_day
+            self._instruments = instruments
+            self._by_product = by_product
+            self._by_exchange = by_exchange
+            self._by_expiry = by_expiry
+            if not same_day:
+                self._margin_rates = self.store.load_margin_rates(trading_day)
+                self._commission_rates = self.store.load_commission_rates(trading_day)
+
+        self.gateway.set_instruments(instruments)
+        self._emit("instruments", instruments)
+        if not same_day:
+            for key, rate in self._commission_rates.items():
+                self._emit("commission_rate", key, rate)
+
+    # ==================== 查询 ====================
+
+    def get(self, instrument_id: str) -> Optional[dict]:
+        return self._instruments.get(instrument_id)
+
+    def instruments(self) -> Dict[str, dict]:
+        return self._instruments
+
+    def by_product(self, product_id: str) -> List[str]:
+        """品种下的合约 (品种代码不区分大小写)"""
+        return list(self._by_product.get(product_id.lower(), ()))
+
+    def by_exchange(self, exchange_id: str) -> List[str]:
+        """交易所下的合约"""
+        return list(self._by_exchange.get(exchange_id, ()))
+
+    def by_expiry(self, month: str) -> List[str]:
+        """交割月份 (YYYYMM) 的合约"""
+        return list(self._by_expiry.get(month, ()))
+
+    def get_products(self) -> List[str]:
+        return list(self._by_product)
+
+    # ==================== 费率 ====================
+
+    def get_margin_rate(self, instrument_id: str, timeout: int = 10) -> Optional[Dict]:
+        """保证金率 (缓存未命中时查询柜台并写库)"""
+        rate = self._margin_rates.get(instrument_id)
+        if rate is None:
+            rate = self.gateway.query_margin_rate(instrument_id, timeout=timeout)
+            if rate:
+                self._store_rate('margin', rate, instrument_id)
+        return rate
+
+    def get_commission_rate(self, instrument_id: str, timeout: int = 10) -> Optional[Dict]:
+        """手续费率 (可能按品种返回；缓存未命中时查询柜台并写库)"""
+        rate = (self._commission_rates.get(instrument_id)
+                or self._commission_rates.get(product_of(instrument_id)))
+        if rate is None:
+            rate = self.gateway.query_commission_rate(instrument_id, timeout=timeout)
+            if rate:
+                self._store_rate('commission', rate, instrument_id)
+        return rate
+
+    def get_commission_rates(self) -> Dict[str, dict]:
+        """已缓存的手续费率 (合约或品种代码 -> 费率)"""
+        return dict(self._commission_rates)
+
+    def _store_rate(self, kind: str, rate: dict, instrument_id: str):
+        rate = dict(rate, instrument_id=rate.get('instrument_id') or instrument_id)
+        key = rate['instrument_id']
+        # 柜台查询的费率属于柜台当前交易日: 旧交易日缓存在用、后台刷新未完成时也不写入旧交易日，
+        # 刷新完成切换交易日时 _apply 从库中重新加载 (与 _apply 互斥，切换前后写入的都不丢)
+        trading_day = self.gateway.get_trading_day() or self.trading_day
+        with self._lock:
+            if kind == 'margin':
+                self.store.save_margin_rate(trading_day, rate)
+                self._margin_rates[key] = rate
+            else:
+                self.store.save_commission_rate(trading_day, rate)
+                self._commission_rates[key] = rate
+        if kind != 'margin':
+            self._emit("commission_rate", key, rate)
+
+    def prefetch_rates(self, instrument_ids: Iterable[str]) -> threading.Thread:
+        """
+        后台补齐合约的保证金率与手续费率 (已缓存的不再查询)
+
+        Args:
+            instrument_ids: 合约代码 (如持仓与策略订阅的合约)
+
+        Returns:
+            后台线程
+        """
+        instrument_ids = list(dict.fromkeys(instrument_ids))
+
+        def run():
+            for instrument_id in instrument_ids:
+                if not self.gateway.is_logged_in():
+                    return
+                try:
+                    self.get_margin_rate(instrument_id)
+                    self.get_commission_rate(instrument_id)
+                except Exception as e:
+                    self.logger.log_exception(e, f"prefetch rates {instrument_id}")
+
+        thread = threading.Thread(target=run, name="instrument-rates", daemon=True)
+        thread.start()
+        return thread
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "trading_day": self.trading_day,
+            "current_trading_day": self.gateway.get_trading_day(),
+            "instruments": len(self._instruments),
+            "products": len(self._by_product),
+            "margin_rates": len(self._margin_rates),
+            "commission_rates": len(self._commission_rates),
+        }
@@ -0,0 +1,331 @@
+"""
+行情分发器
+将行情回调从 CTP SPI 线程解耦，每个消费者独立队列、独立工作线程
+
+功能:
+- DeliveryPolicy: 消费者声明的投递策略
+  - INLINE: 在发布线程上同步调用 (仅用于极轻量的消费者，如行情缓存)
+  - EVERY_TICK: 逐tick按序投递，不合并 (策略)；队列满时丢弃最旧的tick并计数
+  - CONFLATE: 每个合约只保留最新值 (界面推送、监控)；未消费的旧值被覆盖
+- 有界队列: 慢消费者只会在自己的队列中积压/丢弃，不阻塞发布线程与其他消费者
+- 指标: 队列深度、丢弃数、合并数、异常数、排队延迟 (入队到回调开始)
+"""
+
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+
+class DeliveryPolicy(Enum):
+    """行情投递策略"""
+    INLINE = "INLINE"           # 发布线程同步调用
+    EVERY_TICK = "EVERY_TICK"   # 逐tick，队列满丢弃最旧
+    CONFLATE = "CONFLATE"       # 每合约最新值
+
+
+@dataclass
+class ConsumerStats:
+    """消费者运行指标"""
+    name: str
+    policy: str
+    capacity: int
+    depth: int = 0              # 当前待投递数 (CONFLATE 为待投递合约数)
+    max_depth: int = 0
+    received: int = 0           # 发布给该消费者的行情数
+    delivered: int = 0          # 已回调的行情数
+    dropped: int = 0            # 队列满丢弃数
+    conflated: int = 0          # 被同合约新行情覆盖的数
+    errors: int = 0             # 回调异常数
+    lag_ms_last: float = 0.0    # 排队延迟 (入队到回调开始)
+    lag_ms_max: float = 0.0
+    lag_ms_avg: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class MdConsumer:
+    """
+    单个行情消费者
+
+    INLINE 消费者没有工作线程，offer 直接调用回调；
+    其他策略由独立的守护线程从有界队列取出行情后回调
+    """
+
+    def __init__(self, name: str, callback: Callable, policy: DeliveryPolicy,
+                 maxsize: int = 10000, logger=None):
+        """
+        Args:
+            name: 消费者名称 (唯一)
+            callback: 回调函数，参数为 MarketTick
+            policy: 投递策略
+            maxsize: 队列容量 (CONFLATE 为最多待投递合约数)
+            logger: TradeLogger，None 时不记录回调异常
+        """
+        self.name = name
+        self.callback = callback
+        self.policy = policy
+        self.maxsize = max(int(maxsize), 1)
+        self.logger = logger
+
+        # EVERY_TICK: deque[(入队ns, tick)]；CONFLATE: instrument_id -> (入队ns, tick)
+        self._queue: deque = deque()
+        self._pending: Dict[str, tuple] = {}
+        self._cond = threading.Condition(threading.Lock())
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._received = 0
+        self._delivered = 0
+        self._dropped = 0
+        self._conflated = 0
+        self._errors = 0
+        self._max_depth = 0
+        self._lag_last_ns = 0
+        self._lag_max_ns = 0
+        self._lag_sum_ns = 0
+
+    # ==================== 生命周期 ====================
+
+    def start(self):
+        """启动工作线程 (INLINE 无需启动)"""
+        if self.policy == DeliveryPolicy.INLINE or self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"md-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, drain: bool = True, timeout: float = 2.0):
+        """
+        停止工作线程
+
+        Args:
+            drain: 是否先投递完队列中剩余的行情
+            timeout: 等待线程退出的秒数
+        """
+        if self._thread is None:
+            return
+        with self._cond:
+            self._running = False
+            if not drain:
+                self._queue.clear()
+                self._pending.clear()
+            self._cond.notify()
+        self._thread.join(timeout)
+        self._thread = None
+
+    # ==================== 发布线程 ====================
+
+    def offer(self, tick, now_ns: int):
+        """
+        投递一条行情 (发布线程调用，除 INLINE 外不执行回调)
+
+        Args:
+            tick: MarketTick
+            now_ns: 入队时间 (time.perf_counter_ns)
+        """
+        if self.policy == DeliveryPolicy.INLINE:
+            self._received += 1
+            self._deliver(tick, now_ns)
+            return
+
+        with self._cond:
+            self._received += 1
+            if self.policy == DeliveryPolicy.EVERY_TICK:
+                queue = self._queue
+                was_empty = not queue
+                if len(queue) >= self.maxsize:
+                    queue.popleft()
+                    self._dropped += 1
+                queue.append((now_ns, tick))
+                depth = len(queue)
+            else:
+                pending = self._pending
+                was_empty = not pending
+                key = tick.instrument_id
+                if key in pending:
+                    self._conflated += 1
+                elif len(pending) >= self.maxsize:
+                    del pending[next(iter(pending))]
+                    self._dropped += 1
+                pending[key] = (now_ns, tick)
+                depth = len(pending)
+
+            if depth > self._max_depth:
+                self._max_depth = depth
+            # 工作线程只在队列为空时等待
+            if was_empty:
+                self._cond.notify()
+
+    # ==================== 工作线程 ====================
+
+    def _take(self):
+        """取出下一条待投递行情，停止且队列为空时返回 None"""
+        with self._cond:
+            while True:
+                if self._queue:
+                    return self._queue.popleft()
+                if self._pending:
+                    key = next(iter(self._pending))
+                    return self._pending.pop(key)
+                if not self._running:
+                    return None
+                self._cond.wait()
+
+    def _run(self):
+        while True:
+            item = self._take()
+            if item is None:
+                return
+            self._deliver(item[1], item[0])
+
+    def _deliver(self, tick, enqueue_ns: int):
+        """执行回调并记录延迟"""
+        lag = time.perf_counter_ns() - enqueue_ns
+        self._lag_last_ns = lag
+        self._lag_sum_ns += lag
+        if lag > self._lag_max_ns:
+            self._lag_max_ns = lag
+        try:
+            self.callback(tick)
+        except Exception as e:
+            self._errors += 1
+            if self.logger:
+                self.logger.log_exception(e, f"market_data consumer {self.name}")
+        self._delivered += 1
+
+    # ==================== 指标 ====================
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue) + len(self._pending)
+
+    def stats(self) -> ConsumerStats:
+        """当前指标快照"""
+        delivered = self._delivered
+        return ConsumerStats(
+            name=self.name,
+            policy=self.policy.value,
+            capacity=self.maxsize,
+            depth=self.depth,
+            max_depth=self._max_depth,
+            received=self._received,
+            delivered=delivered,
+            dropped=self._dropped,
+            conflated=self._conflated,
+            errors=self._errors,
+            lag_ms_last=self._lag_last_ns / 1e6,
+            lag_ms_max=self._lag_max_ns / 1e6,
+            lag_ms_avg=self._lag_sum_ns / delivered / 1e6 if delivered else 0.0,
+        )
+
+
+class MdDispatcher:
+    """
+    行情分发器
+
+    用法:
+        dispatcher = MdDispatcher()
+        dispatcher.register(strategy_manager.on_tick, DeliveryPolicy.EVERY_TICK, name="strategy")
+        dispatcher.register(ws_push, DeliveryPolicy.CONFLATE, name="web")
+        dispatcher.publish(tick)        # CTP 线程只做入队
+        dispatcher.stats()              # 各消费者队列深度/丢弃/延迟
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        self._consumers: Dict[str, MdConsumer] = {}
+        # 发布线程遍历的快照 (写时复制，publish 不加锁)
+        self._snapshot: tuple = ()
+        self._lock = threading.Lock()
+
+    def register(self, callback: Callable,
+                 policy: DeliveryPolicy = DeliveryPolicy.EVERY_TICK,
+                 name: Optional[str] = None, maxsize: int = 10000) -> str:
+        """
+        注册消费者并启动其工作线程
+
+        Args:
+            callback: 回调函数，参数为 MarketTick
+            policy: 投递策略
+            name: 消费者名称，None 时按回调名生成
+            maxsize: 队列容量
+
+        Returns:
+            消费者名称
+        """
+        policy = DeliveryPolicy(policy)
+        with self._lock:
+            if name is None:
+                base = getattr(callback, '__qualname__', None) or type(callback).__name__
+                name, n = base, 1
+                while name in self._consumers:
+                    n += 1
+                    name = f"{base}#{n}"
+            elif name in self._consumers:
+                raise ValueError(f"消费者已存在: {name}")
+
+            consumer = MdConsumer(name, callback, policy, maxsize, self.logger)
+            consumer.start()
+            self._consumers[name] = consumer
+            self._snapshot = tuple(self._consumers.values())
+        return name
+
+    def unregister(self, name: str, drain: bool = False) -> bool:
+        """注销消费者并停止其工作线程"""
+        with self._lock:
+            consumer = self._consumers.pop(name, None)
+            self._snapshot = tuple(self._consumers.values())
+        if consumer is None:
+            return False
+        consumer.stop(drain=drain)
+        return True
+
+    def publish(self, tick):
+        """发布一条行情到所有消费者"""
+        now_ns = time.perf_counter_ns()
+        for consumer in self._snapshot:
+            consumer.offer(tick, now_ns)
+
+    def start(self):
+        """(重新) 启动全部工作线程 (注册时已自动启动)"""
+        for consumer in self._snapshot:
+            consumer.start()
+
+    def stop(self, drain: bool = True):
+        """停止全部工作线程 (默认先投递完剩余行情)"""
+        for consumer in self._snapshot:
+            consumer.stop(drain=drain)
+
+    def wait_drained(self, headroom: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """
+        等待队列消费者的积压降到阈值以下 (回放等可控发布者用作背压，避免 EVERY_TICK 丢tick)
+
+        Args:
+            headroom: 每个消费者至少保留的空位数，None 表示等待全部队列为空
+            timeout: 最长等待秒数，None 表示一直等待
+
+        Returns:
+            是否已满足
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if all(consumer.depth <= (0 if headroom is None else max(consumer.maxsize - headroom, 0))
+                   for consumer in self._snapshot if consumer.policy != DeliveryPolicy.INLINE):
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.0002)
+
+    def get_consumer(self, name: str) -> Optional[MdConsumer]:
+        return self._consumers.get(name)
+
+    def get_consumer_names(self) -> List[str]:
+        return list(self._consumers)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各消费者指标 (name -> 字典)"""
+        return {c.name: c.stats().to_dict() for c in self._snapshot}
@@ -1,11 +1,23 @@
 """
 CTP行情网关
 使用 CTP v6.6.8 官方行情 API (通过 ctp_md_wrapper)
+
+use_ring=True 时使用环形缓冲模式: CTP 线程只复制定长记录，
+由网关的行情线程按批读取并分发 (wrapper 不支持时自动退回回调模式)
+
+行情回调经 MdDispatcher 分发: 消费者按投递策略注册，
+慢消费者在各自队列中积压，不阻塞 CTP 线程 (见 core/md_dispatcher.py)
+
+多前置: 配置多个行情前置时连接前并行测速 (TCP 建连 + 登录)，主会话使用最快者；
+standby=True 时在次优前置上保持热备会话，两路行情按 (合约, 更新时间, 毫秒, 成交量) 去重后分发，
+任一路断线 (CTP 自动重连后自动登录并重新订阅) 期间由另一路继续提供行情，不丢数据
 """
 import os
 import sys
 import time
+import itertools
 import threading
+from collections import deque
 from typing import Optional, Dict, Callable, Any, List
 
 # 添加 ctp_api 路径
@@ -15,6 +27,7 @@ if ctp_api_path not in sys.path:
 
 try:
     from ctp_md_api import CTPMdApi
+    from md_ring import MdTickRing
     MD_API_AVAILABLE = True
 except ImportError as e:
     print(f"警告: 无法导入 CTP MdApi: {e}")
@@ -22,137 +35,455 @@ except ImportError as e:
 
 try:
     from ..trade_logging.trade_logger import get_logger, TradeLogger
+    from ..data.market_tick import MarketTick, TradingDayClock, ticks_from_records
+    from .md_dispatcher import MdDispatcher, DeliveryPolicy
+    from .front_selector import FrontSelector
 except ImportError:
     from trade_logging.trade_logger import get_logger, TradeLogger
+    from data.market_tick import MarketTick, TradingDayClock, ticks_from_records
+    from core.md_dispatcher import MdDispatcher, DeliveryPolicy
+    from core.front_selector import FrontSelector
+
+
+class TickDeduper:
+    """多路行情去重: 键为 (更新时间, 毫秒, 成交量)，每个合约保留最近 window 个键"""
+
+    def __init__(self, window: int = 8):
+        self.window = window
+        self._recent: Dict[str, deque] = {}
+
+    def seen(self, tick) -> bool:
+        """是否为已收到的行情 (未收到时记录并返回 False)"""
+        key = (tick.update_time, tick.update_millisec, tick.volume)
+        recent = self._recent.get(tick.instrument_id)
+        if recent is None:
+            recent = self._recent[tick.instrument_id] = deque(maxlen=self.window)
+        elif key in recent:
+            return True
+        recent.append(key)
+        return False
+
+
+class _MdSession:
+    """一个行情前置上的会话 (primary 主用 / standby 热备 / probe 测速)"""
+
+    def __init__(self, role: str, front: str, flow_path: str):
+        self.role = role
+        self.front = front
+        self.flow_path = flow_path
+        self.api: Optional[CTPMdApi] = None
+        self.connected = False
+        self.logged_in = False
+        # 连上 (含 CTP 断线自动重连) 后自动登录；主会话在首次 login() 成功后开启
+        self.auto_login = role != "primary"
+        self.connect_event = threading.Event()
+        self.login_event = threading.Event()
+        self.login_started = 0.0
+        self.login_ms: Optional[float] = None
+        self.ticks = 0
+        self.duplicates = 0
+        # 每个会话在自己的 SPI 线程上计算时间戳，各用一个时间基准，不跨线程共享
+        self.clock = TradingDayClock()
+
+    def to_dict(self) -> dict:
+        return {
+            "role": self.role,
+            "front": self.front,
+            "connected": self.connected,
+            "logged_in": self.logged_in,
+            "ticks": self.ticks,
+            "duplicates": self.duplicates,
+        }
 
 
 class MdGateway:
     """CTP 行情网关"""
 
     def __init__(self, md_front: str, broker_id: str = "",
-                 user_id: str = "", password: str = ""):
+                 user_id: str = "", password: str = "",
+                 use_ring: bool = False, ring_capacity: int = 65536, ring_batch: int = 4096,
+                 md_fronts: Optional[List[str]] = None, standby: bool = False,
+                 probe_timeout: float = 3.0, dedup_window: int = 8):
+        """
+        Args:
+            use_ring: 是否使用环形缓冲模式 (只用于主会话)
+            ring_capacity: 环形缓冲记录容量 (满时新行情被丢弃并计数)
+            ring_batch: 单批最多处理的记录数
+            md_fronts: 行情前置列表 (多个时连接前测速排序)，为空时只用 md_front
+            standby: 是否在次优前置上保持热备会话
+            probe_timeout: 前置测速超时 (秒)
+            dedup_window: 去重时每个合约保留的最近行情键数
+        """
         self.md_front = md_front
         self.broker_id = broker_id
         self.user_id = user_id
         self.password = password
         self.logger: TradeLogger = get_logger()
 
-        self._api: Optional[CTPMdApi] = None
-        self._connected = False
-        self._logged_in = False
+        # 会话: 主用 + 可选热备
+        self._primary = _MdSession("primary", md_front, os.path.join("flow", "md_"))
+        self._standby: Optional[_MdSession] = None
+        self.standby = standby
+        self.dedup_window = dedup_window
+        self._dedup: Optional[TickDeduper] = None
+        self._request_ids = itertools.count(1)
+        self._probe_ids = itertools.count(1)
 
-        self._connect_event = threading.Event()
-        self._login_event = threading.Event()
+        fronts = list(dict.fromkeys(md_fronts or [md_front]))
+        self.front_selector = FrontSelector(
+            fronts, probe_timeout=probe_timeout,
+            login_probe=self._probe_login if MD_API_AVAILABLE and len(fronts) > 1 else None,
+            logger=self.logger)
 
-        # 行情缓存: instrument_id -> market data dict
-        self._market_data: Dict[str, Dict] = {}
+        # 行情缓存: instrument_id -> 最新 MarketTick
+        self._market_data: Dict[str, MarketTick] = {}
+
+        # 登录返回的交易日 (优先于tick的TradingDay，郑商所夜盘tick的TradingDay为自然日)；
+        # 时间基准由各会话的 TradingDayClock 计算
+        self._trading_day: str = ""
 
         # 已订阅合约
         self._subscribed: set = set()
 
-        # 行情回调
-        self._on_market_data_callbacks: List[Callable] = []
+        # 行情消费者 (按投递策略分发)
+        self._dispatcher = MdDispatcher(self.logger)
+        # 批量行情回调 (环形缓冲模式，参数为结构化数组)
+        self._on_tick_batch_callbacks: List[Callable] = []
+
+        # 环形缓冲模式
+        self.use_ring = use_ring
+        self.ring_capacity = ring_capacity
+        self.ring_batch = ring_batch
+        self._ring = None
+        self._ring_thread: Optional[threading.Thread] = None
+        self._ring_stop = threading.Event()
+        self._ring_dropped = 0
 
         self._lock = threading.Lock()
 
+    @classmethod
+    def from_config(cls, config, **kwargs) -> 'MdGateway':
+        """
+        按 ConnectionConfig 创建 (行情前置列表、热备、测速超时、登录账号)
+
+        Args:
+            config: ConnectionConfig
+            **kwargs: 其余构造参数 (如 use_ring)
+        """
+        fronts = config.get_md_fronts()
+        return cls(fronts[0], broker_id=config.broker_id,
+                   user_id=config.investor_id, password=config.password,
+                   md_fronts=fronts, standby=config.md_standby,
+                   probe_timeout=config.front_probe_timeout, **kwargs)
+
     def connect(self, timeout: int = 10) -> bool:
-        """连接行情前置"""
+        """连接行情前置 (多前置时先测速，主会话连接最快者；启用热备时再连接次优者)"""
         if not MD_API_AVAILABLE:
             self.logger.log_error("MdApi not available")
             return False
 
-        self.logger.log_system("连接行情前置", {"md_front": self.md_front})
+        if not self.front_selector.probed:
+            self.front_selector.probe()
+        session = self._primary
+        session.front = self.md_front = self.front_selector.current()
+
+        self.logger.log_system("连接行情前置", {"md_front": session.front})
 
-        flow_path = os.path.join("flow", "md_")
         os.makedirs("flow", exist_ok=True)
 
-        self._api = CTPMdApi()
-        self._api.create_api(flow_path)
-        self._setup_callbacks()
-        self._api.register_front(self.md_front)
+        self._create_session(session)
+        self._dispatcher.start()
+        if self.use_ring:
+            self._start_ring()
 
-        self._connect_event.clear()
-        self._api.init()
+        start = time.perf_counter()
+        self._init_session(session)
 
-        if not self._connect_event.wait(timeout):
+        if not session.connect_event.wait(timeout):
             self.logger.log_error("行情连接超时")
             return False
+        self.front_selector.record(session.front, connect_ms=(time.perf_counter() - start) * 1000)
+
+        if self.standby:
+            self._start_standby()
 
-        return self._connected
+        return session.connected
 
     def login(self, timeout: int = 10) -> bool:
-        """登录行情"""
-        if not self._connected:
+        """登录行情 (主会话；热备会话连上后自动登录)"""
+        session = self._primary
+        if not session.connected:
             return False
 
-        self._login_event.clear()
-        ret = self._api.req_user_login(
-            broker_id=self.broker_id,
-            user_id=self.user_id,
-            password=self.password,
-            request_id=1
-        )
-        if ret != 0:
+        if not self._send_login(session):
             return False
 
-        if not self._login_event.wait(timeout):
+        if not session.login_event.wait(timeout):
             return False
 
-        return self._logged_in
+        if session.logged_in:
+            # 之后 CTP 断线自动重连时自动登录并重新订阅
+            session.auto_login = True
+        return session.logged_in
 
     def subscribe(self, instrument_ids: List[str]) -> bool:
-        """订阅行情"""
-        if not self._logged_in:
+        """订阅行情 (主用与热备会话都订阅；稍后登录的会话在登录时补订)"""
+        if not self.is_logged_in():
             return False
-        ret = self._api.subscribe_market_data(instrument_ids)
-        if ret == 0:
-            self._subscribed.update(instrument_ids)
-        return ret == 0
+        new_ids = set(instrument_ids) - self._subscribed
+        self._subscribed.update(instrument_ids)
+        ok = False
+        for session in self._sessions():
+            if session.logged_in and session.api.subscribe_market_data(instrument_ids) == 0:
+                ok = True
+        if not ok:
+            self._subscribed -= new_ids
+        return ok
 
     def unsubscribe(self, instrument_ids: List[str]) -> bool:
         """退订行情"""
-        if not self._logged_in:
+        if not self.is_logged_in():
             return False
-        ret = self._api.unsubscribe_market_data(instrument_ids)
-        if ret == 0:
+        ok = False
+        for session in self._sessions():
+            if session.logged_in and session.api.unsubscribe_market_data(instrument_ids) == 0:
+                ok = True
+        if ok:
             self._subscribed -= set(instrument_ids)
+        return ok
+
+    # ==================== 会话 ====================
+
+    def _sessions(self) -> List[_MdSession]:
+        """已创建 API 的会话 (主用在前)"""
+        return [session for session in (self._primary, self._standby)
+                if session is not None and session.api is not None]
+
+    def _create_session(self, session: _MdSession):
+        """创建会话的 API 实例并设置回调 (init 前可挂接环形缓冲)"""
+        session.api = CTPMdApi()
+        session.api.create_api(session.flow_path)
+        self._setup_callbacks(session)
+
+    def _init_session(self, session: _MdSession):
+        """注册前置并开始连接 (不等待)"""
+        session.api.register_front(session.front)
+        session.connect_event.clear()
+        session.api.init()
+
+    def _send_login(self, session: _MdSession) -> bool:
+        """发送登录请求 (应答在 on_login 回调中处理)"""
+        session.login_event.clear()
+        session.login_started = time.perf_counter()
+        ret = session.api.req_user_login(
+            broker_id=self.broker_id,
+            user_id=self.user_id,
+            password=self.password,
+            request_id=next(self._request_ids)
+        )
+        if ret != 0:
+            self.logger.log_error(f"行情登录请求发送失败 ({session.role}): {ret}")
         return ret == 0
 
+    def _start_standby(self):
+        """在次优前置上启动热备会话 (连上后自动登录并订阅主会话的全部合约)"""
+        front = self.front_selector.standby(exclude=self._primary.front)
+        if not front:
+            self.logger.log_system("没有可用的行情热备前置，只使用主会话")
+            return
+        # 两路行情到达之前启用去重
+        if self._dedup is None:
+            self._dedup = TickDeduper(self.dedup_window)
+        session = self._standby = _MdSession("standby", front, os.path.join("flow", "md_standby_"))
+        self.logger.log_system("启动行情热备会话", {"md_front": front})
+        self._create_session(session)
+        self._init_session(session)
+
+    def _probe_login(self, front: str, timeout: float) -> Optional[float]:
+        """在临时会话上测量行情前置的登录耗时 (秒)，失败返回 None"""
+        session = _MdSession("probe", front, os.path.join("flow", f"md_probe{next(self._probe_ids)}_"))
+        os.makedirs("flow", exist_ok=True)
+        try:
+            self._create_session(session)
+            self._init_session(session)
+            if not session.connect_event.wait(timeout):
+                return None
+            if not session.login_event.wait(timeout) or not session.logged_in:
+                return None
+            return session.login_ms / 1000
+        finally:
+            if session.api is not None:
+                session.api.release()
+                session.api = None
+
     def get_market_data(self, instrument_id: str = "") -> Dict:
-        """获取行情缓存"""
+        """获取行情缓存 (返回字典副本)"""
         if instrument_id:
-            return self._market_data.get(instrument_id, {})
-        return self._market_data
+            tick = self._market_data.get(instrument_id)
+            return tick.to_dict() if tick else {}
+        with self._lock:
+            ticks = list(self._market_data.items())
+        return {inst: tick.to_dict() for inst, tick in ticks}
+
+    def get_latest_tick(self, instrument_id: str) -> Optional[MarketTick]:
+        """获取合约最新 MarketTick (共享对象，只读)"""
+        return self._market_data.get(instrument_id)
+
+    def get_trading_day(self) -> str:
+        """当前交易日"""
+        return self._trading_day
 
     def get_subscribed(self) -> List[str]:
         """获取已订阅合约列表"""
         return list(self._subscribed)
 
-    def register_market_data_callback(self, callback: Callable):
-        """注册行情回调"""
-        self._on_market_data_callbacks.append(callback)
+    def register_market_data_callback(self, callback: Callable,
+                                      policy: DeliveryPolicy = DeliveryPolicy.EVERY_TICK,
+                                      name: Optional[str] = None, maxsize: int = 10000) -> str:
+        """
+        注册行情回调
+
+        Args:
+            callback: 回调函数，参数为 MarketTick
+            policy: 投递策略，默认 EVERY_TICK (独立队列与工作线程，逐tick投递)；
+                    界面/监控用 CONFLATE；INLINE 在行情线程上同步调用，只用于显式声明的轻量消费者
+            name: 消费者名称 (用于指标与注销)
+            maxsize: 队列容量
+
+        Returns:
+            消费者名称
+        """
+        return self._dispatcher.register(callback, policy, name=name, maxsize=maxsize)
+
+    def unregister_market_data_callback(self, name: str) -> bool:
+        """注销行情回调"""
+        return self._dispatcher.unregister(name)
+
+    def get_dispatch_stats(self) -> Dict[str, Dict[str, Any]]:
+        """各行情消费者的队列深度、丢弃数与延迟"""
+        return self._dispatcher.stats()
+
+    def register_tick_batch_callback(self, callback: Callable):
+        """
+        注册批量行情回调 (仅环形缓冲模式)
+
+        每批记录在逐tick回调之前以 MD_TICK_DTYPE 结构化数组调用一次，
+        适合按列处理的消费者 (如多合约注册表、落盘)
+        """
+        self._on_tick_batch_callbacks.append(callback)
+
+    def is_ring_mode(self) -> bool:
+        """是否已启用环形缓冲模式"""
+        return self._ring_thread is not None
+
+    def get_feed_stats(self) -> Dict[str, Any]:
+        """前置测速排序与各会话的行情计数 (duplicates 为被另一路抢先送达而丢弃的行情数)"""
+        return {
+            "fronts": self.front_selector.to_dict(),
+            "sessions": [session.to_dict() for session in (self._primary, self._standby)
+                         if session is not None],
+        }
+
+    # ==================== 行情分发 ====================
+
+    def _publish(self, data: MarketTick, session: Optional[_MdSession] = None):
+        """更新行情缓存并分发给行情消费者 (有热备会话时先去重)"""
+        with self._lock:
+            if session is not None:
+                session.ticks += 1
+            if self._dedup is not None and self._dedup.seen(data):
+                if session is not None:
+                    session.duplicates += 1
+                return
+            self._market_data[data.instrument_id] = data
+        self._dispatcher.publish(data)
+
+    def _on_ring_records(self, records):
+        """分发一批环形缓冲记录"""
+        for callback in self._on_tick_batch_callbacks:
+            try:
+                callback(records)
+            except Exception as e:
+                self.logger.log_exception(e, "tick batch callback")
+
+        for data in ticks_from_records(records, self._primary.clock, self._trading_day):
+            self._publish(data, self._primary)
+
+    def _start_ring(self):
+        """挂接环形缓冲并启动行情线程 (wrapper 不支持时退回回调模式)"""
+        ring = MdTickRing(self.ring_capacity)
+        if not self._primary.api.attach_ring(ring):
+            self.logger.log_system("行情 wrapper 不支持环形缓冲，使用回调模式")
+            return
+        self._ring = ring
+        self._ring_stop.clear()
+        self._ring_thread = threading.Thread(target=self._ring_loop, name="md-ring", daemon=True)
+        self._ring_thread.start()
+        self.logger.log_system("行情环形缓冲模式已启用", {"capacity": ring.capacity})
+
+    def _ring_loop(self):
+        """行情线程: 按批读取环形缓冲，空闲时短暂等待"""
+        ring = self._ring
+        while not self._ring_stop.is_set():
+            records = ring.drain(self.ring_batch)
+            if len(records):
+                self._on_ring_records(records)
+            else:
+                self._ring_stop.wait(0.0005)
+
+            dropped = ring.dropped
+            if dropped != self._ring_dropped:
+                self.logger.log_error(f"行情环形缓冲已满，累计丢弃 {dropped} 条")
+                self._ring_dropped = dropped
+
+    def _stop_ring(self):
+        """停止行情线程 (须在 CTP API 释放之后调用)，处理剩余记录"""
+        if self._ring_thread is None:
+            return
+        self._ring_stop.set()
+        self._ring_thread.join(timeout=2)
+        self._ring_thread = None
+        records = self._ring.drain()
+        if len(records):
+            self._on_ring_records(records)
+        self._ring = None
+
+    def _setup_callbacks(self, session: _MdSession):
+        """设置会话的回调"""
+        api = session.api
 
-    def _setup_callbacks(self):
-        """设置回调"""
         def on_connected():
-            self.logger.log_system("行情前置已连接")
-            self._connected = True
-            self._connect_event.set()
+            self.logger.log_system(f"行情前置已连接 ({session.role})", {"md_front": session.front})
+            session.connected = True
+            session.connect_event.set()
+            if session.auto_login:
+                self._send_login(session)
 
         def on_disconnected(reason):
-            self.logger.log_system(f"行情前置断开: {reason}")
-            self._connected = False
-            self._logged_in = False
+            self.logger.log_system(f"行情前置断开 ({session.role}): {reason}", {"md_front": session.front})
+            session.connected = False
+            session.logged_in = False
+            others = [s for s in self._sessions() if s is not session and s.logged_in]
+            if others:
+                self.logger.log_system(f"行情由{others[0].role}会话继续提供", {"md_front": others[0].front})
 
         def on_login(trading_day, login_time, broker_id, user_id,
                      error_id, error_msg, request_id, is_last):
             if error_id != 0:
-                self.logger.log_error(f"行情登录失败: {error_msg}")
-                self._logged_in = False
+                self.logger.log_error(f"行情登录失败 ({session.role}): {error_msg}")
+                session.logged_in = False
             else:
-                self.logger.log_system(f"行情登录成功, 交易日: {trading_day}")
-                self._logged_in = True
-            self._login_event.set()
+                session.login_ms = (time.perf_counter() - session.login_started) * 1000
+                self.logger.log_system(f"行情登录成功 ({session.role}), 交易日: {trading_day}")
+                if session.role != "probe":
+                    if trading_day:
+                        self._trading_day = trading_day
+                    self.front_selector.record(session.front, login_ms=session.login_ms)
+                session.logged_in = True
+                # 断线重连后或热备会话首次登录: 订阅全部已订阅合约
+                if session.role != "probe" and self._subscribed:
+                    api.subscribe_market_data(list(self._subscribed))
+            session.login_event.set()
 
         def on_sub(instrument_id, error_id, error_msg, request_id, is_last):
             if error_id != 0:
@@ -178,75 +509,51 @@ class MdGateway:
                            average_price,
                            update_time, update_millisec,
                            trading_day, action_day):
-            data = {
-                "instrument_id": instrument_id,
-                "exchange_id": exchange_id,
-                "last_price": last_price,
-                "pre_settlement_price": pre_settlement_price,
-                "pre_close_price": pre_close_price,
-                "open_price": open_price,
-                "highest_price": highest_price,
-                "lowest_price": lowest_price,
-                "volume": volume,
-                "turnover": turnover,
-                "open_interest": open_interest,
-                "close_price": close_price,
-                "settlement_price": settlement_price,
-                "upper_limit_price": upper_limit_price,
-                "lower_limit_price": lower_limit_price,
-                "bid_price1": bid_price1,
-                "bid_volume1": bid_volume1,
-                "ask_price1": ask_price1,
-                "ask_volume1": ask_volume1,
-                "bid_price2": bid_price2,
-                "bid_volume2": bid_volume2,
-                "ask_price2": ask_price2,
-                "ask_volume2": ask_volume2,
-                "bid_price3": bid_price3,
-                "bid_volume3": bid_volume3,
-                "ask_price3": ask_price3,
-                "ask_volume3": ask_volume3,
-                "bid_price4": bid_price4,
-                "bid_volume4": bid_volume4,
-                "ask_price4": ask_price4,
-                "ask_volume4": ask_volume4,
-                "bid_price5": bid_price5,
-                "bid_volume5": bid_volume5,
-                "ask_price5": ask_price5,
-                "ask_volume5": ask_volume5,
-                "average_price": average_price,
-                "update_time": update_time,
-                "update_millisec": update_millisec,
-                "trading_day": trading_day,
-                "action_day": action_day,
-            }
-
-            with self._lock:
-                self._market_data[instrument_id] = data
-
-            for callback in self._on_market_data_callbacks:
-                try:
-                    callback(data)
-                except Exception as e:
-                    self.logger.log_exception(e, "market_data callback")
-
-        self._api.on_front_connected = on_connected
-        self._api.on_front_disconnected = on_disconnected
-        self._api.on_rsp_user_login = on_login
-        self._api.on_rsp_sub_market_data = on_sub
-        self._api.on_rsp_unsub_market_data = on_unsub
-        self._api.on_rtn_depth_market_data = on_market_data
+            # 交易日取 tick 与登录交易日中较大者，时间戳每个tick只做一次查表
+            if trading_day < self._trading_day:
+                trading_day = self._trading_day
+            data = MarketTick(
+                instrument_id, exchange_id,
+                last_price, pre_settlement_price,
+                pre_close_price, pre_open_interest,
+                open_price, highest_price, lowest_price,
+                volume, turnover, open_interest,
+                close_price, settlement_price,
+                upper_limit_price, lower_limit_price,
+                bid_price1, bid_volume1, ask_price1, ask_volume1,
+                bid_price2, bid_volume2, ask_price2, ask_volume2,
+                bid_price3, bid_volume3, ask_price3, ask_volume3,
+                bid_price4, bid_volume4, ask_price4, ask_volume4,
+                bid_price5, bid_volume5, ask_price5, ask_volume5,
+                average_price,
+                update_time, update_millisec,
+                trading_day, action_day,
+                epoch_ns=session.clock.epoch_ns(trading_day, update_time, update_millisec)
+            )
+            self._publish(data, session)
+
+        api.on_front_connected = on_connected
+        api.on_front_disconnected = on_disconnected
+        api.on_rsp_user_login = on_login
+        api.on_rsp_sub_market_data = on_sub
+        api.on_rsp_unsub_market_data = on_unsub
+        api.on_rtn_depth_market_data = on_market_data
 
     def is_connected(self) -> bool:
-        return self._connected
+        """主用或热备会话已连接"""
+        return any(session.connected for session in self._sessions())
 
     def is_logged_in(self) -> bool:
-        return self._logged_in
+        """主用或热备会话已登录"""
+        return any(session.logged_in for session in self._sessions())
 
     def close(self):
         """关闭连接"""
-        if self._api:
-            self._api.release()
-            self._api = None
-        self._connected = False
-        self._logged_in = False
+        for session in self._sessions():
+            session.api.release()
+            session.api = None
+            session.connected = False
+            session.logged_in = False
+        self._standby = None
+        self._stop_ring()
+        self._dispatcher.stop()
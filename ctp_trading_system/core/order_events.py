@@ -0,0 +1,287 @@
+"""
+报单/成交回报事件
+CtpGateway 由 OnRtnOrder / OnRtnTrade 的原始字段每次回调只构建一个事件对象，所有回调共享
+
+功能:
+- __slots__ 定长记录，不再为每个回报构建字典
+- 合约代码按原始字节缓存并驻留 (sys.intern)，同一合约的回报共享一个 str
+- 少用字段 (StatusMsg、经纪公司/投资者/用户代码、报单日期时间) 保留原始字节，首次读取时按GBK解码
+- 兼容字典读取 (get / [] / in / keys)，键名与原回报字典一致，现有 order.get('OrderRef') 代码无需修改
+
+事件构建后不再修改，可直接放入跨线程队列，无需 copy
+ReturnDeduper 过滤断线续传后重发的报单/成交回报
+"""
+
+import sys
+from typing import Dict
+
+
+# 单字节枚举字段 (c_char 回调参数为 bytes，测试/旧接口可能传 int 或 str)
+_CHARS: Dict[object, str] = {}
+for _code in range(128):
+    _CHARS[bytes([_code])] = _CHARS[_code] = _CHARS[chr(_code)] = chr(_code)
+_CHARS[b''] = _CHARS[''] = ''
+del _code
+
+# 报单终态: 全部成交 / 部分成交不在队列 / 未成交不在队列 / 撤单
+ORDER_FINAL_STATUS = frozenset('0245')
+
+# 合约代码驻留缓存: 原始值 -> 驻留后的 str
+_INSTRUMENTS: Dict[object, str] = {}
+
+
+def to_char(value) -> str:
+    """单字节枚举值 -> 单字符 str"""
+    char = _CHARS.get(value)
+    if char is None:
+        char = chr(value[0]) if isinstance(value, bytes) else str(value)
+    return char
+
+
+def decode_text(value) -> str:
+    """GBK字节串 -> str (已是 str 时原样返回)"""
+    if not value:
+        return ""
+    return value.decode('gbk', errors='replace') if isinstance(value, bytes) else str(value)
+
+
+def intern_instrument(value) -> str:
+    """合约代码 -> 驻留 str (按原始字节缓存，同一合约只解码一次)"""
+    instrument_id = _INSTRUMENTS.get(value)
+    if instrument_id is None:
+        instrument_id = sys.intern(decode_text(value))
+        _INSTRUMENTS[value] = instrument_id
+    return instrument_id
+
+
+def _ascii(value) -> str:
+    """报单引用/报单编号等ASCII字段"""
+    if isinstance(value, bytes):
+        return value.decode('ascii', errors='replace')
+    return value or ""
+
+
+class _Decoded:
+    """延迟解码字段: 原始字节存于同名下划线槽位，首次读取时按GBK解码并写回"""
+
+    __slots__ = ('slot',)
+
+    def __set_name__(self, owner, name):
+        self.slot = '_' + name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        value = getattr(obj, self.slot)
+        if not isinstance(value, str):
+            value = decode_text(value)
+            setattr(obj, self.slot, value)
+        return value
+
+
+class _LazyRecord:
+    """字典兼容读取 (子类定义 _KEYS: 回报字典键名 -> 属性名)"""
+
+    __slots__ = ()
+    _KEYS: Dict[str, str] = {}
+
+    def get(self, key: str, default=None):
+        name = self._KEYS.get(key)
+        return getattr(self, name) if name is not None else default
+
+    def __getitem__(self, key: str):
+        name = self._KEYS.get(key)
+        if name is None:
+            raise KeyError(key)
+        return getattr(self, name)
+
+    def __contains__(self, key) -> bool:
+        return key in self._KEYS
+
+    def keys(self):
+        return self._KEYS.keys()
+
+    def to_dict(self) -> dict:
+        """转为回报字典 (JSON序列化时使用，会解码全部延迟字段)"""
+        return {key: getattr(self, name) for key, name in self._KEYS.items()}
+
+    def copy(self) -> dict:
+        return self.to_dict()
+
+
+class OrderEvent(_LazyRecord):
+    """报单回报"""
+
+    __slots__ = ('order_ref', 'instrument_id', 'direction', 'offset', 'price',
+                 'volume_total', 'volume_traded', 'status', 'order_sys_id',
+                 'front_id', 'session_id',
+                 '_broker_id', '_investor_id', '_user_id',
+                 '_insert_date', '_insert_time', '_status_msg')
+
+    _KEYS = {
+        "OrderRef": 'order_ref',
+        "InstrumentID": 'instrument_id',
+        "Direction": 'direction',
+        "CombOffsetFlag": 'offset',
+        "LimitPrice": 'price',
+        "VolumeTotal": 'volume_total',
+        "VolumeTraded": 'volume_traded',
+        "OrderStatus": 'status',
+        "OrderSysID": 'order_sys_id',
+        "FrontID": 'front_id',
+        "SessionID": 'session_id',
+        "StatusMsg": 'status_msg',
+        "BrokerID": 'broker_id',
+        "InvestorID": 'investor_id',
+        "UserID": 'user_id',
+        "InsertDate": 'insert_date',
+        "InsertTime": 'insert_time',
+    }
+
+    def __init__(self, broker_id, investor_id, instrument_id, order_ref, user_id,
+                 direction, offset_flag, price, volume_total, volume_traded,
+                 order_status, order_sys_id, front_id, session_id,
+                 insert_date, insert_time, status_msg):
+        """参数顺序与 CTPTraderApi.on_rtn_order 回调一致，字符串字段可为原始字节"""
+        self.order_ref = _ascii(order_ref)
+        self.instrument_id = intern_instrument(instrument_id)
+        self.direction = to_char(direction)
+        self.offset = to_char(offset_flag)
+        self.price = price
+        self.volume_total = volume_total
+        self.volume_traded = volume_traded
+        self.status = to_char(order_status)
+        self.order_sys_id = _ascii(order_sys_id)
+        self.front_id = front_id
+        self.session_id = session_id
+        self._broker_id = broker_id
+        self._investor_id = investor_id
+        self._user_id = user_id
+        self._insert_date = insert_date
+        self._insert_time = insert_time
+        self._status_msg = status_msg
+
+    @property
+    def key(self) -> tuple:
+        """报单唯一键 (FrontID, SessionID, OrderRef)，OrderRef 只在本会话内唯一"""
+        return (self.front_id, self.session_id, self.order_ref)
+
+    # 延迟解码字段
+    status_msg = _Decoded()
+    broker_id = _Decoded()
+    investor_id = _Decoded()
+    user_id = _Decoded()
+    insert_date = _Decoded()
+    insert_time = _Decoded()
+
+    def __repr__(self) -> str:
+        return (f"OrderEvent({self.order_ref} {self.instrument_id} {self.direction}{self.offset} "
+                f"{self.price}x{self.volume_total} traded={self.volume_traded} status={self.status})")
+
+
+class TradeEvent(_LazyRecord):
+    """成交回报"""
+
+    __slots__ = ('trade_id', 'instrument_id', 'direction', 'offset', 'price', 'volume',
+                 'order_ref', 'order_sys_id',
+                 '_broker_id', '_investor_id', '_user_id', '_trade_date', '_trade_time')
+
+    _KEYS = {
+        "TradeID": 'trade_id',
+        "InstrumentID": 'instrument_id',
+        "Direction": 'direction',
+        "OffsetFlag": 'offset',
+        "Price": 'price',
+        "Volume": 'volume',
+        "OrderRef": 'order_ref',
+        "OrderSysID": 'order_sys_id',
+        "TradeDate": 'trade_date',
+        "TradeTime": 'trade_time',
+        "BrokerID": 'broker_id',
+        "InvestorID": 'investor_id',
+        "UserID": 'user_id',
+    }
+
+    def __init__(self, broker_id, investor_id, instrument_id, order_ref, user_id,
+                 trade_id, direction, offset_flag, price, volume,
+                 trade_date, trade_time, order_sys_id):
+        """参数顺序与 CTPTraderApi.on_rtn_trade 回调一致，字符串字段可为原始字节"""
+        self.trade_id = _ascii(trade_id)
+        self.instrument_id = intern_instrument(instrument_id)
+        self.direction = to_char(direction)
+        self.offset = to_char(offset_flag)
+        self.price = price
+        self.volume = volume
+        self.order_ref = _ascii(order_ref)
+        self.order_sys_id = _ascii(order_sys_id)
+        self._broker_id = broker_id
+        self._investor_id = investor_id
+        self._user_id = user_id
+        self._trade_date = trade_date
+        self._trade_time = trade_time
+
+    # 延迟解码字段
+    broker_id = _Decoded()
+    investor_id = _Decoded()
+    user_id = _Decoded()
+    trade_date = _Decoded()
+    trade_time = _Decoded()
+
+    def __repr__(self) -> str:
+        return (f"TradeEvent({self.trade_id} {self.instrument_id} {self.direction}{self.offset} "
+                f"{self.price}x{self.volume} ref={self.order_ref})")
+
+
+class ReturnDeduper:
+    """
+    重复回报过滤 (私有流按 RESUME 续传时，断线前已收到的回报可能被重发)
+
+    - 报单: 按 (FrontID, SessionID, OrderRef) 记录已收到的最大 SequenceNo，不大于它的回报丢弃；
+      wrapper 不提供序号 (0) 时按 (状态, 已成交量, OrderSysID) 判断是否已收到过同一状态
+    - 成交: 按 (TradeID, 方向, OrderSysID) 去重，同一笔成交只计入一次持仓
+    - 交易日切换时 reset()
+    """
+
+    def __init__(self):
+        self._order_seq: Dict[tuple, int] = {}
+        self._order_states: Dict[tuple, set] = {}
+        self._trades: set = set()
+        self.dropped_orders = 0
+        self.dropped_trades = 0
+
+    def accept_order(self, order: OrderEvent, sequence_no: int = 0) -> bool:
+        """是否为新的报单回报 (重复回报返回 False 并计数)"""
+        key = (order.front_id, order.session_id, order.order_ref)
+        if sequence_no > 0:
+            last = self._order_seq.get(key, 0)
+            if sequence_no <= last:
+                self.dropped_orders += 1
+                return False
+            self._order_seq[key] = sequence_no
+            return True
+        state = (order.status, order.volume_traded, order.order_sys_id)
+        states = self._order_states.get(key)
+        if states is None:
+            states = self._order_states[key] = set()
+        elif state in states:
+            self.dropped_orders += 1
+            return False
+        states.add(state)
+        return True
+
+    def accept_trade(self, trade: TradeEvent) -> bool:
+        """是否为新的成交回报 (重复回报返回 False 并计数)"""
+        key = (trade.trade_id.strip(), trade.direction, trade.order_sys_id.strip())
+        if key in self._trades:
+            self.dropped_trades += 1
+            return False
+        self._trades.add(key)
+        return True
+
+    def reset(self):
+        self._order_seq.clear()
+        self._order_states.clear()
+        self._trades.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"dropped_orders": self.dropped_orders, "dropped_trades": self.dropped_trades}
@@ -0,0 +1,148 @@
+"""
+报单快速路径
+CtpGateway._send_order 使用的预编码报单模板与延迟统计
+
+功能:
+- OrderTemplate: 每个 (合约, 价格类型, 有效期, 成交量类型) 一个预填好的 OrderInsertArgs 原型，
+  报单时复制原型并只写 order_ref/方向/开平/价格/数量，不再逐次编码字符串
+- OrderTemplateCache: 模板缓存，登录账户变化时整体失效
+- LatencyStats: 信号到 ReqOrderInsert 返回的延迟采样与分位数
+"""
+
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+# 方向/开平枚举值 -> 报单字段字节 (CtpGateway.Direction / OffsetFlag 的 value)
+DIRECTION_BYTES = {'0': b'0', '1': b'1'}
+OFFSET_BYTES = {flag: flag.encode() for flag in '012345'}
+
+
+class OrderTemplate:
+    """单合约报单模板"""
+
+    __slots__ = ('instrument_id', 'proto', '_copy')
+
+    def __init__(self, args_type, broker_id: bytes, investor_id: bytes, instrument_id: str,
+                 order_price_type: str = '2', time_condition: str = '3',
+                 volume_condition: str = '1'):
+        """
+        Args:
+            args_type: ctp_api.OrderInsertArgs
+            broker_id: 经纪公司代码 (已编码)
+            investor_id: 投资者代码 (已编码)
+            instrument_id: 合约代码
+            order_price_type: 报单价格类型
+            time_condition: 有效期类型
+            volume_condition: 成交量类型
+        """
+        self.instrument_id = instrument_id
+        proto = args_type()
+        proto.broker_id = broker_id
+        proto.investor_id = investor_id
+        proto.instrument_id = instrument_id.encode('gbk')
+        proto.hedge_flag = b'1'         # 投机
+        proto.order_price_type = order_price_type.encode()
+        proto.time_condition = time_condition.encode()
+        proto.volume_condition = volume_condition.encode()
+        proto.min_volume = 1
+        self.proto = bytes(proto)
+        self._copy = args_type.from_buffer_copy
+
+    def build(self, order_ref: bytes, direction: bytes, offset: bytes,
+              price: float, volume: int):
+        """复制原型并填入本次报单的可变字段 (每次返回新的结构体，可跨线程使用)"""
+        args = self._copy(self.proto)
+        args.order_ref = order_ref
+        args.direction = direction
+        args.offset_flag = offset
+        args.price = price
+        args.volume = volume
+        return args
+
+
+class OrderTemplateCache:
+    """报单模板缓存"""
+
+    def __init__(self, args_type=None):
+        """
+        Args:
+            args_type: ctp_api.OrderInsertArgs，None 时 get 始终返回 None (不支持快速路径)
+        """
+        self.args_type = args_type
+        self._broker_id = b''
+        self._investor_id = b''
+        self._templates: Dict[tuple, OrderTemplate] = {}
+
+    def reset(self, broker_id: str, investor_id: str):
+        """登录后设置账户并清空模板"""
+        self._broker_id = broker_id.encode('gbk')
+        self._investor_id = investor_id.encode('gbk')
+        self._templates = {}
+
+    def get(self, instrument_id: str, order_price_type: str = '2',
+            time_condition: str = '3', volume_condition: str = '1') -> Optional[OrderTemplate]:
+        """取 (或创建) 模板"""
+        key = (instrument_id, order_price_type, time_condition, volume_condition)
+        template = self._templates.get(key)
+        if template is None and self.args_type is not None:
+            template = OrderTemplate(self.args_type, self._broker_id, self._investor_id,
+                                     instrument_id, order_price_type, time_condition,
+                                     volume_condition)
+            self._templates[key] = template
+        return template
+
+    def warm_up(self, instrument_ids, order_price_type: str = '2',
+                time_condition: str = '3', volume_condition: str = '1') -> int:
+        """预先创建模板 (如策略订阅的合约)，返回模板数"""
+        for instrument_id in instrument_ids:
+            self.get(instrument_id, order_price_type, time_condition, volume_condition)
+        return len(self._templates)
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+
+class LatencyStats:
+    """
+    延迟统计 (纳秒采样，保留最近 maxlen 个样本)
+
+    record 只做一次 deque.append，汇总在读取时计算
+    """
+
+    def __init__(self, maxlen: int = 10000):
+        self._samples: deque = deque(maxlen=maxlen)
+        self.count = 0
+
+    def record(self, ns: int):
+        self._samples.append(ns)
+        self.count += 1
+
+    def reset(self):
+        self._samples.clear()
+        self.count = 0
+
+    def summary(self) -> Dict[str, Any]:
+        """count 与最近样本的 mean/p50/p90/p99/max (微秒)"""
+        samples = sorted(self._samples)
+        n = len(samples)
+        if not n:
+            return {"count": self.count, "samples": 0}
+
+        def pct(p: float) -> float:
+            return samples[min(n - 1, int(p * n))] / 1e3
+
+        return {
+            "count": self.count,
+            "samples": n,
+            "mean_us": sum(samples) / n / 1e3,
+            "p50_us": pct(0.50),
+            "p90_us": pct(0.90),
+            "p99_us": pct(0.99),
+            "max_us": samples[-1] / 1e3,
+        }
+
+
+def now_ns() -> int:
+    """信号时间戳 (与 LatencyStats 同一时钟)"""
+    return time.perf_counter_ns()
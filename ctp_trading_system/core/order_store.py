@@ -0,0 +1,226 @@
+"""
+报单存储
+CtpGateway._orders 的实现: 在途报单常驻，终态报单归档到有界的近期表并写入报单流水
+
+功能:
+- 报单键为 (FrontID, SessionID, OrderRef): OrderRef 只在一个会话内唯一，
+  重新登录后新会话从 MaxOrderRef 续编，其他会话 (或断线前的会话) 的同号报单互不覆盖
+- 在途表: 未到终态的报单，规模等于当前挂单数
+- 近期终态表: 最近 max_done 笔终态报单，超出后淘汰最早的一笔 (已写入流水，不再保留在内存)
+- journal: 报单到达终态时调用一次 (由网关交给异步审计线程写入交易日志)
+- 二级索引 (随每条回报增量维护): 在途报单按合约、全部报单按状态、按 OrderSysID，
+  按合约/全部撤单时取目标为 O(k)，k 为命中的报单数
+- 读取接口与原 Dict 兼容 (get / [] / in / items / values / len)，
+  get / [] / in 也接受单独的 OrderRef: 优先取当前会话 (set_session) 的报单，否则取最近一笔同号报单
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    from .order_events import ORDER_FINAL_STATUS
+except ImportError:
+    from core.order_events import ORDER_FINAL_STATUS
+
+
+# (FrontID, SessionID, OrderRef)
+OrderKey = Tuple[int, int, str]
+
+
+def format_order_key(key: OrderKey) -> str:
+    """报单键 -> 'FrontID:SessionID:OrderRef' (日志/JSON 输出用)"""
+    return "%s:%s:%s" % key
+
+
+class OrderStore:
+    """
+    有界报单存储
+
+    用法:
+        store = OrderStore(max_done=2000, journal=lambda order: ...)
+        store.set_session(front_id, session_id)     # 登录成功
+        store.update(order_event)                   # OnRtnOrder
+        store.get((front_id, session_id, '12'))
+        store.get('12')                             # 当前会话的 12 号报单
+        store.live()                                # 在途报单 {键: 报单}
+    """
+
+    def __init__(self, max_done: int = 2000, journal: Optional[Callable] = None):
+        """
+        Args:
+            max_done: 内存中保留的终态报单数
+            journal: 报单到达终态时的回调 (参数为报单事件)
+        """
+        self.max_done = max_done
+        self.journal = journal
+        self._live: Dict[OrderKey, object] = {}
+        self._done: OrderedDict = OrderedDict()
+        # 二级索引: 合约 -> {键: 在途报单}，状态 -> {键: 报单}，OrderSysID -> 报单
+        self._live_by_instrument: Dict[str, Dict[OrderKey, object]] = {}
+        self._by_status: Dict[str, Dict[OrderKey, object]] = {}
+        self._by_sys_id: Dict[str, object] = {}
+        # OrderRef -> 最近一笔同号报单的键 (按 OrderRef 查找时使用)
+        self._by_ref: Dict[str, OrderKey] = {}
+        self._session: Tuple[int, int] = (0, 0)
+        self._lock = threading.Lock()
+        self.archived = 0
+
+    def set_session(self, front_id: int, session_id: int):
+        """设置当前会话 (按 OrderRef 查找时优先匹配该会话的报单)"""
+        self._session = (front_id, session_id)
+
+    def update(self, order) -> bool:
+        """
+        写入一条报单回报
+
+        Returns:
+            本次回报是否使报单进入终态
+        """
+        key = (order.front_id, order.session_id, order.order_ref)
+        final = order.status in ORDER_FINAL_STATUS
+        with self._lock:
+            previous = self._live.get(key)
+            if previous is None:
+                previous = self._done.get(key)
+                if previous is not None and not final:
+                    # 同一报单终态之后的迟到回报 (如断线重连后的流重放)，保留终态
+                    return False
+            if previous is not None:
+                self._unindex(key, previous)
+            self._index(key, order)
+            self._by_ref[order.order_ref] = key
+            if not final:
+                self._live[key] = order
+                by_instrument = self._live_by_instrument.get(order.instrument_id)
+                if by_instrument is None:
+                    by_instrument = self._live_by_instrument[order.instrument_id] = {}
+                by_instrument[key] = order
+                return False
+            if self._live.pop(key, None) is not None:
+                self._unindex_live(key, previous.instrument_id)
+            repeated = key in self._done
+            self._done[key] = order
+            self._done.move_to_end(key)
+            while len(self._done) > self.max_done:
+                evicted_key, evicted = self._done.popitem(last=False)
+                self._unindex(evicted_key, evicted)
+                if self._by_ref.get(evicted.order_ref) == evicted_key:
+                    del self._by_ref[evicted.order_ref]
+            if repeated:
+                return False
+            self.archived += 1
+        if self.journal is not None:
+            self.journal(order)
+        return True
+
+    def _index(self, key: OrderKey, order):
+        by_status = self._by_status.get(order.status)
+        if by_status is None:
+            by_status = self._by_status[order.status] = {}
+        by_status[key] = order
+        sys_id = order.order_sys_id.strip()
+        if sys_id:
+            self._by_sys_id[sys_id] = order
+
+    def _unindex(self, key: OrderKey, order):
+        by_status = self._by_status.get(order.status)
+        if by_status is not None and by_status.get(key) is order:
+            del by_status[key]
+        sys_id = order.order_sys_id.strip()
+        if sys_id and self._by_sys_id.get(sys_id) is order:
+            del self._by_sys_id[sys_id]
+
+    def _unindex_live(self, key: OrderKey, instrument_id: str):
+        by_instrument = self._live_by_instrument.get(instrument_id)
+        if by_instrument is not None:
+            by_instrument.pop(key, None)
+            if not by_instrument:
+                del self._live_by_instrument[instrument_id]
+
+    def clear(self):
+        with self._lock:
+            self._live.clear()
+            self._done.clear()
+            self._live_by_instrument.clear()
+            self._by_status.clear()
+            self._by_sys_id.clear()
+            self._by_ref.clear()
+
+    # ==================== 查询 ====================
+
+    def resolve(self, key) -> Optional[OrderKey]:
+        """
+        报单键或 OrderRef -> 报单键
+
+        OrderRef 优先匹配当前会话的报单，否则取最近一笔同号报单；不存在时返回 None
+        """
+        if isinstance(key, tuple):
+            return key
+        current = self._session + (key,)
+        if current in self._live or current in self._done:
+            return current
+        return self._by_ref.get(key)
+
+    def live(self, instrument_id: Optional[str] = None) -> Dict[OrderKey, object]:
+        """在途报单快照 {键: 报单} (可按合约过滤，O(k))"""
+        with self._lock:
+            if instrument_id is None:
+                return dict(self._live)
+            return dict(self._live_by_instrument.get(instrument_id, ()))
+
+    def live_instruments(self) -> list:
+        """有在途报单的合约"""
+        with self._lock:
+            return list(self._live_by_instrument)
+
+    def by_status(self, status: str) -> Dict[OrderKey, object]:
+        """指定状态的报单快照 (终态报单只含内存中保留的部分)"""
+        with self._lock:
+            return dict(self._by_status.get(status, ()))
+
+    def get_by_sys_id(self, order_sys_id: str):
+        """按交易所报单编号查找 (忽略左侧补位空格)"""
+        return self._by_sys_id.get(order_sys_id.strip())
+
+    def live_count(self) -> int:
+        return len(self._live)
+
+    def get(self, key, default=None):
+        """按报单键或 OrderRef 查找报单"""
+        key = self.resolve(key)
+        order = self._live.get(key)
+        if order is None:
+            order = self._done.get(key, default)
+        return order
+
+    def __getitem__(self, key):
+        order = self.get(key)
+        if order is None:
+            raise KeyError(key)
+        return order
+
+    def __contains__(self, key) -> bool:
+        key = self.resolve(key)
+        return key in self._live or key in self._done
+
+    def __len__(self) -> int:
+        return len(self._live) + len(self._done)
+
+    def items(self) -> Iterator[Tuple[OrderKey, object]]:
+        """近期终态报单 + 在途报单 (快照，可在回调线程写入时遍历)"""
+        with self._lock:
+            snapshot = list(self._done.items()) + list(self._live.items())
+        return iter(snapshot)
+
+    def values(self):
+        return [order for _, order in self.items()]
+
+    def keys(self):
+        return [key for key, _ in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"live": len(self._live), "recent_done": len(self._done), "archived": self.archived}
@@ -0,0 +1,360 @@
+"""
+本地持仓簿
+由成交回报增量维护持仓，行情逐合约盯市，读取不访问柜台
+
+功能:
+- 基准: CtpGateway.query_position 的结果 (load)
+- 成交回报: 开仓计入今仓；平仓按交易所规则扣减今/昨仓
+  - 上期所/能源中心: 平今 ('3') 只平今仓，平仓/平昨 ('1'/'4') 只平昨仓
+  - 中金所: 平仓先平今仓
+  - 其他交易所: 平仓先平昨仓
+- 均价: 今仓、昨仓分别记成本与保证金，平仓盈亏按被平部分的均价计算
+- 行情: 只重算该合约的多空持仓盈亏，总浮动盈亏按差值更新
+- get_position / get_positions: 字段同 CtpGateway.query_position，可直接替代查询结果
+- 监听: 持仓或盈亏变化后通知 (AccountService 据此重建资金快照)
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+# 区分平今/平昨的交易所
+CLOSE_TODAY_EXCHANGES = frozenset(('SHFE', 'INE'))
+# 平仓优先平今仓的交易所
+TODAY_FIRST_EXCHANGES = frozenset(('CFFEX',))
+
+# 成交方向 (0买 1卖) -> 开仓形成的持仓方向 (2多 3空)
+_OPEN_DIRECTION = {'0': '2', '1': '3'}
+# 成交方向 -> 平仓扣减的持仓方向
+_CLOSE_DIRECTION = {'0': '3', '1': '2'}
+
+
+@dataclass
+class BookPosition:
+    """单合约单方向持仓"""
+    instrument_id: str
+    direction: str              # 持仓方向 '2'多 '3'空
+    multiplier: float = 1
+    today: int = 0              # 今仓手数
+    yesterday: int = 0          # 昨仓手数
+    today_cost: float = 0.0     # 今仓成本 (价格 × 手数 × 合约乘数)
+    yd_cost: float = 0.0        # 昨仓成本
+    today_margin: float = 0.0   # 今仓占用保证金
+    yd_margin: float = 0.0      # 昨仓占用保证金
+    last_price: float = 0.0
+    profit: float = 0.0         # 浮动盈亏
+    priced: bool = False        # 是否已按行情计算过盈亏
+
+    @property
+    def volume(self) -> int:
+        return self.today + self.yesterday
+
+    @property
+    def cost(self) -> float:
+        return self.today_cost + self.yd_cost
+
+    @property
+    def margin(self) -> float:
+        return self.today_margin + self.yd_margin
+
+    @property
+    def avg_price(self) -> float:
+        """持仓均价"""
+        volume = self.volume
+        return self.cost / (volume * self.multiplier) if volume else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """字段同 CtpGateway.query_position，另含均价、最新价、浮动盈亏"""
+        return {
+            "instrument_id": self.instrument_id,
+            "direction": self.direction,
+            "position": self.volume,
+            "yd_position": self.yesterday,
+            "today_position": self.today,
+            "position_cost": self.cost,
+            "use_margin": self.margin,
+            "avg_price": self.avg_price,
+            "last_price": self.last_price,
+            "position_profit": self.profit,
+        }
+
+
+class PositionBook:
+    """
+    本地持仓簿
+
+    用法:
+        book = PositionBook(gateway)            # 注册 on_trade 回调
+        book.load(gateway.query_position())     # 登录后以柜台持仓为基准
+        md_gateway.register_market_data_callback(book.on_tick, DeliveryPolicy.CONFLATE)
+        book.get_position("rb2505", "2")        # 任意线程读取
+    """
+
+    def __init__(self, gateway=None,
+                 instrument_info: Optional[Callable[[str], Optional[dict]]] = None):
+        """
+        Args:
+            gateway: CtpGateway，用于注册成交回报 (None 时由调用方喂入 on_trade)
+            instrument_info: 合约信息查询 (交易所、合约乘数、保证金率)，默认读取 gateway.settings.instruments
+        """
+        self.gateway = gateway
+        if instrument_info is None and gateway is not None:
+            instrument_info = lambda inst: gateway.settings.instruments.get(inst)
+        self._instrument_info = instrument_info or (lambda inst: None)
+
+        self._lock = threading.Lock()
+        self._positions: Dict[str, BookPosition] = {}   # f"{合约}_{持仓方向}" -> 持仓
+        self._prices: Dict[str, float] = {}
+        self._listeners: List[Callable[[], None]] = []
+        self._loaded = False
+
+        # 汇总 (增量维护)
+        self.trade_seq = 0
+        self.close_profit = 0.0         # 基准以来的平仓盈亏
+        self.margin = 0.0               # 占用保证金
+        self.position_profit = 0.0      # 浮动盈亏
+        self._unpriced = 0
+
+        if gateway is not None:
+            gateway.register_callback("on_trade", self.on_trade)
+
+    def add_listener(self, listener: Callable[[], None]):
+        """注册变化通知 (在回报/行情线程上调用，需轻量)"""
+        self._listeners.append(listener)
+
+    def _notify(self):
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception:
+                pass
+
+    # ==================== 合约信息 ====================
+
+    def _info(self, instrument_id: str) -> dict:
+        return self._instrument_info(instrument_id) or {}
+
+    def _margin(self, instrument_id: str, direction: str, price: float, volume: int) -> float:
+        info = self._info(instrument_id)
+        ratio = info.get('long_margin_ratio' if direction == '2' else 'short_margin_ratio') or 0.0
+        return price * volume * (info.get('volume_multiple') or 1) * ratio
+
+    @staticmethod
+    def _split_close(position: BookPosition, offset: str, exchange_id: str, volume: int):
+        """平仓手数 -> (平今手数, 平昨手数)"""
+        if exchange_id in CLOSE_TODAY_EXCHANGES:
+            today_first = offset == '3'
+        elif offset in ('3', '4'):
+            today_first = offset == '3'
+        else:
+            today_first = exchange_id in TODAY_FIRST_EXCHANGES
+        if today_first:
+            from_today = min(volume, position.today)
+            return from_today, min(volume - from_today, position.yesterday)
+        from_yd = min(volume, position.yesterday)
+        return min(volume - from_yd, position.today), from_yd
+
+    # ==================== 基准 ====================
+
+    def load(self, positions: Dict[str, dict]):
+        """
+        以柜台持仓为新基准 (清空本地持仓与平仓盈亏)
+
+        Args:
+            positions: CtpGateway.query_position 结果
+        """
+        with self._lock:
+            self._positions.clear()
+            self.close_profit = 0.0
+            self.margin = 0.0
+            self.position_profit = 0.0
+            self._unpriced = 0
+            for pos in positions.values():
+                volume = int(pos.get('position') or 0)
+                direction = pos.get('direction')
+                if volume <= 0 or direction not in ('2', '3'):
+                    continue
+                position = self._get_locked(pos['instrument_id'], direction)
+                today = int(pos.get('today_position', volume - int(pos.get('yd_position') or 0)))
+                today = min(max(today, 0), volume)
+                cost = float(pos.get('position_cost') or 0.0)
+                position.today = today
+                position.yesterday = volume - today
+                margin = float(pos.get('use_margin') or 0.0)
+                position.today_cost = cost * today / volume
+                position.yd_cost = cost - position.today_cost
+                position.today_margin = margin * today / volume
+                position.yd_margin = margin - position.today_margin
+                self.margin += margin
+                self._mark_locked(position)
+            self._loaded = True
+        self._notify()
+
+    def is_loaded(self) -> bool:
+        """是否已加载过柜台持仓"""
+        return self._loaded
+
+    # ==================== 回报与行情 ====================
+
+    def on_trade(self, trade: dict):
+        """
+        成交回报: 更新今/昨仓、成本、保证金与平仓盈亏
+
+        重复回报由网关的 ReturnDeduper 过滤 (交易日切换时重置)；TradeID 只在一个交易日内唯一，
+        这里不再按 TradeID 去重，避免跨夜运行时误丢次日的同号成交
+        """
+        instrument_id = trade.get('InstrumentID', '')
+        direction = trade.get('Direction', '0')
+        offset = trade.get('OffsetFlag', '0')
+        price = float(trade.get('Price') or 0.0)
+        volume = int(trade.get('Volume') or 0)
+        if not instrument_id or volume <= 0:
+            return
+        info = self._info(instrument_id)
+
+        with self._lock:
+            self.trade_seq += 1
+
+            if offset == '0':
+                position = self._get_locked(instrument_id, _OPEN_DIRECTION.get(direction, '2'))
+                margin = self._margin(instrument_id, position.direction, price, volume)
+                position.today += volume
+                position.today_cost += price * volume * position.multiplier
+                position.today_margin += margin
+                self.margin += margin
+            else:
+                position = self._positions.get(f"{instrument_id}_{_CLOSE_DIRECTION.get(direction, '2')}")
+                if position is None or position.volume == 0:
+                    return
+                from_today, from_yd = self._split_close(
+                    position, offset, info.get('exchange_id', ''), volume)
+                cost = released = 0.0
+                if from_today:
+                    share = from_today / position.today
+                    cost += position.today_cost * share
+                    released += position.today_margin * share
+                    position.today -= from_today
+                    position.today_cost -= position.today_cost * share
+                    position.today_margin -= position.today_margin * share
+                if from_yd:
+                    share = from_yd / position.yesterday
+                    cost += position.yd_cost * share
+                    released += position.yd_margin * share
+                    position.yesterday -= from_yd
+                    position.yd_cost -= position.yd_cost * share
+                    position.yd_margin -= position.yd_margin * share
+                value = price * (from_today + from_yd) * position.multiplier
+                self.close_profit += value - cost if position.direction == '2' else cost - value
+                self.margin -= released
+
+            self._mark_locked(position)
+            if position.volume == 0:
+                self._drop_locked(position)
+        self._notify()
+
+    def on_tick(self, tick):
+        """行情: 只重算该合约的持仓盈亏"""
+        instrument_id = tick.get('instrument_id', '')
+        price = tick.get('last_price') or 0.0
+        if not price:
+            return
+        with self._lock:
+            self._prices[instrument_id] = price
+            long_pos = self._positions.get(f"{instrument_id}_2")
+            short_pos = self._positions.get(f"{instrument_id}_3")
+            if long_pos is None and short_pos is None:
+                return
+            if long_pos is not None:
+                self._mark_locked(long_pos)
+            if short_pos is not None:
+                self._mark_locked(short_pos)
+        self._notify()
+
+    def _get_locked(self, instrument_id: str, direction: str) -> BookPosition:
+        key = f"{instrument_id}_{direction}"
+        position = self._positions.get(key)
+        if position is None:
+            multiplier = self._info(instrument_id).get('volume_multiple') or 1
+            position = self._positions[key] = BookPosition(instrument_id, direction, multiplier)
+            self._unpriced += 1
+        return position
+
+    def _drop_locked(self, position: BookPosition):
+        self.position_profit -= position.profit
+        self.margin -= position.margin
+        if not position.priced:
+            self._unpriced -= 1
+        del self._positions[f"{position.instrument_id}_{position.direction}"]
+
+    def _mark_locked(self, position: BookPosition):
+        """按最新价重算持仓盈亏，差值计入总浮动盈亏"""
+        price = self._prices.get(position.instrument_id)
+        if price is None:
+            return
+        value = price * position.volume * position.multiplier
+        profit = value - position.cost if position.direction == '2' else position.cost - value
+        self.position_profit += profit - position.profit
+        position.profit = profit
+        position.last_price = price
+        if not position.priced:
+            position.priced = True
+            self._unpriced -= 1
+
+    # ==================== 查询 ====================
+
+    def all_priced(self) -> bool:
+        """所有持仓是否都已收到行情 (否则 position_profit 不完整)"""
+        return self._unpriced == 0
+
+    def get_position(self, instrument_id: str, direction: str) -> Optional[Dict[str, Any]]:
+        """
+        单合约单方向持仓
+
+        Args:
+            instrument_id: 合约代码
+            direction: 持仓方向 '2'多 '3'空
+
+        Returns:
+            持仓字典，无持仓时为 None
+        """
+        with self._lock:
+            position = self._positions.get(f"{instrument_id}_{direction}")
+            return position.to_dict() if position else None
+
+    def get_positions(self) -> Dict[str, Dict[str, Any]]:
+        """全部持仓，格式同 CtpGateway.query_position"""
+        with self._lock:
+            return {key: pos.to_dict() for key, pos in self._positions.items()}
+
+    def closable(self, instrument_id: str, direction: str, offset: str = '1') -> int:
+        """
+        可平手数 (不含已挂单冻结)
+
+        Args:
+            instrument_id: 合约代码
+            direction: 持仓方向 '2'多 '3'空
+            offset: '3' 平今、'4' 平昨，其他为平仓 (上期所/能源中心为平昨)
+        """
+        with self._lock:
+            position = self._positions.get(f"{instrument_id}_{direction}")
+            if position is None:
+                return 0
+            exchange_id = self._info(instrument_id).get('exchange_id', '')
+            if exchange_id in CLOSE_TODAY_EXCHANGES:
+                return position.today if offset == '3' else position.yesterday
+            if offset == '3':
+                return position.today
+            if offset == '4':
+                return position.yesterday
+            return position.volume
+
+    def total_volume(self) -> int:
+        """全部持仓手数"""
+        with self._lock:
+            return sum(pos.volume for pos in self._positions.values())
+
+    def market_value(self) -> float:
+        """持仓市值 (未收到行情的持仓按成本计)"""
+        with self._lock:
+            return sum(pos.last_price * pos.volume * pos.multiplier if pos.priced else pos.cost
+                       for pos in self._positions.values())
@@ -0,0 +1,338 @@
+"""
+CTP查询调度器
+每个查询请求按 request_id 跟踪为一个 QueryFuture，由单一发送线程按查询流控发出
+
+功能:
+- QueryFuture: 累积分页响应直到 is_last，调用方各自等待自己的结果
+- 流控: 按每秒查询数与在途查询数发送，CTP 返回 -2/-3 (在途/每秒超限) 时自动重试
+- 合并: 相同 key 的查询在完成前共享同一个 QueryFuture (如多个调用方同时查资金)
+- 超时: 长时间无响应的在途查询被放弃，释放在途名额
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+# CTP 请求返回值: -1 网络连接失败, -2 未处理请求超过许可数, -3 每秒发送请求数超过许可数
+FLOW_CONTROL_ERRORS = (-2, -3)
+
+
+class QueryFuture:
+    """
+    单个查询请求的结果
+
+    items 为按到达顺序累积的分页数据，完成后由 reducer 归并为 result()
+    """
+
+    def __init__(self, kind: str, send: Callable[[int], int],
+                 reducer: Callable[[list], Any] = list, default: Any = None,
+                 key: Optional[Any] = None):
+        """
+        Args:
+            kind: 查询类型 (日志与统计用)
+            send: 发送函数，参数为 request_id，返回 CTP 请求返回值
+            reducer: 分页数据 -> 结果
+            default: 失败或超时的返回值
+            key: 合并键，None 表示不合并
+        """
+        self.kind = kind
+        self.key = key
+        self.request_id = 0
+        self.items: list = []
+        self.error_id = 0
+        self.error_msg = ""
+        self.submitted_at = time.monotonic()
+        self.sent_at = 0.0
+        self.completed_at = 0.0
+
+        self._send = send
+        self._reducer = reducer
+        self._default = default
+        self._result = None
+        self._done = threading.Event()
+
+    def _finish(self, error_id: int = 0, error_msg: str = ""):
+        if self._done.is_set():
+            return
+        if error_id:
+            self.error_id = error_id
+            self.error_msg = error_msg
+        try:
+            self._result = self._reducer(self.items)
+        except Exception:
+            self._result = self._default
+        self.completed_at = time.monotonic()
+        self._done.set()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def ok(self) -> bool:
+        """已完成且无错误"""
+        return self._done.is_set() and self.error_id == 0
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """
+        等待并返回结果
+
+        Args:
+            timeout: 等待秒数，None 表示一直等待
+
+        Returns:
+            归并后的结果；超时、发送失败或出错时返回 default
+        """
+        if not self._done.wait(timeout) or self.error_id:
+            return self._default
+        return self._result
+
+    @property
+    def latency(self) -> float:
+        """提交到完成的耗时 (秒)"""
+        return self.completed_at - self.submitted_at if self.completed_at else 0.0
+
+
+class QueryScheduler:
+    """
+    查询调度器
+
+    用法:
+        scheduler = QueryScheduler(next_request_id, max_per_second=1)
+        future = scheduler.submit('account', lambda rid: api.req_qry_trading_account(..., request_id=rid),
+                                  reducer=last_item, key='account')
+        # SPI 回调线程:
+        scheduler.on_response(request_id, item, error_id, error_msg, is_last)
+        account = future.result(timeout=5)
+    """
+
+    def __init__(self, request_id_factory: Callable[[], int],
+                 max_per_second: float = 1.0, max_inflight: int = 1,
+                 response_timeout: float = 30.0, logger=None):
+        """
+        Args:
+            request_id_factory: 分配 request_id (与报单等请求共用序号)
+            max_per_second: 每秒最多发送的查询数
+            max_inflight: 同时等待响应的查询数上限
+            response_timeout: 在途查询无响应的放弃时间 (秒)
+            logger: TradeLogger
+        """
+        self._next_request_id = request_id_factory
+        self.min_interval = 1.0 / max_per_second if max_per_second > 0 else 0.0
+        self.max_inflight = max(int(max_inflight), 1)
+        self.response_timeout = response_timeout
+        self.logger = logger
+
+        self._queue: deque = deque()
+        self._inflight: Dict[int, QueryFuture] = {}
+        self._by_key: Dict[Any, QueryFuture] = {}
+        self._cond = threading.Condition(threading.Lock())
+        self._next_send = 0.0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.sent = 0
+        self.retries = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+
+    # ==================== 调用方 ====================
+
+    def submit(self, kind: str, send: Callable[[int], int],
+               reducer: Callable[[list], Any] = list, default: Any = None,
+               key: Optional[Any] = None) -> QueryFuture:
+        """
+        提交查询 (不阻塞)
+
+        Args:
+            kind: 查询类型
+            send: 发送函数，参数为 request_id
+            reducer: 分页数据 -> 结果
+            default: 失败或超时的返回值
+            key: 合并键，相同 key 的未完成查询直接返回已有 QueryFuture
+
+        Returns:
+            QueryFuture
+        """
+        with self._cond:
+            if key is not None:
+                existing = self._by_key.get(key)
+                if existing is not None and not existing.done():
+                    return existing
+            future = QueryFuture(kind, send, reducer, default, key)
+            if key is not None:
+                self._by_key[key] = future
+            self._queue.append(future)
+            self._ensure_thread()
+            self._cond.notify()
+        return future
+
+    # ==================== SPI 回调线程 ====================
+
+    def on_response(self, request_id: int, item: Any = None,
+                    error_id: int = 0, error_msg: str = "", is_last: bool = True) -> bool:
+        """
+        分页响应
+
+        Args:
+            request_id: 响应对应的请求号
+            item: 本页数据，None 表示空页
+            error_id: CTP 错误号
+            error_msg: 错误信息
+            is_last: 是否最后一页
+
+        Returns:
+            是否对应本调度器发出的查询
+        """
+        with self._cond:
+            future = self._inflight.get(request_id)
+            if future is None:
+                return False
+            if item is not None:
+                future.items.append(item)
+            if not (is_last or error_id):
+                return True
+            self._complete_locked(future, error_id, error_msg)
+        return True
+
+    def on_error(self, request_id: int, error_id: int, error_msg: str) -> bool:
+        """OnRspError: 结束对应的查询"""
+        return self.on_response(request_id, None, error_id or -1, error_msg, True)
+
+    def fail_all(self, error_msg: str = "连接断开"):
+        """结束全部排队与在途查询 (断线时调用)"""
+        with self._cond:
+            futures = list(self._inflight.values()) + list(self._queue)
+            self._inflight.clear()
+            self._queue.clear()
+            for future in futures:
+                self._complete_locked(future, -1, error_msg)
+            self._cond.notify()
+
+    def _complete_locked(self, future: QueryFuture, error_id: int = 0, error_msg: str = ""):
+        self._inflight.pop(future.request_id, None)
+        if future.key is not None and self._by_key.get(future.key) is future:
+            del self._by_key[future.key]
+        if error_id:
+            self.failed += 1
+            if self.logger:
+                self.logger.log_error(f"查询失败: {future.kind}", error_code=error_id,
+                                      error_msg=error_msg)
+        else:
+            self.completed += 1
+        future._finish(error_id, error_msg)
+        # 在途名额释放
+        self._cond.notify()
+
+    # ==================== 发送线程 ====================
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="ctp-query", daemon=True)
+            self._thread.start()
+
+    def _expire_locked(self, now: float) -> Optional[float]:
+        """放弃超时的在途查询，返回下一个超时时间"""
+        next_deadline = None
+        for future in list(self._inflight.values()):
+            deadline = future.sent_at + self.response_timeout
+            if deadline <= now:
+                self.expired += 1
+                self._complete_locked(future, -1, "查询响应超时")
+            elif next_deadline is None or deadline < next_deadline:
+                next_deadline = deadline
+        return next_deadline
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._running:
+                        return
+                    now = time.monotonic()
+                    deadline = self._expire_locked(now)
+                    if self._queue and len(self._inflight) < self.max_inflight:
+                        if now >= self._next_send:
+                            break
+                        wait = self._next_send - now
+                    else:
+                        wait = None
+                    if deadline is not None:
+                        wait = deadline - now if wait is None else min(wait, deadline - now)
+                    self._cond.wait(wait)
+
+                future = self._queue.popleft()
+                future.request_id = self._next_request_id()
+                future.sent_at = now
+                # 先登记再发送，响应可能早于发送函数返回
+                self._inflight[future.request_id] = future
+                self._next_send = now + self.min_interval
+
+            try:
+                ret = future._send(future.request_id)
+            except Exception as e:
+                ret = -1
+                if self.logger:
+                    self.logger.log_exception(e, f"query {future.kind}")
+
+            if ret == 0:
+                self.sent += 1
+                continue
+            with self._cond:
+                if future.request_id not in self._inflight:
+                    continue
+                if ret in FLOW_CONTROL_ERRORS:
+                    # 流控拒绝: 放回队首，按发送间隔重试
+                    del self._inflight[future.request_id]
+                    self.retries += 1
+                    self._queue.appendleft(future)
+                    self._next_send = time.monotonic() + max(self.min_interval, 0.05)
+                else:
+                    self._complete_locked(future, ret, f"查询请求发送失败: ret={ret}")
+
+    def stop(self):
+        """停止发送线程并结束未完成的查询"""
+        self.fail_all("查询调度器已停止")
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    # ==================== 状态 ====================
+
+    def pending(self) -> int:
+        """排队中的查询数"""
+        return len(self._queue)
+
+    def inflight(self) -> int:
+        """已发送、等待响应的查询数"""
+        return len(self._inflight)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self.pending(),
+            "inflight": self.inflight(),
+            "sent": self.sent,
+            "retries": self.retries,
+            "completed": self.completed,
+            "failed": self.failed,
+            "expired": self.expired,
+        }
+
+
+# ==================== 归并函数 ====================
+
+def last_item(items: list) -> Any:
+    """单条结果: 取最后一页，无数据为 None"""
+    return items[-1] if items else None
+
+
+def keyed_items(items: list) -> Dict[str, Any]:
+    """(key, value) 分页 -> 字典"""
+    return dict(items)
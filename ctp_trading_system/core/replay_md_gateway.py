@@ -0,0 +1,381 @@
+"""
+回放行情网关
+按交易所时间顺序回放 TickRecorder 落盘的多合约行情，接口与 MdGateway 相同
+(connect / login / subscribe / register_market_data_callback / get_market_data ...)，
+策略管理器等行情消费者不依赖 CTP DLL 即可运行与测压
+
+功能:
+- 每个交易日把已订阅合约的内存映射记录按 epoch_ns 稳定归并 (同一时刻按合约代码顺序)，
+  按块转换为 MarketTick 后经 MdDispatcher 分发
+- 速度: speed=1 为实盘节奏，speed=N 为 N 倍速，speed<=0 为最快；超过 max_gap 的间隔 (休市、隔夜) 被压缩
+- 虚拟时钟: now_ns() 为当前回放到的交易所时间，clock_hook(epoch_ns) 在时钟推进时于分发前调用
+- 背压: 队列消费者积压接近容量时暂停发布，EVERY_TICK 消费者不丢tick，同一数据回放结果一致
+- 回放中订阅的合约从当前回放时刻起并入当日剩余行情，退订的合约不再分发
+"""
+
+import time
+import threading
+from typing import Optional, Dict, Callable, Any, List
+
+import numpy as np
+
+try:
+    from ..trade_logging.trade_logger import get_logger, TradeLogger
+    from ..data.market_tick import MarketTick
+    from ..data.tick_recorder import TickReader, TICK_RECORD_DTYPE
+    from .md_dispatcher import MdDispatcher, DeliveryPolicy
+except ImportError:
+    from trade_logging.trade_logger import get_logger, TradeLogger
+    from data.market_tick import MarketTick
+    from data.tick_recorder import TickReader, TICK_RECORD_DTYPE
+    from core.md_dispatcher import MdDispatcher, DeliveryPolicy
+
+
+class ReplayMdGateway:
+    """
+    回放行情网关
+
+    用法:
+        md = ReplayMdGateway("./data/ticks", trading_days=["20250110"], speed=0)
+        md.connect(); md.login()
+        strategy_manager.attach_md_gateway(md)      # 订阅策略所需合约
+        stats = md.run()                            # 同步回放 (或 md.start() 在后台线程回放)
+    """
+
+    def __init__(self, root: str, trading_days: Optional[List[str]] = None,
+                 speed: float = 1.0, max_gap: float = 5.0,
+                 clock_hook: Optional[Callable[[int], None]] = None,
+                 chunk_size: int = 1024):
+        """
+        Args:
+            root: TickRecorder 落盘根目录
+            trading_days: 回放的交易日，None 表示全部已落盘交易日
+            speed: 回放倍速，<=0 表示最快
+            max_gap: 按倍速换算后单个间隔最多等待的秒数
+            clock_hook: 虚拟时钟回调，参数为回放到的 epoch_ns
+            chunk_size: 每块转换/分发的记录数
+        """
+        self.reader = TickReader(root)
+        self.trading_days = list(trading_days) if trading_days is not None else None
+        self.speed = speed
+        self.max_gap = max_gap
+        self.clock_hook = clock_hook
+        self.chunk_size = max(int(chunk_size), 1)
+        self.logger: TradeLogger = get_logger()
+
+        # 行情缓存: instrument_id -> 最新 MarketTick
+        self._market_data: Dict[str, MarketTick] = {}
+        self._trading_day: str = ""
+        self._subscribed: set = set()
+        self._day_instruments: set = set()
+        self._subscription_version = 0
+        self._connected = False
+        self._logged_in = False
+
+        self._dispatcher = MdDispatcher(self.logger)
+        self._on_tick_batch_callbacks: List[Callable] = []
+        self._lock = threading.Lock()
+
+        # 回放状态
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._finished = threading.Event()
+        self._now_ns = 0
+        self._anchor: Optional[tuple] = None        # (epoch_ns, perf_counter) 节奏基准
+        self._started = 0.0
+        self._elapsed = 0.0
+        self.ticks = 0
+        self.days = 0
+        self.behind_ms_max = 0.0                    # 实盘节奏下落后于计划的最大毫秒数
+        self.gaps_compressed = 0
+        self.backpressure_waits = 0
+
+    # ==================== 连接 (与 MdGateway 接口一致) ====================
+
+    def connect(self, timeout: int = 10) -> bool:
+        """回放无需连接前置"""
+        self._dispatcher.start()
+        self._connected = True
+        return True
+
+    def login(self, timeout: int = 10) -> bool:
+        """登录: 交易日取第一个回放交易日"""
+        if not self._connected:
+            return False
+        days = self._days()
+        if days and not self._trading_day:
+            self._trading_day = days[0]
+        self._logged_in = True
+        return True
+
+    def subscribe(self, instrument_ids: List[str]) -> bool:
+        """订阅行情 (回放中订阅的合约从当前回放时刻起生效)"""
+        if not self.is_logged_in():
+            return False
+        if not self._subscribed.issuperset(instrument_ids):
+            self._subscribed.update(instrument_ids)
+            self._subscription_version += 1
+        return True
+
+    def unsubscribe(self, instrument_ids: List[str]) -> bool:
+        """退订行情"""
+        if not self.is_logged_in():
+            return False
+        self._subscribed -= set(instrument_ids)
+        return True
+
+    def get_market_data(self, instrument_id: str = "") -> Dict:
+        """获取行情缓存 (返回字典副本)"""
+        if instrument_id:
+            tick = self._market_data.get(instrument_id)
+            return tick.to_dict() if tick else {}
+        with self._lock:
+            ticks = list(self._market_data.items())
+        return {inst: tick.to_dict() for inst, tick in ticks}
+
+    def get_latest_tick(self, instrument_id: str) -> Optional[MarketTick]:
+        """获取合约最新 MarketTick (共享对象，只读)"""
+        return self._market_data.get(instrument_id)
+
+    def get_trading_day(self) -> str:
+        """当前回放交易日"""
+        return self._trading_day
+
+    def get_subscribed(self) -> List[str]:
+        """获取已订阅合约列表"""
+        return list(self._subscribed)
+
+    def register_market_data_callback(self, callback: Callable,
+                                      policy: DeliveryPolicy = DeliveryPolicy.EVERY_TICK,
+                                      name: Optional[str] = None, maxsize: int = 10000) -> str:
+        """注册行情回调 (参数同 MdGateway.register_market_data_callback)"""
+        return self._dispatcher.register(callback, policy, name=name, maxsize=maxsize)
+
+    def unregister_market_data_callback(self, name: str) -> bool:
+        """注销行情回调"""
+        return self._dispatcher.unregister(name)
+
+    def get_dispatch_stats(self) -> Dict[str, Dict[str, Any]]:
+        """各行情消费者的队列深度、丢弃数与延迟"""
+        return self._dispatcher.stats()
+
+    def register_tick_batch_callback(self, callback: Callable):
+        """注册批量行情回调 (每块记录分发后以 TICK_RECORD_DTYPE 结构化数组调用一次，只含已分发的记录)"""
+        self._on_tick_batch_callbacks.append(callback)
+
+    def is_ring_mode(self) -> bool:
+        return False
+
+    def get_feed_stats(self) -> Dict[str, Any]:
+        """回放统计 (对应 MdGateway 的前置/会话统计)"""
+        return {"replay": self.get_replay_stats()}
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def is_logged_in(self) -> bool:
+        return self._logged_in
+
+    def close(self):
+        """停止回放并关闭分发线程"""
+        self.stop()
+        self._connected = False
+        self._logged_in = False
+        self._dispatcher.stop()
+
+    # ==================== 虚拟时钟与速度 ====================
+
+    def now_ns(self) -> int:
+        """当前回放到的交易所时间 (epoch_ns，尚未开始时为0)"""
+        return self._now_ns
+
+    def set_clock_hook(self, hook: Optional[Callable[[int], None]]):
+        """设置虚拟时钟回调"""
+        self.clock_hook = hook
+
+    def set_speed(self, speed: float):
+        """调整回放倍速 (从当前回放时刻重新计时)"""
+        self.speed = speed
+        self._anchor = None
+
+    # ==================== 回放控制 ====================
+
+    def start(self):
+        """在后台线程回放"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._finished.clear()
+        self._thread = threading.Thread(target=self.run, name="md-replay", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """停止回放"""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待回放结束 (全部行情已分发且消费者队列已清空)"""
+        return self._finished.wait(timeout)
+
+    def is_finished(self) -> bool:
+        return self._finished.is_set()
+
+    def run(self) -> Dict[str, Any]:
+        """
+        在当前线程回放全部交易日，结束时等待消费者处理完已分发的行情
+
+        Returns:
+            回放统计
+        """
+        self._stop.clear()
+        self._finished.clear()
+        self._anchor = None
+        self.ticks = self.days = 0
+        self._started = time.perf_counter()
+        self.logger.log_system("开始回放行情", {"days": self._days(), "speed": self.speed,
+                                                "instruments": sorted(self._subscribed)})
+        try:
+            for trading_day in self._days():
+                if self._stop.is_set():
+                    break
+                self._replay_day(trading_day)
+            while not self._stop.is_set() and not self._dispatcher.wait_drained(timeout=0.1):
+                pass
+        finally:
+            self._elapsed = time.perf_counter() - self._started
+            self._finished.set()
+        stats = self.get_replay_stats()
+        self.logger.log_system("行情回放结束", stats)
+        return stats
+
+    def _days(self) -> List[str]:
+        if self.trading_days is not None:
+            return self.trading_days
+        return self.reader.trading_days()
+
+    def _load(self, trading_day: str, instruments, since_ns: int = 0) -> List[np.ndarray]:
+        arrays = []
+        for instrument_id in sorted(instruments):
+            records = self.reader.load(trading_day, instrument_id)
+            if since_ns:
+                records = records[records['epoch_ns'] >= since_ns]
+            if len(records):
+                arrays.append(records)
+        return arrays
+
+    @staticmethod
+    def _merge(arrays: List[np.ndarray]) -> np.ndarray:
+        """按 epoch_ns 稳定归并 (同一时刻保持数组顺序)"""
+        if not arrays:
+            return np.zeros(0, dtype=TICK_RECORD_DTYPE)
+        merged = np.concatenate(arrays)
+        return merged[np.argsort(merged['epoch_ns'], kind='stable')]
+
+    def _replay_day(self, trading_day: str):
+        """回放一个交易日"""
+        self._trading_day = trading_day
+        self._day_instruments = set(self._subscribed)
+        records = self._merge(self._load(trading_day, self._day_instruments))
+        pos = 0
+        while pos < len(records) and not self._stop.is_set():
+            added = self._subscribed - self._day_instruments
+            if added:
+                # 回放中新订阅的合约: 从当前时刻起并入剩余行情
+                self._day_instruments |= added
+                records = self._merge([records[pos:]] + self._load(trading_day, added, self._now_ns))
+                pos = 0
+
+            chunk = records[pos:pos + self.chunk_size]
+            step = min(len(chunk), self._queue_capacity())
+            version = self._subscription_version
+            emitted = 0
+            for tick in TickReader.to_ticks(chunk):
+                if emitted % step == 0 and not self._backpressure(step):
+                    return
+                if self._stop.is_set():
+                    return
+                self._emit(tick)
+                emitted += 1
+                if self._subscription_version != version:
+                    break
+            pos += emitted
+
+            for callback in self._on_tick_batch_callbacks:
+                try:
+                    callback(chunk[:emitted])
+                except Exception as e:
+                    self.logger.log_exception(e, "tick batch callback")
+        self.days += 1
+
+    def _queue_capacity(self) -> int:
+        """队列消费者的最小容量 (背压步长)"""
+        dispatcher = self._dispatcher
+        consumers = (dispatcher.get_consumer(name) for name in dispatcher.get_consumer_names())
+        return min((consumer.maxsize for consumer in consumers
+                    if consumer is not None and consumer.policy != DeliveryPolicy.INLINE),
+                   default=self.chunk_size)
+
+    def _backpressure(self, step: int) -> bool:
+        """等待每个队列消费者至少有 step 个空位，回放被停止时返回 False"""
+        if self._dispatcher.wait_drained(headroom=step, timeout=0):
+            return True
+        self.backpressure_waits += 1
+        while not self._dispatcher.wait_drained(headroom=step, timeout=0.1):
+            if self._stop.is_set():
+                return False
+        return True
+
+    def _emit(self, tick: MarketTick):
+        """推进虚拟时钟 (按倍速等待) 并分发一条行情"""
+        epoch_ns = tick.epoch_ns
+        if epoch_ns != self._now_ns:
+            if self.speed > 0:
+                self._pace(epoch_ns)
+            self._now_ns = epoch_ns
+            hook = self.clock_hook
+            if hook is not None:
+                hook(epoch_ns)
+
+        if tick.instrument_id not in self._subscribed:
+            return
+        with self._lock:
+            self._market_data[tick.instrument_id] = tick
+        self.ticks += 1
+        self._dispatcher.publish(tick)
+
+    def _pace(self, epoch_ns: int):
+        """按倍速等待到 epoch_ns 对应的墙钟时刻"""
+        now = time.perf_counter()
+        if self._anchor is None:
+            self._anchor = (epoch_ns, now)
+            return
+        anchor_ns, anchor_wall = self._anchor
+        delay = anchor_wall + (epoch_ns - anchor_ns) / 1e9 / self.speed - now
+        if delay > self.max_gap:
+            # 休市/隔夜等长间隔: 只等待 max_gap
+            self._anchor = (anchor_ns, anchor_wall - (delay - self.max_gap))
+            delay = self.max_gap
+            self.gaps_compressed += 1
+        if delay > 0.0002:
+            self._stop.wait(delay)
+        elif delay < 0:
+            self.behind_ms_max = max(self.behind_ms_max, -delay * 1000)
+
+    def get_replay_stats(self) -> Dict[str, Any]:
+        elapsed = self._elapsed if self._finished.is_set() or not self._started \
+            else time.perf_counter() - self._started
+        return {
+            "ticks": self.ticks,
+            "days": self.days,
+            "trading_day": self._trading_day,
+            "now_ns": self._now_ns,
+            "speed": self.speed,
+            "elapsed_s": elapsed,
+            "ticks_per_sec": self.ticks / elapsed if elapsed > 0 else 0.0,
+            "behind_ms_max": self.behind_ms_max,
+            "gaps_compressed": self.gaps_compressed,
+            "backpressure_waits": self.backpressure_waits,
+            "finished": self._finished.is_set(),
+        }
@@ -12,6 +12,7 @@ from .ctp_api import (
     OrderStatus,
     PositionDirection,
     ResumeType,
+    OrderInsertArgs,
 )
 
 __all__ = [
@@ -24,4 +25,5 @@ __all__ = [
     'OrderStatus',
     'PositionDirection',
     'ResumeType',
+    'OrderInsertArgs',
 ]
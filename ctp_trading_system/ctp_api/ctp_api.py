@@ -236,6 +236,18 @@ OnRtnTradeCallback = CFUNCTYPE(
     c_char_p, c_char_p, c_char, c_char,
     c_double, c_int, c_char_p, c_char_p, c_char_p)
 
+# 带序号的报单/成交回报 (参数同上，末尾追加 SequenceNo)
+OnRtnOrderSeqCallback = CFUNCTYPE(
+    None, c_char_p, c_char_p, c_char_p, c_char_p,
+    c_char_p, c_char, c_char, c_double, c_int, c_int,
+    c_char, c_char_p, c_int, c_int,
+    c_char_p, c_char_p, c_char_p, c_int)
+
+OnRtnTradeSeqCallback = CFUNCTYPE(
+    None, c_char_p, c_char_p, c_char_p, c_char_p,
+    c_char_p, c_char_p, c_char, c_char,
+    c_double, c_int, c_char_p, c_char_p, c_char_p, c_int)
+
 OnErrRtnOrderInsertCallback = CFUNCTYPE(
     None, c_char_p, c_char_p, c_char_p, c_char_p,
     c_char, c_char, c_double, c_int,
@@ -264,6 +276,14 @@ OnRspQryInvestorPositionCallback = CFUNCTYPE(
     c_double, c_double,
     c_int, c_char_p, c_int, c_int)
 
+# 带今仓/持仓日期的持仓查询响应 (参数同上，末尾追加 TodayPosition、PositionDate)
+OnRspQryInvestorPositionExCallback = CFUNCTYPE(
+    None, c_char_p, c_char_p, c_char_p, c_char,
+    c_int, c_int, c_double, c_double,
+    c_double, c_double,
+    c_int, c_char_p, c_int, c_int,
+    c_int, c_char)
+
 OnRspQryTradingAccountCallback = CFUNCTYPE(
     None, c_char_p, c_char_p,
     c_double, c_double, c_double,
@@ -330,6 +350,34 @@ OnRtnInstrumentStatusCallback = CFUNCTYPE(
     None, c_char_p, c_char_p, c_int, c_char_p, c_int)
 
 
+# ============================================================
+# 报单参数块 (快速路径)
+# ============================================================
+class OrderInsertArgs(Structure):
+    """
+    报单参数块，必须与C++端 OrderInsertArgs 结构体完全一致 (144字节)
+
+    按合约预填 broker/investor/instrument 等固定字段，报单时复制后只写
+    order_ref、方向、开平、价格、数量，由 ReqOrderInsertArgs 一次传入
+    """
+    _fields_ = [
+        ("broker_id", c_char * 11),
+        ("investor_id", c_char * 13),
+        ("instrument_id", c_char * 81),
+        ("order_ref", c_char * 13),
+        ("direction", c_char),
+        ("offset_flag", c_char),
+        ("hedge_flag", c_char),
+        ("order_price_type", c_char),
+        ("time_condition", c_char),
+        ("volume_condition", c_char),
+        ("reserved", c_char * 4),
+        ("price", c_double),
+        ("volume", c_int),
+        ("min_volume", c_int),
+    ]
+
+
 # ============================================================
 # 回调结构体
 # ============================================================
@@ -427,12 +475,17 @@ class CTPTraderApi:
         self.on_rsp_order_action: Optional[Callable] = None
         self.on_rtn_order: Optional[Callable] = None
         self.on_rtn_trade: Optional[Callable] = None
+        # 原始字节回报: 设置后字符串字段不解码、不输出日志，直接交给调用方 (参数顺序同上)；
+        # wrapper 支持 RegisterSequenceCallbacks 时以关键字参数 sequence_no 传入回报序号
+        self.on_rtn_order_raw: Optional[Callable] = None
+        self.on_rtn_trade_raw: Optional[Callable] = None
         self.on_err_rtn_order_insert: Optional[Callable] = None
         self.on_err_rtn_order_action: Optional[Callable] = None
 
         # 查询响应
         self.on_rsp_qry_order: Optional[Callable] = None
         self.on_rsp_qry_trade: Optional[Callable] = None
+        # wrapper 支持 RegisterPositionCallback 时以关键字参数 today_position、position_date 传入今仓与持仓日期
         self.on_rsp_qry_investor_position: Optional[Callable] = None
         self.on_rsp_qry_trading_account: Optional[Callable] = None
         self.on_rsp_qry_instrument: Optional[Callable] = None
@@ -552,6 +605,24 @@ class CTPTraderApi:
             c_char_p, c_int]
         self._dll.ReqOrderAction.restype = c_int
 
+        # 报单快速路径 (旧版 wrapper 无此导出函数，回退到 ReqOrderInsert)
+        if hasattr(self._dll, 'ReqOrderInsertArgs'):
+            self._dll.OrderInsertArgsSize.argtypes = []
+            self._dll.OrderInsertArgsSize.restype = c_int
+            self._dll.ReqOrderInsertArgs.argtypes = [c_void_p, POINTER(OrderInsertArgs), c_int]
+            self._dll.ReqOrderInsertArgs.restype = c_int
+
+        # 带序号的回报 (旧版 wrapper 无此导出函数，回报不带序号)
+        if hasattr(self._dll, 'RegisterSequenceCallbacks'):
+            self._dll.RegisterSequenceCallbacks.argtypes = [
+                c_void_p, OnRtnOrderSeqCallback, OnRtnTradeSeqCallback]
+            self._dll.RegisterSequenceCallbacks.restype = None
+
+        # 带今仓/持仓日期的持仓查询响应 (旧版 wrapper 无此导出函数，只有 YdPosition)
+        if hasattr(self._dll, 'RegisterPositionCallback'):
+            self._dll.RegisterPositionCallback.argtypes = [c_void_p, OnRspQryInvestorPositionExCallback]
+            self._dll.RegisterPositionCallback.restype = None
+
         # ========== 查询 ==========
         self._dll.ReqQryOrder.argtypes = [
             c_void_p, c_char_p, c_char_p, c_char_p, c_char_p, c_int]
@@ -801,6 +872,13 @@ class CTPTraderApi:
                           user_id, direction, offset_flag, price, volume_total, volume_traded,
                           order_status, order_sys_id, front_id, session_id,
                           insert_date, insert_time, status_msg):
+            if self.on_rtn_order_raw:
+                self.on_rtn_order_raw(
+                    broker_id, investor_id, instrument_id, order_ref,
+                    user_id, direction, offset_flag, price, volume_total, volume_traded,
+                    order_status, order_sys_id, front_id, session_id,
+                    insert_date, insert_time, status_msg)
+                return
             broker_id = self._decode(broker_id)
             investor_id = self._decode(investor_id)
             instrument_id = self._decode(instrument_id)
@@ -827,6 +905,12 @@ class CTPTraderApi:
         def _on_rtn_trade(broker_id, investor_id, instrument_id, order_ref,
                           user_id, trade_id, direction, offset_flag,
                           price, volume, trade_date, trade_time, order_sys_id):
+            if self.on_rtn_trade_raw:
+                self.on_rtn_trade_raw(
+                    broker_id, investor_id, instrument_id, order_ref,
+                    user_id, trade_id, direction, offset_flag,
+                    price, volume, trade_date, trade_time, order_sys_id)
+                return
             broker_id = self._decode(broker_id)
             investor_id = self._decode(investor_id)
             instrument_id = self._decode(instrument_id)
@@ -1162,6 +1246,38 @@ class CTPTraderApi:
 
         self._callback_refs = callbacks
 
+        # 带序号的报单/成交回报: 原始字节模式附带序号，否则按普通回报处理
+        def _on_rtn_order_seq(*args):
+            if self.on_rtn_order_raw:
+                self.on_rtn_order_raw(*args[:-1], sequence_no=args[-1])
+            else:
+                _on_rtn_order(*args[:-1])
+
+        def _on_rtn_trade_seq(*args):
+            if self.on_rtn_trade_raw:
+                self.on_rtn_trade_raw(*args[:-1], sequence_no=args[-1])
+            else:
+                _on_rtn_trade(*args[:-1])
+
+        self._seq_callback_refs = (OnRtnOrderSeqCallback(_on_rtn_order_seq),
+                                   OnRtnTradeSeqCallback(_on_rtn_trade_seq))
+
+        # 带今仓/持仓日期的持仓查询响应
+        def _on_rsp_qry_investor_position_ex(broker_id, investor_id, instrument_id, position_direction,
+                                              position, yd_position, position_cost, open_cost,
+                                              use_margin, frozen_margin,
+                                              error_id, error_msg, request_id, is_last,
+                                              today_position, position_date):
+            if self.on_rsp_qry_investor_position:
+                self.on_rsp_qry_investor_position(
+                    self._decode(broker_id), self._decode(investor_id), self._decode(instrument_id),
+                    position_direction, position, yd_position, position_cost, open_cost,
+                    use_margin, frozen_margin,
+                    error_id, self._decode(error_msg), request_id, bool(is_last),
+                    today_position=today_position, position_date=self._decode(position_date))
+
+        self._position_callback_ref = OnRspQryInvestorPositionExCallback(_on_rsp_qry_investor_position_ex)
+
         # 创建回调结构体
         self._callbacks = TraderCallbacks(
             on_front_connected=callbacks[0],
@@ -1219,6 +1335,10 @@ class CTPTraderApi:
         # 创建并注册回调
         self._create_callbacks()
         self._dll.RegisterCallbacks(self._api, byref(self._callbacks))
+        if self.supports_sequence_no():
+            self._dll.RegisterSequenceCallbacks(self._api, *self._seq_callback_refs)
+        if self.supports_today_position():
+            self._dll.RegisterPositionCallback(self._api, self._position_callback_ref)
 
         # 获取版本
         version = self.get_api_version()
@@ -1492,6 +1612,33 @@ class CTPTraderApi:
             request_id
         )
 
+    def supports_order_args(self) -> bool:
+        """wrapper 是否支持报单参数块 (且布局一致)"""
+        if not self._dll or not hasattr(self._dll, 'ReqOrderInsertArgs'):
+            return False
+        return self._dll.OrderInsertArgsSize() == ctypes.sizeof(OrderInsertArgs)
+
+    def supports_sequence_no(self) -> bool:
+        """wrapper 是否在报单/成交回报中提供 SequenceNo"""
+        return bool(self._dll) and hasattr(self._dll, 'RegisterSequenceCallbacks')
+
+    def supports_today_position(self) -> bool:
+        """wrapper 是否在持仓查询响应中提供 TodayPosition、PositionDate"""
+        return bool(self._dll) and hasattr(self._dll, 'RegisterPositionCallback')
+
+    def req_order_insert_args(self, args: OrderInsertArgs, request_id: int) -> int:
+        """
+        报单请求 (快速路径: 参数块已预编码，不做字符串编码与日志输出)
+
+        Args:
+            args: 报单参数块
+            request_id: 请求ID
+
+        Returns:
+            0 表示成功，其他表示失败
+        """
+        return self._dll.ReqOrderInsertArgs(self._api, byref(args), request_id)
+
     def req_order_action(self, broker_id: str, investor_id: str,
                          instrument_id: str, exchange_id: str = "",
                          order_ref: str = "", front_id: int = 0, session_id: int = 0,
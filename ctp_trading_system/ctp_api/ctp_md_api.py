@@ -1,6 +1,10 @@
 """
 CTP 行情 API Python 封装 (ctypes)
-通过 ctp_md_wrapper.dll 调用 CTP v6.6.8 官方行情 API
+通过 ctp_md_wrapper.dll (Linux: libctp_md_wrapper.so) 调用 CTP v6.6.8 官方行情 API
+
+深度行情两种投递方式:
+- 回调模式: 每个tick由 CTP 线程调用 on_rtn_depth_market_data (41个参数)
+- 环形缓冲模式: attach_ring 后 CTP 线程只把记录写入 MdTickRing，由调用方线程按批读取
 """
 
 import os
@@ -82,6 +86,7 @@ class CTPMdApi:
         self._api = None
         self._callbacks_struct = None
         self._callback_refs = []
+        self._ring = None           # 挂接期间持有引用，防止缓冲被回收
 
         # 用户回调
         self.on_front_connected: Optional[Callable] = None
@@ -110,8 +115,9 @@ class CTPMdApi:
         wrapper_dir = os.path.join(os.path.dirname(os.path.dirname(curr_dir)), 'ctp_wrapper', 'python')
         search_paths.append(wrapper_dir)
 
+        lib_name = 'ctp_md_wrapper.dll' if sys.platform == 'win32' else 'libctp_md_wrapper.so'
         for path in search_paths:
-            dll_path = os.path.join(path, 'ctp_md_wrapper.dll')
+            dll_path = os.path.join(path, lib_name)
             if os.path.exists(dll_path):
                 try:
                     os.add_dll_directory(path)
@@ -119,12 +125,12 @@ class CTPMdApi:
                     pass
                 try:
                     self._dll = cdll.LoadLibrary(dll_path)
-                    log.info(f"Loaded ctp_md_wrapper.dll from {path}")
+                    log.info(f"Loaded {lib_name} from {path}")
                     return
                 except Exception as e:
                     log.warning(f"Failed to load from {path}: {e}")
 
-        log.warning("ctp_md_wrapper.dll not found")
+        log.warning(f"{lib_name} not found")
 
     def _setup_functions(self):
         """设置DLL函数签名"""
@@ -155,6 +161,15 @@ class CTPMdApi:
         self._dll.MdUnSubscribeMarketData.argtypes = [c_void_p, POINTER(c_char_p), c_int]
         self._dll.MdUnSubscribeMarketData.restype = c_int
 
+        # 环形缓冲模式 (旧版 wrapper 无这些导出函数，只能使用回调模式)
+        if hasattr(self._dll, 'MdAttachRing'):
+            self._dll.MdRingRecordSize.argtypes = []
+            self._dll.MdRingRecordSize.restype = c_int
+            self._dll.MdAttachRing.argtypes = [c_void_p, c_void_p]
+            self._dll.MdAttachRing.restype = c_int
+            self._dll.MdDetachRing.argtypes = [c_void_p]
+            self._dll.MdDetachRing.restype = None
+
     def _decode(self, val) -> str:
         if val is None:
             return ""
@@ -335,11 +350,44 @@ class CTPMdApi:
         ids = (c_char_p * count)(*[s.encode('gbk') for s in instrument_ids])
         return self._dll.MdUnSubscribeMarketData(self._api, ids, count)
 
+    def supports_ring(self) -> bool:
+        """wrapper 是否支持环形缓冲模式"""
+        return bool(self._dll) and hasattr(self._dll, 'MdAttachRing')
+
+    def attach_ring(self, ring) -> bool:
+        """
+        切换到环形缓冲模式: 深度行情写入 ring，不再调用 on_rtn_depth_market_data
+
+        Args:
+            ring: MdTickRing 实例 (须在 release 之后才能释放)
+
+        Returns:
+            是否挂接成功 (wrapper 不支持或记录布局不一致时返回 False)
+        """
+        if not self._api:
+            raise RuntimeError("API not initialized")
+        if not self.supports_ring():
+            return False
+        if self._dll.MdRingRecordSize() != ring.record_size:
+            log.warning("MdTickRecord size mismatch, ring mode disabled")
+            return False
+        if self._dll.MdAttachRing(self._api, ring.address) != 0:
+            return False
+        self._ring = ring
+        return True
+
+    def detach_ring(self):
+        """恢复回调模式"""
+        if self._api and self.supports_ring():
+            self._dll.MdDetachRing(self._api)
+
     def release(self):
         """释放资源"""
         if self._api and self._dll:
             self._dll.ReleaseMdApi(self._api)
             self._api = None
+        # CTP 线程已停止，此后才能释放环形缓冲
+        self._ring = None
 
     def __del__(self):
         self.release()
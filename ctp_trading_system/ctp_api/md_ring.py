@@ -0,0 +1,193 @@
+"""
+CTP 行情共享内存环形缓冲 (Python 端)
+与 ctp_wrapper/src/md_ring.h 的内存布局一一对应
+
+功能:
+- MD_TICK_DTYPE: 定长行情记录的 NumPy 结构化类型 (352字节)
+- MdTickRing: 分配并初始化环形缓冲，交给 ctp_md_wrapper 挂接 (CTPMdApi.attach_ring)
+- drain: 按批读取为结构化数组，CTP 线程不进入Python、不持有GIL
+- push / encode_ticks: Python 端合成生产者，用于测试与回放
+
+单生产者单消费者: head 只由生产者写，tail 只由消费者写。
+Python 端对对齐的64位字段直接读写 (x86-64 上为原子操作且不与其他读操作重排)
+"""
+
+from typing import Iterable, Optional
+import numpy as np
+
+
+MD_RING_MAGIC = 0x4E52444D          # "MDRN"
+MD_RING_VERSION = 1
+MD_RING_HEADER_SIZE = 256
+
+_DOUBLE_FIELDS = (
+    'last_price', 'pre_settlement_price', 'pre_close_price', 'pre_open_interest',
+    'open_price', 'highest_price', 'lowest_price',
+    'turnover', 'open_interest', 'close_price', 'settlement_price',
+    'upper_limit_price', 'lower_limit_price',
+    'bid_price1', 'ask_price1', 'bid_price2', 'ask_price2', 'bid_price3', 'ask_price3',
+    'bid_price4', 'ask_price4', 'bid_price5', 'ask_price5',
+    'average_price',
+)
+_INT_FIELDS = (
+    'volume', 'update_millisec',
+    'bid_volume1', 'ask_volume1', 'bid_volume2', 'ask_volume2', 'bid_volume3', 'ask_volume3',
+    'bid_volume4', 'ask_volume4', 'bid_volume5', 'ask_volume5',
+)
+_STR_FIELDS = (
+    ('instrument_id', 32), ('exchange_id', 16), ('update_time', 16),
+    ('trading_day', 16), ('action_day', 16),
+)
+
+# 行情记录 (字段顺序与 C 结构体 MdTickRecord 一致，无填充)
+MD_TICK_DTYPE = np.dtype(
+    [('seq', '<u8'), ('recv_ns', '<i8')]
+    + [(name, '<f8') for name in _DOUBLE_FIELDS]
+    + [(name, '<i4') for name in _INT_FIELDS]
+    + [(name, f'S{size}') for name, size in _STR_FIELDS]
+)
+assert MD_TICK_DTYPE.itemsize == 352
+
+# 环形缓冲头部 (生产者/消费者字段分属不同缓存行)
+MD_RING_HEADER_DTYPE = np.dtype({
+    'names': ['magic', 'version', 'record_size', 'capacity', 'mask', 'head', 'tail', 'dropped'],
+    'formats': ['<u4', '<u4', '<u4', '<u4', '<u8', '<u8', '<u8', '<u8'],
+    'offsets': [0, 4, 8, 12, 16, 64, 128, 192],
+    'itemsize': MD_RING_HEADER_SIZE,
+})
+
+_ALIGN = 64
+
+
+class MdTickRing:
+    """
+    行情环形缓冲
+
+    用法:
+        ring = MdTickRing(capacity=65536)
+        md_api.attach_ring(ring)          # C++ 行情线程开始写入
+        records = ring.drain(4096)        # 消费线程按批读取
+    """
+
+    def __init__(self, capacity: int = 65536):
+        """
+        Args:
+            capacity: 记录容量，向上取整为2的幂
+        """
+        capacity = 1 << max(int(capacity) - 1, 1).bit_length()
+        size = MD_RING_HEADER_SIZE + capacity * MD_TICK_DTYPE.itemsize
+        # 按缓存行对齐 (head/tail 独占缓存行)
+        raw = np.zeros(size + _ALIGN, dtype=np.uint8)
+        offset = (-raw.ctypes.data) % _ALIGN
+        self._raw = raw
+        self._buffer = raw[offset:offset + size]
+        self._header = self._buffer[:MD_RING_HEADER_SIZE].view(MD_RING_HEADER_DTYPE)
+        self._records = self._buffer[MD_RING_HEADER_SIZE:].view(MD_TICK_DTYPE)
+
+        header = self._header
+        header['magic'] = MD_RING_MAGIC
+        header['version'] = MD_RING_VERSION
+        header['record_size'] = MD_TICK_DTYPE.itemsize
+        header['capacity'] = capacity
+        header['mask'] = capacity - 1
+
+        self.capacity = capacity
+        self._mask = capacity - 1
+
+    @property
+    def record_size(self) -> int:
+        return MD_TICK_DTYPE.itemsize
+
+    @property
+    def address(self) -> int:
+        """缓冲起始地址 (传给 MdAttachRing)"""
+        return self._buffer.ctypes.data
+
+    @property
+    def head(self) -> int:
+        return int(self._header['head'][0])
+
+    @property
+    def tail(self) -> int:
+        return int(self._header['tail'][0])
+
+    @property
+    def dropped(self) -> int:
+        """缓冲满被生产者丢弃的记录数"""
+        return int(self._header['dropped'][0])
+
+    def __len__(self) -> int:
+        """待消费记录数"""
+        return self.head - self.tail
+
+    # ==================== 消费者 ====================
+
+    def drain(self, max_records: Optional[int] = None) -> np.ndarray:
+        """
+        读取已发布的记录 (结构化数组副本，按序号顺序)
+
+        Args:
+            max_records: 单批最多读取的记录数，None 表示全部
+        """
+        head = int(self._header['head'][0])
+        tail = int(self._header['tail'][0])
+        n = head - tail
+        if max_records is not None:
+            n = min(n, max_records)
+        if n <= 0:
+            return self._records[:0].copy()
+
+        start = tail & self._mask
+        first = min(n, self.capacity - start)
+        if first == n:
+            batch = self._records[start:start + n].copy()
+        else:
+            batch = np.concatenate((self._records[start:], self._records[:n - first]))
+        # 复制完成后才释放槽位
+        self._header['tail'] = tail + n
+        return batch
+
+    # ==================== 合成生产者 ====================
+
+    def push(self, records: np.ndarray) -> int:
+        """
+        写入记录并发布 (与 C++ RingPush 相同的协议，缓冲满的部分丢弃)
+
+        Args:
+            records: MD_TICK_DTYPE 数组 (seq 由本方法填写)
+
+        Returns:
+            实际写入的记录数
+        """
+        records = np.atleast_1d(records)
+        head = int(self._header['head'][0])
+        tail = int(self._header['tail'][0])
+        n = min(len(records), self.capacity - (head - tail))
+        if n < len(records):
+            self._header['dropped'] += len(records) - n
+        if n <= 0:
+            return 0
+
+        slots = (head + np.arange(n)) & self._mask
+        self._records[slots] = records[:n]
+        self._records['seq'][slots] = head + 1 + np.arange(n, dtype=np.uint64)
+        self._header['head'] = head + n
+        return n
+
+
+def encode_ticks(ticks: Iterable[dict], recv_ns: int = 0) -> np.ndarray:
+    """
+    行情字典 / MarketTick 序列 -> MD_TICK_DTYPE 数组 (合成生产者使用)
+
+    Args:
+        ticks: 字段名与 MarketTick 一致，缺失字段为0/空串
+        recv_ns: 接收时间戳
+    """
+    ticks = list(ticks)
+    records = np.zeros(len(ticks), dtype=MD_TICK_DTYPE)
+    records['recv_ns'] = recv_ns
+    for name in _DOUBLE_FIELDS + _INT_FIELDS:
+        records[name] = [t.get(name, 0) or 0 for t in ticks]
+    for name, _ in _STR_FIELDS:
+        records[name] = [(t.get(name, '') or '').encode('ascii', errors='replace') for t in ticks]
+    return records
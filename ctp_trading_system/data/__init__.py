@@ -3,18 +3,34 @@
 实时数据缓存与备份管理
 """
 
+from .market_tick import MarketTick, TradingDayClock
 from .tick_cache import TickCache, TickData
-from .bar_aggregator import BarAggregator, BarBuffer, BarData
+from .tick_features import IncrementalTickFeatures
+from .tick_registry import TickCacheRegistry
+from .tick_recorder import TickRecorder, TickReader, TICK_RECORD_DTYPE
+from .indicators import (
+    EMA, MACD, RSI, Bollinger, RollingVolatility, BarIndicators, L1OrderFlow
+)
+from .bar_aggregator import (
+    BarAggregator, BarBuffer, BarData, BarInterval, TradingSessions, sessions_for_instrument
+)
 from .l2_depth_buffer import L2DepthBuffer, L2Depth
 from .feature_sequence_cache import FeatureSequenceCache
+from .feature_registry import FeatureRegistry, FeaturePlan, FeatureSpec, FEATURE_REGISTRY
+from .feature_backfill import backfill_tick_features, backfill_lstm_features, backfill_days
 from .trade_context import TradeContext, SignalContext, ExecutionContext, L1Snapshot, L2Snapshot
 from .context_manager import ContextManager
 
 __all__ = [
-    'TickCache', 'TickData',
-    'BarAggregator', 'BarBuffer', 'BarData',
+    'MarketTick', 'TradingDayClock',
+    'TickCache', 'TickData', 'IncrementalTickFeatures', 'TickCacheRegistry',
+    'TickRecorder', 'TickReader', 'TICK_RECORD_DTYPE',
+    'EMA', 'MACD', 'RSI', 'Bollinger', 'RollingVolatility', 'BarIndicators', 'L1OrderFlow',
+    'BarAggregator', 'BarBuffer', 'BarData', 'BarInterval', 'TradingSessions',
+    'sessions_for_instrument',
     'L2DepthBuffer', 'L2Depth',
-    'FeatureSequenceCache',
+    'FeatureSequenceCache', 'FeatureRegistry', 'FeaturePlan', 'FeatureSpec', 'FEATURE_REGISTRY',
+    'backfill_tick_features', 'backfill_lstm_features', 'backfill_days',
     'TradeContext', 'SignalContext', 'ExecutionContext', 'L1Snapshot', 'L2Snapshot',
     'ContextManager'
 ]
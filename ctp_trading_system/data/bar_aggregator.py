@@ -3,16 +3,75 @@ Bar聚合器
 tick级别数据实时聚合成K线
 
 功能:
-- tick到1分钟Bar实时聚合
-- 每分钟自动切换新Bar
-- 支持回调通知完成的Bar
+- 以整数毫秒epoch为键确定Bar边界，不再逐tick比较分钟
+- 单次遍历同时生成 N秒 / N分钟 / tick数 / 成交量 / 成交额 Bar
+- 按交易所交易时段切分 (午休、夜盘收盘)，跨午夜夜盘正确归属
+- 完成的Bar按批回调通知
 - BarBuffer保存历史Bar用于特征计算
+
+时间约定: epoch按交易所本地墙钟 (北京时间) 当作UTC计算，
+即 epoch_ms % 86400000 直接是当日时刻，不涉及时区换算
 """
 
+import re
 from collections import deque
 from dataclasses import dataclass, asdict
-from typing import Optional, Callable, List
-from datetime import datetime
+from typing import Optional, Callable, List, Dict, Tuple, Sequence, Union, Iterable
+from datetime import datetime, timedelta
+
+
+_DAY_MS = 86_400_000
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch_ms(dt: datetime) -> int:
+    """本地墙钟时间 -> 整数毫秒epoch (忽略时区信息)"""
+    delta = dt.replace(tzinfo=None) - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+
+
+def from_epoch_ms(epoch_ms: int) -> datetime:
+    """整数毫秒epoch -> 本地墙钟时间"""
+    return _EPOCH + timedelta(milliseconds=epoch_ms)
+
+
+def tick_epoch_ms(tick_data: dict) -> int:
+    """
+    从tick字典取整数毫秒时间戳
+
+    优先级: epoch_ns (MarketTick) > epoch_ms > timestamp(秒) > datetime
+    > action_day + update_time > 当前时间
+    """
+    value = tick_data.get('epoch_ns')
+    if value:
+        return value // 1_000_000
+    value = tick_data.get('epoch_ms')
+    if value:
+        return int(value)
+    value = tick_data.get('timestamp')
+    if value:
+        return int(value * 1000)
+
+    value = tick_data.get('datetime')
+    if value:
+        try:
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            return to_epoch_ms(value)
+        except (ValueError, TypeError, AttributeError):
+            pass
+
+    update_time = tick_data.get('update_time')
+    day = tick_data.get('action_day') or tick_data.get('trading_day')
+    if update_time and day and len(day) == 8 and len(update_time) == 8:
+        try:
+            days = (datetime(int(day[:4]), int(day[4:6]), int(day[6:])) - _EPOCH).days
+            seconds = int(update_time[:2]) * 3600 + int(update_time[3:5]) * 60 + int(update_time[6:])
+            return (days * 86400 + seconds) * 1000 + int(tick_data.get('update_millisec', 0) or 0)
+        except ValueError:
+            pass
+
+    return to_epoch_ms(datetime.now())
 
 
 @dataclass
@@ -26,6 +85,9 @@ class BarData:
     volume: int = 0
     turnover: float = 0.0
     open_interest: float = 0.0
+    interval: str = ""          # 周期名称，如 1m / 30s / 100tick
+    epoch_ms: int = 0           # Bar起始时间 (时间Bar为周期起点，其余为首个tick时间)
+    tick_count: int = 0
 
     def to_dict(self) -> dict:
         return asdict(self)
@@ -35,26 +97,362 @@ class BarData:
         return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
 
 
+# ==================== 周期定义 ====================
+
+@dataclass(frozen=True)
+class BarInterval:
+    """
+    Bar周期
+
+    kind:
+    - time: 时间Bar，size为毫秒
+    - tick: tick数Bar，size为tick个数
+    - volume: 成交量Bar，size为手数
+    - turnover: 成交额Bar，size为金额
+    """
+    kind: str
+    size: float
+    name: str
+
+    _PATTERN = re.compile(r'^\s*([0-9.eE+]+)\s*(s|m|h|tick|vol|amt)\s*$')
+
+    @classmethod
+    def seconds(cls, n: int) -> 'BarInterval':
+        return cls('time', int(n) * 1000, f"{n}s")
+
+    @classmethod
+    def minutes(cls, n: int) -> 'BarInterval':
+        return cls('time', int(n) * 60_000, f"{n}m")
+
+    @classmethod
+    def hours(cls, n: int) -> 'BarInterval':
+        return cls('time', int(n) * 3_600_000, f"{n}h")
+
+    @classmethod
+    def ticks(cls, n: int) -> 'BarInterval':
+        return cls('tick', int(n), f"{n}tick")
+
+    @classmethod
+    def volume(cls, n: int) -> 'BarInterval':
+        return cls('volume', int(n), f"{n}vol")
+
+    @classmethod
+    def turnover(cls, amount: float) -> 'BarInterval':
+        amount = float(amount)
+        label = int(amount) if amount.is_integer() else amount
+        return cls('turnover', amount, f"{label}amt")
+
+    @classmethod
+    def parse(cls, text: str) -> 'BarInterval':
+        """
+        解析周期字符串: 30s / 5m / 1h / 100tick / 500vol / 1e7amt
+        """
+        match = cls._PATTERN.match(text)
+        if not match:
+            raise ValueError(f"无法解析Bar周期: {text}")
+        value, unit = match.groups()
+        if unit == 'amt':
+            return cls.turnover(float(value))
+        factory = {
+            's': cls.seconds, 'm': cls.minutes, 'h': cls.hours,
+            'tick': cls.ticks, 'vol': cls.volume,
+        }[unit]
+        return factory(int(float(value)))
+
+
+# ==================== 交易时段 ====================
+
+def _parse_hhmm(text: str) -> int:
+    hour, minute = text.split(':')
+    return (int(hour) * 60 + int(minute)) * 60_000
+
+
+@dataclass(frozen=True)
+class TradingSessions:
+    """
+    交易时段
+
+    segments 为当日时刻毫秒区间 (start, end)，夜盘跨午夜时 end > 86400000
+    """
+    segments: Tuple[Tuple[int, int], ...]
+    preopen_ms: int = 5 * 60_000        # 集合竞价tick并入开盘第一根Bar
+    close_grace_ms: int = 3_000         # 收盘后若干秒内的tick并入最后一根Bar
+
+    @classmethod
+    def from_strings(cls, segments: Sequence[Tuple[str, str]], **kwargs) -> 'TradingSessions':
+        """
+        由 "HH:MM" 字符串构造
+
+        Args:
+            segments: [("21:00", "02:30"), ("09:00", "10:15"), ...]
+        """
+        result = []
+        for start, end in segments:
+            s, e = _parse_hhmm(start), _parse_hhmm(end)
+            if e <= s:
+                e += _DAY_MS
+            result.append((s, e))
+        return cls(tuple(sorted(result)), **kwargs)
+
+    def locate(self, epoch_ms: int) -> Optional[Tuple[int, int]]:
+        """
+        定位tick所属交易时段
+
+        Returns:
+            (时段起点epoch, 时段终点epoch)，不在任何时段内返回None
+        """
+        tod = epoch_ms % _DAY_MS
+        day0 = epoch_ms - tod
+        for s, e in self.segments:
+            if e <= _DAY_MS:
+                if s - self.preopen_ms <= tod < e + self.close_grace_ms:
+                    return day0 + s, day0 + e
+            else:
+                # 跨午夜夜盘: 午夜前部分属当天开始的时段，午夜后部分属前一天开始的时段
+                if tod >= s - self.preopen_ms:
+                    return day0 + s, day0 + e
+                if tod < e - _DAY_MS + self.close_grace_ms:
+                    return day0 - _DAY_MS + s, day0 - _DAY_MS + e
+        return None
+
+
+_DAY_SEGMENTS = [("09:00", "10:15"), ("10:30", "11:30"), ("13:30", "15:00")]
+
+SESSIONS_DAY = TradingSessions.from_strings(_DAY_SEGMENTS)
+SESSIONS_NIGHT_2300 = TradingSessions.from_strings([("21:00", "23:00")] + _DAY_SEGMENTS)
+SESSIONS_NIGHT_0100 = TradingSessions.from_strings([("21:00", "01:00")] + _DAY_SEGMENTS)
+SESSIONS_NIGHT_0230 = TradingSessions.from_strings([("21:00", "02:30")] + _DAY_SEGMENTS)
+SESSIONS_CFFEX_INDEX = TradingSessions.from_strings([("09:30", "11:30"), ("13:00", "15:00")])
+SESSIONS_CFFEX_BOND = TradingSessions.from_strings([("09:30", "11:30"), ("13:00", "15:15")])
+
+# 常见品种的交易时段 (品种代码不区分大小写，未列出的按日盘处理)
+_PRODUCT_SESSIONS: Dict[str, TradingSessions] = {}
+for _products, _sessions in (
+    ("au ag sc", SESSIONS_NIGHT_0230),
+    ("cu al zn pb ni sn ss bc ao", SESSIONS_NIGHT_0100),
+    ("rb hc bu ru fu sp br nr lu "
+     "a b m y p c cs i j jm l v pp eg eb pg rr "
+     "SR CF CY TA MA FG RM OI ZC SA PF PX SH", SESSIONS_NIGHT_2300),
+    ("IF IH IC IM", SESSIONS_CFFEX_INDEX),
+    ("T TF TS TL", SESSIONS_CFFEX_BOND),
+):
+    for _product in _products.split():
+        _PRODUCT_SESSIONS[_product.lower()] = _sessions
+
+
+def sessions_for_instrument(instrument_id: str) -> TradingSessions:
+    """
+    按合约代码取交易时段
+
+    Args:
+        instrument_id: 合约代码，如 rb2505 / IF2506 / SR505
+    """
+    product = re.match(r'[A-Za-z]*', instrument_id).group(0).lower()
+    return _PRODUCT_SESSIONS.get(product, SESSIONS_DAY)
+
+
+# ==================== 聚合器 ====================
+
+class _BarBuilder:
+    """单个周期的Bar构建状态"""
+
+    __slots__ = ('interval', 'is_time', 'bar', 'bar_start', 'bar_end', 'closes_at', 'accumulated')
+
+    def __init__(self, interval: BarInterval):
+        self.interval = interval
+        self.is_time = interval.kind == 'time'
+        self.reset()
+
+    def reset(self):
+        self.bar: Optional[BarData] = None
+        self.bar_start = -1
+        self.bar_end = -1
+        self.closes_at = -1
+        self.accumulated = 0.0
+
+    def _new_bar(self, start_ms: int, price: float, volume_delta: int,
+                 turnover_delta: float, open_interest: float) -> BarData:
+        return BarData(
+            datetime=from_epoch_ms(start_ms).isoformat(),
+            open=price,
+            high=price,
+            low=price,
+            close=price,
+            volume=volume_delta,
+            turnover=turnover_delta,
+            open_interest=open_interest,
+            interval=self.interval.name,
+            epoch_ms=start_ms,
+            tick_count=1
+        )
+
+    def update(self, t: int, segment: Optional[Tuple[int, int]], grace_ms: int,
+               price: float, volume_delta: int, turnover_delta: float,
+               open_interest: float) -> Optional[BarData]:
+        """并入一个tick，返回因此完成的Bar"""
+        completed = None
+
+        if self.is_time:
+            if not (self.bar_start <= t < self.bar_end):
+                size = self.interval.size
+                if segment is None:
+                    start = t - t % size
+                    end = start + size
+                    closes_at = end
+                else:
+                    s0, s1 = segment
+                    rel = t - s0
+                    if rel < 0:
+                        rel = 0
+                    elif t >= s1:
+                        rel = s1 - s0 - 1
+                    start = s0 + rel - rel % size
+                    end = min(start + size, s1)
+                    closes_at = end + grace_ms if end == s1 else end
+                if start > self.bar_start:
+                    completed = self.bar
+                    self.bar = None
+                    self.bar_start = start
+                    self.bar_end = end
+                    self.closes_at = closes_at
+                # 乱序的迟到tick (start < bar_start) 并入当前Bar
+            start_ms = self.bar_start
+        else:
+            start_ms = t
+
+        bar = self.bar
+        if bar is None:
+            self.bar = self._new_bar(start_ms, price, volume_delta, turnover_delta, open_interest)
+        else:
+            if price > bar.high:
+                bar.high = price
+            if price < bar.low:
+                bar.low = price
+            bar.close = price
+            bar.volume += volume_delta
+            bar.turnover += turnover_delta
+            bar.open_interest = open_interest
+            bar.tick_count += 1
+
+        if not self.is_time:
+            kind = self.interval.kind
+            if kind == 'tick':
+                self.accumulated += 1
+            elif kind == 'volume':
+                self.accumulated += volume_delta
+            else:
+                self.accumulated += turnover_delta
+            if self.accumulated >= self.interval.size:
+                completed = self.bar
+                self.bar = None
+                self.accumulated = 0.0
+
+        return completed
+
+
 class BarAggregator:
     """
     Tick到Bar实时聚合器
 
     功能:
-    - tick级别实时聚合成1分钟Bar
-    - 每分钟自动切换新Bar
-    - 支持回调通知完成的Bar
+    - 单次遍历同时聚合多个周期 (默认仅1分钟，兼容原接口)
+    - 时间Bar以毫秒epoch整除确定边界，按交易时段对齐并在时段末截断
+    - on_bar_completed 逐根通知主周期 (第一个周期) Bar
+    - on_bars_completed 每个tick/每批tick一次性通知所有周期完成的Bar
     """
 
-    def __init__(self, on_bar_completed: Optional[Callable[[BarData], None]] = None):
+    def __init__(self, on_bar_completed: Optional[Callable[[BarData], None]] = None,
+                 intervals: Optional[Sequence[Union[BarInterval, str]]] = None,
+                 sessions: Optional[TradingSessions] = None,
+                 on_bars_completed: Optional[Callable[[List[BarData]], None]] = None):
         """
         Args:
-            on_bar_completed: Bar完成时的回调函数
+            on_bar_completed: 主周期Bar完成时的回调函数
+            intervals: Bar周期列表，BarInterval或字符串 (如 "1m", "30s", "100tick")，默认 ["1m"]
+            sessions: 交易时段，None表示按自然时间连续切分 (不过滤非交易时段tick)
+            on_bars_completed: 批量回调，参数为本次完成的全部Bar列表
         """
-        self._current_bar: Optional[BarData] = None
-        self._current_minute: Optional[int] = None
+        intervals = intervals or [BarInterval.minutes(1)]
+        self._builders = [
+            _BarBuilder(BarInterval.parse(i) if isinstance(i, str) else i) for i in intervals
+        ]
+        names = [b.interval.name for b in self._builders]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Bar周期重复: {names}")
+        self._by_name = {b.interval.name: b for b in self._builders}
+        self._primary = self._builders[0]
+
+        self._sessions = sessions
+        self._grace_ms = sessions.close_grace_ms if sessions else 0
         self._on_bar_completed = on_bar_completed
+        self._on_bars_completed = on_bars_completed
+
         self._last_volume: int = 0
         self._last_turnover: float = 0.0
+        # 交易时段定位缓存: [有效起点, 有效终点) -> (时段起点, 时段终点)
+        self._segment_lo = 0
+        self._segment_hi = -1
+        self._segment: Optional[Tuple[int, int]] = None
+
+    @property
+    def intervals(self) -> List[BarInterval]:
+        """已配置的Bar周期"""
+        return [b.interval for b in self._builders]
+
+    def _locate(self, t: int) -> Optional[Tuple[int, int]]:
+        """带缓存的交易时段定位，同一时段内的tick不再遍历时段表"""
+        if self._segment_lo <= t < self._segment_hi:
+            return self._segment
+        segment = self._sessions.locate(t)
+        if segment is not None:
+            self._segment = segment
+            self._segment_lo = segment[0] - self._sessions.preopen_ms
+            self._segment_hi = segment[1] + self._sessions.close_grace_ms
+        return segment
+
+    def _process(self, tick_data: dict, completed: List[BarData]) -> Optional[BarData]:
+        """处理单个tick，完成的Bar追加到completed，返回主周期完成的Bar"""
+        price = tick_data.get('last_price', 0)
+        volume = tick_data.get('volume', 0)
+        turnover = tick_data.get('turnover', 0.0)
+        open_interest = tick_data.get('open_interest', 0.0)
+        t = tick_epoch_ms(tick_data)
+
+        # 计算增量 (累计量回落视为新交易日重新计数)
+        last_volume, last_turnover = self._last_volume, self._last_turnover
+        volume_delta = volume - last_volume if 0 < last_volume <= volume else 0
+        turnover_delta = turnover - last_turnover if 0 < last_turnover <= turnover else 0.0
+        self._last_volume = volume
+        self._last_turnover = turnover
+
+        segment = None
+        if self._sessions is not None:
+            segment = self._locate(t)
+            if segment is None:
+                return None
+
+        primary = None
+        grace_ms = self._grace_ms
+        for builder in self._builders:
+            bar = builder.update(t, segment, grace_ms, price, volume_delta,
+                                 turnover_delta, open_interest)
+            if bar is not None:
+                completed.append(bar)
+                if builder is self._primary:
+                    primary = bar
+        return primary
+
+    def _dispatch(self, completed: List[BarData]):
+        """通知完成的Bar"""
+        if not completed:
+            return
+        if self._on_bar_completed:
+            name = self._primary.interval.name
+            for bar in completed:
+                if bar.interval == name:
+                    self._on_bar_completed(bar)
+        if self._on_bars_completed:
+            self._on_bars_completed(completed)
 
     def on_tick(self, tick_data: dict) -> Optional[BarData]:
         """
@@ -64,78 +462,66 @@ class BarAggregator:
             tick_data: CTP tick数据字典
 
         Returns:
-            如果一根Bar完成，返回该Bar，否则返回None
+            如果一根主周期Bar完成，返回该Bar，否则返回None
         """
-        price = tick_data.get('last_price', 0)
-        volume = tick_data.get('volume', 0)
-        turnover = tick_data.get('turnover', 0.0)
-        open_interest = tick_data.get('open_interest', 0.0)
-        timestamp = tick_data.get('datetime', datetime.now().isoformat())
+        completed: List[BarData] = []
+        primary = self._process(tick_data, completed)
+        self._dispatch(completed)
+        return primary
 
-        # 解析分钟
-        try:
-            if isinstance(timestamp, str):
-                dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            else:
-                dt = timestamp
-            current_minute = dt.minute
-            bar_datetime = dt.replace(second=0, microsecond=0).isoformat()
-        except:
-            dt = datetime.now()
-            current_minute = dt.minute
-            bar_datetime = dt.replace(second=0, microsecond=0).isoformat()
-
-        completed_bar = None
-
-        # 新分钟开始 - 完成旧Bar，开始新Bar
-        if self._current_minute is not None and current_minute != self._current_minute:
-            completed_bar = self._current_bar
-            self._current_bar = None
-
-            # 通知完成
-            if completed_bar and self._on_bar_completed:
-                self._on_bar_completed(completed_bar)
-
-        # 计算增量
-        volume_delta = volume - self._last_volume if self._last_volume > 0 else 0
-        turnover_delta = turnover - self._last_turnover if self._last_turnover > 0 else 0
-
-        # 更新当前Bar
-        if self._current_bar is None:
-            self._current_bar = BarData(
-                datetime=bar_datetime,
-                open=price,
-                high=price,
-                low=price,
-                close=price,
-                volume=0,
-                turnover=0.0,
-                open_interest=open_interest
-            )
-        else:
-            self._current_bar.high = max(self._current_bar.high, price)
-            self._current_bar.low = min(self._current_bar.low, price)
-            self._current_bar.close = price
-            self._current_bar.volume += volume_delta
-            self._current_bar.turnover += turnover_delta
-            self._current_bar.open_interest = open_interest
-
-        self._current_minute = current_minute
-        self._last_volume = volume
-        self._last_turnover = turnover
+    def on_ticks(self, ticks: Iterable[dict]) -> List[BarData]:
+        """
+        批量处理tick，所有完成的Bar在最后一次性回调
 
-        return completed_bar
+        Returns:
+            本批次完成的全部Bar (按完成顺序)
+        """
+        completed: List[BarData] = []
+        for tick_data in ticks:
+            self._process(tick_data, completed)
+        self._dispatch(completed)
+        return completed
+
+    def flush(self, epoch_ms: Optional[int] = None) -> List[BarData]:
+        """
+        收盘/定时强制完成Bar (无新tick时时间Bar不会自行结束)
+
+        Args:
+            epoch_ms: 当前时间，只完成已过结束时间的时间Bar；None表示完成所有未完成Bar
 
-    def get_current_bar(self) -> Optional[BarData]:
-        """获取当前未完成的Bar"""
-        return self._current_bar
+        Returns:
+            本次完成的Bar列表
+        """
+        completed: List[BarData] = []
+        for builder in self._builders:
+            if builder.bar is None:
+                continue
+            if epoch_ms is not None and not (builder.is_time and epoch_ms >= builder.closes_at):
+                continue
+            completed.append(builder.bar)
+            builder.reset()
+        self._dispatch(completed)
+        return completed
+
+    def get_current_bar(self, interval: Optional[str] = None) -> Optional[BarData]:
+        """
+        获取当前未完成的Bar
+
+        Args:
+            interval: 周期名称，默认主周期
+        """
+        builder = self._primary if interval is None else self._by_name.get(interval)
+        return builder.bar if builder else None
 
     def reset(self):
         """重置聚合器状态"""
-        self._current_bar = None
-        self._current_minute = None
+        for builder in self._builders:
+            builder.reset()
         self._last_volume = 0
         self._last_turnover = 0.0
+        self._segment_lo = 0
+        self._segment_hi = -1
+        self._segment = None
 
 
 class BarBuffer:
@@ -0,0 +1,455 @@
+"""
+历史特征批量回填
+对一整个交易日的tick/Bar一次性计算每个时刻的实时特征，输出 [T × F] 矩阵
+
+功能:
+- backfill_tick_features: 与逐tick调用 TickCache.extract_features 结果一致
+- backfill_lstm_features: 与逐Bar调用 FeatureEngine.calculate_features 结果一致
+- 窗口统计使用 sliding_window_view 向量化，整数累计量使用 cumsum 差分
+- 按窗口分块计算，内存占用与交易日长度无关
+- backfill_days: 多个交易日用进程池并行 (每个交易日独立从空缓存开始)
+
+对齐规则: 第 t 行为加入第 t 个tick (Bar) 后实时路径输出的特征，
+窗口未满 (TickCache) 或Bar不足 (FeatureEngine.is_ready) 的行与实时路径一样为0。
+数值与实时路径的差异仅为浮点求和顺序 (见 tests/test_data_cache.py)
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .tick_cache import TickCache, TICK_FIELDS
+from .feature_registry import LSTM_L2_FEATURES, ICEBERG_TICKS, LARGE_ORDER_TICKS
+
+
+# TickCache 特征名 (列顺序与 extract_features 的键顺序一致)
+TICK_FEATURE_NAMES: List[str] = list(TickCache(maxlen=2)._get_empty_features())
+_TICK_COL = {name: i for i, name in enumerate(TICK_FEATURE_NAMES)}
+_FIELD = {name: i for i, name in enumerate(TICK_FIELDS)}
+
+# 默认分块大小 (窗口数)，120 tick 窗口下每个临时数组约 2MB
+DEFAULT_CHUNK = 2048
+
+
+def tick_matrix(ticks) -> np.ndarray:
+    """
+    tick序列 -> [T, len(TICK_FIELDS)] float64 数组
+
+    Args:
+        ticks: 以下任一种
+            - [T, len(TICK_FIELDS)] 数组 (列顺序同 TICK_FIELDS)
+            - {字段名: 数组} 列字典 (缺失字段补0)
+            - TickData / MarketTick / 行情字典 序列
+    """
+    if isinstance(ticks, np.ndarray):
+        if ticks.ndim != 2 or ticks.shape[1] != len(TICK_FIELDS):
+            raise ValueError(f"tick数组形状应为 [T, {len(TICK_FIELDS)}]，实际为 {ticks.shape}")
+        return np.asarray(ticks, dtype=np.float64)
+    if isinstance(ticks, Mapping):
+        length = max((len(v) for v in ticks.values()), default=0)
+        return np.column_stack([
+            np.asarray(ticks[name], dtype=np.float64) if name in ticks else np.zeros(length)
+            for name in TICK_FIELDS
+        ]) if length else np.zeros((0, len(TICK_FIELDS)))
+    rows = [
+        [(t.get(name, 0) if isinstance(t, dict) else getattr(t, name, 0)) or 0 for name in TICK_FIELDS]
+        for t in ticks
+    ]
+    return np.array(rows, dtype=np.float64).reshape(len(rows), len(TICK_FIELDS))
+
+
+# ==================== 向量化工具 ====================
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """整数值序列的滑动窗口和 (cumsum 差分，整数累加无舍入误差)"""
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    return csum[window:] - csum[:-window]
+
+
+def _row_std(windows: np.ndarray, mean: np.ndarray) -> np.ndarray:
+    """逐行总体标准差 (与 np.std 一致: 先求均值再求偏差平方均值)"""
+    dev = windows - mean[:, None]
+    return np.sqrt(np.einsum('ij,ij->i', dev, dev) / windows.shape[1])
+
+
+def _row_corr(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """逐行相关系数 (与 np.corrcoef 一致，方差为0时为NaN)"""
+    da = a - a.mean(axis=1, keepdims=True)
+    db = b - b.mean(axis=1, keepdims=True)
+    cov = np.einsum('ij,ij->i', da, db)
+    denom = np.sqrt(np.einsum('ij,ij->i', da, da) * np.einsum('ij,ij->i', db, db))
+    return np.clip(cov / denom, -1.0, 1.0)
+
+
+def _row_slope(windows: np.ndarray) -> np.ndarray:
+    """逐行对 x = 0..n-1 的最小二乘斜率 (与 np.polyfit(deg=1) 一致)"""
+    n = windows.shape[1]
+    x = np.arange(n, dtype=np.float64)
+    x -= x.mean()
+    return (windows @ x) / (x @ x)
+
+
+def _row_moment(windows: np.ndarray, mean: np.ndarray, std: np.ndarray, order: int) -> np.ndarray:
+    """逐行标准化矩 (std为0时为0)，对应 TickCache._calc_skewness / _calc_kurtosis"""
+    safe = np.where(std == 0, 1.0, std)
+    z = (windows - mean[:, None]) / safe[:, None]
+    moment = np.mean(z ** order, axis=1)
+    if order == 4:
+        moment -= 3
+    return np.where(std == 0, 0.0, moment)
+
+
+# ==================== TickCache 特征 ====================
+
+def _tick_feature_block(data: np.ndarray, start: int, stop: int, maxlen: int) -> np.ndarray:
+    """
+    计算窗口 [start, stop) 的全部特征，窗口 j 为 tick j .. j + maxlen - 1
+
+    Returns:
+        [stop - start, len(TICK_FEATURE_NAMES)]
+    """
+    m = maxlen
+    rows = slice(start, stop + m - 1)
+    prices = data[rows, _FIELD['last_price']]
+    volumes = data[rows, _FIELD['volume']]
+    bid_vols = data[rows, _FIELD['bid_volume1']]
+    ask_vols = data[rows, _FIELD['ask_volume1']]
+    bid_prices = data[rows, _FIELD['bid_price1']]
+    ask_prices = data[rows, _FIELD['ask_price1']]
+
+    n = stop - start
+    out = np.empty((n, len(TICK_FEATURE_NAMES)))
+
+    def put(name, values):
+        out[:, _TICK_COL[name]] = values
+
+    P = sliding_window_view(prices, m)
+    diffs = np.diff(prices)
+    R = sliding_window_view(diffs / prices[:-1], m - 1)
+    D = sliding_window_view(np.diff(volumes), m - 1)
+    PC = sliding_window_view(diffs, m - 1)
+    BV = sliding_window_view(bid_vols, m)
+    AV = sliding_window_view(ask_vols, m)
+    close, first = P[:, -1], P[:, 0]
+
+    # ========== A. 价格特征 ==========
+    high, low = P.max(axis=1), P.min(axis=1)
+    price_mean = P.mean(axis=1)
+    price_std = _row_std(P, price_mean)
+    put('price_open', first)
+    put('price_high', high)
+    put('price_low', low)
+    put('price_close', close)
+    put('price_mean', price_mean)
+    put('price_std', price_std)
+    put('price_range', high - low)
+    put('price_range_pct', np.where(price_mean > 0, (high - low) / np.where(price_mean > 0, price_mean, 1), 0))
+    put('return_total', np.where(first > 0, (close - first) / np.where(first > 0, first, 1), 0))
+    return_mean = R.mean(axis=1)
+    return_std = _row_std(R, return_mean)
+    put('return_mean', return_mean)
+    put('return_std', return_std)
+    put('return_skew', _row_moment(R, return_mean, return_std, 3) if m - 1 > 2 else 0)
+    put('return_kurt', _row_moment(R, return_mean, return_std, 4) if m - 1 > 3 else 0)
+
+    # ========== B. 成交量特征 ==========
+    volume_sum = volumes[m - 1:] - volumes[:n]
+    volume_mean = volume_sum / (m - 1)
+    put('volume_sum', volume_sum)
+    put('volume_mean', volume_mean)
+    put('volume_std', _row_std(D, D.mean(axis=1)))
+    put('volume_max', D.max(axis=1))
+    vwap = np.where(volume_sum > 0,
+                    np.einsum('ij,ij->i', P[:, 1:], D) / np.where(volume_sum > 0, volume_sum, 1), close)
+    put('vwap', vwap)
+    put('vwap_distance', np.where(vwap > 0, (close - vwap) / np.where(vwap > 0, vwap, 1), 0))
+    put('volume_trend', D[:, -10:].mean(axis=1) - D[:, :10].mean(axis=1) if m - 1 >= 20 else 0)
+    put('volume_acceleration', np.diff(D[:, -10:], axis=1).mean(axis=1) if m - 1 >= 11 else 0)
+
+    # ========== C. L2深度特征 ==========
+    total_bid = _window_sums(bid_vols, m)
+    total_ask = _window_sums(ask_vols, m)
+    put('imb_mean', (total_bid - total_ask) / (total_bid + total_ask + 1))
+    put('imb_last', (BV[:, -1] - AV[:, -1]) / (BV[:, -1] + AV[:, -1] + 1))
+    imb = (BV - AV) / (BV + AV + 1)
+    imb_max, imb_min = imb.max(axis=1), imb.min(axis=1)
+    put('imb_std', _row_std(imb, imb.mean(axis=1)))
+    put('imb_max', imb_max)
+    put('imb_min', imb_min)
+    put('imb_range', imb_max - imb_min)
+    put('depth_total', total_bid + total_ask)
+    put('depth_bid', total_bid)
+    put('depth_ask', total_ask)
+    put('depth_ratio', total_bid / (total_ask + 1))
+    bid_pressure = BV[:, -10:].mean(axis=1)
+    ask_pressure = AV[:, -10:].mean(axis=1)
+    put('bid_pressure', bid_pressure)
+    put('ask_pressure', ask_pressure)
+    put('pressure_ratio', bid_pressure / (ask_pressure + 1))
+
+    S = sliding_window_view(ask_prices - bid_prices, m)
+    spread_mean = S.mean(axis=1)
+    put('spread_mean', spread_mean)
+    put('spread_std', _row_std(S, spread_mean))
+    put('spread_max', S.max(axis=1))
+    put('spread_min', S.min(axis=1))
+
+    M = sliding_window_view((bid_prices + ask_prices) / 2, m)
+    mid = M[:, -1]
+    put('mid_price', mid)
+    put('mid_price_std', _row_std(M, M.mean(axis=1)))
+    put('price_vs_mid', np.where(mid > 0, (close - mid) / np.where(mid > 0, mid, 1), 0))
+
+    liquidity_bid = sliding_window_view(bid_vols * bid_prices, m).mean(axis=1)
+    liquidity_ask = sliding_window_view(ask_vols * ask_prices, m).mean(axis=1)
+    put('liquidity_bid', liquidity_bid)
+    put('liquidity_ask', liquidity_ask)
+    put('liquidity_total', liquidity_bid + liquidity_ask)
+
+    # ========== D. 订单流特征 ==========
+    up, down = PC > 0, PC < 0
+    up_ticks = _window_sums(diffs > 0, m - 1)
+    down_ticks = _window_sums(diffs < 0, m - 1)
+    put('tick_direction_ratio', up_ticks / (down_ticks + 1))
+    put('net_tick_direction', up_ticks - down_ticks)
+    buy_volume = np.where(up, D, 0).sum(axis=1)
+    sell_volume = np.where(down, D, 0).sum(axis=1)
+    net_volume = buy_volume - sell_volume
+    put('buy_volume_est', buy_volume)
+    put('sell_volume_est', sell_volume)
+    put('net_volume', net_volume)
+    put('order_flow_intensity', volume_sum / (m + 1))
+    put('order_flow_imbalance', net_volume / (volume_sum + 1))
+    threshold = np.where(volume_mean > 0, volume_mean * 3, 100)
+    large = D > threshold[:, None]
+    put('large_order_count', large.sum(axis=1))
+    put('large_order_volume', np.where(large, D, 0).sum(axis=1))
+
+    # ========== E. 时间序列特征 ==========
+    put('price_autocorr_1', _row_corr(P[:, :-1], P[:, 1:]))
+    put('price_autocorr_5', _row_corr(P[:, :-5], P[:, 5:]) if m > 5 else 0)
+    put('volume_autocorr_1', _row_corr(D[:, :-1], D[:, 1:]) if m - 1 > 1 else 0)
+    put('price_trend', _row_slope(P))
+    put('volume_trend_slope', _row_slope(D) if m - 1 > 1 else 0)
+    for k in (5, 10, 20):
+        put(f'momentum_{k}', close - P[:, -k] if m >= k else 0)
+    put('mean_reversion_signal', (close - price_mean) / (price_std + 0.0001))
+    put('tick_count', float(m))
+    put('zero_return_ratio', (R == 0).sum(axis=1) / (m - 1))
+    put('positive_return_ratio', (R > 0).sum(axis=1) / (m - 1))
+    return out
+
+
+def backfill_tick_features(ticks, maxlen: int = 120,
+                           chunk_size: int = DEFAULT_CHUNK) -> Tuple[List[str], np.ndarray]:
+    """
+    一次计算整段tick序列每个时刻的 TickCache 特征
+
+    Args:
+        ticks: tick序列 (格式见 tick_matrix)
+        maxlen: TickCache 窗口长度
+        chunk_size: 每块计算的窗口数
+
+    Returns:
+        (特征名列表, [T, F] 矩阵)，前 maxlen - 1 行窗口未满为0
+    """
+    data = tick_matrix(ticks)
+    total = data.shape[0]
+    result = np.zeros((total, len(TICK_FEATURE_NAMES)))
+    windows = total - maxlen + 1
+    if maxlen < 2 or windows <= 0:
+        return list(TICK_FEATURE_NAMES), result
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for start in range(0, windows, chunk_size):
+            stop = min(start + chunk_size, windows)
+            result[start + maxlen - 1:stop + maxlen - 1] = _tick_feature_block(data, start, stop, maxlen)
+    return list(TICK_FEATURE_NAMES), result
+
+
+# ==================== FeatureEngine (LSTM_L2) 特征 ====================
+
+def _trailing(values: np.ndarray, window: int, fill: float = 0.0) -> np.ndarray:
+    """
+    长度 len(values) 的滑动窗口视图，第 i 行为以 i 结尾的窗口
+
+    不足窗口的前 window - 1 行用 fill 补齐 (调用方负责屏蔽)
+    """
+    padded = np.concatenate((np.full(window - 1, fill), values))
+    return sliding_window_view(padded, window)
+
+
+def _l1_tick_features(ticks) -> Dict[str, np.ndarray]:
+    """逐tick的一档冰山单/大单特征 (与 L1OrderFlow 一致)，第 t 项为加入第 t 个tick后的值"""
+    data = tick_matrix(ticks)
+    T = data.shape[0]
+    bid = data[:, _FIELD['bid_volume1']]
+    ask = data[:, _FIELD['ask_volume1']]
+    volume = data[:, _FIELD['volume']]
+    price = data[:, _FIELD['last_price']]
+    features: Dict[str, np.ndarray] = {}
+
+    # 冰山单: 中间点 j 满足 "较前一tick减少50%以上、下一tick恢复1.5倍以上"
+    n = ICEBERG_TICKS
+    ready = np.arange(T) >= n - 1
+    for side, vols in (('bid', bid), ('ask', ask)):
+        flags = np.zeros(T)
+        if T >= 3:
+            flags[1:-1] = (vols[1:-1] < vols[:-2] * 0.5) & (vols[2:] > vols[1:-1] * 1.5)
+        # 窗口 t-n+1 .. t 的中间点为 t-n+2 .. t-1
+        csum = np.concatenate(([0.0], np.cumsum(flags)))
+        t = np.arange(T)
+        drops = csum[t] - csum[np.maximum(t - n + 2, 0)]
+        window = _trailing(vols, n)
+        mean = window.mean(axis=1)
+        strength = _row_std(window, mean) / (mean + 1)
+        features[f'{side}_iceberg_count'] = np.where(ready, drops, 0)
+        features[f'{side}_iceberg_strength'] = np.where(ready, strength, 0.0)
+        features[f'has_{side}_iceberg'] = np.where(ready & (drops > 0), 1, 0)
+    features['iceberg_imbalance'] = features['bid_iceberg_strength'] - features['ask_iceberg_strength']
+
+    # 大单: 窗口内相邻tick成交量增量超过窗口累计成交量均值3倍，按价格变化方向区分买卖
+    n = LARGE_ORDER_TICKS
+    ready = np.arange(T) >= n - 1
+    deltas = _trailing(np.diff(volume, prepend=volume[:1]), n - 1)
+    is_buy = _trailing(np.diff(price, prepend=price[:1]) > 0, n - 1, False)
+    threshold = _trailing(volume, n).mean(axis=1) * 3
+    large = deltas > threshold[:, None]
+    buys = np.where(ready, (large & is_buy).sum(axis=1), 0)
+    sells = np.where(ready, (large & ~is_buy).sum(axis=1), 0)
+    total = buys + sells
+    features['large_buy_count'] = buys
+    features['large_sell_count'] = sells
+    features['large_order_ratio'] = total / n
+    features['large_order_imbalance'] = np.divide(buys - sells, total, out=np.zeros(T), where=total > 0)
+    return features
+
+
+def _bar_columns(bars) -> Dict[str, np.ndarray]:
+    """Bar序列 -> OHLCV列 (支持列字典或具有 open/high/low/close/volume 属性的对象序列)"""
+    names = ('open', 'high', 'low', 'close', 'volume')
+    if isinstance(bars, Mapping):
+        return {name: np.asarray(bars[name], dtype=np.float64) for name in names}
+    return {name: np.array([getattr(bar, name) for bar in bars], dtype=np.float64) for name in names}
+
+
+def backfill_lstm_features(bars, ticks=None, tick_counts: Optional[Sequence[int]] = None,
+                           names: Optional[Sequence[str]] = None,
+                           min_bars: int = 15) -> Tuple[List[str], np.ndarray]:
+    """
+    一次计算整段Bar序列每根Bar完成时的 FeatureEngine 特征
+
+    Args:
+        bars: Bar序列 (BarData 列表或 {open/high/low/close/volume: 数组})
+        ticks: 同期L2行情tick (格式见 tick_matrix)，为None时冰山单/大单特征取默认值
+        tick_counts: 第 i 根Bar计算特征时已加入的tick数 (给出 ticks 时必填，避免用到Bar之后的tick)，
+            如 np.searchsorted(tick_ms, bar_end_ms, side='right')
+        names: 输出特征 (默认 LSTM_L2_FEATURES 全部28个)
+        min_bars: 与 FeatureEngine.is_ready 一致，Bar数不足的行为0
+
+    Returns:
+        (特征名列表, [Bar数, F] 矩阵)
+
+    Raises:
+        KeyError: 特征不支持批量回填
+        ValueError: 给出 ticks 但未给出与Bar等长的 tick_counts
+    """
+    names = list(names) if names is not None else list(LSTM_L2_FEATURES)
+    unknown = [name for name in names if name not in LSTM_L2_FEATURES]
+    if unknown:
+        raise KeyError(f"未支持批量回填的特征: {unknown}")
+
+    columns = _bar_columns(bars)
+    close, volume = columns['close'], columns['volume']
+    N = close.shape[0]
+    if ticks is not None:
+        if tick_counts is None:
+            raise ValueError("给出 ticks 时必须给出 tick_counts (每根Bar完成时已到达的tick数)")
+        tick_counts = np.asarray(tick_counts, dtype=np.int64)
+        if tick_counts.shape != (N,):
+            raise ValueError(f"tick_counts 长度 {tick_counts.shape} 与Bar数 {N} 不一致")
+    idx = np.arange(N)
+    f: Dict[str, np.ndarray] = {name: columns[name] for name in ('open', 'high', 'low', 'close')}
+    f['volume'] = volume
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for period in (1, 5, 10):
+            base = np.concatenate((np.zeros(period), close[:-period])) if N > period else np.zeros(N)
+            ok = (idx >= period) & (base > 0)
+            f[f'return_{period}'] = np.where(ok, (close - base) / np.where(ok, base, 1), 0)
+
+        # RSI: 最近14个涨跌幅的简单均值
+        deltas = np.diff(close, prepend=close[:1])
+        gains = _trailing(np.where(deltas > 0, deltas, 0), 14).mean(axis=1)
+        losses = _trailing(np.where(deltas < 0, -deltas, 0), 14).mean(axis=1)
+        rsi = np.where(losses == 0, 100.0, 100 - 100 / (1 + gains / np.where(losses == 0, 1, losses)))
+        f['rsi_14'] = np.where(idx >= 14, rsi, 50.0)
+
+        avg_volume = _trailing(volume, 20).mean(axis=1)
+        ok = (idx >= 19) & (avg_volume > 0)
+        f['volume_ratio'] = np.where(ok, volume / np.where(ok, avg_volume, 1), 1.0)
+
+        # 收益率波动率 (窗口内收益率全部相同时为精确0，与 RollingWindow 一致)
+        returns = np.concatenate(([0.0], np.diff(close) / close[:-1])) if N else np.zeros(0)
+        for window in (5, 15, 30):
+            view = _trailing(returns, window)
+            std = _row_std(view, view.mean(axis=1))
+            constant = view.max(axis=1) == view.min(axis=1)
+            f[f'volatility_{window}'] = np.where((idx >= window) & ~constant, std, 0.0)
+        vol_15 = f['volatility_15']
+        f['volatility_ratio'] = np.where(vol_15 > 0, f['volatility_5'] / np.where(vol_15 > 0, vol_15, 1), 1.0)
+
+        for window in (5, 15):
+            high = _trailing(columns['high'], window, -np.inf).max(axis=1)
+            low = _trailing(columns['low'], window, np.inf).min(axis=1)
+            ok = (idx >= window - 1) & (close > 0)
+            f[f'price_range_{window}'] = np.where(ok, (high - low) / np.where(ok, close, 1), 0.0)
+        f['return_abs'] = np.where(idx >= 4, np.abs(returns), 0.0)
+
+        l1_names = [name for name in names if name in LSTM_L2_FEATURES[10:21]]
+        if l1_names:
+            if ticks is not None:
+                tick_features = _l1_tick_features(ticks)
+                counts = tick_counts
+                has_tick = counts > 0
+                pos = np.maximum(counts - 1, 0)
+                for name in l1_names:
+                    values = tick_features[name]
+                    f[name] = np.where(has_tick, values[pos] if len(values) else 0, 0.0)
+            else:
+                for name in l1_names:
+                    f[name] = np.zeros(N)
+
+    matrix = np.column_stack([np.asarray(f[name], dtype=np.float64) for name in names]) \
+        if N else np.zeros((0, len(names)))
+    matrix[idx < min_bars - 1] = 0.0
+    return names, matrix
+
+
+# ==================== 多交易日并行 ====================
+
+def backfill_days(days: Mapping[str, Any], func: Callable = backfill_tick_features,
+                  max_workers: Optional[int] = None, **kwargs) -> Dict[str, Tuple[List[str], np.ndarray]]:
+    """
+    多个交易日并行回填 (进程池，每个交易日一个任务)
+
+    Args:
+        days: {交易日: 参数}，参数为元组时按位置参数展开，否则作为第一个参数
+            如 {'20240102': ticks} 或 {'20240102': (bars, ticks, tick_counts)}
+        func: 回填函数 (需可被 pickle，默认 backfill_tick_features)
+        max_workers: 进程数，1 表示在当前进程顺序执行
+        **kwargs: 传给 func 的关键字参数
+
+    Returns:
+        {交易日: (特征名列表, 矩阵)}，按交易日排序
+    """
+    items = sorted(days.items())
+    args = [value if isinstance(value, tuple) else (value,) for _, value in items]
+    if max_workers == 1 or len(items) <= 1:
+        results = [func(*a, **kwargs) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(func, *a, **kwargs) for a in args]
+            results = [future.result() for future in futures]
+    return {day: result for (day, _), result in zip(items, results)}
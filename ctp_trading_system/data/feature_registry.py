@@ -0,0 +1,433 @@
+"""
+特征注册表
+声明式定义特征，按需构建依赖子图并惰性求值
+
+功能:
+- 每个特征声明数据源、所需窗口和依赖 (其他特征或中间量)
+- 策略按名称请求特征集合，只计算该集合实际用到的子图
+- 中间量 (收益率序列、挂单量序列、成交量增量等) 在一次求值内只计算一次
+- 统一三处特征来源的命名:
+  - Bar特征 (LSTM模型输入): 直接使用模型特征名，如 close / rsi_14 / volatility_5
+  - TickCache窗口特征: tick.<名称>，如 tick.imb_mean
+  - L2DepthBuffer盘口特征: depth.<名称>，如 depth.obi
+
+数据源 (evaluate 的 sources 参数):
+- bar_indicators: BarIndicators 实例 (Bar级增量指标)
+- l1_flow: L1OrderFlow 实例 (一档冰山单/大单增量统计)
+- tick_cache: TickCache 实例
+- depth: L2DepthBuffer 实例
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """特征声明"""
+    name: str
+    func: Callable[['FeatureContext'], Any]
+    source: str = ""                 # 数据源名称
+    window: int = 0                  # 数据源所需的最少历史长度
+    deps: Tuple[str, ...] = ()       # 依赖的特征/中间量
+    group: str = ""
+    intermediate: bool = False       # 中间量不出现在特征输出中
+
+
+class FeatureContext:
+    """
+    单次求值上下文
+
+    特征函数通过 ctx.source(name) 读取数据源，通过 ctx[dep] 读取已计算的依赖
+    """
+
+    __slots__ = ('_sources', '_values')
+
+    def __init__(self, sources: Dict[str, Any]):
+        self._sources = sources
+        self._values: Dict[str, Any] = {}
+
+    def source(self, name: str) -> Any:
+        return self._sources[name]
+
+    def __getitem__(self, name: str) -> Any:
+        return self._values[name]
+
+
+class FeaturePlan:
+    """
+    已解析的特征求值计划 (依赖拓扑序)
+
+    由 FeatureRegistry.plan 创建，可反复对新数据求值
+    """
+
+    def __init__(self, names: Sequence[str], order: List[FeatureSpec]):
+        self.names: List[str] = list(names)
+        self._order = order
+
+    @property
+    def nodes(self) -> List[str]:
+        """计划内所有节点 (含中间量，按求值顺序)"""
+        return [spec.name for spec in self._order]
+
+    @property
+    def windows(self) -> Dict[str, int]:
+        """各数据源所需的最大历史长度"""
+        result: Dict[str, int] = {}
+        for spec in self._order:
+            if spec.source:
+                result[spec.source] = max(result.get(spec.source, 0), spec.window)
+        return result
+
+    def evaluate(self, sources: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        对当前数据求值
+
+        Args:
+            sources: {数据源名称: 数据}
+
+        Returns:
+            {特征名: 值}，顺序与请求顺序一致
+        """
+        ctx = FeatureContext(sources)
+        values = ctx._values
+        for spec in self._order:
+            values[spec.name] = spec.func(ctx)
+        return {name: values[name] for name in self.names}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return f"FeaturePlan(features={len(self.names)}, nodes={len(self._order)}, windows={self.windows})"
+
+
+class FeatureRegistry:
+    """
+    特征注册表
+
+    用法:
+        registry = FeatureRegistry()
+
+        @registry.intermediate('_closes', source='bars', window=60)
+        def _closes(ctx): ...
+
+        @registry.feature('return_1', deps=('_closes',), group='base')
+        def return_1(ctx): ...
+
+        plan = registry.plan(['return_1'])
+        plan.evaluate({'bars': bars})
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, FeatureSpec] = {}
+        self._sets: Dict[str, List[str]] = {}
+        self._plans: Dict[Tuple[str, ...], FeaturePlan] = {}
+
+    # ==================== 注册 ====================
+
+    def register(self, spec: FeatureSpec):
+        """注册特征声明 (同名覆盖，已缓存的计划失效)"""
+        self._specs[spec.name] = spec
+        self._plans.clear()
+
+    def feature(self, name: str, source: str = "", window: int = 0,
+                deps: Iterable[str] = (), group: str = "") -> Callable:
+        """特征装饰器"""
+        def decorator(func: Callable) -> Callable:
+            self.register(FeatureSpec(name, func, source, window, tuple(deps), group))
+            return func
+        return decorator
+
+    def intermediate(self, name: str, source: str = "", window: int = 0,
+                     deps: Iterable[str] = ()) -> Callable:
+        """中间量装饰器 (可被多个特征共享，每次求值只计算一次)"""
+        def decorator(func: Callable) -> Callable:
+            self.register(FeatureSpec(name, func, source, window, tuple(deps), intermediate=True))
+            return func
+        return decorator
+
+    def define_set(self, set_name: str, names: Sequence[str]):
+        """定义命名特征集合 (注册时校验名称)"""
+        self.plan(names)
+        self._sets[set_name] = list(names)
+
+    # ==================== 查询 ====================
+
+    def __contains__(self, name: str) -> bool:
+        spec = self._specs.get(name)
+        return spec is not None and not spec.intermediate
+
+    def names(self, group: Optional[str] = None, prefix: Optional[str] = None) -> List[str]:
+        """已注册特征名 (不含中间量)，可按分组或前缀过滤"""
+        return [
+            spec.name for spec in self._specs.values()
+            if not spec.intermediate
+            and (group is None or spec.group == group)
+            and (prefix is None or spec.name.startswith(prefix))
+        ]
+
+    def feature_set(self, set_name: str) -> List[str]:
+        """获取命名特征集合"""
+        return list(self._sets[set_name])
+
+    def unknown(self, names: Iterable[str]) -> List[str]:
+        """返回未注册的特征名 (用于核对模型/缓存的特征名列表)"""
+        return [name for name in names if name not in self]
+
+    def spec(self, name: str) -> FeatureSpec:
+        return self._specs[name]
+
+    # ==================== 计划 ====================
+
+    def plan(self, names: Sequence[str]) -> FeaturePlan:
+        """
+        解析特征集合的依赖子图
+
+        Args:
+            names: 请求的特征名 (输出顺序)
+
+        Returns:
+            FeaturePlan
+
+        Raises:
+            KeyError: 请求或依赖了未注册的特征
+            ValueError: 依赖存在环
+        """
+        key = tuple(names)
+        plan = self._plans.get(key)
+        if plan is not None:
+            return plan
+
+        order: List[FeatureSpec] = []
+        state: Dict[str, int] = {}          # 1=访问中, 2=已完成
+
+        def visit(name: str, path: Tuple[str, ...]):
+            status = state.get(name)
+            if status == 2:
+                return
+            if status == 1:
+                raise ValueError(f"特征依赖存在环: {' -> '.join(path + (name,))}")
+            spec = self._specs.get(name)
+            if spec is None:
+                raise KeyError(f"未注册的特征: {name}" + (f" (被 {path[-1]} 依赖)" if path else ""))
+            state[name] = 1
+            for dep in spec.deps:
+                visit(dep, path + (name,))
+            state[name] = 2
+            order.append(spec)
+
+        for name in names:
+            visit(name, ())
+
+        plan = FeaturePlan(names, order)
+        self._plans[key] = plan
+        return plan
+
+
+# 全局特征注册表
+FEATURE_REGISTRY = FeatureRegistry()
+_reg = FEATURE_REGISTRY
+
+
+# ==================== Bar特征 (LSTM模型输入) ====================
+# 来源: L2滑点回测.py，与 FeatureEngine 原实现数值一致
+# 指标状态由 BarIndicators 每根Bar增量更新，这里只做常数时间读取
+
+BAR_WINDOW = 60
+
+
+@_reg.intermediate('_latest_bar', source='bar_indicators', window=1)
+def _latest_bar(ctx):
+    return ctx.source('bar_indicators').latest
+
+
+for _field in ('open', 'high', 'low', 'close'):
+    _reg.feature(_field, deps=('_latest_bar',), group='base')(
+        lambda ctx, _f=_field: getattr(ctx['_latest_bar'], _f))
+
+
+@_reg.feature('volume', deps=('_latest_bar',), group='base')
+def _volume(ctx):
+    return float(ctx['_latest_bar'].volume)
+
+
+for _period in (1, 5, 10):
+    _reg.feature(f'return_{_period}', source='bar_indicators', window=_period + 1, group='base')(
+        lambda ctx, _p=_period: ctx.source('bar_indicators').close_return(_p))
+
+_reg.feature('rsi_14', source='bar_indicators', window=15, group='base')(
+    lambda ctx: ctx.source('bar_indicators').rsi_14.value)
+_reg.feature('volume_ratio', source='bar_indicators', window=20, group='base')(
+    lambda ctx: ctx.source('bar_indicators').volume_ratio())
+
+
+# 波动率特征 (来源: volatility_estimation.py)
+
+for _window in (5, 15, 30):
+    _reg.feature(f'volatility_{_window}', source='bar_indicators', window=_window + 1,
+                 group='volatility')(
+        lambda ctx, _w=_window: ctx.source('bar_indicators').volatility.std(_w))
+
+
+@_reg.feature('volatility_ratio', deps=('volatility_5', 'volatility_15'), group='volatility')
+def _volatility_ratio(ctx):
+    if ctx['volatility_15'] > 0:
+        return ctx['volatility_5'] / ctx['volatility_15']
+    return 1.0
+
+
+for _window in (5, 15):
+    _reg.feature(f'price_range_{_window}', source='bar_indicators', window=_window,
+                 group='volatility')(
+        lambda ctx, _w=_window: ctx.source('bar_indicators').price_range(_w))
+
+
+@_reg.feature('return_abs', source='bar_indicators', window=5, group='volatility')
+def _return_abs(ctx):
+    indicators = ctx.source('bar_indicators')
+    if indicators.count < 5:
+        return 0.0
+    return abs(indicators.volatility.last_return)
+
+
+# 趋势指标 (不在LSTM_L2模型输入中，供策略按名称选用)
+
+_reg.feature('rsi_7', source='bar_indicators', window=8, group='trend')(
+    lambda ctx: ctx.source('bar_indicators').rsi_7.value)
+_reg.feature('rsi_14_wilder', source='bar_indicators', window=15, group='trend')(
+    lambda ctx: ctx.source('bar_indicators').rsi_14_wilder.value)
+_reg.feature('ema_10', source='bar_indicators', window=10, group='trend')(
+    lambda ctx: ctx.source('bar_indicators').ema_10.value)
+_reg.feature('ema_30', source='bar_indicators', window=30, group='trend')(
+    lambda ctx: ctx.source('bar_indicators').ema_30.value)
+
+
+@_reg.feature('ema_ratio', deps=('ema_10', 'ema_30'), group='trend')
+def _ema_ratio(ctx):
+    return ctx['ema_10'] / ctx['ema_30'] if ctx['ema_30'] > 0 else 1.0
+
+
+_reg.intermediate('_macd', source='bar_indicators', window=26)(
+    lambda ctx: ctx.source('bar_indicators').macd.value)
+_reg.intermediate('_bollinger', source='bar_indicators', window=20)(
+    lambda ctx: ctx.source('bar_indicators').bollinger.value)
+
+for _i, _name in enumerate(('macd', 'macd_signal', 'macd_hist')):
+    _reg.feature(_name, deps=('_macd',), group='trend')(lambda ctx, _i=_i: ctx['_macd'][_i])
+for _i, _name in enumerate(('bollinger_upper', 'bollinger_lower', 'bollinger_pct')):
+    _reg.feature(_name, deps=('_bollinger',), group='trend')(lambda ctx, _i=_i: ctx['_bollinger'][_i])
+
+
+# ==================== 一档冰山单/大单特征 (基于行情tick序列) ====================
+# 来源: iceberg_detection.py / large_order_detection.py
+# 由 L1OrderFlow 逐tick增量维护，窗口: 冰山单10个tick，大单20个tick
+
+ICEBERG_TICKS = 10
+LARGE_ORDER_TICKS = 20
+
+_reg.intermediate('_l1_iceberg', source='l1_flow', window=ICEBERG_TICKS)(
+    lambda ctx: ctx.source('l1_flow').iceberg_features())
+_reg.intermediate('_l1_large_trades', source='l1_flow', window=LARGE_ORDER_TICKS)(
+    lambda ctx: ctx.source('l1_flow').large_order_features())
+
+for _name in ('bid_iceberg_count', 'bid_iceberg_strength', 'ask_iceberg_count', 'ask_iceberg_strength',
+              'iceberg_imbalance', 'has_bid_iceberg', 'has_ask_iceberg'):
+    _reg.feature(_name, deps=('_l1_iceberg',), group='iceberg')(
+        lambda ctx, _n=_name: ctx['_l1_iceberg'][_n])
+
+for _name in ('large_buy_count', 'large_sell_count', 'large_order_ratio', 'large_order_imbalance'):
+    _reg.feature(_name, deps=('_l1_large_trades',), group='large_order')(
+        lambda ctx, _n=_name: ctx['_l1_large_trades'][_n])
+
+
+# ==================== TickCache窗口特征 ====================
+# TickCache 一次遍历产出全部窗口特征 (增量模式下为常数时间)，作为共享中间量
+
+def _register_tick_features():
+    from .tick_cache import TickCache
+
+    @_reg.intermediate('_tick_window_features', source='tick_cache')
+    def _tick_window_features(ctx):
+        return ctx.source('tick_cache').extract_features()
+
+    for name in TickCache(maxlen=2)._get_empty_features():
+        _reg.feature(f'tick.{name}', deps=('_tick_window_features',), group='tick')(
+            lambda ctx, _n=name: ctx['_tick_window_features'][_n])
+
+
+_register_tick_features()
+
+
+# ==================== L2DepthBuffer盘口特征 ====================
+
+_reg.intermediate('_depth_iceberg', source='depth')(lambda ctx: ctx.source('depth').detect_iceberg())
+_reg.intermediate('_depth_large', source='depth')(lambda ctx: ctx.source('depth').detect_large_order())
+_reg.intermediate('_depth_slope', source='depth')(lambda ctx: ctx.source('depth').get_depth_slope())
+_reg.intermediate('_depth_depletion', source='depth')(lambda ctx: ctx.source('depth').get_depletion_rates())
+_reg.intermediate('_depth_totals', source='depth')(
+    lambda ctx: ctx.source('depth').get_level_means(1).sum(axis=0).tolist())
+
+for _name, _method in (('obi', 'get_obi'), ('weighted_obi', 'get_weighted_obi'),
+                       ('spread', 'get_spread'), ('mid_price', 'get_mid_price'),
+                       ('microprice', 'get_microprice')):
+    _reg.feature(f'depth.{_name}', source='depth', group='depth')(
+        lambda ctx, _m=_method: getattr(ctx.source('depth'), _m)())
+
+for _name in ('bid_iceberg_strength', 'ask_iceberg_strength'):
+    _reg.feature(f'depth.{_name}', deps=('_depth_iceberg',), group='depth')(
+        lambda ctx, _n=_name: ctx['_depth_iceberg'][_n])
+for _name in ('has_bid_iceberg', 'has_ask_iceberg'):
+    _reg.feature(f'depth.{_name}', deps=('_depth_iceberg',), group='depth')(
+        lambda ctx, _n=_name: float(ctx['_depth_iceberg'][_n]))
+_reg.feature('depth.iceberg_imbalance', deps=('depth.bid_iceberg_strength', 'depth.ask_iceberg_strength'),
+             group='depth')(lambda ctx: ctx['depth.bid_iceberg_strength'] - ctx['depth.ask_iceberg_strength'])
+
+for _name in ('has_large_bid', 'has_large_ask'):
+    _reg.feature(f'depth.{_name}', deps=('_depth_large',), group='depth')(
+        lambda ctx, _n=_name: float(ctx['_depth_large'][_n]))
+_reg.feature('depth.large_order_imbalance', deps=('_depth_large',), group='depth')(
+    lambda ctx: ctx['_depth_large']['large_order_imbalance'])
+
+_reg.feature('depth.bid_depth_total', deps=('_depth_totals',), group='depth')(
+    lambda ctx: ctx['_depth_totals'][0])
+_reg.feature('depth.ask_depth_total', deps=('_depth_totals',), group='depth')(
+    lambda ctx: ctx['_depth_totals'][1])
+_reg.feature('depth.depth_ratio', deps=('depth.bid_depth_total', 'depth.ask_depth_total'),
+             group='depth')(lambda ctx: ctx['depth.bid_depth_total'] / (ctx['depth.ask_depth_total'] + 1))
+
+for _name in ('bid_depth_slope', 'ask_depth_slope'):
+    _reg.feature(f'depth.{_name}', deps=('_depth_slope',), group='depth')(
+        lambda ctx, _n=_name: ctx['_depth_slope'][_n])
+for _side in ('bid', 'ask'):
+    _reg.feature(f'depth.{_side}_depletion_rate', deps=('_depth_depletion',), group='depth')(
+        lambda ctx, _s=_side: ctx['_depth_depletion'][f'{_s}_depletion_per_tick'])
+
+
+# ==================== 命名特征集合 ====================
+
+# LSTM_L2 模型特征 (顺序即模型输入列顺序)
+LSTM_L2_FEATURES = [
+    # 基础特征 (10)
+    'open', 'high', 'low', 'close', 'volume',
+    'return_1', 'return_5', 'return_10',
+    'rsi_14', 'volume_ratio',
+
+    # 冰山单特征 (7) - 需要L2数据
+    'bid_iceberg_count', 'bid_iceberg_strength',
+    'ask_iceberg_count', 'ask_iceberg_strength',
+    'iceberg_imbalance', 'has_bid_iceberg', 'has_ask_iceberg',
+
+    # 大单特征 (4) - 需要L2数据
+    'large_buy_count', 'large_sell_count',
+    'large_order_ratio', 'large_order_imbalance',
+
+    # 波动率特征 (7)
+    'volatility_5', 'volatility_15', 'volatility_30',
+    'volatility_ratio', 'price_range_5', 'price_range_15', 'return_abs'
+]
+
+_reg.define_set('lstm_l2', LSTM_L2_FEATURES)
+_reg.define_set('trend', _reg.names(group='trend'))
+_reg.define_set('tick', _reg.names(group='tick'))
+_reg.define_set('depth', _reg.names(group='depth'))
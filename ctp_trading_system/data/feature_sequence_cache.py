@@ -5,10 +5,11 @@
 功能:
 - 缓存最近10个时间步的68个特征
 - 形成[10, 68]的特征矩阵用于LSTM输入
-- 支持特征标准化
+- 支持特征标准化 (由 scaler.mean_/scale_ 预计算，写入时融合标准化)
+- 预分配float32环形缓冲，读取LSTM输入不分配内存
 """
 
-from collections import deque
+from operator import itemgetter
 from typing import List, Dict, Optional, Any
 import numpy as np
 
@@ -25,7 +26,9 @@ class FeatureSequenceCache:
     - 支持特征标准化
     """
 
-    # 标准特征名列表 (68个)
+    # 标准特征名列表 (68个，训练脚本的tick窗口特征命名)
+    # 与 FeatureEngine 配合使用时应通过 set_feature_names 改为特征集合的名称，
+    # 可用 FEATURE_REGISTRY.unknown(names) 核对名称是否已注册
     FEATURE_NAMES = [
         # 价格特征 (8)
         'return_1min', 'return_5min', 'return_15min', 'return_30min',
@@ -71,27 +74,106 @@ class FeatureSequenceCache:
         """
         self.sequence_length = sequence_length
         self.feature_dim = feature_dim
-        self._buffer: deque = deque(maxlen=sequence_length)
+
+        # 双倍写入环形缓冲: 第i步同时写入 i 和 i + sequence_length，窗口始终连续
+        self._raw = np.zeros((2 * sequence_length, feature_dim), dtype=np.float32)
+        self._scaled = np.zeros((2 * sequence_length, feature_dim), dtype=np.float32)
+        self._zeros = np.zeros((sequence_length, feature_dim), dtype=np.float32)
+        self._out = np.zeros((1, sequence_length, feature_dim), dtype=np.float32)
+        self._count = 0
+        self._size = 0
+
+        # 标准化参数: [feature_dim] 按特征 或 [sequence_length, feature_dim] 按位置
         self._scaler: Any = None  # sklearn StandardScaler
-        self._feature_names: List[str] = self.FEATURE_NAMES[:feature_dim]
+        self._mean: Optional[np.ndarray] = None
+        self._inv_scale: Optional[np.ndarray] = None
+        self._per_position = False
+
+        self._feature_names: List[str] = []
+        self._getter: Optional[itemgetter] = None
+        self._name_index: Dict[str, int] = {}
+        self.set_feature_names(self.FEATURE_NAMES)
 
     def set_scaler(self, scaler: Any):
         """
         设置标准化器 (从模型加载)
 
+        支持两种拟合方式:
+        - 按特征拟合: mean_ 长度为 feature_dim，写入时即完成标准化
+        - 按展平序列拟合: mean_ 长度为 sequence_length × feature_dim，读取时逐位置标准化
+        其他情况回退到调用 scaler.transform
+
         Args:
             scaler: sklearn StandardScaler 实例
         """
         self._scaler = scaler
+        self._mean = self._inv_scale = None
+        self._per_position = False
+
+        mean = getattr(scaler, 'mean_', None)
+        scale = getattr(scaler, 'scale_', None)
+        reference = mean if mean is not None else scale
+        if reference is None:
+            return
+
+        size = np.size(reference)
+        if size == self.feature_dim:
+            shape = (self.feature_dim,)
+        elif size == self.sequence_length * self.feature_dim:
+            shape = (self.sequence_length, self.feature_dim)
+            self._per_position = True
+        else:
+            print(f"[FeatureSequenceCache] 标准化器维度 {size} 与特征维度不匹配，使用 transform")
+            return
+
+        mean = np.zeros(shape) if mean is None else np.asarray(mean, dtype=np.float64).reshape(shape)
+        scale = np.ones(shape) if scale is None else np.asarray(scale, dtype=np.float64).reshape(shape)
+        self._mean = mean.astype(np.float32)
+        self._inv_scale = (1.0 / scale).astype(np.float32)
+
+        # 已缓存的数据按新参数重新标准化
+        if not self._per_position:
+            np.subtract(self._raw, self._mean, out=self._scaled)
+            np.multiply(self._scaled, self._inv_scale, out=self._scaled)
 
     def set_feature_names(self, names: List[str]):
         """
-        设置特征名列表
+        设置特征名列表 (一次性解析为列下标)
 
         Args:
             names: 特征名列表
         """
-        self._feature_names = names[:self.feature_dim]
+        self._feature_names = list(names[:self.feature_dim])
+        self._name_index = {name: i for i, name in enumerate(self._feature_names)}
+        # itemgetter 在特征齐全时以C速度按顺序取值，单个特征时返回标量需包一层
+        if len(self._feature_names) > 1:
+            self._getter = itemgetter(*self._feature_names)
+        elif self._feature_names:
+            getter = itemgetter(self._feature_names[0])
+            self._getter = lambda features: (getter(features),)
+        else:
+            self._getter = lambda features: ()
+
+    def _append(self, values):
+        """写入一个时间步 (values 长度不超过 feature_dim，不足部分补0)"""
+        seq = self.sequence_length
+        i = self._count % seq
+        row = self._raw[i]
+        n = len(values)
+        row[:n] = values
+        if n < self.feature_dim:
+            row[n:] = 0.0
+        self._raw[i + seq] = row
+
+        if self._mean is not None and not self._per_position:
+            scaled = self._scaled[i]
+            np.subtract(row, self._mean, out=scaled)
+            np.multiply(scaled, self._inv_scale, out=scaled)
+            self._scaled[i + seq] = scaled
+
+        self._count += 1
+        if self._size < seq:
+            self._size += 1
 
     def add_features(self, features: Dict[str, float]):
         """
@@ -100,81 +182,95 @@ class FeatureSequenceCache:
         Args:
             features: 特征字典 {feature_name: value}
         """
-        # 按固定顺序提取特征
-        feature_array = np.zeros(self.feature_dim)
-
-        for i, name in enumerate(self._feature_names):
-            if i >= self.feature_dim:
-                break
-            feature_array[i] = features.get(name, 0.0)
+        # 按固定顺序提取特征 (缺失特征补0)
+        try:
+            values = self._getter(features)
+        except KeyError:
+            get = features.get
+            values = [get(name, 0.0) for name in self._feature_names]
 
-        self._buffer.append(feature_array)
+        self._append(values)
 
     def add_feature_array(self, feature_array: np.ndarray):
         """
         直接添加特征数组
 
         Args:
-            feature_array: 特征数组 (feature_dim,)
+            feature_array: 特征数组 (feature_dim,)，超出部分截断，不足补0
         """
-        if len(feature_array) != self.feature_dim:
-            # 补齐或截断
-            padded = np.zeros(self.feature_dim)
-            padded[:min(len(feature_array), self.feature_dim)] = feature_array[:self.feature_dim]
-            feature_array = padded
-
-        self._buffer.append(feature_array)
+        self._append(feature_array[:self.feature_dim])
 
     def is_ready(self) -> bool:
         """是否有足够的序列长度"""
-        return len(self._buffer) >= self.sequence_length
+        return self._size >= self.sequence_length
 
     def size(self) -> int:
         """当前缓存大小"""
-        return len(self._buffer)
+        return self._size
+
+    def _window_slice(self) -> slice:
+        """窗口在双倍缓冲中的连续区间"""
+        end = self._count % self.sequence_length
+        if self._size == self.sequence_length:
+            return slice(end, end + self.sequence_length)
+        return slice(0, self._size)
 
     def get_matrix(self) -> np.ndarray:
         """
         获取特征矩阵 [sequence_length, feature_dim]
 
         Returns:
-            原始特征矩阵
+            原始特征矩阵 (float32只读视图，按时间顺序)
         """
         if not self.is_ready():
             # 返回零矩阵
-            return np.zeros((self.sequence_length, self.feature_dim))
+            return np.zeros((self.sequence_length, self.feature_dim), dtype=np.float32)
 
-        return np.array(list(self._buffer))
+        view = self._raw[self._window_slice()]
+        view.flags.writeable = False
+        return view
 
     def get_scaled_matrix(self) -> np.ndarray:
         """
         获取标准化后的特征矩阵
 
+        按特征标准化时直接返回缓冲区视图；按位置标准化时写入预分配的输出缓冲。
+        返回的数组在下一次 add/get 后可能被覆盖，需要保留时请 copy()
+
         Returns:
             标准化后的[sequence_length, feature_dim]矩阵
         """
-        matrix = self.get_matrix()
+        if self._mean is None:
+            matrix = self.get_matrix()
+            if self._scaler is None:
+                return matrix
 
-        if self._scaler is not None:
             # 展平 -> 标准化 -> 重塑
             original_shape = matrix.shape
             flat = matrix.reshape(1, -1)
 
             try:
                 scaled_flat = self._scaler.transform(flat)
-                return scaled_flat.reshape(original_shape)
+                return scaled_flat.reshape(original_shape).astype(np.float32)
             except Exception as e:
                 print(f"[FeatureSequenceCache] 标准化失败: {e}")
                 return matrix
 
-        return matrix
+        if self.is_ready() and not self._per_position:
+            return self._scaled[self._window_slice()]
+
+        source = self._raw[self._window_slice()] if self.is_ready() else self._zeros
+        out = self._out[0]
+        np.subtract(source, self._mean, out=out)
+        np.multiply(out, self._inv_scale, out=out)
+        return out
 
     def get_lstm_input(self) -> np.ndarray:
         """
         获取LSTM输入张量 [1, sequence_length, feature_dim]
 
         Returns:
-            可直接输入LSTM的张量
+            可直接输入LSTM的float32张量 (连续内存视图，不复制)
         """
         matrix = self.get_scaled_matrix()
         return matrix.reshape(1, self.sequence_length, self.feature_dim)
@@ -203,18 +299,19 @@ class FeatureSequenceCache:
         Returns:
             特征字典
         """
-        if len(self._buffer) == 0:
+        if self._size == 0:
             return {name: 0.0 for name in self._feature_names}
 
-        latest = self._buffer[-1]
-        return {name: float(latest[i]) for i, name in enumerate(self._feature_names) if i < len(latest)}
+        latest = self._raw[(self._count - 1) % self.sequence_length].tolist()
+        return {name: latest[i] for i, name in enumerate(self._feature_names)}
 
     def clear(self):
         """清空缓存"""
-        self._buffer.clear()
+        self._count = 0
+        self._size = 0
 
     def __len__(self) -> int:
-        return len(self._buffer)
+        return self._size
 
     def __repr__(self) -> str:
-        return f"FeatureSequenceCache(size={len(self._buffer)}/{self.sequence_length}, dim={self.feature_dim})"
+        return f"FeatureSequenceCache(size={self._size}/{self.sequence_length}, dim={self.feature_dim})"
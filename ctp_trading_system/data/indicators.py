@@ -0,0 +1,594 @@
+"""
+增量技术指标库
+每根Bar / 每个tick O(1) 更新，替代每次重建列表再 np.diff / np.std
+
+功能:
+- EMA / MACD / RSI (Wilder平滑或简单均值) / 布林带 / 多窗口收益率波动率
+- BarIndicators: FeatureEngine 使用的Bar级指标集合
+- L1OrderFlow: 一档挂单冰山单模式与大单统计的增量版本
+- 所有指标支持 seed(history) 从历史数据预热 (如开盘前加载前一交易日Bar)
+- 滑动窗口累加量定期全量重建，避免浮点漂移
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from math import sqrt, copysign, inf, nan
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from .tick_features import RollingMoments, RollingExtremum
+
+
+def _pct_change(current: float, previous: float) -> float:
+    """收益率 (与 numpy 除法一致: 除数为0时得到 inf/nan 而不是抛异常)"""
+    if previous:
+        return (current - previous) / previous
+    diff = current - previous
+    return copysign(inf, diff) if diff else nan
+
+
+class RollingWindow:
+    """
+    定长滑动窗口均值/标准差
+
+    数值减去参考值 (pivot) 后累加以降低抵消误差，
+    每 resync_interval 次更新用窗口数据全量重建。
+    窗口内数值全部相同时 (如价格不变时的收益率全为0) 直接返回精确结果，
+    不输出累加残差
+    """
+
+    __slots__ = ('period', 'resync_interval', '_values', '_moments', '_pivot', '_updates', '_run')
+
+    def __init__(self, period: int, resync_interval: int = 0):
+        """
+        Args:
+            period: 窗口长度
+            resync_interval: 全量重建间隔，0表示 50 × period
+        """
+        self.period = period
+        self.resync_interval = resync_interval or 50 * period
+        self._values: deque = deque(maxlen=period)
+        self._moments = RollingMoments()
+        self._pivot = 0.0
+        self._updates = 0
+        self._run = 0                 # 末尾连续相同数值的个数
+
+    def push(self, x: float):
+        values = self._values
+        if not values:
+            self._pivot = x
+        elif len(values) == self.period:
+            self._moments.remove(values[0] - self._pivot)
+        self._run = self._run + 1 if values and values[-1] == x else 1
+        values.append(x)
+        self._moments.add(x - self._pivot)
+        self._updates += 1
+        if self._updates % self.resync_interval == 0:
+            self._resync()
+
+    def _resync(self):
+        self._pivot = self._values[-1]
+        self._moments.reset()
+        for x in self._values:
+            self._moments.add(x - self._pivot)
+
+    @property
+    def full(self) -> bool:
+        return len(self._values) == self.period
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @property
+    def constant(self) -> bool:
+        """窗口内数值是否全部相同"""
+        return self._run >= len(self._values)
+
+    def mean(self) -> float:
+        if not self._values:
+            return 0.0
+        if self.constant:
+            return self._values[-1]
+        return self._pivot + self._moments.mean()
+
+    def std(self) -> float:
+        """总体标准差 (与 np.std 一致)"""
+        return 0.0 if self.constant else self._moments.std()
+
+    def reset(self):
+        self._values.clear()
+        self._moments.reset()
+        self._pivot = 0.0
+        self._updates = 0
+        self._run = 0
+
+
+# ==================== 单值指标 ====================
+
+class EMA:
+    """指数移动平均 (alpha = 2 / (period + 1)，以首个值为初值)"""
+
+    __slots__ = ('period', 'alpha', 'value', 'count')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.value = 0.0
+        self.count = 0
+
+    def update(self, x: float) -> float:
+        if self.count == 0:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        self.count += 1
+        return self.value
+
+    @property
+    def ready(self) -> bool:
+        return self.count >= self.period
+
+    def seed(self, history: Iterable[float]) -> 'EMA':
+        self.reset()
+        for x in history:
+            self.update(x)
+        return self
+
+    def reset(self):
+        self.value = 0.0
+        self.count = 0
+
+
+class MACD:
+    """MACD = EMA(fast) - EMA(slow)，信号线为 MACD 的 EMA(signal)"""
+
+    __slots__ = ('fast', 'slow', 'signal')
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    def update(self, x: float) -> Tuple[float, float, float]:
+        """Returns: (macd, signal, hist)"""
+        macd = self.fast.update(x) - self.slow.update(x)
+        signal = self.signal.update(macd)
+        return macd, signal, macd - signal
+
+    @property
+    def value(self) -> Tuple[float, float, float]:
+        macd = self.fast.value - self.slow.value
+        return macd, self.signal.value, macd - self.signal.value
+
+    @property
+    def ready(self) -> bool:
+        return self.slow.ready
+
+    def seed(self, history: Iterable[float]) -> 'MACD':
+        self.reset()
+        for x in history:
+            self.update(x)
+        return self
+
+    def reset(self):
+        self.fast.reset()
+        self.slow.reset()
+        self.signal.reset()
+
+
+class RSI:
+    """
+    相对强弱指数
+
+    method:
+    - wilder: Wilder平滑，前 period 个涨跌幅取均值作初值，之后 avg = (avg × (n-1) + x) / n
+    - sma: 最近 period 个涨跌幅的简单均值 (与原 FeatureEngine._calc_rsi 一致)
+
+    不足 period 个涨跌幅时返回50，平均跌幅为0时返回100
+    """
+
+    __slots__ = ('period', 'method', '_prev', '_count', '_avg_gain', '_avg_loss',
+                 '_window', '_gain_sum', '_loss_sum', '_loss_count', '_updates')
+
+    def __init__(self, period: int = 14, method: str = 'wilder'):
+        if method not in ('wilder', 'sma'):
+            raise ValueError(f"未知RSI计算方式: {method}")
+        self.period = period
+        self.method = method
+        self._window: deque = deque(maxlen=period)
+        self.reset()
+
+    def update(self, price: float) -> float:
+        prev = self._prev
+        self._prev = price
+        if prev is None:
+            return self.value
+        delta = price - prev
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        self._count += 1
+
+        if self.method == 'wilder':
+            n = self.period
+            if self._count <= n:
+                self._gain_sum += gain
+                self._loss_sum += loss
+                if self._count == n:
+                    self._avg_gain = self._gain_sum / n
+                    self._avg_loss = self._loss_sum / n
+            else:
+                self._avg_gain = (self._avg_gain * (n - 1) + gain) / n
+                self._avg_loss = (self._avg_loss * (n - 1) + loss) / n
+            return self.value
+
+        # 简单均值: 窗口和 + 非零跌幅计数 (判断平均跌幅是否严格为0不受浮点残差影响)
+        window = self._window
+        if len(window) == self.period:
+            old_gain, old_loss = window[0]
+            self._gain_sum -= old_gain
+            self._loss_sum -= old_loss
+            self._loss_count -= old_loss > 0
+        window.append((gain, loss))
+        self._gain_sum += gain
+        self._loss_sum += loss
+        self._loss_count += loss > 0
+        self._updates += 1
+        if self._updates % (50 * self.period) == 0:
+            self._gain_sum = sum(g for g, _ in window)
+            self._loss_sum = sum(l for _, l in window)
+        return self.value
+
+    @property
+    def ready(self) -> bool:
+        return self._count >= self.period
+
+    @property
+    def value(self) -> float:
+        if self._count < self.period:
+            return 50.0
+        if self.method == 'wilder':
+            avg_gain, avg_loss = self._avg_gain, self._avg_loss
+            if avg_loss == 0:
+                return 100.0
+        else:
+            if self._loss_count == 0:
+                return 100.0
+            avg_gain, avg_loss = self._gain_sum / self.period, self._loss_sum / self.period
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+    def seed(self, history: Iterable[float]) -> 'RSI':
+        self.reset()
+        for x in history:
+            self.update(x)
+        return self
+
+    def reset(self):
+        self._prev: Optional[float] = None
+        self._count = 0
+        self._avg_gain = self._avg_loss = 0.0
+        self._window.clear()
+        self._gain_sum = self._loss_sum = 0.0
+        self._loss_count = 0
+        self._updates = 0
+
+
+class Bollinger:
+    """布林带 (中轨为 period 均值，带宽为 k 倍总体标准差)"""
+
+    __slots__ = ('k', '_window', '_last')
+
+    def __init__(self, period: int = 20, k: float = 2.0):
+        self.k = k
+        self._window = RollingWindow(period)
+        self._last = 0.0
+
+    def update(self, x: float) -> Tuple[float, float, float]:
+        self._window.push(x)
+        self._last = x
+        return self.value
+
+    @property
+    def ready(self) -> bool:
+        return self._window.full
+
+    @property
+    def value(self) -> Tuple[float, float, float]:
+        """Returns: (upper, lower, pct_b)，pct_b = (close - lower) / (upper - lower)"""
+        if not len(self._window):
+            return 0.0, 0.0, 0.5
+        mid = self._window.mean()
+        width = self.k * self._window.std()
+        upper, lower = mid + width, mid - width
+        pct = (self._last - lower) / (upper - lower) if width > 0 else 0.5
+        return upper, lower, pct
+
+    def seed(self, history: Iterable[float]) -> 'Bollinger':
+        self.reset()
+        for x in history:
+            self.update(x)
+        return self
+
+    def reset(self):
+        self._window.reset()
+        self._last = 0.0
+
+
+class RollingVolatility:
+    """多窗口收益率波动率 (收益率总体标准差)"""
+
+    def __init__(self, windows: Sequence[int] = (5, 15, 30)):
+        self.windows = tuple(windows)
+        self._rolling = {w: RollingWindow(w) for w in self.windows}
+        self._prev: Optional[float] = None
+        self.count = 0                # 已计算的收益率个数
+        self.last_return = 0.0
+
+    def update(self, price: float):
+        prev = self._prev
+        self._prev = price
+        if prev is None:
+            return
+        r = _pct_change(price, prev)
+        self.last_return = r
+        self.count += 1
+        for rolling in self._rolling.values():
+            rolling.push(r)
+
+    def std(self, window: int) -> float:
+        """最近window个收益率的标准差 (不足window个返回0)"""
+        rolling = self._rolling[window]
+        return rolling.std() if rolling.full else 0.0
+
+    def seed(self, history: Iterable[float]) -> 'RollingVolatility':
+        self.reset()
+        for x in history:
+            self.update(x)
+        return self
+
+    def reset(self):
+        for rolling in self._rolling.values():
+            rolling.reset()
+        self._prev = None
+        self.count = 0
+        self.last_return = 0.0
+
+
+# ==================== Bar级指标集合 ====================
+
+class BarIndicators:
+    """
+    FeatureEngine 使用的Bar级增量指标
+
+    每根Bar调用一次 update，特征读取为常数时间
+    """
+
+    RETURN_PERIODS = (1, 5, 10)
+    RANGE_WINDOWS = (5, 15)
+
+    def __init__(self, maxlen: int = 60):
+        """
+        Args:
+            maxlen: Bar计数上限 (与 FeatureEngine 的Bar缓存一致)
+        """
+        self.maxlen = maxlen
+        self._closes: deque = deque(maxlen=max(self.RETURN_PERIODS) + 1)
+        self._seq = 0
+
+        self.rsi_14 = RSI(14, 'sma')
+        self.rsi_7 = RSI(7, 'sma')
+        self.rsi_14_wilder = RSI(14, 'wilder')
+        self.ema_10 = EMA(10)
+        self.ema_30 = EMA(30)
+        self.macd = MACD(12, 26, 9)
+        self.bollinger = Bollinger(20, 2.0)
+        self.volatility = RollingVolatility((5, 15, 30))
+        self.volumes = RollingWindow(20)
+        self._highs = {w: RollingExtremum(is_max=True) for w in self.RANGE_WINDOWS}
+        self._lows = {w: RollingExtremum(is_max=False) for w in self.RANGE_WINDOWS}
+        self.latest = None
+
+    def update(self, bar):
+        """
+        更新一根Bar
+
+        Args:
+            bar: 具有 open/high/low/close/volume 属性的Bar
+        """
+        close = bar.close
+        self.latest = bar
+        self._closes.append(close)
+        self._seq += 1
+        for w in self.RANGE_WINDOWS:
+            self._highs[w].push(self._seq, bar.high)
+            self._highs[w].expire(self._seq - w + 1)
+            self._lows[w].push(self._seq, bar.low)
+            self._lows[w].expire(self._seq - w + 1)
+
+        self.rsi_14.update(close)
+        self.rsi_7.update(close)
+        self.rsi_14_wilder.update(close)
+        self.ema_10.update(close)
+        self.ema_30.update(close)
+        self.macd.update(close)
+        self.bollinger.update(close)
+        self.volatility.update(close)
+        self.volumes.push(bar.volume)
+
+    def seed(self, bars: Iterable) -> 'BarIndicators':
+        """用历史Bar预热 (先清空)"""
+        self.reset()
+        for bar in bars:
+            self.update(bar)
+        return self
+
+    @property
+    def count(self) -> int:
+        """已接收的Bar数 (不超过 maxlen，与Bar缓存长度一致)"""
+        return min(self._seq, self.maxlen)
+
+    def close_return(self, period: int) -> float:
+        """period 根Bar的收益率 (不足时为0)"""
+        closes = self._closes
+        if len(closes) < period + 1:
+            return 0
+        base = closes[-period - 1]
+        return (closes[-1] - base) / base if base > 0 else 0
+
+    def price_range(self, window: int) -> float:
+        """最近window根Bar的 (最高 - 最低) / 收盘"""
+        if self.count < window:
+            return 0.0
+        close = self._closes[-1]
+        high, low = self._highs[window].value(), self._lows[window].value()
+        return (high - low) / close if close > 0 else 0
+
+    def volume_ratio(self) -> float:
+        """最新Bar成交量 / 最近20根均量"""
+        if not self.volumes.full:
+            return 1.0
+        mean = self.volumes.mean()
+        return self.latest.volume / mean if mean > 0 else 1.0
+
+    def reset(self):
+        self._closes.clear()
+        self._seq = 0
+        for indicator in (self.rsi_14, self.rsi_7, self.rsi_14_wilder, self.ema_10, self.ema_30,
+                          self.macd, self.bollinger, self.volatility, self.volumes):
+            indicator.reset()
+        for extremum in list(self._highs.values()) + list(self._lows.values()):
+            extremum.reset()
+        self.latest = None
+
+
+# ==================== 一档订单流 ====================
+
+class L1OrderFlow:
+    """
+    一档挂单冰山单模式与大单统计 (增量版本)
+
+    来源: iceberg_detection.py / large_order_detection.py
+
+    - 冰山单: 最近 iceberg_window 个tick买一/卖一量的均值、标准差，
+      以及"量较前一tick减少50%以上、随后恢复1.5倍以上"的次数
+    - 大单: 最近 large_window 个tick内，成交量增量超过窗口累计成交量均值3倍的次数，
+      按价格变化方向区分买卖。阈值随窗口变化，增量按方向维护有序表，计数为一次二分
+    """
+
+    def __init__(self, iceberg_window: int = 10, large_window: int = 20):
+        # 冰山单标志需要连续3个tick，窗口内标志数为 iceberg_window - 2
+        if iceberg_window < 3:
+            raise ValueError(f"iceberg_window 至少为3: {iceberg_window}")
+        self.iceberg_window = iceberg_window
+        self.large_window = large_window
+        self.reset()
+
+    def update(self, tick: dict):
+        """加入一个tick (字典或 MarketTick)"""
+        get = tick.get
+        bid, ask = get('bid_volume1', 0), get('ask_volume1', 0)
+        volume, price = get('volume', 0), get('last_price', 0)
+        self.count += 1
+
+        # 冰山单: 整数幂和 (挂单量为整数，方差可精确计算)
+        queue = self._queue
+        if len(queue) == self.iceberg_window:
+            old_bid, old_ask = queue[0]
+            self._bid_s1 -= old_bid
+            self._bid_s2 -= old_bid * old_bid
+            self._ask_s1 -= old_ask
+            self._ask_s2 -= old_ask * old_ask
+        queue.append((bid, ask))
+        self._bid_s1 += bid
+        self._bid_s2 += bid * bid
+        self._ask_s1 += ask
+        self._ask_s2 += ask * ask
+
+        if self._prev2 is not None:
+            (b0, a0), (b1, a1) = self._prev2, self._prev
+            flag = (b1 < b0 * 0.5 and bid > b1 * 1.5, a1 < a0 * 0.5 and ask > a1 * 1.5)
+            flags = self._flags
+            if len(flags) == flags.maxlen:
+                old_b, old_a = flags[0]
+                self._bid_drops -= old_b
+                self._ask_drops -= old_a
+            flags.append(flag)
+            self._bid_drops += flag[0]
+            self._ask_drops += flag[1]
+        self._prev2, self._prev = self._prev, (bid, ask)
+
+        # 大单: 窗口内相邻tick对的成交量增量
+        ticks = self._ticks
+        if len(ticks) == self.large_window:
+            old_volume, _ = ticks[0]
+            self._volume_sum -= old_volume
+            if self._pairs:
+                delta, is_buy = self._pairs.popleft()
+                side = self._buy_deltas if is_buy else self._sell_deltas
+                del side[bisect_left(side, delta)]
+        if ticks:
+            prev_volume, prev_price = ticks[-1]
+            delta = volume - prev_volume
+            is_buy = price - prev_price > 0
+            self._pairs.append((delta, is_buy))
+            insort(self._buy_deltas if is_buy else self._sell_deltas, delta)
+        ticks.append((volume, price))
+        self._volume_sum += volume
+
+    def seed(self, ticks: Iterable[dict]) -> 'L1OrderFlow':
+        self.reset()
+        for tick in ticks:
+            self.update(tick)
+        return self
+
+    def iceberg_features(self) -> Dict[str, float]:
+        """冰山单特征 (tick不足 iceberg_window 时为默认值)"""
+        n = self.iceberg_window
+        if len(self._queue) < n:
+            return {
+                'bid_iceberg_count': 0, 'bid_iceberg_strength': 0.0,
+                'ask_iceberg_count': 0, 'ask_iceberg_strength': 0.0,
+                'iceberg_imbalance': 0.0, 'has_bid_iceberg': 0, 'has_ask_iceberg': 0
+            }
+        bid_strength = sqrt(max(n * self._bid_s2 - self._bid_s1 * self._bid_s1, 0)) / n \
+            / (self._bid_s1 / n + 1)
+        ask_strength = sqrt(max(n * self._ask_s2 - self._ask_s1 * self._ask_s1, 0)) / n \
+            / (self._ask_s1 / n + 1)
+        return {
+            'bid_iceberg_count': self._bid_drops,
+            'bid_iceberg_strength': bid_strength,
+            'ask_iceberg_count': self._ask_drops,
+            'ask_iceberg_strength': ask_strength,
+            'iceberg_imbalance': bid_strength - ask_strength,
+            'has_bid_iceberg': 1 if self._bid_drops > 0 else 0,
+            'has_ask_iceberg': 1 if self._ask_drops > 0 else 0,
+        }
+
+    def large_order_features(self) -> Dict[str, float]:
+        """大单特征 (tick不足 large_window 时为默认值)"""
+        n = self.large_window
+        if len(self._ticks) < n:
+            return {'large_buy_count': 0, 'large_sell_count': 0,
+                    'large_order_ratio': 0.0, 'large_order_imbalance': 0.0}
+        threshold = self._volume_sum / n * 3
+        buys = len(self._buy_deltas) - bisect_right(self._buy_deltas, threshold)
+        sells = len(self._sell_deltas) - bisect_right(self._sell_deltas, threshold)
+        total = buys + sells
+        return {
+            'large_buy_count': buys,
+            'large_sell_count': sells,
+            'large_order_ratio': total / n,
+            'large_order_imbalance': (buys - sells) / total if total > 0 else 0,
+        }
+
+    def reset(self):
+        self.count = 0
+        self._queue: deque = deque(maxlen=self.iceberg_window)
+        self._flags: deque = deque(maxlen=self.iceberg_window - 2)
+        self._bid_s1 = self._bid_s2 = self._ask_s1 = self._ask_s2 = 0
+        self._bid_drops = self._ask_drops = 0
+        self._prev = self._prev2 = None
+        self._ticks: deque = deque(maxlen=self.large_window)
+        self._pairs: deque = deque()
+        self._buy_deltas: list = []
+        self._sell_deltas: list = []
+        self._volume_sum = 0
@@ -3,15 +3,18 @@ L2盘口深度缓存
 来源: C:\Repo\future-trading-strategy 的 iceberg_detection.py
 
 功能:
-- 缓存最新5档盘口数据
-- 计算订单簿不平衡 (OBI)
-- 检测冰山单/大单
+- 缓存最新5档盘口数据 (预分配NumPy环形缓冲)
+- 计算订单簿不平衡 (OBI) / 加权多档OBI / 微观价格 / 深度斜率
+- 检测冰山单/大单，统计队列消耗速率
+- 窗口统计基于累计和，每次更新常数时间
 """
 
 from dataclasses import dataclass, field, asdict
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Sequence, Tuple
 import numpy as np
 
+from .market_tick import tick_timestamp_ms
+
 
 @dataclass
 class L2Depth:
@@ -64,10 +67,24 @@ class L2Depth:
             bid_volumes=bid_volumes,
             ask_prices=ask_prices,
             ask_volumes=ask_volumes,
-            timestamp_ms=int(tick_data.get('timestamp', 0) * 1000) if 'timestamp' in tick_data else 0
+            timestamp_ms=tick_timestamp_ms(tick_data)
         )
 
 
+# 盘口数组布局: [历史 × 档位 × (价格, 数量) × 方向]
+L2_LEVELS = 5
+_PRICE, _VOLUME = 0, 1
+_BID, _ASK = 0, 1
+
+# 累计和列: 每个快照写入一行前缀和，任意窗口和 = cum[n] - cum[n-k]
+_C_BID_TOTAL, _C_ASK_TOTAL = 0, 1
+_C_BID_TOTAL_SQ, _C_ASK_TOTAL_SQ = 2, 3
+_C_BID_ICEBERG, _C_ASK_ICEBERG = 4, 5
+_C_BID_DEPLETED, _C_ASK_DEPLETED = 6, 7
+_C_LEVELS = 8                       # 8..17: 各档挂单量 [level, side]
+_CUM_COLUMNS = _C_LEVELS + L2_LEVELS * 2
+
+
 class L2DepthBuffer:
     """
     L2深度缓存
@@ -78,32 +95,163 @@ class L2DepthBuffer:
     - 缓存最新5档盘口数据
     - 计算订单簿不平衡 (OBI)
     - 检测冰山单/大单
+    - 加权OBI、微观价格、深度斜率、队列消耗速率
+
+    存储: [2 × max_history, 5, 2, 2] 双倍写入环形缓冲 (窗口始终连续)，
+    另维护一份 [max_history + 1, 列] 前缀和环，冰山单/大单/消耗速率
+    的窗口统计都由两行相减得到，不再逐快照重新求和
     """
 
-    def __init__(self, max_history: int = 100):
+    ICEBERG_WINDOW = 10
+    LARGE_ORDER_WINDOW = 20
+
+    def __init__(self, max_history: int = 100,
+                 level_weights: Sequence[float] = (1.0, 0.8, 0.6, 0.4, 0.2),
+                 depletion_window: int = 20):
         """
         Args:
             max_history: 历史快照最大数量
+            level_weights: 加权OBI各档权重 (由近及远)
+            depletion_window: 队列消耗速率统计窗口 (快照数)
         """
-        self._current_depth: Optional[L2Depth] = None
-        self._depth_history: List[L2Depth] = []
         self._max_history = max_history
+        self._book = np.zeros((2 * max_history, L2_LEVELS, 2, 2), dtype=np.float64)
+        self._timestamps = np.zeros(2 * max_history, dtype=np.int64)
+        self._cum = np.zeros((max_history + 1, _CUM_COLUMNS), dtype=np.float64)
+        self._count = 0
+        self._weights = np.asarray(level_weights, dtype=np.float64)
+        self._depletion_window = min(depletion_window, max_history)
+
+        # 最近两次的双边总量 (冰山单"减少后恢复"模式判定)
+        self._prev_totals: Optional[Tuple[float, float]] = None
+        self._prev2_totals: Optional[Tuple[float, float]] = None
+        self._prev_top: Optional[list] = None
+        self._delta = np.zeros(_CUM_COLUMNS, dtype=np.float64)
 
         # 冰山单检测参数
         self._iceberg_threshold = 0.5  # 波动阈值
         self._large_order_multiplier = 3.0  # 大单判定倍数
 
+    # ==================== 写入 ====================
+
+    def _write(self, book: np.ndarray, timestamp_ms: int):
+        """
+        写入一个快照并更新前缀和
+
+        Args:
+            book: [5, 2, 2] 盘口 (价格<=0的档位数量已置0)
+        """
+        h = self._max_history
+        i = self._count % h
+        self._book[i] = book
+        self._book[i + h] = book
+        self._timestamps[i] = timestamp_ms
+        self._timestamps[i + h] = timestamp_ms
+
+        volumes = book[:, _VOLUME, :]
+        bid_total, ask_total = volumes.sum(axis=0).tolist()
+        top = book[0].tolist()          # [[bid1, ask1], [bid_vol1, ask_vol1]]
+
+        # 中间快照的冰山单模式: 量较前一快照减少50%以上，随后恢复1.5倍以上
+        bid_iceberg = ask_iceberg = 0.0
+        if self._prev2_totals is not None:
+            (b0, a0), (b1, a1) = self._prev2_totals, self._prev_totals
+            bid_iceberg = float(b1 < b0 * 0.5 and bid_total > b1 * 1.5)
+            ask_iceberg = float(a1 < a0 * 0.5 and ask_total > a1 * 1.5)
+
+        # 一档队列消耗量: 同价位减少的量，或整档被吃掉 (买一下移/卖一上移)
+        bid_depleted = ask_depleted = 0.0
+        if self._prev_top is not None:
+            (bid_price, ask_price), (bid_vol, ask_vol) = top
+            (prev_bid_price, prev_ask_price), (prev_bid_vol, prev_ask_vol) = self._prev_top
+            if bid_price == prev_bid_price:
+                bid_depleted = max(prev_bid_vol - bid_vol, 0.0)
+            elif bid_price < prev_bid_price:
+                bid_depleted = prev_bid_vol
+            if ask_price == prev_ask_price:
+                ask_depleted = max(prev_ask_vol - ask_vol, 0.0)
+            elif ask_price > prev_ask_price and prev_ask_price > 0:
+                ask_depleted = prev_ask_vol
+
+        delta = self._delta
+        delta[:_C_LEVELS] = (bid_total, ask_total, bid_total * bid_total, ask_total * ask_total,
+                             bid_iceberg, ask_iceberg, bid_depleted, ask_depleted)
+        delta[_C_LEVELS:] = volumes.ravel()
+        h1 = h + 1
+        if self._count:
+            np.add(self._cum[(self._count - 1) % h1], delta, out=self._cum[self._count % h1])
+        else:
+            self._cum[0] = delta
+
+        self._prev_top = top
+        self._prev2_totals = self._prev_totals
+        self._prev_totals = (bid_total, ask_total)
+        self._count += 1
+
     def update(self, depth: L2Depth):
         """更新最新盘口"""
-        self._current_depth = depth
-        self._depth_history.append(depth)
-        if len(self._depth_history) > self._max_history:
-            self._depth_history.pop(0)
+        book = np.zeros((L2_LEVELS, 2, 2), dtype=np.float64)
+        for side, prices, volumes in ((_BID, depth.bid_prices, depth.bid_volumes),
+                                      (_ASK, depth.ask_prices, depth.ask_volumes)):
+            n = min(len(prices), len(volumes), L2_LEVELS)
+            book[:n, _PRICE, side] = prices[:n]
+            book[:n, _VOLUME, side] = volumes[:n]
+        self._write(book, depth.timestamp_ms)
 
     def update_from_tick(self, tick_data: dict):
-        """从tick数据更新"""
-        depth = L2Depth.from_ctp(tick_data)
-        self.update(depth)
+        """从tick数据更新 (直接写入数组，不创建 L2Depth)"""
+        get = tick_data.get
+        book = np.array([
+            ((get('bid_price1', 0) or 0, get('ask_price1', 0) or 0),
+             (get('bid_volume1', 0) or 0, get('ask_volume1', 0) or 0)),
+            ((get('bid_price2', 0) or 0, get('ask_price2', 0) or 0),
+             (get('bid_volume2', 0) or 0, get('ask_volume2', 0) or 0)),
+            ((get('bid_price3', 0) or 0, get('ask_price3', 0) or 0),
+             (get('bid_volume3', 0) or 0, get('ask_volume3', 0) or 0)),
+            ((get('bid_price4', 0) or 0, get('ask_price4', 0) or 0),
+             (get('bid_volume4', 0) or 0, get('ask_volume4', 0) or 0)),
+            ((get('bid_price5', 0) or 0, get('ask_price5', 0) or 0),
+             (get('bid_volume5', 0) or 0, get('ask_volume5', 0) or 0)),
+        ], dtype=np.float64)
+        # 与 L2Depth.from_ctp 一致: 无价格的档位不计量
+        book[:, _VOLUME, :] *= book[:, _PRICE, :] > 0
+        self._write(book, tick_timestamp_ms(tick_data))
+
+    # ==================== 读取 ====================
+
+    def __len__(self) -> int:
+        return min(self._count, self._max_history)
+
+    def _current(self) -> Optional[np.ndarray]:
+        """当前盘口 [5, 2, 2]，无数据返回None"""
+        if self._count == 0:
+            return None
+        return self._book[(self._count - 1) % self._max_history]
+
+    def _window_sum(self, k: int, columns) -> np.ndarray:
+        """最近k个快照的累计列之和"""
+        h1 = self._max_history + 1
+        n = self._count
+        end = self._cum[(n - 1) % h1, columns]
+        if k >= n:
+            return end.copy() if isinstance(end, np.ndarray) else end
+        return end - self._cum[(n - 1 - k) % h1, columns]
+
+    def window(self, n: Optional[int] = None) -> np.ndarray:
+        """
+        最近n个快照的盘口 (零拷贝只读视图，按时间顺序)
+
+        Returns:
+            [n, 5, 2(价格/数量), 2(买/卖)] 数组
+        """
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = (self._count - 1) % self._max_history + 1 if self._count else 0
+        if self._count > self._max_history:
+            end += self._max_history
+        view = self._book[end - n:end]
+        view.flags.writeable = False
+        return view
 
     def get_obi(self) -> float:
         """
@@ -114,17 +262,30 @@ class L2DepthBuffer:
         Returns:
             OBI值，范围[-1, 1]
         """
-        if not self._current_depth:
+        if self._prev_totals is None:
             return 0.0
 
-        bid_vol = sum(self._current_depth.bid_volumes)
-        ask_vol = sum(self._current_depth.ask_volumes)
+        bid_vol, ask_vol = self._prev_totals
 
         if bid_vol + ask_vol == 0:
             return 0.0
 
         return (bid_vol - ask_vol) / (bid_vol + ask_vol)
 
+    def get_weighted_obi(self) -> float:
+        """
+        加权多档OBI
+
+        OBI_w = Σ w_i (bid_vol_i - ask_vol_i) / Σ w_i (bid_vol_i + ask_vol_i)
+        """
+        book = self._current()
+        if book is None:
+            return 0.0
+        bid = self._weights @ book[:, _VOLUME, _BID]
+        ask = self._weights @ book[:, _VOLUME, _ASK]
+        total = bid + ask
+        return float((bid - ask) / total) if total > 0 else 0.0
+
     def get_spread(self) -> float:
         """
         计算买卖价差
@@ -132,13 +293,11 @@ class L2DepthBuffer:
         Returns:
             价差 (ask1 - bid1)
         """
-        if not self._current_depth:
+        book = self._current()
+        if book is None or book[0, _PRICE, _BID] <= 0 or book[0, _PRICE, _ASK] <= 0:
             return 0.0
 
-        if not self._current_depth.ask_prices or not self._current_depth.bid_prices:
-            return 0.0
-
-        return self._current_depth.ask_prices[0] - self._current_depth.bid_prices[0]
+        return float(book[0, _PRICE, _ASK] - book[0, _PRICE, _BID])
 
     def get_mid_price(self) -> float:
         """
@@ -147,13 +306,94 @@ class L2DepthBuffer:
         Returns:
             中间价 (ask1 + bid1) / 2
         """
-        if not self._current_depth:
+        book = self._current()
+        if book is None or book[0, _PRICE, _BID] <= 0 or book[0, _PRICE, _ASK] <= 0:
             return 0.0
 
-        if not self._current_depth.ask_prices or not self._current_depth.bid_prices:
+        return float(book[0, _PRICE, _ASK] + book[0, _PRICE, _BID]) / 2
+
+    def get_microprice(self) -> float:
+        """
+        微观价格 (按一档挂单量加权)
+
+        microprice = (bid1 × ask_vol1 + ask1 × bid_vol1) / (bid_vol1 + ask_vol1)
+        一档量均为0时退化为中间价
+        """
+        mid = self.get_mid_price()
+        if mid == 0.0:
             return 0.0
+        book = self._current()
+        bid_price, ask_price = book[0, _PRICE]
+        bid_vol, ask_vol = book[0, _VOLUME]
+        total = bid_vol + ask_vol
+        if total <= 0:
+            return mid
+        return float((bid_price * ask_vol + ask_price * bid_vol) / total)
+
+    def get_depth_slope(self) -> Dict[str, float]:
+        """
+        深度斜率: 累计挂单量对"离中间价距离"的最小二乘斜率
+
+        斜率大表示远档挂单厚、价格冲击成本高
+
+        Returns:
+            {'bid_depth_slope', 'ask_depth_slope'}
+        """
+        mid = self.get_mid_price()
+        if mid == 0.0:
+            return {'bid_depth_slope': 0.0, 'ask_depth_slope': 0.0}
+        book = self._current()
+        prices = book[:, _PRICE, :]
+        valid = prices > 0
+        distance = np.abs(prices - mid)
+        cum_volume = np.cumsum(book[:, _VOLUME, :], axis=0)
+
+        n = valid.sum(axis=0)
+        safe_n = np.maximum(n, 1)
+        x_mean = np.where(valid, distance, 0.0).sum(axis=0) / safe_n
+        y_mean = np.where(valid, cum_volume, 0.0).sum(axis=0) / safe_n
+        dx = np.where(valid, distance - x_mean, 0.0)
+        sxx = (dx * dx).sum(axis=0)
+        sxy = (dx * (cum_volume - y_mean)).sum(axis=0)
+        slope = np.divide(sxy, sxx, out=np.zeros(2), where=(n >= 2) & (sxx > 0))
+        return {'bid_depth_slope': float(slope[_BID]), 'ask_depth_slope': float(slope[_ASK])}
+
+    def get_depletion_rates(self) -> Dict[str, float]:
+        """
+        一档队列消耗速率 (最近 depletion_window 个快照)
+
+        Returns:
+            - bid/ask_depletion_per_tick: 平均每个快照被消耗的挂单量
+            - bid/ask_depletion_per_sec: 按快照时间戳折算的每秒消耗量 (无时间戳为0)
+        """
+        k = min(self._depletion_window, len(self) - 1)
+        if k <= 0:
+            return {'bid_depletion_per_tick': 0.0, 'ask_depletion_per_tick': 0.0,
+                    'bid_depletion_per_sec': 0.0, 'ask_depletion_per_sec': 0.0}
+        bid, ask = self._window_sum(k, slice(_C_BID_DEPLETED, _C_ASK_DEPLETED + 1)).tolist()
+        h = self._max_history
+        elapsed_ms = int(self._timestamps[(self._count - 1) % h]
+                         - self._timestamps[(self._count - 1 - k) % h])
+        per_sec = 1000.0 / elapsed_ms if elapsed_ms > 0 else 0.0
+        return {
+            'bid_depletion_per_tick': bid / k,
+            'ask_depletion_per_tick': ask / k,
+            'bid_depletion_per_sec': bid * per_sec,
+            'ask_depletion_per_sec': ask * per_sec,
+        }
 
-        return (self._current_depth.ask_prices[0] + self._current_depth.bid_prices[0]) / 2
+    def get_level_means(self, n: Optional[int] = None) -> np.ndarray:
+        """
+        最近n个快照各档平均挂单量
+
+        Returns:
+            [5, 2(买/卖)] 数组
+        """
+        n = len(self) if n is None else min(n, len(self))
+        if n == 0:
+            return np.zeros((L2_LEVELS, 2))
+        sums = self._window_sum(n, slice(_C_LEVELS, _CUM_COLUMNS))
+        return (sums / n).reshape(L2_LEVELS, 2)
 
     def detect_iceberg(self) -> Dict[str, any]:
         """
@@ -168,7 +408,8 @@ class L2DepthBuffer:
         Returns:
             冰山单检测结果字典
         """
-        if len(self._depth_history) < 10:
+        w = self.ICEBERG_WINDOW
+        if len(self) < w:
             return {
                 'has_bid_iceberg': False,
                 'has_ask_iceberg': False,
@@ -178,15 +419,10 @@ class L2DepthBuffer:
                 'ask_iceberg_count': 0
             }
 
-        recent_depths = self._depth_history[-10:]
-
-        bid_vols = [sum(d.bid_volumes) for d in recent_depths]
-        ask_vols = [sum(d.ask_volumes) for d in recent_depths]
-
-        bid_mean = np.mean(bid_vols) if bid_vols else 0
-        ask_mean = np.mean(ask_vols) if ask_vols else 0
-        bid_std = np.std(bid_vols) if len(bid_vols) > 1 else 0
-        ask_std = np.std(ask_vols) if len(ask_vols) > 1 else 0
+        sums = self._window_sum(w, slice(_C_BID_TOTAL, _C_ASK_TOTAL_SQ + 1))
+        bid_mean, ask_mean = sums[_C_BID_TOTAL] / w, sums[_C_ASK_TOTAL] / w
+        bid_std = np.sqrt(max(sums[_C_BID_TOTAL_SQ] / w - bid_mean * bid_mean, 0.0))
+        ask_std = np.sqrt(max(sums[_C_ASK_TOTAL_SQ] / w - ask_mean * ask_mean, 0.0))
 
         # 波动大可能有冰山单
         has_bid_iceberg = bid_std > bid_mean * self._iceberg_threshold if bid_mean > 0 else False
@@ -196,24 +432,16 @@ class L2DepthBuffer:
         bid_strength = bid_std / (bid_mean + 1) if bid_mean > 0 else 0
         ask_strength = ask_std / (ask_mean + 1) if ask_mean > 0 else 0
 
-        # 统计冰山单次数 (量突然减少又恢复)
-        bid_iceberg_count = 0
-        ask_iceberg_count = 0
-
-        for i in range(1, len(bid_vols) - 1):
-            # 量突然减少50%以上，然后恢复
-            if bid_vols[i] < bid_vols[i-1] * 0.5 and bid_vols[i+1] > bid_vols[i] * 1.5:
-                bid_iceberg_count += 1
-            if ask_vols[i] < ask_vols[i-1] * 0.5 and ask_vols[i+1] > ask_vols[i] * 1.5:
-                ask_iceberg_count += 1
+        # 统计冰山单次数 (量突然减少又恢复): 窗口内中间快照的模式标记记在其后一个快照上
+        bid_count, ask_count = self._window_sum(w - 2, slice(_C_BID_ICEBERG, _C_ASK_ICEBERG + 1))
 
         return {
-            'has_bid_iceberg': has_bid_iceberg,
-            'has_ask_iceberg': has_ask_iceberg,
+            'has_bid_iceberg': bool(has_bid_iceberg),
+            'has_ask_iceberg': bool(has_ask_iceberg),
             'bid_iceberg_strength': float(bid_strength),
             'ask_iceberg_strength': float(ask_strength),
-            'bid_iceberg_count': bid_iceberg_count,
-            'ask_iceberg_count': ask_iceberg_count
+            'bid_iceberg_count': int(round(bid_count)),
+            'ask_iceberg_count': int(round(ask_count))
         }
 
     def detect_large_order(self) -> Dict[str, any]:
@@ -225,7 +453,8 @@ class L2DepthBuffer:
         Returns:
             大单检测结果字典
         """
-        if len(self._depth_history) < 20:
+        w = self.LARGE_ORDER_WINDOW
+        if len(self) < w:
             return {
                 'has_large_bid': False,
                 'has_large_ask': False,
@@ -234,18 +463,13 @@ class L2DepthBuffer:
                 'large_order_imbalance': 0.0
             }
 
-        recent_depths = self._depth_history[-20:]
-
-        # 计算历史均值
-        bid_vols = [sum(d.bid_volumes) for d in recent_depths[:-1]]
-        ask_vols = [sum(d.ask_volumes) for d in recent_depths[:-1]]
-
-        bid_mean = np.mean(bid_vols) if bid_vols else 0
-        ask_mean = np.mean(ask_vols) if ask_vols else 0
-
         # 当前量
-        current_bid = sum(self._current_depth.bid_volumes) if self._current_depth else 0
-        current_ask = sum(self._current_depth.ask_volumes) if self._current_depth else 0
+        current_bid, current_ask = self._prev_totals
+
+        # 计算历史均值 (窗口内除当前快照外)
+        bid_sum, ask_sum = self._window_sum(w, slice(_C_BID_TOTAL, _C_ASK_TOTAL + 1)).tolist()
+        bid_mean = (bid_sum - current_bid) / (w - 1)
+        ask_mean = (ask_sum - current_ask) / (w - 1)
 
         # 大单判定
         threshold_bid = bid_mean * self._large_order_multiplier
@@ -261,8 +485,8 @@ class L2DepthBuffer:
         return {
             'has_large_bid': has_large_bid,
             'has_large_ask': has_large_ask,
-            'large_bid_volume': current_bid if has_large_bid else 0,
-            'large_ask_volume': current_ask if has_large_ask else 0,
+            'large_bid_volume': int(current_bid) if has_large_bid else 0,
+            'large_ask_volume': int(current_ask) if has_large_ask else 0,
             'large_order_imbalance': float(imbalance)
         }
 
@@ -295,22 +519,44 @@ class L2DepthBuffer:
         features['large_order_imbalance'] = large['large_order_imbalance']
 
         # 深度特征
-        if self._current_depth:
-            features['bid_depth_total'] = float(sum(self._current_depth.bid_volumes))
-            features['ask_depth_total'] = float(sum(self._current_depth.ask_volumes))
+        if self._prev_totals is not None:
+            features['bid_depth_total'], features['ask_depth_total'] = self._prev_totals
             features['depth_ratio'] = features['bid_depth_total'] / (features['ask_depth_total'] + 1)
         else:
             features['bid_depth_total'] = 0.0
             features['ask_depth_total'] = 0.0
             features['depth_ratio'] = 1.0
 
+        # 多档特征
+        features['weighted_obi'] = self.get_weighted_obi()
+        features['microprice'] = self.get_microprice()
+        features.update(self.get_depth_slope())
+        depletion = self.get_depletion_rates()
+        features['bid_depletion_rate'] = depletion['bid_depletion_per_tick']
+        features['ask_depletion_rate'] = depletion['ask_depletion_per_tick']
+
         return features
 
     def get_snapshot(self) -> Optional[L2Depth]:
-        """获取当前快照"""
-        return self._current_depth
+        """获取当前快照 (按需由数组重建)"""
+        book = self._current()
+        if book is None:
+            return None
+        depth = L2Depth(timestamp_ms=int(self._timestamps[(self._count - 1) % self._max_history]))
+        for level in range(L2_LEVELS):
+            bid_price, ask_price = book[level, _PRICE].tolist()
+            bid_vol, ask_vol = book[level, _VOLUME].tolist()
+            if bid_price > 0:
+                depth.bid_prices.append(bid_price)
+                depth.bid_volumes.append(int(bid_vol))
+            if ask_price > 0:
+                depth.ask_prices.append(ask_price)
+                depth.ask_volumes.append(int(ask_vol))
+        return depth
 
     def clear(self):
         """清空缓存"""
-        self._current_depth = None
-        self._depth_history.clear()
+        self._count = 0
+        self._prev_totals = None
+        self._prev2_totals = None
+        self._prev_top = None
@@ -0,0 +1,318 @@
+"""
+标准化行情Tick
+MdGateway 每次行情回调只构建一次，所有下游模块共享同一个对象
+
+功能:
+- __slots__ 定长记录，字段名与原行情字典一致
+- 兼容字典读取 (get / [] / in / keys)，现有 tick_data.get(...) 代码无需修改
+- epoch_ns 由按交易日缓存的时间基准计算，夜盘跨午夜正确归属自然日
+- 热路径不解析字符串: UpdateTime 按字符串缓存为当日偏移
+- ticks_from_records: 由环形缓冲批量读取的结构化数组构建 (见 ctp_api/md_ring.py)
+
+时间约定: epoch按交易所本地墙钟 (北京时间) 当作UTC计算，与 bar_aggregator 一致
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+
+_NS_PER_SEC = 1_000_000_000
+_NS_PER_MS = 1_000_000
+_DAY_NS = 86_400 * _NS_PER_SEC
+_EPOCH = datetime(1970, 1, 1)
+
+# 行情字段 (顺序与 CTPMdApi.on_rtn_depth_market_data 回调参数一致)
+MARKET_TICK_FIELDS: Tuple[str, ...] = (
+    'instrument_id', 'exchange_id',
+    'last_price', 'pre_settlement_price', 'pre_close_price', 'pre_open_interest',
+    'open_price', 'highest_price', 'lowest_price',
+    'volume', 'turnover', 'open_interest',
+    'close_price', 'settlement_price',
+    'upper_limit_price', 'lower_limit_price',
+    'bid_price1', 'bid_volume1', 'ask_price1', 'ask_volume1',
+    'bid_price2', 'bid_volume2', 'ask_price2', 'ask_volume2',
+    'bid_price3', 'bid_volume3', 'ask_price3', 'ask_volume3',
+    'bid_price4', 'bid_volume4', 'ask_price4', 'ask_volume4',
+    'bid_price5', 'bid_volume5', 'ask_price5', 'ask_volume5',
+    'average_price',
+    'update_time', 'update_millisec',
+    'trading_day', 'action_day',
+)
+
+# 派生字段: 可通过 get / [] 读取，但不参与 to_dict 之外的存储
+_DERIVED_FIELDS = ('epoch_ns', 'epoch_ms', 'timestamp', 'datetime')
+_KEYS = frozenset(MARKET_TICK_FIELDS + _DERIVED_FIELDS)
+
+
+def format_epoch_ns(epoch_ns: int) -> str:
+    """整数纳秒epoch -> ISO时间字符串 (毫秒精度)"""
+    dt = _EPOCH + timedelta(microseconds=epoch_ns // 1000)
+    return dt.isoformat(timespec='milliseconds')
+
+
+def tick_timestamp_ms(tick_data) -> int:
+    """
+    取tick的毫秒时间戳，无时间信息时返回0
+
+    Args:
+        tick_data: MarketTick 或行情字典 (epoch_ns 优先，其次秒级 timestamp)
+    """
+    epoch_ns = tick_data.get('epoch_ns')
+    if epoch_ns:
+        return epoch_ns // _NS_PER_MS
+    timestamp = tick_data.get('timestamp')
+    return int(timestamp * 1000) if timestamp else 0
+
+
+class TradingDayClock:
+    """
+    交易日时间基准缓存
+
+    每个交易日只计算一次日盘/夜盘的零点基准，
+    之后每个tick只做一次 UpdateTime 字典查找 + 整数加法。
+
+    夜盘归属规则 (不依赖各交易所不一致的 ActionDay):
+    - UpdateTime >= 18:00: 交易日前一个工作日的夜盘
+    - UpdateTime < 06:00: 夜盘跨午夜部分，前一个工作日的次日
+    - 其余: 交易日当天日盘
+    """
+
+    # 单交易日内不同 UpdateTime 的数量有上限 (按秒计不超过86400)
+    MAX_CACHE = 90_000
+
+    def __init__(self):
+        # (交易日, 日盘零点ns, 夜盘零点相对日盘零点的偏移(负数), UpdateTime -> 偏移缓存)
+        # 切换交易日时整体替换为新元组 (一次赋值)，多个行情线程共用时不会读到新旧混合的基准
+        self._state: tuple = (None, 0, 0, {})
+
+    @property
+    def trading_day(self) -> Optional[str]:
+        return self._state[0]
+
+    def set_trading_day(self, trading_day: str):
+        """
+        切换交易日，重建时间基准
+
+        Args:
+            trading_day: 交易日 YYYYMMDD
+        """
+        if trading_day != self._state[0]:
+            self._state = self._make_state(trading_day)
+
+    @staticmethod
+    def _make_state(trading_day: str) -> tuple:
+        day = datetime(int(trading_day[:4]), int(trading_day[4:6]), int(trading_day[6:8]))
+        # 夜盘属于前一个工作日 (周一的夜盘在上周五晚)
+        night = day - timedelta(days=1)
+        while night.weekday() >= 5:
+            night -= timedelta(days=1)
+        return (trading_day, (day - _EPOCH).days * _DAY_NS, (night - day).days * _DAY_NS, {})
+
+    def _offset_ns(self, state: tuple, update_time: str) -> int:
+        """UpdateTime 相对交易日零点的纳秒偏移 (未命中缓存时解析一次)"""
+        night_offset_ns, offsets = state[2], state[3]
+        hour = int(update_time[:2])
+        seconds = hour * 3600 + int(update_time[3:5]) * 60 + int(update_time[6:8])
+        offset = seconds * _NS_PER_SEC
+        if hour >= 18:
+            offset += night_offset_ns
+        elif hour < 6:
+            offset += night_offset_ns + _DAY_NS
+        if len(offsets) >= self.MAX_CACHE:
+            offsets.clear()
+        offsets[update_time] = offset
+        return offset
+
+    def epoch_ns(self, trading_day: str, update_time: str, update_millisec: int) -> int:
+        """
+        计算tick的整数纳秒时间戳
+
+        Args:
+            trading_day: 交易日 YYYYMMDD
+            update_time: 最后修改时间 HH:MM:SS
+            update_millisec: 最后修改毫秒
+        """
+        state = self._state
+        if trading_day != state[0]:
+            if not trading_day:
+                return 0
+            # 本tick使用自己构建的基准，不再读回 self._state (其他线程可能同时切换)
+            self._state = state = self._make_state(trading_day)
+        offset = state[3].get(update_time)
+        if offset is None:
+            if not update_time:
+                return 0
+            offset = self._offset_ns(state, update_time)
+        return state[1] + offset + update_millisec * _NS_PER_MS
+
+
+class MarketTick:
+    """
+    标准化行情Tick
+
+    字段与 MdGateway 原行情字典相同，额外提供:
+    - epoch_ns: 整数纳秒时间戳 (本地墙钟)
+    - epoch_ms / timestamp / datetime: 由 epoch_ns 派生，按需计算
+    """
+
+    __slots__ = MARKET_TICK_FIELDS + ('epoch_ns', '_datetime')
+
+    def __init__(self, instrument_id, exchange_id,
+                 last_price, pre_settlement_price,
+                 pre_close_price, pre_open_interest,
+                 open_price, highest_price, lowest_price,
+                 volume, turnover, open_interest,
+                 close_price, settlement_price,
+                 upper_limit_price, lower_limit_price,
+                 bid_price1, bid_volume1, ask_price1, ask_volume1,
+                 bid_price2, bid_volume2, ask_price2, ask_volume2,
+                 bid_price3, bid_volume3, ask_price3, ask_volume3,
+                 bid_price4, bid_volume4, ask_price4, ask_volume4,
+                 bid_price5, bid_volume5, ask_price5, ask_volume5,
+                 average_price,
+                 update_time, update_millisec,
+                 trading_day, action_day,
+                 epoch_ns: int = 0):
+        self.instrument_id = instrument_id
+        self.exchange_id = exchange_id
+        self.last_price = last_price
+        self.pre_settlement_price = pre_settlement_price
+        self.pre_close_price = pre_close_price
+        self.pre_open_interest = pre_open_interest
+        self.open_price = open_price
+        self.highest_price = highest_price
+        self.lowest_price = lowest_price
+        self.volume = volume
+        self.turnover = turnover
+        self.open_interest = open_interest
+        self.close_price = close_price
+        self.settlement_price = settlement_price
+        self.upper_limit_price = upper_limit_price
+        self.lower_limit_price = lower_limit_price
+        self.bid_price1 = bid_price1
+        self.bid_volume1 = bid_volume1
+        self.ask_price1 = ask_price1
+        self.ask_volume1 = ask_volume1
+        self.bid_price2 = bid_price2
+        self.bid_volume2 = bid_volume2
+        self.ask_price2 = ask_price2
+        self.ask_volume2 = ask_volume2
+        self.bid_price3 = bid_price3
+        self.bid_volume3 = bid_volume3
+        self.ask_price3 = ask_price3
+        self.ask_volume3 = ask_volume3
+        self.bid_price4 = bid_price4
+        self.bid_volume4 = bid_volume4
+        self.ask_price4 = ask_price4
+        self.ask_volume4 = ask_volume4
+        self.bid_price5 = bid_price5
+        self.bid_volume5 = bid_volume5
+        self.ask_price5 = ask_price5
+        self.ask_volume5 = ask_volume5
+        self.average_price = average_price
+        self.update_time = update_time
+        self.update_millisec = update_millisec
+        self.trading_day = trading_day
+        self.action_day = action_day
+        self.epoch_ns = epoch_ns
+        self._datetime = None
+
+    @classmethod
+    def from_dict(cls, data: dict, clock: Optional[TradingDayClock] = None) -> 'MarketTick':
+        """
+        由行情字典构建 (缺失字段补0/空串)
+
+        Args:
+            data: 行情字典
+            clock: 交易日时钟，提供时按 trading_day/update_time 计算 epoch_ns
+        """
+        values = [data.get(name, '' if name in _STR_FIELDS else 0) for name in MARKET_TICK_FIELDS]
+        tick = cls(*values, epoch_ns=int(data.get('epoch_ns', 0) or 0))
+        if not tick.epoch_ns and clock is not None:
+            tick.epoch_ns = clock.epoch_ns(tick.trading_day, tick.update_time, tick.update_millisec)
+        return tick
+
+    # ==================== 派生字段 ====================
+
+    @property
+    def epoch_ms(self) -> int:
+        return self.epoch_ns // _NS_PER_MS
+
+    @property
+    def timestamp(self) -> float:
+        """秒级时间戳 (与 L1Snapshot.timestamp_ms 等旧接口兼容)"""
+        return self.epoch_ns / _NS_PER_SEC
+
+    @property
+    def datetime(self) -> str:
+        """ISO时间字符串，首次访问时格式化"""
+        if self._datetime is None:
+            self._datetime = format_epoch_ns(self.epoch_ns) if self.epoch_ns else ''
+        return self._datetime
+
+    # ==================== 字典兼容 ====================
+
+    def get(self, key: str, default=None):
+        if key in _KEYS:
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key: str):
+        if key in _KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return key in _KEYS
+
+    def keys(self):
+        return MARKET_TICK_FIELDS + ('epoch_ns',)
+
+    def to_dict(self) -> dict:
+        """转为普通字典 (用于JSON序列化/跨线程快照)"""
+        result = {name: getattr(self, name) for name in MARKET_TICK_FIELDS}
+        result['epoch_ns'] = self.epoch_ns
+        result['datetime'] = self.datetime
+        return result
+
+    def __repr__(self) -> str:
+        return (f"MarketTick({self.instrument_id} {self.datetime} last={self.last_price} "
+                f"bid={self.bid_price1}x{self.bid_volume1} ask={self.ask_price1}x{self.ask_volume1})")
+
+
+_STR_FIELDS = frozenset(('instrument_id', 'exchange_id', 'update_time', 'trading_day', 'action_day'))
+
+
+def _decode_column(column) -> list:
+    """定长字节串列 -> str 列表 (ASCII 整列解码，失败时逐个按GBK解码)"""
+    try:
+        return column.astype(f'U{column.dtype.itemsize}').tolist()
+    except UnicodeDecodeError:
+        return [value.decode('gbk', errors='replace') for value in column.tolist()]
+
+
+def ticks_from_records(records, clock: TradingDayClock, min_trading_day: str = '') -> List[MarketTick]:
+    """
+    环形缓冲记录批量转换为 MarketTick
+
+    逐列整体转换为Python对象后再按行构建，避免逐字段访问结构化数组
+
+    Args:
+        records: 包含 MARKET_TICK_FIELDS 各字段的 NumPy 结构化数组
+        clock: 交易日时钟 (计算 epoch_ns)
+        min_trading_day: 交易日下限 (登录交易日，规则同 MdGateway 回调模式)
+    """
+    columns = [
+        _decode_column(records[name]) if records.dtype[name].kind == 'S' else records[name].tolist()
+        for name in MARKET_TICK_FIELDS
+    ]
+    epoch_ns = clock.epoch_ns
+    ticks = []
+    for row in zip(*columns):
+        tick = MarketTick(*row)
+        trading_day = tick.trading_day
+        if trading_day < min_trading_day:
+            tick.trading_day = trading_day = min_trading_day
+        tick.epoch_ns = epoch_ns(trading_day, tick.update_time, tick.update_millisec)
+        ticks.append(tick)
+    return ticks
@@ -4,15 +4,18 @@
 
 功能:
 - 缓存最近120个tick (约60秒，每500ms一个)
-- 自动滚动窗口 (deque实现)
+- 自动滚动窗口 (预分配NumPy列式环形缓冲，零拷贝窗口视图)
 - 提取68个聚合特征用于策略计算
+- 可选增量模式: add_tick 时更新滑动统计量，特征读取为常数时间
 """
 
-from collections import deque
 from dataclasses import dataclass, asdict
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 import numpy as np
 
+from .tick_features import IncrementalTickFeatures
+from .market_tick import format_epoch_ns
+
 
 @dataclass
 class TickData:
@@ -52,50 +55,139 @@ class TickData:
         )
 
 
+# 列式存储字段 (TickData 中除 datetime 外的数值字段)
+TICK_FIELDS = (
+    'last_price', 'bid_price1', 'bid_volume1', 'ask_price1', 'ask_volume1',
+    'volume', 'turnover', 'open_interest', 'pre_close', 'upper_limit', 'lower_limit'
+)
+_FIELD_INDEX = {name: i for i, name in enumerate(TICK_FIELDS)}
+_INT_FIELDS = ('bid_volume1', 'ask_volume1', 'volume')
+
+
 class TickCache:
     """
     实时Tick缓存
 
     来源: order_flow_imbalance.py 的 IMB计算逻辑
+
+    存储: 预分配 [2 * maxlen, 字段数] 的 float64 环形缓冲，每行同时写入
+    i 和 i + maxlen 两个位置，任意时刻窗口都是一段连续切片，
+    view()/window() 按时间顺序零拷贝返回
     """
 
-    def __init__(self, maxlen: int = 120):
+    def __init__(self, maxlen: int = 120, incremental: bool = False):
         """
         Args:
             maxlen: 缓存最大长度，默认120个tick (~60秒)
+            incremental: 是否启用增量特征引擎 (多合约高频调用 extract_features 时使用)
         """
         self.maxlen = maxlen
-        self._buffer: deque = deque(maxlen=maxlen)
+        self._data = np.zeros((2 * maxlen, len(TICK_FIELDS)), dtype=np.float64)
+        # 时间: 字符串或 MarketTick.epoch_ns (重建 TickData 时才格式化)
+        self._datetimes: List[Union[str, int]] = [''] * maxlen
+        self._count: int = 0     # 累计写入行数
+        self._size: int = 0      # 当前窗口长度
         self._last_volume: int = 0
+        self._engine: Optional[IncrementalTickFeatures] = (
+            IncrementalTickFeatures(maxlen) if incremental else None
+        )
+
+    def _append_row(self, row: tuple, dt: Union[str, int]):
+        """写入一行 (按 TICK_FIELDS 顺序)"""
+        i = self._count % self.maxlen
+        self._data[i] = row
+        self._data[i + self.maxlen] = row
+        self._datetimes[i] = dt
+        self._count += 1
+        if self._size < self.maxlen:
+            self._size += 1
+        if self._engine is not None:
+            # row: last, bid_p, bid_v, ask_p, ask_v, volume, ...
+            self._engine.add(row[0], row[5], row[2], row[4], row[1], row[3])
 
     def add_tick(self, tick: TickData):
         """添加tick到缓存"""
-        self._buffer.append(tick)
+        self._append_row((
+            tick.last_price, tick.bid_price1, tick.bid_volume1, tick.ask_price1,
+            tick.ask_volume1, tick.volume, tick.turnover, tick.open_interest,
+            tick.pre_close, tick.upper_limit, tick.lower_limit
+        ), tick.datetime)
 
     def add_from_ctp(self, ctp_tick: dict):
-        """从CTP原始数据添加"""
-        tick = TickData.from_ctp(ctp_tick)
-        self.add_tick(tick)
+        """从CTP原始数据添加 (直接写入列存储，不创建TickData)"""
+        get = ctp_tick.get
+        self._append_row((
+            get('last_price', 0.0), get('bid_price1', 0.0), get('bid_volume1', 0),
+            get('ask_price1', 0.0), get('ask_volume1', 0), get('volume', 0),
+            get('turnover', 0.0), get('open_interest', 0.0), get('pre_close', 0.0),
+            get('upper_limit', 0.0), get('lower_limit', 0.0)
+        ), get('epoch_ns') or get('datetime', ''))
 
     def is_ready(self) -> bool:
         """缓存是否已满"""
-        return len(self._buffer) >= self.maxlen
+        return self._size >= self.maxlen
 
     def size(self) -> int:
         """当前缓存大小"""
-        return len(self._buffer)
+        return self._size
 
     def __len__(self) -> int:
         """返回缓存大小"""
-        return len(self._buffer)
+        return self._size
+
+    def _window_slice(self) -> slice:
+        """窗口在双倍缓冲中的连续区间"""
+        end = self._count % self.maxlen
+        if self._size == self.maxlen:
+            return slice(end, end + self.maxlen)
+        return slice(0, self._size)
+
+    def window(self) -> np.ndarray:
+        """
+        按时间顺序的窗口视图 [size, len(TICK_FIELDS)]
+
+        零拷贝只读视图，后续 add_tick 会覆盖其内容，需要保留时请 copy()
+        """
+        view = self._data[self._window_slice()]
+        view.flags.writeable = False
+        return view
+
+    def view(self, field_name: str) -> np.ndarray:
+        """
+        单个字段的窗口视图 (零拷贝，按时间顺序)
+
+        Args:
+            field_name: TICK_FIELDS 中的字段名
+        """
+        view = self._data[self._window_slice(), _FIELD_INDEX[field_name]]
+        view.flags.writeable = False
+        return view
+
+    def _tick_at(self, ring_index: int) -> TickData:
+        """由环形下标重建 TickData"""
+        row = self._data[ring_index].tolist()
+        values = dict(zip(TICK_FIELDS, row))
+        for name in _INT_FIELDS:
+            values[name] = int(values[name])
+        dt = self._datetimes[ring_index]
+        if isinstance(dt, int):
+            dt = format_epoch_ns(dt)
+        return TickData(datetime=dt, **values)
 
     def get_ticks(self) -> List[TickData]:
-        """获取所有缓存的tick"""
-        return list(self._buffer)
+        """
+        获取所有缓存的tick
+
+        兼容接口: 调用时才按需重建 TickData 对象
+        """
+        start = self._window_slice().start
+        return [self._tick_at((start + k) % self.maxlen) for k in range(self._size)]
 
     def get_latest(self) -> Optional[TickData]:
         """获取最新tick"""
-        return self._buffer[-1] if self._buffer else None
+        if self._size == 0:
+            return None
+        return self._tick_at((self._count - 1) % self.maxlen)
 
     def calculate_imb(self) -> float:
         """
@@ -107,15 +199,11 @@ class TickCache:
         Returns:
             IMB值，范围[-1, 1]
         """
-        if len(self._buffer) < 2:
+        if self._size < 2:
             return 0.0
 
-        ticks = list(self._buffer)
-        bid_vols = [t.bid_volume1 for t in ticks]
-        ask_vols = [t.ask_volume1 for t in ticks]
-
-        total_bid = sum(bid_vols)
-        total_ask = sum(ask_vols)
+        total_bid = float(self.view('bid_volume1').sum())
+        total_ask = float(self.view('ask_volume1').sum())
 
         if total_bid + total_ask == 0:
             return 0.0
@@ -129,11 +217,11 @@ class TickCache:
         Returns:
             标准差波动率
         """
-        if len(self._buffer) < 2:
+        if self._size < 2:
             return 0.0
 
-        prices = [t.last_price for t in self._buffer]
-        returns = np.diff(prices) / np.array(prices[:-1])
+        prices = self.view('last_price')
+        returns = np.diff(prices) / prices[:-1]
 
         return float(np.std(returns)) if len(returns) > 0 else 0.0
 
@@ -147,17 +235,25 @@ class TickCache:
         - L2深度特征 (25个): OBI, 盘口压力, 流动性等
         - 订单流特征 (10个): 买卖比, 净成交量等
         - 时间序列特征 (12个): 自相关, tick计数等
+
+        增量模式下直接读取 IncrementalTickFeatures，结果与批量实现一致
         """
         if not self.is_ready():
             return self._get_empty_features()
 
-        ticks = list(self._buffer)
-        prices = np.array([t.last_price for t in ticks])
-        volumes = np.array([t.volume for t in ticks])
-        bid_vols = np.array([t.bid_volume1 for t in ticks])
-        ask_vols = np.array([t.ask_volume1 for t in ticks])
-        bid_prices = np.array([t.bid_price1 for t in ticks])
-        ask_prices = np.array([t.ask_price1 for t in ticks])
+        if self._engine is not None:
+            return self._engine.get_features()
+
+        return self._extract_features_batch()
+
+    def _extract_features_batch(self) -> Dict[str, float]:
+        """批量计算特征 (每次从缓存全量重建数组)"""
+        prices = self.view('last_price')
+        volumes = self.view('volume')
+        bid_vols = self.view('bid_volume1')
+        ask_vols = self.view('ask_volume1')
+        bid_prices = self.view('bid_price1')
+        ask_prices = self.view('ask_price1')
 
         features = {}
 
@@ -186,9 +282,9 @@ class TickCache:
         features['volume_std'] = float(np.std(vol_diffs)) if len(vol_diffs) > 0 else 0
         features['volume_max'] = float(np.max(vol_diffs)) if len(vol_diffs) > 0 else 0
 
-        # VWAP
+        # VWAP (成交量增量对应后一个tick的价格)
         if features['volume_sum'] > 0:
-            features['vwap'] = float(np.sum(prices * vol_diffs) / features['volume_sum']) if len(vol_diffs) == len(prices) - 1 else prices[-1]
+            features['vwap'] = float(np.sum(prices[1:] * vol_diffs) / features['volume_sum'])
         else:
             features['vwap'] = float(prices[-1])
         features['vwap_distance'] = (features['price_close'] - features['vwap']) / features['vwap'] if features['vwap'] > 0 else 0
@@ -280,7 +376,7 @@ class TickCache:
         features['mean_reversion_signal'] = (features['price_close'] - features['price_mean']) / (features['price_std'] + 0.0001)
 
         # tick统计
-        features['tick_count'] = float(len(ticks))
+        features['tick_count'] = float(len(prices))
         features['zero_return_ratio'] = float(np.sum(returns == 0) / len(returns)) if len(returns) > 0 else 0
         features['positive_return_ratio'] = float(np.sum(returns > 0) / len(returns)) if len(returns) > 0 else 0
 
@@ -333,5 +429,8 @@ class TickCache:
 
     def clear(self):
         """清空缓存"""
-        self._buffer.clear()
+        self._count = 0
+        self._size = 0
         self._last_volume = 0
+        if self._engine is not None:
+            self._engine.reset()
@@ -0,0 +1,542 @@
+"""
+增量Tick特征引擎
+配合 TickCache 使用，替代每次调用都全量重算的 extract_features
+
+功能:
+- add_tick 时 O(1) 更新滑动窗口统计量 (移位幂和、单调队列极值、滚动回归和)
+- 读取全部65个特征为常数时间 (大单统计为 O(k)，k为大单笔数)
+- 定期全量重建累加量，避免长时间增删带来的浮点漂移
+- 与 TickCache 的批量实现逐特征对齐 (见 tests/test_data_cache.py)
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from math import sqrt
+from typing import Dict, List
+
+
+class RollingMoments:
+    """
+    滑动窗口矩统计
+
+    维护 x, x^2, x^3, x^4 的幂和，支持加入/移出，
+    调用方负责对数值做移位 (减去参考值) 以降低抵消误差
+    """
+
+    __slots__ = ('n', 's1', 's2', 's3', 's4')
+
+    def __init__(self):
+        self.n = 0
+        self.s1 = 0.0
+        self.s2 = 0.0
+        self.s3 = 0.0
+        self.s4 = 0.0
+
+    def add(self, x: float):
+        x2 = x * x
+        self.n += 1
+        self.s1 += x
+        self.s2 += x2
+        self.s3 += x2 * x
+        self.s4 += x2 * x2
+
+    def remove(self, x: float):
+        x2 = x * x
+        self.n -= 1
+        self.s1 -= x
+        self.s2 -= x2
+        self.s3 -= x2 * x
+        self.s4 -= x2 * x2
+
+    def mean(self) -> float:
+        return self.s1 / self.n if self.n > 0 else 0.0
+
+    def var(self) -> float:
+        """总体方差 (与 np.var 一致)"""
+        if self.n == 0:
+            return 0.0
+        m = self.s1 / self.n
+        v = self.s2 / self.n - m * m
+        return v if v > 0 else 0.0
+
+    def std(self) -> float:
+        return sqrt(self.var())
+
+    def skew(self) -> float:
+        """偏度 (总体矩)"""
+        if self.n == 0:
+            return 0.0
+        n = self.n
+        m = self.s1 / n
+        m2 = self.s2 / n - m * m
+        if m2 <= 0:
+            return 0.0
+        m3 = self.s3 / n - 3 * m * self.s2 / n + 2 * m ** 3
+        return m3 / m2 ** 1.5
+
+    def kurt(self) -> float:
+        """超额峰度 (总体矩)"""
+        if self.n == 0:
+            return 0.0
+        n = self.n
+        m = self.s1 / n
+        m2 = self.s2 / n - m * m
+        if m2 <= 0:
+            return 0.0
+        m4 = (self.s4 / n - 4 * m * self.s3 / n
+              + 6 * m * m * self.s2 / n - 3 * m ** 4)
+        return m4 / (m2 * m2) - 3
+
+    def reset(self):
+        self.n = 0
+        self.s1 = self.s2 = self.s3 = self.s4 = 0.0
+
+
+class RollingExtremum:
+    """
+    滑动窗口极值 (单调队列)
+
+    元素按全局序号入队，序号小于窗口起点的元素惰性出队
+    """
+
+    __slots__ = ('_dq', '_is_max')
+
+    def __init__(self, is_max: bool = True):
+        self._dq: deque = deque()
+        self._is_max = is_max
+
+    def push(self, seq: int, x: float):
+        dq = self._dq
+        if self._is_max:
+            while dq and dq[-1][1] <= x:
+                dq.pop()
+        else:
+            while dq and dq[-1][1] >= x:
+                dq.pop()
+        dq.append((seq, x))
+
+    def expire(self, min_seq: int):
+        dq = self._dq
+        while dq and dq[0][0] < min_seq:
+            dq.popleft()
+
+    def value(self) -> float:
+        return self._dq[0][1] if self._dq else 0.0
+
+    def reset(self):
+        self._dq.clear()
+
+
+class IncrementalTickFeatures:
+    """
+    增量Tick特征引擎
+
+    窗口内原始字段保存在定长环形列表中；价格类数值减去参考价
+    (pivot) 后再累加，每 resync_interval 个tick用窗口数据全量重建一次
+    """
+
+    def __init__(self, maxlen: int = 120, resync_interval: int = 0):
+        """
+        Args:
+            maxlen: 窗口长度，与 TickCache.maxlen 一致
+            resync_interval: 全量重建间隔 (tick数)，默认 50 * maxlen
+        """
+        self.maxlen = maxlen
+        self.resync_interval = resync_interval or maxlen * 50
+
+        # 环形存储: 价格, 累计成交量, 买一量, 卖一量, 买一价, 卖一价
+        self._p: List[float] = [0.0] * maxlen
+        self._v: List[float] = [0.0] * maxlen
+        self._bv: List[float] = [0.0] * maxlen
+        self._av: List[float] = [0.0] * maxlen
+        self._bp: List[float] = [0.0] * maxlen
+        self._ap: List[float] = [0.0] * maxlen
+
+        self._count = 0       # 累计加入的tick数 (全局序号)
+        self._n = 0           # 当前窗口长度
+        self._since_resync = 0
+
+        self._reset_state()
+
+    # ==================== 状态管理 ====================
+
+    def _reset_state(self):
+        """清零全部累加量 (不动环形存储)"""
+        self._pivot = 0.0
+        self._pivot_set = False
+
+        # 窗口级序列
+        self._price = RollingMoments()      # p - pivot
+        self._mid = RollingMoments()        # mid - pivot
+        self._spread = RollingMoments()
+        self._imb = RollingMoments()
+        self._price_max = RollingExtremum(True)
+        self._price_min = RollingExtremum(False)
+        self._imb_max = RollingExtremum(True)
+        self._imb_min = RollingExtremum(False)
+        self._spread_max = RollingExtremum(True)
+        self._spread_min = RollingExtremum(False)
+        self._bid_sum = 0.0
+        self._ask_sum = 0.0
+        self._liq_bid_sum = 0.0
+        self._liq_ask_sum = 0.0
+        self._price_trend = 0.0             # Σ k * (p_k - pivot)
+        self._price_cross1 = 0.0            # Σ y_k * y_{k+1}
+        self._price_cross5 = 0.0            # Σ y_k * y_{k+5}
+
+        # 差分序列 (元素归属于较新的tick)
+        self._ret = RollingMoments()
+        self._vdiff = RollingMoments()
+        self._vdiff_max = RollingExtremum(True)
+        self._vdiff_sorted: List[float] = []
+        self._vdiff_trend = 0.0             # Σ k * d_k
+        self._vdiff_cross1 = 0.0            # Σ d_k * d_{k+1}
+        self._pv_sum = 0.0                  # Σ p_{k+1} * d_k
+        self._up_ticks = 0
+        self._down_ticks = 0
+        self._zero_returns = 0
+        self._positive_returns = 0
+        self._buy_volume = 0.0
+        self._sell_volume = 0.0
+
+    def reset(self):
+        """清空窗口"""
+        self._count = 0
+        self._n = 0
+        self._since_resync = 0
+        self._reset_state()
+
+    def _idx(self, k: int) -> int:
+        """窗口位置k (0为最旧) 对应的环形下标"""
+        return (self._count - self._n + k) % self.maxlen
+
+    def _resync(self):
+        """用窗口内数据全量重建累加量，参考价移到最新价"""
+        n = self._n
+        rows = [(self._p[i], self._v[i], self._bv[i], self._av[i], self._bp[i], self._ap[i])
+                for i in (self._idx(k) for k in range(n))]
+        self._count -= n
+        self._n = 0
+        self._reset_state()
+        if rows:
+            self._pivot = rows[-1][0]
+            self._pivot_set = True
+        for row in rows:
+            self._append(*row)
+        self._since_resync = 0
+
+    # ==================== 更新 ====================
+
+    def add(self, last_price: float, volume: float, bid_volume: float, ask_volume: float,
+            bid_price: float, ask_price: float):
+        """加入一个tick，窗口满时先移出最旧的tick"""
+        if self._n == self.maxlen:
+            self._evict()
+        self._append(float(last_price), float(volume), float(bid_volume), float(ask_volume),
+                     float(bid_price), float(ask_price))
+        self._since_resync += 1
+        if self._since_resync >= self.resync_interval:
+            self._resync()
+
+    def _derived(self, i0: int, i1: int):
+        """相邻两个tick (环形下标) 的差分量: 收益率, 成交量增量, 价格变化"""
+        p0 = self._p[i0]
+        p1 = self._p[i1]
+        dp = p1 - p0
+        ret = dp / p0 if p0 != 0 else 0.0
+        return ret, self._v[i1] - self._v[i0], dp
+
+    def _append(self, p, v, bv, av, bp, ap):
+        if not self._pivot_set:
+            self._pivot = p
+            self._pivot_set = True
+
+        i = self._count % self.maxlen
+        self._p[i] = p
+        self._v[i] = v
+        self._bv[i] = bv
+        self._av[i] = av
+        self._bp[i] = bp
+        self._ap[i] = ap
+
+        k = self._n            # 新tick的窗口位置
+        seq = self._count
+        self._count += 1
+        self._n += 1
+
+        y = p - self._pivot
+        mid = (bp + ap) / 2
+        spread = ap - bp
+        imb = (bv - av) / (bv + av + 1)
+
+        self._price.add(y)
+        self._mid.add(mid - self._pivot)
+        self._spread.add(spread)
+        self._imb.add(imb)
+        self._price_max.push(seq, p)
+        self._price_min.push(seq, p)
+        self._imb_max.push(seq, imb)
+        self._imb_min.push(seq, imb)
+        self._spread_max.push(seq, spread)
+        self._spread_min.push(seq, spread)
+        self._bid_sum += bv
+        self._ask_sum += av
+        self._liq_bid_sum += bv * bp
+        self._liq_ask_sum += av * ap
+        self._price_trend += k * y
+        if k >= 1:
+            self._price_cross1 += (self._p[self._idx(k - 1)] - self._pivot) * y
+        if k >= 5:
+            self._price_cross5 += (self._p[self._idx(k - 5)] - self._pivot) * y
+
+        if k >= 1:
+            ret, d, dp = self._derived(self._idx(k - 1), i)
+            j = k - 1          # 差分序列中的位置
+            self._ret.add(ret)
+            self._vdiff.add(d)
+            self._vdiff_max.push(seq, d)
+            insort(self._vdiff_sorted, d)
+            self._vdiff_trend += j * d
+            self._pv_sum += p * d
+            if j >= 1:
+                _, d_prev, _ = self._derived(self._idx(k - 2), self._idx(k - 1))
+                self._vdiff_cross1 += d_prev * d
+            if dp > 0:
+                self._up_ticks += 1
+                self._buy_volume += d
+            elif dp < 0:
+                self._down_ticks += 1
+                self._sell_volume += d
+            if ret == 0:
+                self._zero_returns += 1
+            elif ret > 0:
+                self._positive_returns += 1
+
+    def _evict(self):
+        """移出窗口最旧的tick"""
+        n = self._n
+        i0 = self._idx(0)
+        p0 = self._p[i0]
+        bv, av, bp, ap = self._bv[i0], self._av[i0], self._bp[i0], self._ap[i0]
+
+        y0 = p0 - self._pivot
+        spread = ap - bp
+        imb = (bv - av) / (bv + av + 1)
+
+        # 回归和: 其余元素位置均减1
+        self._price_trend -= self._price.s1 - y0
+        if n >= 2:
+            self._price_cross1 -= y0 * (self._p[self._idx(1)] - self._pivot)
+        if n >= 6:
+            self._price_cross5 -= y0 * (self._p[self._idx(5)] - self._pivot)
+
+        self._price.remove(y0)
+        self._mid.remove((bp + ap) / 2 - self._pivot)
+        self._spread.remove(spread)
+        self._imb.remove(imb)
+        self._bid_sum -= bv
+        self._ask_sum -= av
+        self._liq_bid_sum -= bv * bp
+        self._liq_ask_sum -= av * ap
+
+        if n >= 2:
+            ret, d, dp = self._derived(i0, self._idx(1))
+            self._vdiff_trend -= self._vdiff.s1 - d
+            if n >= 3:
+                _, d_next, _ = self._derived(self._idx(1), self._idx(2))
+                self._vdiff_cross1 -= d * d_next
+            self._ret.remove(ret)
+            self._vdiff.remove(d)
+            del self._vdiff_sorted[bisect_left(self._vdiff_sorted, d)]
+            self._pv_sum -= self._p[self._idx(1)] * d
+            if dp > 0:
+                self._up_ticks -= 1
+                self._buy_volume -= d
+            elif dp < 0:
+                self._down_ticks -= 1
+                self._sell_volume -= d
+            if ret == 0:
+                self._zero_returns -= 1
+            elif ret > 0:
+                self._positive_returns -= 1
+
+        self._n -= 1
+        start = self._count - self._n
+        self._price_max.expire(start)
+        self._price_min.expire(start)
+        self._imb_max.expire(start)
+        self._imb_min.expire(start)
+        self._spread_max.expire(start)
+        self._spread_min.expire(start)
+        self._vdiff_max.expire(start + 1)
+
+    # ==================== 读取 ====================
+
+    def size(self) -> int:
+        return self._n
+
+    def _lag_corr(self, first: List[float], last: List[float], s1: float, s2: float,
+                  cross: float, n: int) -> float:
+        """
+        滞后自相关 (与 np.corrcoef(x[:-lag], x[lag:]) 一致)
+
+        Args:
+            first: 窗口最前 lag 个值
+            last: 窗口最后 lag 个值
+            s1, s2: 窗口内全部值的和与平方和
+            cross: Σ x_k * x_{k+lag}
+            n: 窗口长度
+        """
+        m = n - len(first)
+        a1 = s1 - sum(last)
+        a2 = s2 - sum(x * x for x in last)
+        b1 = s1 - sum(first)
+        b2 = s2 - sum(x * x for x in first)
+        var_a = m * a2 - a1 * a1
+        var_b = m * b2 - b1 * b1
+        if var_a <= 0 or var_b <= 0:
+            return float('nan')
+        return (m * cross - a1 * b1) / sqrt(var_a * var_b)
+
+    @staticmethod
+    def _slope(trend: float, s1: float, n: int) -> float:
+        """最小二乘斜率 (x = 0..n-1)"""
+        sx = n * (n - 1) / 2
+        sxx = (n - 1) * n * (2 * n - 1) / 6
+        denom = n * sxx - sx * sx
+        return (n * trend - sx * s1) / denom if denom != 0 else 0.0
+
+    def get_features(self) -> Dict[str, float]:
+        """
+        读取全部特征
+
+        字段与 TickCache 批量实现一致，要求窗口已满
+        """
+        n = self._n
+        nr = n - 1
+        pivot = self._pivot
+        P = self._p
+        V = self._v
+        idx = self._idx
+        f: Dict[str, float] = {}
+
+        # ========== A. 价格特征 ==========
+        p_first = P[idx(0)]
+        p_last = P[idx(n - 1)]
+        price_mean = pivot + self._price.mean()
+        price_std = self._price.std()
+        price_high = self._price_max.value()
+        price_low = self._price_min.value()
+        f['price_open'] = p_first
+        f['price_high'] = price_high
+        f['price_low'] = price_low
+        f['price_close'] = p_last
+        f['price_mean'] = price_mean
+        f['price_std'] = price_std
+        f['price_range'] = price_high - price_low
+        f['price_range_pct'] = f['price_range'] / price_mean if price_mean > 0 else 0
+
+        f['return_total'] = (p_last - p_first) / p_first if p_first > 0 else 0
+        f['return_mean'] = self._ret.mean() if nr > 0 else 0
+        f['return_std'] = self._ret.std() if nr > 0 else 0
+        f['return_skew'] = self._ret.skew() if nr > 2 and self._zero_returns < nr else 0
+        f['return_kurt'] = self._ret.kurt() if nr > 3 and self._zero_returns < nr else 0
+
+        # ========== B. 成交量特征 ==========
+        volume_sum = V[idx(n - 1)] - V[idx(0)]
+        f['volume_sum'] = volume_sum if nr > 0 else 0
+        f['volume_mean'] = self._vdiff.mean() if nr > 0 else 0
+        f['volume_std'] = self._vdiff.std() if nr > 0 else 0
+        f['volume_max'] = self._vdiff_max.value() if nr > 0 else 0
+        f['vwap'] = self._pv_sum / volume_sum if volume_sum > 0 else p_last
+        f['vwap_distance'] = (p_last - f['vwap']) / f['vwap'] if f['vwap'] > 0 else 0
+        if nr >= 20:
+            f['volume_trend'] = ((V[idx(n - 1)] - V[idx(n - 11)]) - (V[idx(10)] - V[idx(0)])) / 10
+        else:
+            f['volume_trend'] = 0
+        if nr >= 11:
+            d_last = V[idx(n - 1)] - V[idx(n - 2)]
+            d_first = V[idx(n - 10)] - V[idx(n - 11)]
+            f['volume_acceleration'] = (d_last - d_first) / 9
+        else:
+            f['volume_acceleration'] = 0
+
+        # ========== C. L2深度特征 ==========
+        total_bid = self._bid_sum
+        total_ask = self._ask_sum
+        bv_last = self._bv[idx(n - 1)]
+        av_last = self._av[idx(n - 1)]
+        f['imb_mean'] = (total_bid - total_ask) / (total_bid + total_ask + 1)
+        f['imb_last'] = (bv_last - av_last) / (bv_last + av_last + 1)
+        f['imb_std'] = self._imb.std()
+        f['imb_max'] = self._imb_max.value()
+        f['imb_min'] = self._imb_min.value()
+        f['imb_range'] = f['imb_max'] - f['imb_min']
+
+        f['depth_total'] = total_bid + total_ask
+        f['depth_bid'] = total_bid
+        f['depth_ask'] = total_ask
+        f['depth_ratio'] = total_bid / (total_ask + 1)
+
+        tail = min(n, 10)
+        f['bid_pressure'] = sum(self._bv[idx(k)] for k in range(n - tail, n)) / tail
+        f['ask_pressure'] = sum(self._av[idx(k)] for k in range(n - tail, n)) / tail
+        f['pressure_ratio'] = f['bid_pressure'] / (f['ask_pressure'] + 1)
+
+        f['spread_mean'] = self._spread.mean()
+        f['spread_std'] = self._spread.std()
+        f['spread_max'] = self._spread_max.value()
+        f['spread_min'] = self._spread_min.value()
+
+        mid_last = (self._bp[idx(n - 1)] + self._ap[idx(n - 1)]) / 2
+        f['mid_price'] = mid_last
+        f['mid_price_std'] = self._mid.std()
+        f['price_vs_mid'] = (p_last - mid_last) / mid_last if mid_last > 0 else 0
+
+        f['liquidity_bid'] = self._liq_bid_sum / n
+        f['liquidity_ask'] = self._liq_ask_sum / n
+        f['liquidity_total'] = f['liquidity_bid'] + f['liquidity_ask']
+
+        # ========== D. 订单流特征 ==========
+        f['tick_direction_ratio'] = self._up_ticks / (self._down_ticks + 1)
+        f['net_tick_direction'] = float(self._up_ticks - self._down_ticks)
+        f['buy_volume_est'] = self._buy_volume
+        f['sell_volume_est'] = self._sell_volume
+        f['net_volume'] = f['buy_volume_est'] - f['sell_volume_est']
+        f['order_flow_intensity'] = f['volume_sum'] / (self.maxlen + 1)
+        f['order_flow_imbalance'] = f['net_volume'] / (f['volume_sum'] + 1)
+
+        vol_threshold = f['volume_mean'] * 3 if f['volume_mean'] > 0 else 100
+        cut = bisect_right(self._vdiff_sorted, vol_threshold)
+        f['large_order_count'] = float(len(self._vdiff_sorted) - cut)
+        f['large_order_volume'] = float(sum(self._vdiff_sorted[cut:]))
+
+        # ========== E. 时间序列特征 ==========
+        ys = [P[idx(k)] - pivot for k in range(min(n, 5))]
+        ye = [P[idx(k)] - pivot for k in range(max(n - 5, 0), n)]
+        f['price_autocorr_1'] = (self._lag_corr(ys[:1], ye[-1:], self._price.s1, self._price.s2,
+                                                self._price_cross1, n) if n > 1 else 0.0)
+        f['price_autocorr_5'] = (self._lag_corr(ys, ye, self._price.s1, self._price.s2,
+                                                self._price_cross5, n) if n > 5 else 0.0)
+        if nr > 1:
+            d_first = V[idx(1)] - V[idx(0)]
+            d_last = V[idx(n - 1)] - V[idx(n - 2)]
+            f['volume_autocorr_1'] = self._lag_corr([d_first], [d_last], self._vdiff.s1,
+                                                    self._vdiff.s2, self._vdiff_cross1, nr)
+        else:
+            f['volume_autocorr_1'] = 0
+
+        f['price_trend'] = self._slope(self._price_trend, self._price.s1, n) if n > 1 else 0
+        f['volume_trend_slope'] = self._slope(self._vdiff_trend, self._vdiff.s1, nr) if nr > 1 else 0
+
+        f['momentum_5'] = p_last - P[idx(n - 5)] if n >= 5 else 0
+        f['momentum_10'] = p_last - P[idx(n - 10)] if n >= 10 else 0
+        f['momentum_20'] = p_last - P[idx(n - 20)] if n >= 20 else 0
+
+        f['mean_reversion_signal'] = (p_last - price_mean) / (price_std + 0.0001)
+
+        f['tick_count'] = float(n)
+        f['zero_return_ratio'] = self._zero_returns / nr if nr > 0 else 0
+        f['positive_return_ratio'] = self._positive_returns / nr if nr > 0 else 0
+
+        return f
@@ -0,0 +1,364 @@
+"""
+行情落盘与读取
+MdGateway 的行情按 交易日/合约 追加写入定长二进制文件，研究、预热与回放直接内存映射读取
+
+功能:
+- TICK_RECORD_DTYPE: 定长记录 (352字节，布局与 ctp_api/md_ring.py 的 MD_TICK_DTYPE 一致，seq 换为 epoch_ns)
+- TickRecorder: 行情回调只把 tick 放入队列 (不编码、不做IO)，
+  写盘线程按 flush_interval 成批取出，按 (交易日, 合约) 分组编码为结构化数组后一次写入
+- TickReader: np.memmap 映射一个文件，返回结构化数组，不解析、不复制；
+  写入中途中断留下的不完整尾记录被忽略
+
+文件布局: {root}/{交易日}/{合约}.tick = 64字节文件头 + N 条记录
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from operator import attrgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .market_tick import MarketTick, TradingDayClock, ticks_from_records
+except ImportError:
+    from data.market_tick import MarketTick, TradingDayClock, ticks_from_records
+
+
+TICK_FILE_MAGIC = b'CTPTICK1'
+TICK_FILE_VERSION = 1
+TICK_FILE_HEADER_SIZE = 64
+TICK_FILE_SUFFIX = '.tick'
+
+_DOUBLE_FIELDS = (
+    'last_price', 'pre_settlement_price', 'pre_close_price', 'pre_open_interest',
+    'open_price', 'highest_price', 'lowest_price',
+    'turnover', 'open_interest', 'close_price', 'settlement_price',
+    'upper_limit_price', 'lower_limit_price',
+    'bid_price1', 'ask_price1', 'bid_price2', 'ask_price2', 'bid_price3', 'ask_price3',
+    'bid_price4', 'ask_price4', 'bid_price5', 'ask_price5',
+    'average_price',
+)
+_INT_FIELDS = (
+    'volume', 'update_millisec',
+    'bid_volume1', 'ask_volume1', 'bid_volume2', 'ask_volume2', 'bid_volume3', 'ask_volume3',
+    'bid_volume4', 'ask_volume4', 'bid_volume5', 'ask_volume5',
+)
+_STR_FIELDS = (
+    ('instrument_id', 32), ('exchange_id', 16), ('update_time', 16),
+    ('trading_day', 16), ('action_day', 16),
+)
+
+# 行情记录 (epoch_ns: 交易所时间，recv_ns: 本地接收时间)
+TICK_RECORD_DTYPE = np.dtype(
+    [('epoch_ns', '<i8'), ('recv_ns', '<i8')]
+    + [(name, '<f8') for name in _DOUBLE_FIELDS]
+    + [(name, '<i4') for name in _INT_FIELDS]
+    + [(name, f'S{size}') for name, size in _STR_FIELDS]
+)
+assert TICK_RECORD_DTYPE.itemsize == 352
+
+# 文件头
+TICK_FILE_HEADER_DTYPE = np.dtype({
+    'names': ['magic', 'version', 'record_size', 'instrument_id', 'trading_day'],
+    'formats': ['S8', '<u4', '<u4', 'S32', 'S16'],
+    'offsets': [0, 8, 12, 16, 48],
+    'itemsize': TICK_FILE_HEADER_SIZE,
+})
+
+_NUMERIC_GETTERS = tuple((name, attrgetter(name)) for name in _DOUBLE_FIELDS + _INT_FIELDS)
+_STR_GETTERS = tuple((name, attrgetter(name)) for name, _ in _STR_FIELDS)
+
+
+def _encode(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return (value or '').encode('gbk', errors='replace')
+
+
+def encode_tick_records(ticks: List[MarketTick], recv_ns: Optional[List[int]] = None) -> np.ndarray:
+    """
+    MarketTick 列表 -> TICK_RECORD_DTYPE 数组 (逐列整体赋值)
+
+    Args:
+        ticks: MarketTick (或同名属性的对象)
+        recv_ns: 各tick的接收时间戳，None 时为0
+    """
+    records = np.zeros(len(ticks), dtype=TICK_RECORD_DTYPE)
+    if not ticks:
+        return records
+    records['epoch_ns'] = [tick.epoch_ns for tick in ticks]
+    if recv_ns is not None:
+        records['recv_ns'] = recv_ns
+    for name, getter in _NUMERIC_GETTERS:
+        records[name] = [getter(tick) or 0 for tick in ticks]
+    for name, getter in _STR_GETTERS:
+        records[name] = [_encode(getter(tick)) for tick in ticks]
+    return records
+
+
+def _file_header(instrument_id: str, trading_day: str) -> bytes:
+    header = np.zeros(1, dtype=TICK_FILE_HEADER_DTYPE)
+    header['magic'] = TICK_FILE_MAGIC
+    header['version'] = TICK_FILE_VERSION
+    header['record_size'] = TICK_RECORD_DTYPE.itemsize
+    header['instrument_id'] = _encode(instrument_id)
+    header['trading_day'] = _encode(trading_day)
+    return header.tobytes()
+
+
+def tick_file_path(root: str, trading_day: str, instrument_id: str) -> str:
+    """落盘文件路径"""
+    return os.path.join(root, trading_day, instrument_id + TICK_FILE_SUFFIX)
+
+
+class TickRecorder:
+    """
+    行情落盘
+
+    用法:
+        recorder = TickRecorder("./data/ticks")
+        recorder.attach(md_gateway)     # 注册 INLINE 行情回调并启动写盘线程
+        ...
+        recorder.stop()                 # 写完剩余行情并关闭文件
+    """
+
+    def __init__(self, root: str, flush_interval: float = 0.2,
+                 max_pending: int = 1_000_000, logger=None):
+        """
+        Args:
+            root: 落盘根目录
+            flush_interval: 写盘间隔 (秒)
+            max_pending: 待写入队列上限 (超出时新行情丢弃并计数)
+            logger: TradeLogger
+        """
+        self.root = root
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.logger = logger
+
+        self._pending: deque = deque()
+        self._files: Dict[Tuple[str, str], object] = {}
+        self._trading_day = ""
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+
+        self.recorded = 0
+        self.dropped = 0
+        self.batches = 0
+        self.write_ms_last = 0.0
+        self.write_ms_max = 0.0
+
+    # ==================== 行情回调 ====================
+
+    def on_tick(self, tick: MarketTick):
+        """行情回调 (在行情线程上调用，只入队)"""
+        pending = self._pending
+        if len(pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        pending.append((time.time_ns(), tick))
+
+    def attach(self, md_gateway, name: str = "tick_recorder") -> str:
+        """
+        挂接到行情网关并启动写盘线程
+
+        Args:
+            md_gateway: MdGateway 实例
+            name: 消费者名称
+
+        Returns:
+            消费者名称
+        """
+        try:
+            from ..core.md_dispatcher import DeliveryPolicy
+        except ImportError:
+            from core.md_dispatcher import DeliveryPolicy
+
+        self.start()
+        # on_tick 只做入队 (写盘在自己的线程)，在行情线程上同步调用，不再经过分发队列
+        return md_gateway.register_market_data_callback(self.on_tick, DeliveryPolicy.INLINE, name=name)
+
+    # ==================== 写盘线程 ====================
+
+    def start(self):
+        if self._thread is not None:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tick-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止写盘线程，写完剩余行情并关闭文件"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+        self._close_files()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                if self.logger:
+                    self.logger.log_exception(e, "tick recorder flush")
+
+    def flush(self) -> int:
+        """
+        写入队列中的全部行情
+
+        Returns:
+            本次写入的记录数
+        """
+        with self._write_lock:
+            pending = self._pending
+            n = len(pending)
+            if not n:
+                return 0
+            start = time.perf_counter()
+            popleft = pending.popleft
+            groups: Dict[Tuple[str, str], Tuple[list, list]] = {}
+            for _ in range(n):
+                recv_ns, tick = popleft()
+                key = (tick.trading_day, tick.instrument_id)
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = ([], [])
+                group[0].append(tick)
+                group[1].append(recv_ns)
+
+            for (trading_day, instrument_id), (ticks, recv_ns) in groups.items():
+                if trading_day and trading_day > self._trading_day:
+                    self._roll_day(trading_day)
+                self._file(trading_day, instrument_id).write(
+                    encode_tick_records(ticks, recv_ns).tobytes())
+            for f in self._files.values():
+                f.flush()
+
+            self.recorded += n
+            self.batches += 1
+            self.write_ms_last = (time.perf_counter() - start) * 1000
+            self.write_ms_max = max(self.write_ms_max, self.write_ms_last)
+            return n
+
+    def _file(self, trading_day: str, instrument_id: str):
+        key = (trading_day, instrument_id)
+        f = self._files.get(key)
+        if f is None:
+            path = tick_file_path(self.root, trading_day or "unknown", instrument_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = open(path, 'ab')
+            if f.tell() == 0:
+                f.write(_file_header(instrument_id, trading_day))
+            else:
+                # 上次写入中断留下的不完整尾记录: 截断到整条记录
+                size = f.tell() - TICK_FILE_HEADER_SIZE
+                if size % TICK_RECORD_DTYPE.itemsize:
+                    f.truncate(TICK_FILE_HEADER_SIZE + size - size % TICK_RECORD_DTYPE.itemsize)
+                    f.seek(0, os.SEEK_END)
+            self._files[key] = f
+        return f
+
+    def _roll_day(self, trading_day: str):
+        """交易日切换: 关闭前一交易日的文件"""
+        for key in [key for key in self._files if key[0] and key[0] < trading_day]:
+            self._files.pop(key).close()
+        self._trading_day = trading_day
+
+    def _close_files(self):
+        with self._write_lock:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            "recorded": self.recorded,
+            "pending": len(self._pending),
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "open_files": len(self._files),
+            "write_ms_last": self.write_ms_last,
+            "write_ms_max": self.write_ms_max,
+        }
+
+
+class TickReader:
+    """
+    落盘行情读取
+
+    用法:
+        reader = TickReader("./data/ticks")
+        records = reader.load("20250110", "rb2505")     # np.memmap 结构化数组
+        day = reader.load_day("20250110")               # {合约: 结构化数组}
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def trading_days(self) -> List[str]:
+        """已落盘的交易日 (升序)"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
+
+    def instruments(self, trading_day: str) -> List[str]:
+        """交易日已落盘的合约"""
+        day_dir = os.path.join(self.root, trading_day)
+        if not os.path.isdir(day_dir):
+            return []
+        return sorted(name[:-len(TICK_FILE_SUFFIX)] for name in os.listdir(day_dir)
+                      if name.endswith(TICK_FILE_SUFFIX))
+
+    @staticmethod
+    def open_file(path: str) -> np.ndarray:
+        """
+        内存映射一个落盘文件
+
+        Returns:
+            TICK_RECORD_DTYPE 只读数组 (文件为空时为空数组)
+        """
+        header = np.fromfile(path, dtype=TICK_FILE_HEADER_DTYPE, count=1)
+        if len(header) != 1 or header['magic'][0] != TICK_FILE_MAGIC:
+            raise ValueError(f"不是行情落盘文件: {path}")
+        if header['record_size'][0] != TICK_RECORD_DTYPE.itemsize:
+            raise ValueError(f"记录长度不一致: {path} ({header['record_size'][0]})")
+        count = (os.path.getsize(path) - TICK_FILE_HEADER_SIZE) // TICK_RECORD_DTYPE.itemsize
+        if count <= 0:
+            return np.zeros(0, dtype=TICK_RECORD_DTYPE)
+        return np.memmap(path, dtype=TICK_RECORD_DTYPE, mode='r',
+                         offset=TICK_FILE_HEADER_SIZE, shape=(count,))
+
+    def load(self, trading_day: str, instrument_id: str) -> np.ndarray:
+        """读取一个合约一个交易日的行情 (不存在时为空数组)"""
+        path = tick_file_path(self.root, trading_day, instrument_id)
+        if not os.path.exists(path):
+            return np.zeros(0, dtype=TICK_RECORD_DTYPE)
+        return self.open_file(path)
+
+    def load_day(self, trading_day: str,
+                 instruments: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """读取一个交易日多个合约的行情 (默认全部已落盘合约)"""
+        if instruments is None:
+            instruments = self.instruments(trading_day)
+        return {instrument_id: self.load(trading_day, instrument_id) for instrument_id in instruments}
+
+    @staticmethod
+    def to_ticks(records: np.ndarray, clock: Optional[TradingDayClock] = None) -> List[MarketTick]:
+        """
+        结构化数组 -> MarketTick 列表 (预热/回放使用)
+
+        epoch_ns 取落盘值；clock 提供时按 trading_day/update_time 重新计算
+        """
+        ticks = ticks_from_records(records, clock or TradingDayClock())
+        if clock is None:
+            for tick, epoch_ns in zip(ticks, records['epoch_ns'].tolist()):
+                tick.epoch_ns = epoch_ns
+        return ticks
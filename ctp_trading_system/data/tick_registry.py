@@ -0,0 +1,263 @@
+"""
+多合约Tick缓存注册表
+所有合约共享一块 [合约数 × maxlen × 字段数] 的NumPy数组
+
+功能:
+- 由 MdGateway 行情回调直接写入，每个合约一行环形缓冲
+- 一次向量化计算所有合约的 IMB / 波动率 / 价差 / OBI
+- 按 H1e 信号条件批量筛选合约，支持单进程扫描数百个合约
+"""
+
+import threading
+from typing import Dict, List, Optional, Iterable
+import numpy as np
+
+
+# 注册表字段: L1价格 + 累计成交量 + 5档挂单量
+REGISTRY_FIELDS = (
+    'last_price', 'bid_price1', 'ask_price1', 'volume',
+    'bid_volume1', 'bid_volume2', 'bid_volume3', 'bid_volume4', 'bid_volume5',
+    'ask_volume1', 'ask_volume2', 'ask_volume3', 'ask_volume4', 'ask_volume5',
+)
+_F = {name: i for i, name in enumerate(REGISTRY_FIELDS)}
+_BID_VOLS = slice(_F['bid_volume1'], _F['bid_volume5'] + 1)
+_ASK_VOLS = slice(_F['ask_volume1'], _F['ask_volume5'] + 1)
+
+
+class TickCacheRegistry:
+    """
+    多合约Tick缓存注册表
+
+    与每个策略各自持有 TickCache + IMBCalculator 相比，
+    N 个合约的指标在一次 NumPy 调用中完成，而不是 N 次Python循环
+    """
+
+    def __init__(self, maxlen: int = 120, capacity: int = 64, volatility_window: int = 20):
+        """
+        Args:
+            maxlen: 每个合约缓存的tick数，默认120
+            capacity: 初始合约容量，不足时自动翻倍
+            volatility_window: 波动率窗口，与 IMBCalculator 一致默认20个tick
+        """
+        self.maxlen = maxlen
+        self.volatility_window = min(volatility_window, maxlen)
+        self._data = np.zeros((capacity, maxlen, len(REGISTRY_FIELDS)), dtype=np.float64)
+        self._counts = np.zeros(capacity, dtype=np.int64)
+        self._index: Dict[str, int] = {}
+        self._instruments: List[str] = []
+        self._lock = threading.Lock()
+
+    # ==================== 合约管理 ====================
+
+    def register(self, instrument_id: str) -> int:
+        """注册合约，返回其行号"""
+        with self._lock:
+            return self._register(instrument_id)
+
+    def _register(self, instrument_id: str) -> int:
+        row = self._index.get(instrument_id)
+        if row is not None:
+            return row
+        row = len(self._instruments)
+        if row >= self._data.shape[0]:
+            self._grow()
+        self._index[instrument_id] = row
+        self._instruments.append(instrument_id)
+        return row
+
+    def _grow(self):
+        """容量翻倍"""
+        capacity = self._data.shape[0] * 2
+        data = np.zeros((capacity, self.maxlen, len(REGISTRY_FIELDS)), dtype=np.float64)
+        data[:self._data.shape[0]] = self._data
+        counts = np.zeros(capacity, dtype=np.int64)
+        counts[:self._counts.shape[0]] = self._counts
+        self._data = data
+        self._counts = counts
+
+    def instruments(self) -> List[str]:
+        """已注册合约列表 (与计算结果数组的行顺序一致)"""
+        return list(self._instruments)
+
+    def size(self, instrument_id: str) -> int:
+        """合约当前缓存的tick数"""
+        with self._lock:
+            row = self._index.get(instrument_id)
+            if row is None:
+                return 0
+            return int(min(self._counts[row], self.maxlen))
+
+    def __len__(self) -> int:
+        return len(self._instruments)
+
+    def __contains__(self, instrument_id: str) -> bool:
+        return instrument_id in self._index
+
+    # ==================== 写入 ====================
+
+    def on_tick(self, tick_data: dict):
+        """
+        行情回调 (可直接注册到 MdGateway.register_market_data_callback)
+
+        Args:
+            tick_data: CTP tick数据字典，需包含 instrument_id
+        """
+        instrument_id = tick_data.get('instrument_id')
+        if not instrument_id:
+            return
+        get = tick_data.get
+        row_values = tuple(get(name, 0.0) or 0.0 for name in REGISTRY_FIELDS)
+        with self._lock:
+            row = self._register(instrument_id)
+            self._data[row, self._counts[row] % self.maxlen] = row_values
+            self._counts[row] += 1
+
+    def on_ticks(self, ticks: Iterable[dict]):
+        """批量写入一批tick"""
+        for tick in ticks:
+            self.on_tick(tick)
+
+    def attach(self, md_gateway):
+        """
+        挂接到行情网关: 注册行情回调并预注册已订阅合约
+
+        Args:
+            md_gateway: MdGateway 实例
+        """
+        try:
+            from ..core.md_dispatcher import DeliveryPolicy
+        except ImportError:
+            from core.md_dispatcher import DeliveryPolicy
+
+        for instrument_id in md_gateway.get_subscribed():
+            self.register(instrument_id)
+        # 写入只是一行赋值，在行情线程上同步调用
+        md_gateway.register_market_data_callback(self.on_tick, DeliveryPolicy.INLINE)
+
+    def clear(self, instrument_id: Optional[str] = None):
+        """清空缓存 (指定合约或全部)"""
+        with self._lock:
+            if instrument_id is None:
+                self._counts[:] = 0
+            elif instrument_id in self._index:
+                self._counts[self._index[instrument_id]] = 0
+
+    # ==================== 读取 ====================
+
+    def view(self, instrument_id: str, field_name: str) -> np.ndarray:
+        """
+        单个合约单个字段的时间序列 (按时间顺序的副本)
+
+        Args:
+            instrument_id: 合约代码
+            field_name: REGISTRY_FIELDS 中的字段名
+        """
+        with self._lock:
+            # 行号与数组在同一把锁下读取: 注册新合约时可能正在扩容替换 _data/_counts
+            row = self._index.get(instrument_id)
+            if row is None:
+                return np.empty(0)
+            count = int(self._counts[row])
+            column = self._data[row, :, _F[field_name]]
+            if count <= self.maxlen:
+                return column[:count].copy()
+            return np.roll(column, -(count % self.maxlen))
+
+    def compute(self) -> Dict[str, np.ndarray]:
+        """
+        向量化计算所有合约指标
+
+        Returns:
+            {指标名: 数组}，数组行顺序与 instruments() 一致:
+            - imb: 最新tick的IMB (BidVol1 - AskVol1) / (BidVol1 + AskVol1 + 1)
+            - depth: 最新tick的买一量 + 卖一量
+            - imb_window: 窗口累计买一量/卖一量的IMB (同 TickCache.calculate_imb)
+            - obi: 最新tick的5档订单簿不平衡 (同 L2DepthBuffer.get_obi)
+            - spread: 最新tick的卖一价 - 买一价
+            - mid_price: 最新tick的中间价
+            - volatility: 最近 volatility_window 个价格的收益率标准差
+            - count: 已缓存tick数
+        """
+        with self._lock:
+            n = len(self._instruments)
+            data = self._data[:n]
+            counts = self._counts[:n].copy()
+            rows = np.arange(n)
+            latest = data[rows, (counts - 1) % self.maxlen]
+
+            # 波动率窗口: 最近W个价格
+            w = self.volatility_window
+            offsets = np.arange(w)
+            idx = (counts[:, None] - w + offsets) % self.maxlen
+            prices = data[rows[:, None], idx, _F['last_price']]
+
+            # 窗口累计挂单量 (顺序无关，直接对整行求和)
+            filled = np.minimum(counts, self.maxlen)
+            valid_rows = np.arange(self.maxlen)[None, :] < filled[:, None]
+            bid_sum = np.where(valid_rows, data[:, :, _F['bid_volume1']], 0.0).sum(axis=1)
+            ask_sum = np.where(valid_rows, data[:, :, _F['ask_volume1']], 0.0).sum(axis=1)
+
+        has_data = counts > 0
+        bid1 = latest[:, _F['bid_volume1']]
+        ask1 = latest[:, _F['ask_volume1']]
+        bid_price = latest[:, _F['bid_price1']]
+        ask_price = latest[:, _F['ask_price1']]
+
+        imb = np.where(has_data, (bid1 - ask1) / (bid1 + ask1 + 1), 0.0)
+        depth = np.where(has_data, bid1 + ask1, 0.0)
+
+        total = bid_sum + ask_sum
+        enough = (counts >= 2) & (total > 0)
+        imb_window = np.divide(bid_sum - ask_sum, total, out=np.zeros(n), where=enough)
+
+        bid_depth = latest[:, _BID_VOLS].sum(axis=1)
+        ask_depth = latest[:, _ASK_VOLS].sum(axis=1)
+        book = bid_depth + ask_depth
+        obi = np.divide(bid_depth - ask_depth, book, out=np.zeros(n), where=has_data & (book > 0))
+
+        both_sides = has_data & (bid_price > 0) & (ask_price > 0)
+        spread = np.where(both_sides, ask_price - bid_price, 0.0)
+        mid_price = np.where(both_sides, (bid_price + ask_price) / 2, latest[:, _F['last_price']])
+
+        # 掩码总体标准差: 只统计窗口内真实存在的收益率
+        available = np.minimum(counts, w)
+        price_valid = offsets[None, :] >= (w - available)[:, None]
+        ret_valid = price_valid[:, 1:] & price_valid[:, :-1] & (prices[:, :-1] != 0)
+        returns = np.divide(np.diff(prices, axis=1), prices[:, :-1],
+                            out=np.zeros((n, w - 1)), where=ret_valid)
+        m = ret_valid.sum(axis=1)
+        safe_m = np.maximum(m, 1)
+        mean = returns.sum(axis=1) / safe_m
+        var = (np.where(ret_valid, returns - mean[:, None], 0.0) ** 2).sum(axis=1) / safe_m
+        volatility = np.where(m > 0, np.sqrt(var), 0.0)
+
+        return {
+            'imb': imb,
+            'depth': depth,
+            'imb_window': imb_window,
+            'obi': obi,
+            'spread': spread,
+            'mid_price': mid_price,
+            'volatility': volatility,
+            'count': counts,
+        }
+
+    def scan_signals(self, imb_threshold: float = 0.8, min_depth: int = 1500,
+                     max_volatility: float = 0.00015) -> Dict[str, int]:
+        """
+        批量筛选满足 H1e 入场条件的合约
+
+        条件与 IMBCalculator._check_signal_conditions 一致:
+        |IMB| > imb_threshold 且 depth >= min_depth 且 volatility < max_volatility
+
+        Returns:
+            {合约代码: 方向 (1=多, -1=空)}
+        """
+        metrics = self.compute()
+        imb = metrics['imb']
+        hit = ((np.abs(imb) > imb_threshold)
+               & (metrics['depth'] >= min_depth)
+               & (metrics['volatility'] < max_volatility)
+               & (metrics['count'] > 0))
+        instruments = self._instruments
+        return {instruments[i]: (1 if imb[i] > 0 else -1) for i in np.flatnonzero(hit)}
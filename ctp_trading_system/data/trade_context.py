@@ -15,6 +15,8 @@ import hashlib
 import json
 import numpy as np
 
+from .market_tick import tick_timestamp_ms
+
 
 @dataclass
 class L1Snapshot:
@@ -44,7 +46,7 @@ class L1Snapshot:
             volume=tick_data.get('volume', 0),
             turnover=tick_data.get('turnover', 0.0),
             open_interest=tick_data.get('open_interest', 0.0),
-            timestamp_ms=int(tick_data.get('timestamp', 0) * 1000) if 'timestamp' in tick_data else 0
+            timestamp_ms=tick_timestamp_ms(tick_data)
         )
 
 
@@ -0,0 +1,310 @@
+"""
+批量撤单引擎
+EmergencyHandler 的部分撤单/全部撤单由此执行
+
+功能:
+- 令牌桶按柜台 ReqOrderAction 流控 (每秒撤单数) 发送，不等待上一笔的回报 (流水线)；
+  首轮撤单全部按令牌桶速率发出，超时只限制重试与等待回报 (截止时间 = total/rate + timeout)
+- 完成判定: OnRtnOrder 报单进入终态 (全部成交/撤单/不在队列)，
+  按 (FrontID, SessionID, OrderRef) 匹配，其他会话的同号报单不会被误判为已撤
+- 重试: 只重发仍未到终态的报单 (撤单被拒、无回报超过 retry_interval、-2/-3 流控拒绝)
+- 报告: 发送/重试次数、失败报单、time_to_flat (开始到全部报单终态的耗时)
+"""
+
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+try:
+    from ..core.order_events import ORDER_FINAL_STATUS
+    from ..core.order_store import format_order_key
+    from ..core.query_scheduler import FLOW_CONTROL_ERRORS
+except ImportError:
+    from core.order_events import ORDER_FINAL_STATUS
+    from core.order_store import format_order_key
+    from core.query_scheduler import FLOW_CONTROL_ERRORS
+
+
+class TokenBucket:
+    """令牌桶 (rate 个/秒，最多积攒 burst 个)"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(int(burst), 1)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        else:
+            self._tokens = float(self.burst)
+        self._last = now
+
+    def try_acquire(self) -> float:
+        """取一个令牌: 成功返回0，否则返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+    def penalize(self, seconds: float):
+        """柜台流控拒绝后清空令牌并推迟补充"""
+        with self._lock:
+            self._tokens = 0.0
+            self._last = time.monotonic() + seconds
+
+
+@dataclass
+class CancelReport:
+    """一次批量撤单的结果"""
+    total: int = 0
+    done: int = 0                       # 已到终态的报单数
+    sent: int = 0                       # 已发送的撤单请求数 (含重试)
+    retries: int = 0
+    flow_control_rejects: int = 0
+    failed: List[str] = field(default_factory=list)     # 'FrontID:SessionID:OrderRef'
+    time_to_flat: Optional[float] = None    # 全部报单终态的耗时 (秒)，未撤完为 None
+    elapsed: float = 0.0
+
+    @property
+    def flat(self) -> bool:
+        return self.time_to_flat is not None
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "done": self.done,
+            "sent": self.sent,
+            "retries": self.retries,
+            "flow_control_rejects": self.flow_control_rejects,
+            "failed": list(self.failed),
+            "time_to_flat": self.time_to_flat,
+            "elapsed": self.elapsed,
+        }
+
+
+class _Target:
+    __slots__ = ('key', 'order_ref', 'info', 'attempts', 'last_sent', 'rejected', 'done')
+
+    def __init__(self, key: tuple, info: dict):
+        self.key = key
+        self.order_ref = key[2]
+        self.info = info
+        self.attempts = 0
+        self.last_sent = 0.0
+        self.rejected = False
+        self.done = False
+
+
+class CancelEngine:
+    """
+    批量撤单引擎
+
+    用法:
+        engine = CancelEngine(gateway, rate=settings.connection.order_action_rate)
+        results, report = engine.cancel(pending_orders)    # {(FrontID, SessionID, OrderRef): 是否已到终态}
+    """
+
+    def __init__(self, gateway, rate: float = 6.0, burst: int = 1,
+                 retry_interval: float = 1.0, max_attempts: int = 3,
+                 timeout: float = 10.0, logger=None):
+        """
+        Args:
+            gateway: CtpGateway (send_cancel / get_order / register_callback)
+            rate: 每秒撤单数 (柜台 ReqOrderAction 流控)
+            burst: 令牌桶容量
+            retry_interval: 撤单后无终态回报的重发间隔 (秒)
+            max_attempts: 单笔报单最多发送撤单的次数
+            timeout: 按流控速率发完全部撤单之后，等待回报/重试的最长秒数
+            logger: TradeLogger
+        """
+        self.gateway = gateway
+        self.bucket = TokenBucket(rate, burst)
+        self.retry_interval = retry_interval
+        self.max_attempts = max(int(max_attempts), 1)
+        self.timeout = timeout
+        self.logger = logger
+
+        self._cond = threading.Condition(threading.Lock())
+        self._targets: Dict[tuple, _Target] = {}
+        self._remaining = 0
+        self._flat_at: Optional[float] = None
+        self._run_lock = threading.Lock()
+        self.last_report: Optional[CancelReport] = None
+
+        gateway.register_callback("on_order", self._on_order)
+        gateway.register_callback("on_error", self._on_error)
+
+    # ==================== 回报 ====================
+
+    def _on_order(self, order):
+        if not self._targets or order.get('OrderStatus', '') not in ORDER_FINAL_STATUS:
+            return
+        key = (order.get('FrontID', 0), order.get('SessionID', 0), order.get('OrderRef', ''))
+        with self._cond:
+            self._mark_done_locked(key)
+
+    def _on_error(self, error_type: str, order_info: dict, error_info: dict):
+        if error_type != "cancel_error" or not self._targets:
+            return
+        key = (order_info.get("front_id", 0), order_info.get("session_id", 0),
+               order_info.get("order_ref", ""))
+        with self._cond:
+            target = self._targets.get(key)
+            if target is not None and not target.done:
+                # 撤单被拒 (如报单已成交/已撤): 立即复核状态，未到终态则重发
+                target.rejected = True
+                self._cond.notify()
+
+    def _mark_done_locked(self, key: tuple):
+        target = self._targets.get(key)
+        if target is not None and not target.done:
+            target.done = True
+            self._remaining -= 1
+            if self._remaining == 0:
+                self._flat_at = time.monotonic()
+            self._cond.notify()
+
+    def _is_final(self, key: tuple) -> bool:
+        front_id, session_id, order_ref = key
+        order = self.gateway.get_order(order_ref, front_id, session_id)
+        return order is not None and order.get('OrderStatus', '') in ORDER_FINAL_STATUS
+
+    # ==================== 撤单 ====================
+
+    def cancel(self, orders: Dict[tuple, dict], timeout: Optional[float] = None):
+        """
+        撤销一批报单并等待其到达终态
+
+        Args:
+            orders: {(FrontID, SessionID, OrderRef): {"instrument_id", "exchange_id", "order_sys_id"}}
+            timeout: 发完全部撤单后等待回报的秒数，None 使用构造参数
+
+        Returns:
+            ({(FrontID, SessionID, OrderRef): 是否已到终态}, CancelReport)
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._run_lock:
+            report = CancelReport(total=len(orders))
+            start = time.monotonic()
+            rate = self.bucket.rate
+            deadline = start + timeout + (len(orders) / rate if rate > 0 else 0.0)
+            with self._cond:
+                self._targets = {key: _Target(key, info) for key, info in orders.items()}
+                self._remaining = len(self._targets)
+                self._flat_at = start if not self._targets else None
+                queue = deque(self._targets.values())
+                # 发送前已终态的报单 (回报已先到) 不再撤
+                for target in list(queue):
+                    if self._is_final(target.key):
+                        self._mark_done_locked(target.key)
+
+            try:
+                self._run(queue, deadline, report)
+            finally:
+                with self._cond:
+                    targets, self._targets = self._targets, {}
+                    remaining = self._remaining
+                    flat_at = self._flat_at
+
+            now = time.monotonic()
+            report.elapsed = now - start
+            report.done = report.total - remaining
+            report.failed = [format_order_key(key) for key, target in targets.items() if not target.done]
+            if not remaining:
+                report.time_to_flat = (flat_at or now) - start
+            self.last_report = report
+            return {key: target.done for key, target in targets.items()}, report
+
+    def _run(self, queue: deque, deadline: float, report: CancelReport):
+        while True:
+            with self._cond:
+                target, wait = self._next_locked(queue, deadline)
+                if target is None:
+                    if self._remaining <= 0 or wait is None:
+                        return
+                    self._cond.wait(wait)
+                    continue
+
+            wait = self.bucket.try_acquire()
+            if wait:
+                time.sleep(wait)
+                with self._cond:
+                    if not target.done:
+                        queue.appendleft(target)
+                continue
+
+            info = target.info
+            try:
+                ret = self.gateway.send_cancel(
+                    instrument_id=info.get("instrument_id", ""),
+                    order_ref=target.order_ref,
+                    exchange_id=info.get("exchange_id", ""),
+                    order_sys_id=info.get("order_sys_id", ""),
+                    front_id=target.key[0],
+                    session_id=target.key[1],
+                )
+            except Exception as e:
+                ret = -1
+                if self.logger:
+                    self.logger.log_exception(e, f"cancel order {target.order_ref}")
+
+            with self._cond:
+                target.last_sent = time.monotonic()
+                if ret in FLOW_CONTROL_ERRORS:
+                    # 柜台流控拒绝: 不计入次数，放回队首
+                    report.flow_control_rejects += 1
+                    self.bucket.penalize(1.0 / self.bucket.rate if self.bucket.rate > 0 else 0.05)
+                    if not target.done:
+                        queue.appendleft(target)
+                    continue
+                target.attempts += 1
+                target.rejected = ret != 0
+                report.sent += 1
+                if target.attempts > 1:
+                    report.retries += 1
+
+    def _next_locked(self, queue: deque, deadline: float):
+        """
+        选出下一笔要发送的撤单
+
+        Returns:
+            (target, None) 立即发送；(None, wait) 等待 wait 秒后再选；(None, None) 结束
+        """
+        if self._remaining <= 0:
+            return None, None
+        # 首轮撤单不受截止时间限制，每笔至少发送一次
+        while queue:
+            target = queue.popleft()
+            if not target.done:
+                return target, None
+        now = time.monotonic()
+        if now >= deadline:
+            return None, None
+
+        # 重试: 未到终态、被拒或超过重发间隔仍无终态回报
+        next_due = deadline
+        for target in self._targets.values():
+            if target.done or target.attempts >= self.max_attempts:
+                continue
+            due = target.last_sent if target.rejected else target.last_sent + self.retry_interval
+            if due <= now:
+                if self._is_final(target.key):
+                    self._mark_done_locked(target.key)
+                    continue
+                return target, None
+            next_due = min(next_due, due)
+        if self._remaining <= 0:
+            return None, None
+        if all(target.done or target.attempts >= self.max_attempts
+               for target in self._targets.values()):
+            # 次数用尽: 只等待迟到的终态回报
+            return None, deadline - now
+        return None, max(next_due - now, 0.0)
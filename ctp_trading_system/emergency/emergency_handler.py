@@ -7,17 +7,21 @@
   - 强制退出账号
 - 第23项：部分撤单功能（建议）
 - 第24项：全部撤单功能（建议）
+
+批量撤单由 CancelEngine 按柜台撤单流控流水线发送，以报单终态回报判定完成
 """
 from typing import Dict, List, Optional, Callable
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 import threading
-import time
 
 from ..core.ctp_gateway import CtpGateway
+from ..core.order_events import ORDER_FINAL_STATUS
+from ..core.order_store import format_order_key
 from ..trade_logging.trade_logger import get_logger, TradeLogger
 from ..alert.alert_service import AlertService, AlertLevel
+from .cancel_engine import CancelEngine, CancelReport
 
 
 class EmergencyAction(Enum):
@@ -65,8 +69,15 @@ class EmergencyHandler:
         self._strategies: Dict[str, Callable] = {}
         self._strategy_status: Dict[str, bool] = {}
 
-        # 待撤订单缓存
-        self._pending_orders: Dict[str, dict] = {}
+        # 待撤订单缓存 (FrontID, SessionID, OrderRef) -> 订单信息
+        self._pending_orders: Dict[tuple, dict] = {}
+
+        # 批量撤单引擎 (按柜台撤单流控发送)
+        self.cancel_engine = CancelEngine(
+            gateway,
+            rate=gateway.config.order_action_rate,
+            logger=self.logger
+        )
 
         # 事件历史
         self._event_history: List[EmergencyEvent] = []
@@ -271,7 +282,7 @@ class EmergencyHandler:
             reason: 撤单原因
 
         Returns:
-            撤单结果 {order_ref: success}
+            撤单结果 {'FrontID:SessionID:OrderRef': 是否已到终态 (已撤/已成交)}
         """
         results = {}
 
@@ -284,27 +295,9 @@ class EmergencyHandler:
                 "reason": reason
             })
 
-            for order_ref, order_info in orders.items():
-                try:
-                    success = self.gateway.cancel_order(
-                        instrument_id=order_info.get("instrument_id", instrument_id),
-                        order_ref=order_ref,
-                        exchange_id=order_info.get("exchange_id", ""),
-                        order_sys_id=order_info.get("order_sys_id", "")
-                    )
-                    results[order_ref] = success
-
-                    if success:
-                        self.logger.log_system(f"撤单成功: {order_ref}")
-                    else:
-                        self.logger.log_error(f"撤单失败: {order_ref}")
-
-                except Exception as e:
-                    self.logger.log_exception(e, f"cancel order {order_ref}")
-                    results[order_ref] = False
-
-                # 避免请求过快
-                time.sleep(0.1)
+            results, report = self.cancel_engine.cancel(orders)
+            results = {format_order_key(key): done for key, done in results.items()}
+            self._log_cancel_report(report)
 
             # 记录事件
             success_count = sum(1 for v in results.values() if v)
@@ -315,7 +308,8 @@ class EmergencyHandler:
                 details={
                     "instrument_id": instrument_id,
                     "total": len(results),
-                    "success": success_count
+                    "success": success_count,
+                    "time_to_flat": report.time_to_flat
                 }
             )
 
@@ -334,7 +328,7 @@ class EmergencyHandler:
             reason: 撤单原因
 
         Returns:
-            撤单结果 {order_ref: success}
+            撤单结果 {'FrontID:SessionID:OrderRef': 是否已到终态 (已撤/已成交)}
         """
         results = {}
 
@@ -354,22 +348,9 @@ class EmergencyHandler:
                     source="EmergencyHandler"
                 )
 
-            for order_ref, order_info in all_orders.items():
-                try:
-                    success = self.gateway.cancel_order(
-                        instrument_id=order_info.get("instrument_id", ""),
-                        order_ref=order_ref,
-                        exchange_id=order_info.get("exchange_id", ""),
-                        order_sys_id=order_info.get("order_sys_id", "")
-                    )
-                    results[order_ref] = success
-
-                except Exception as e:
-                    self.logger.log_exception(e, f"cancel order {order_ref}")
-                    results[order_ref] = False
-
-                # 避免请求过快
-                time.sleep(0.1)
+            results, report = self.cancel_engine.cancel(all_orders)
+            results = {format_order_key(key): done for key, done in results.items()}
+            self._log_cancel_report(report)
 
             # 记录事件
             success_count = sum(1 for v in results.values() if v)
@@ -380,7 +361,8 @@ class EmergencyHandler:
                 details={
                     "type": "ALL",
                     "total": len(results),
-                    "success": success_count
+                    "success": success_count,
+                    "time_to_flat": report.time_to_flat
                 }
             )
 
@@ -396,45 +378,64 @@ class EmergencyHandler:
             self.logger.log_exception(e, "cancel all orders")
             return results
 
-    def _get_pending_orders(self, instrument_id: str = None) -> Dict[str, dict]:
-        """获取待撤订单"""
-        # 从网关获取当前订单
-        orders = getattr(self.gateway, '_orders', {})
+    def _get_pending_orders(self, instrument_id: str = None) -> Dict[tuple, dict]:
+        """
+        获取待撤订单 (网关在途报单索引，按合约时只取该合约的报单)
 
+        Returns:
+            {(FrontID, SessionID, OrderRef): 订单信息}，不同会话的同号报单分别撤销
+        """
         pending = {}
-        for order_ref, order in orders.items():
-            # 检查订单状态（未成交或部分成交）
-            if hasattr(order, 'OrderStatus'):
-                status = order.OrderStatus
-                if status in ['3', '1']:  # 未成交在队列中 或 部分成交在队列中
-                    if instrument_id is None or order.InstrumentID == instrument_id:
-                        pending[order_ref] = {
-                            "instrument_id": order.InstrumentID,
-                            "exchange_id": order.ExchangeID,
-                            "order_sys_id": order.OrderSysID,
-                            "direction": order.Direction,
-                            "volume_total": order.VolumeTotal
-                        }
-
-        # 合并缓存的订单
-        for order_ref, order_info in self._pending_orders.items():
+        for key, order in self.gateway.get_working_orders(instrument_id).items():
+            pending[key] = {
+                "instrument_id": order.instrument_id,
+                "exchange_id": "",
+                "order_sys_id": order.order_sys_id,
+                "direction": order.direction,
+                "volume_total": order.volume_total,
+                "front_id": order.front_id,
+                "session_id": order.session_id
+            }
+
+        # 合并外部登记、网关尚无回报的订单 (已有回报的以网关为准)
+        for key, order_info in list(self._pending_orders.items()):
+            front_id, session_id, order_ref = key
+            order = self.gateway.get_order(order_ref, front_id, session_id)
+            if order is not None:
+                if order.status in ORDER_FINAL_STATUS:
+                    self._pending_orders.pop(key, None)
+                continue
             if instrument_id is None or order_info.get("instrument_id") == instrument_id:
-                if order_ref not in pending:
-                    pending[order_ref] = order_info
+                pending[key] = order_info
 
         return pending
 
-    def _get_all_pending_orders(self) -> Dict[str, dict]:
+    def _log_cancel_report(self, report: CancelReport):
+        """记录批量撤单结果 (time_to_flat: 开始撤单到全部报单终态的耗时)"""
+        data = report.to_dict()
+        if report.flat:
+            self.logger.log_system("批量撤单完成", data)
+        else:
+            self.logger.log_error(f"批量撤单未全部完成: {len(report.failed)}笔未到终态", **data)
+
+    def get_last_cancel_report(self) -> Optional[dict]:
+        """最近一次批量撤单的结果"""
+        report = self.cancel_engine.last_report
+        return report.to_dict() if report else None
+
+    def _get_all_pending_orders(self) -> Dict[tuple, dict]:
         """获取所有待撤订单"""
         return self._get_pending_orders(instrument_id=None)
 
     def register_pending_order(self, order_ref: str, order_info: dict):
-        """注册待撤订单（供外部调用）"""
-        self._pending_orders[order_ref] = order_info
+        """注册待撤订单（供外部调用，order_info 未给出 front_id/session_id 时属于本会话）"""
+        key = self.gateway.order_key(order_ref, order_info.get("front_id", 0),
+                                     order_info.get("session_id", 0))
+        self._pending_orders[key] = order_info
 
-    def unregister_pending_order(self, order_ref: str):
+    def unregister_pending_order(self, order_ref: str, front_id: int = 0, session_id: int = 0):
         """注销待撤订单"""
-        self._pending_orders.pop(order_ref, None)
+        self._pending_orders.pop(self.gateway.order_key(order_ref, front_id, session_id), None)
 
     # ==================== 策略管理 ====================
 
@@ -24,6 +24,11 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from ctp_trading_system.config.settings import Settings, ConnectionConfig, ThresholdConfig, AlertConfig
 from ctp_trading_system.trade_logging.trade_logger import init_logger, get_logger
 from ctp_trading_system.core.ctp_gateway import CtpGateway, Direction
+from ctp_trading_system.core.account_service import AccountService
+from ctp_trading_system.core.position_book import PositionBook
+from ctp_trading_system.core.instrument_catalog import InstrumentCatalog
+from ctp_trading_system.core.md_dispatcher import DeliveryPolicy
+from ctp_trading_system.core.md_gateway import MdGateway
 from ctp_trading_system.monitor.connection_monitor import ConnectionMonitor, ConnectionState
 from ctp_trading_system.monitor.order_monitor import OrderMonitor
 from ctp_trading_system.monitor.threshold_manager import ThresholdManager
@@ -74,6 +79,21 @@ class TradingSystem:
         self.gateway = CtpGateway(self.settings)
         self.logger.log_system("CTP网关初始化完成")
 
+        # 合约目录（按交易日缓存合约信息与费率）
+        self.instrument_catalog = InstrumentCatalog(self.gateway)
+
+        # 本地持仓簿（成交回报增量维护，行情盯市）
+        self.position_book = PositionBook(self.gateway)
+        self.logger.log_system("持仓簿初始化完成")
+
+        # 行情网关（启动时连接，持仓簿盯市；新成交的合约自动订阅）
+        self.md_gateway: Optional[MdGateway] = None
+        self.gateway.register_callback("on_trade", self._on_trade_subscribe)
+
+        # 账户资金状态（由回报增量维护，定期对账）
+        self.account_service = AccountService(self.gateway, position_book=self.position_book)
+        self.logger.log_system("账户资金服务初始化完成")
+
         # 连接监测（第5项）
         self.connection_monitor = ConnectionMonitor(self.gateway)
         self.logger.log_system("连接监测器初始化完成")
@@ -91,6 +111,10 @@ class TradingSystem:
 
         # 交易指令验证器（第14-19项）
         self.validator = OrderValidator(self.settings)
+        self.validator.set_position_book(self.position_book)
+        self.instrument_catalog.register_callback("instruments", self.validator.update_instruments)
+        self.instrument_catalog.register_callback("commission_rate",
+                                                  self.account_service.set_commission_rate)
         self.logger.log_system("交易指令验证器初始化完成")
 
         # 预警服务
@@ -107,6 +131,52 @@ class TradingSystem:
         # 连接阈值预警到预警服务
         self.threshold_manager.register_alert_callback(self._on_threshold_alert)
 
+    def attach_md_gateway(self, md_gateway):
+        """
+        接入行情网关: 持仓簿按行情盯市 (每合约只取最新价)
+
+        Args:
+            md_gateway: MdGateway
+        """
+        self.md_gateway = md_gateway
+        md_gateway.register_market_data_callback(
+            self.position_book.on_tick, DeliveryPolicy.CONFLATE, name="position_book")
+
+    def _start_market_data(self) -> bool:
+        """
+        连接行情前置并订阅持仓合约 (持仓簿由此盯市)
+
+        行情不可用时只预警不中断启动: 此时持仓按成本计值，all_priced() 为 False
+        """
+        if self.md_gateway is None:
+            self.attach_md_gateway(MdGateway.from_config(self.settings.connection))
+
+        self.logger.log_system("正在连接行情前置...")
+        try:
+            ok = self.md_gateway.connect(timeout=10) and self.md_gateway.login(timeout=10)
+        except Exception as e:
+            self.logger.log_error(f"行情连接异常: {e}")
+            ok = False
+        if not ok:
+            self.logger.log_error("行情连接或登录失败，持仓暂按成本计值")
+            self.alert_service.warning("行情不可用", "行情连接或登录失败，持仓暂按成本计值")
+            return False
+
+        instruments = {pos['instrument_id'] for pos in self.position_book.get_positions().values()}
+        if instruments:
+            self.md_gateway.subscribe(sorted(instruments))
+        self.logger.log_system(f"行情已登录，订阅{len(instruments)}个持仓合约")
+        return True
+
+    def _on_trade_subscribe(self, trade):
+        """成交回报: 新成交的合约补订行情，使新持仓也能盯市"""
+        md_gateway = self.md_gateway
+        instrument_id = trade.get('InstrumentID', '')
+        if (md_gateway is None or not instrument_id or not md_gateway.is_logged_in()
+                or instrument_id in md_gateway.get_subscribed()):
+            return
+        md_gateway.subscribe([instrument_id])
+
     def _on_threshold_alert(self, alert):
         """阈值预警回调"""
         level = AlertLevel.CRITICAL if alert.alert_level.value == "CRITICAL" else AlertLevel.WARNING
@@ -163,10 +233,24 @@ class TradingSystem:
 
         # 查询合约信息
         self.logger.log_system("正在查询合约信息...")
-        instruments = self.gateway.query_instruments(timeout=60)
-        self.validator.update_instruments(instruments)
+        instruments = self.instrument_catalog.load(timeout=60)
         self.logger.log_system(f"已加载{len(instruments)}个合约")
 
+        # 资金与持仓对账 (同时加载持仓簿)，之后由回报增量维护
+        self.account_service.reconcile()
+        self.account_service.start()
+
+        # 后台补齐持仓合约的保证金率与手续费率
+        self.instrument_catalog.prefetch_rates(
+            pos['instrument_id'] for pos in self.position_book.get_positions().values())
+
+        # 持仓合约预建报单模板 (其余合约首次报单时创建)
+        self.gateway.warm_up_orders(
+            pos['instrument_id'] for pos in self.position_book.get_positions().values())
+
+        # 行情盯市 (失败不影响交易)
+        self._start_market_data()
+
         self._running = True
         self.logger.log_system("交易系统启动成功")
         self.alert_service.info("系统启动", "交易系统启动成功")
@@ -181,8 +265,11 @@ class TradingSystem:
 
         # 停止连接监测
         self.connection_monitor.stop()
+        self.account_service.stop()
 
         # 关闭网关
+        if self.md_gateway is not None:
+            self.md_gateway.close()
         self.gateway.close()
 
         self.logger.log_system("交易系统已停止")
@@ -2,9 +2,16 @@
 连接状态监测模块
 满足评估表第5项：系统连接状态异常监测功能
 - 能正常监测到启动、正常运行、断开、重连的连接状态
+
+断线重连:
+- 断线后网关由 CTP API 自动重连，连上即在回调中依次发出认证、登录、结算确认 (见 CtpGateway)
+- 监测器按带抖动的指数退避等待恢复；等待期内未恢复则切换前置并重建 API (私有/公有流 RESUME 续传)
+- 每次恢复记录各阶段耗时 (断开→连上→认证→登录)，用于度量回到可交易状态的时间
 """
 import time
+import random
 import threading
+from collections import deque
 from enum import Enum
 from typing import Optional, Callable, List
 from dataclasses import dataclass
@@ -37,6 +44,30 @@ class ConnectionEvent:
     error_code: int = 0
 
 
+class ReconnectBackoff:
+    """
+    带抖动的指数退避
+
+    第 n 次 (从0开始) 的上限为 min(cap, base * 2^n)，实际等待在 [上限/2, 上限] 内均匀取值，
+    避免多个客户端在前置恢复时同时重连
+    """
+
+    def __init__(self, base: float = 0.5, cap: float = 30.0, rng: Optional[random.Random] = None):
+        self.base = base
+        self.cap = cap
+        self.attempts = 0
+        self._rng = rng or random.Random()
+
+    def next_delay(self) -> float:
+        """下一次重连前的等待秒数"""
+        ceiling = min(self.cap, self.base * (2 ** min(self.attempts, 30)))
+        self.attempts += 1
+        return ceiling / 2 + self._rng.uniform(0, ceiling / 2)
+
+    def reset(self):
+        self.attempts = 0
+
+
 class ConnectionMonitor:
     """
     连接状态监测器
@@ -50,20 +81,29 @@ class ConnectionMonitor:
     def __init__(self, gateway: CtpGateway,
                  reconnect_interval: int = 5,
                  max_reconnect_attempts: int = 0,
-                 heartbeat_interval: int = 30):
+                 heartbeat_interval: int = 30,
+                 backoff_base: float = 0.5,
+                 connect_timeout: float = 10,
+                 login_timeout: float = 10):
         """
         初始化连接监测器
 
         Args:
             gateway: CTP网关实例
-            reconnect_interval: 重连间隔（秒）
+            reconnect_interval: 重连间隔上限（秒），退避等待不超过此值
             max_reconnect_attempts: 最大重连次数（0表示无限重连）
             heartbeat_interval: 心跳检测间隔（秒）
+            backoff_base: 首次重连等待的上限（秒），之后逐次翻倍
+            connect_timeout: 重建 API 后等待连上前置的超时（秒）
+            login_timeout: 连上后等待自动认证登录完成的超时（秒）
         """
         self.gateway = gateway
         self.reconnect_interval = reconnect_interval
         self.max_reconnect_attempts = max_reconnect_attempts
         self.heartbeat_interval = heartbeat_interval
+        self.connect_timeout = connect_timeout
+        self.login_timeout = login_timeout
+        self.backoff = ReconnectBackoff(base=backoff_base, cap=reconnect_interval)
 
         self.logger: TradeLogger = get_logger()
 
@@ -74,6 +114,11 @@ class ConnectionMonitor:
         # 重连计数
         self._reconnect_count = 0
         self._auto_reconnect_enabled = True
+        self._reconnect_thread: Optional[threading.Thread] = None
+
+        # 断线恢复耗时 (最近一次的分阶段耗时 + 最近100次回到可交易状态的耗时)
+        self._last_recovery: Optional[dict] = None
+        self._recovery_ms: deque = deque(maxlen=100)
 
         # 事件历史
         self._event_history: List[ConnectionEvent] = []
@@ -94,11 +139,24 @@ class ConnectionMonitor:
         """注册网关回调"""
         self.gateway.register_callback("on_connected", self._on_connected)
         self.gateway.register_callback("on_disconnected", self._on_disconnected)
+        self.gateway.register_callback("on_login", self._on_logged_in)
 
     def _on_connected(self):
         """连接成功回调"""
         self._set_state(ConnectionState.CONNECTED, "连接成功")
+
+    def _on_logged_in(self):
+        """登录成功回调 (含断线后的自动登录)"""
+        timing = self.gateway.get_recovery_timing()
+        recovered = timing is not None and timing is not self._last_recovery
+        if recovered:
+            self._last_recovery = timing
+            self._recovery_ms.append(timing["time_to_trading_ms"])
+        message = (f"重连成功并登录，耗时{timing['time_to_trading_ms']:.0f}ms"
+                   if recovered else "登录成功")
+        self._set_state(ConnectionState.LOGGED_IN, message)
         self._reconnect_count = 0
+        self.backoff.reset()
 
     def _on_disconnected(self, reason: int = 0):
         """连接断开回调"""
@@ -156,52 +214,80 @@ class ConnectionMonitor:
                     self.logger.log_exception(e, "state callback")
 
     def _trigger_reconnect(self):
-        """触发重连"""
-        # max_reconnect_attempts <= 0 表示无限重连
-        if self.max_reconnect_attempts > 0 and self._reconnect_count >= self.max_reconnect_attempts:
-            self.logger.log_error("达到最大重连次数，停止重连",
-                                  error_msg=f"已尝试{self._reconnect_count}次")
-            self._set_state(ConnectionState.ERROR, "达到最大重连次数")
-            return
-
-        self._reconnect_count += 1
-        self._set_state(ConnectionState.RECONNECTING,
-                        f"第{self._reconnect_count}次重连")
-
-        # 在新线程中执行重连
-        threading.Thread(target=self._do_reconnect, daemon=True).start()
-
-    def _do_reconnect(self):
-        """执行重连"""
-        log_data = {"attempt": self._reconnect_count}
-        if self.max_reconnect_attempts > 0:
-            log_data["max_attempts"] = self.max_reconnect_attempts
-        else:
-            log_data["mode"] = "unlimited"
-        self.logger.log_system("开始重连", log_data)
-
-        # 等待一段时间
-        time.sleep(self.reconnect_interval)
-
-        # 尝试连接
-        try:
-            if self.gateway.connect(timeout=30):
-                if self.gateway.authenticate(timeout=10):
-                    if self.gateway.login(timeout=10):
-                        self._set_state(ConnectionState.LOGGED_IN, "重连成功并登录")
-                        return
-                    else:
-                        self._set_state(ConnectionState.AUTHENTICATED, "重连成功，登录失败")
-                else:
-                    self._set_state(ConnectionState.CONNECTED, "重连成功，认证失败")
+        """触发重连 (同一时间只有一个重连线程)"""
+        with self._lock:
+            if self._reconnect_thread is not None and self._reconnect_thread.is_alive():
+                return
+            self._reconnect_thread = threading.Thread(
+                target=self._reconnect_loop, name="reconnect", daemon=True)
+            self._reconnect_thread.start()
+
+    def _reconnect_loop(self):
+        """
+        重连状态机: 退避等待 (期间 CTP API 自动重连、网关自动登录) → 未恢复则切换前置重建 API → 再退避
+        """
+        while self._auto_reconnect_enabled:
+            if self.gateway.is_logged_in():
+                return
+            # max_reconnect_attempts <= 0 表示无限重连
+            if self.max_reconnect_attempts > 0 and self._reconnect_count >= self.max_reconnect_attempts:
+                self.logger.log_error("达到最大重连次数，停止重连",
+                                      error_msg=f"已尝试{self._reconnect_count}次")
+                self._set_state(ConnectionState.ERROR, "达到最大重连次数")
+                return
+
+            self._reconnect_count += 1
+            delay = self.backoff.next_delay()
+            self._set_state(ConnectionState.RECONNECTING,
+                            f"第{self._reconnect_count}次重连")
+
+            log_data = {"attempt": self._reconnect_count, "delay": round(delay, 3)}
+            if self.max_reconnect_attempts > 0:
+                log_data["max_attempts"] = self.max_reconnect_attempts
             else:
-                self._set_state(ConnectionState.DISCONNECTED, "重连失败")
-                # 继续尝试重连
-                if self._auto_reconnect_enabled:
-                    self._trigger_reconnect()
-        except Exception as e:
-            self.logger.log_exception(e, "reconnect")
-            self._set_state(ConnectionState.ERROR, str(e))
+                log_data["mode"] = "unlimited"
+            self.logger.log_system("开始重连", log_data)
+
+            # 退避等待期间由 CTP API 自动重连恢复
+            if self.gateway.is_auto_login() and self.gateway.wait_logged_in(delay):
+                return
+            if not self.gateway.is_auto_login():
+                time.sleep(delay)
+            if not self._auto_reconnect_enabled:
+                return
+
+            try:
+                if self._do_reconnect():
+                    return
+            except Exception as e:
+                self.logger.log_exception(e, "reconnect")
+                self._set_state(ConnectionState.ERROR, str(e))
+
+    def _do_reconnect(self) -> bool:
+        """切换前置并重建 API 连接，返回是否已登录"""
+        # 多前置时切换到排序中的下一个前置
+        front = self.gateway.failover_front()
+        self.logger.log_system("重连前置", {"attempt": self._reconnect_count, "front": front})
+
+        if not self.gateway.connect(timeout=self.connect_timeout):
+            self._set_state(ConnectionState.DISCONNECTED, "重连失败")
+            return False
+
+        if self.gateway.is_auto_login():
+            # 连上后网关在回调中自动认证并登录
+            if self.gateway.wait_logged_in(self.login_timeout):
+                return True
+            self._set_state(ConnectionState.CONNECTED, "重连成功，登录失败")
+            return False
+
+        # 尚未登录过: 按步骤认证登录
+        if not self.gateway.authenticate(timeout=self.login_timeout):
+            self._set_state(ConnectionState.CONNECTED, "重连成功，认证失败")
+            return False
+        if not self.gateway.login(timeout=self.login_timeout):
+            self._set_state(ConnectionState.AUTHENTICATED, "重连成功，登录失败")
+            return False
+        return True
 
     def start(self):
         """
@@ -278,6 +364,18 @@ class ConnectionMonitor:
         """获取重连次数"""
         return self._reconnect_count
 
+    def get_recovery_stats(self) -> dict:
+        """最近100次断线恢复 (断开到重新登录) 的耗时统计 (毫秒)"""
+        samples = sorted(self._recovery_ms)
+        if not samples:
+            return {"count": 0}
+        return {
+            "count": len(samples),
+            "p50": samples[len(samples) // 2],
+            "max": samples[-1],
+            "last": self._recovery_ms[-1],
+        }
+
     def is_healthy(self) -> bool:
         """是否健康（已连接或已登录）"""
         return self._current_state in [
@@ -331,5 +429,10 @@ class ConnectionMonitor:
             "is_healthy": self.is_healthy(),
             "gateway_connected": self.gateway.is_connected(),
             "gateway_logged_in": self.gateway.is_logged_in(),
+            "front": self.gateway.get_front(),
+            "fronts": self.gateway.get_front_stats(),
+            "last_recovery": self._last_recovery,
+            "recovery_ms": self.get_recovery_stats(),
+            "duplicate_returns": self.gateway.get_return_stats(),
             "recent_events_count": len(self._event_history)
         }
@@ -5,6 +5,7 @@
 功能:
 - 日内风控 (日亏损、交易数、连续亏损)
 - 单笔风控 (最大亏损、最大持仓)
+- 账户持仓风控 (设置 PositionBook 后按实际持仓手数与市值检查)
 - 交易时段控制
 """
 
@@ -78,6 +79,20 @@ class RiskEngine:
 
         # 持仓状态
         self._current_positions: dict = {}  # {strategy_name: position_size}
+        self._position_book = None          # core.position_book.PositionBook
+
+    def set_position_book(self, position_book):
+        """
+        设置本地持仓簿
+        总持仓手数改按账户实际持仓计算，并启用最大持仓金额检查
+        """
+        self._position_book = position_book
+
+    def _total_position(self) -> int:
+        """总持仓手数 (有持仓簿时取账户实际持仓)"""
+        if self._position_book is not None:
+            return self._position_book.total_volume()
+        return sum(self._current_positions.values())
 
     def reset_daily(self):
         """每日重置"""
@@ -132,10 +147,15 @@ class RiskEngine:
             return False, self._pause_reason
 
         # 检查持仓限制
-        total_position = sum(self._current_positions.values())
+        total_position = self._total_position()
         if total_position >= self.config.max_total_position:
             return False, f"总持仓达到{total_position}手"
 
+        if self._position_book is not None:
+            position_value = self._position_book.market_value()
+            if position_value >= self.config.max_position_value:
+                return False, f"持仓金额达到{position_value:.0f}"
+
         if strategy_name and self._current_positions.get(strategy_name, 0) >= self.config.max_single_position:
             return False, f"策略{strategy_name}持仓达到上限"
 
@@ -226,7 +246,7 @@ class RiskEngine:
             'trading_paused': self._trading_paused,
             'pause_reason': self._pause_reason,
             'positions': self._current_positions.copy(),
-            'total_position': sum(self._current_positions.values()),
+            'total_position': self._total_position(),
             'is_trading_time': self._is_trading_time()
         }
 
@@ -240,7 +260,7 @@ class RiskEngine:
         Returns:
             剩余容量字典
         """
-        total_position = sum(self._current_positions.values())
+        total_position = self._total_position()
         strategy_position = self._current_positions.get(strategy_name, 0) if strategy_name else 0
 
         return {
@@ -1,9 +1,10 @@
 """
 交易记录存储模块
-SQLite数据库管理
+SQLite数据库管理 (交易记录、合约元数据)
 """
 
 from .models import TradeRecord, TradeDirection, ExitReason
 from .database import TradeDatabase
+from .instrument_store import InstrumentStore
 
-__all__ = ['TradeRecord', 'TradeDirection', 'ExitReason', 'TradeDatabase']
+__all__ = ['TradeRecord', 'TradeDirection', 'ExitReason', 'TradeDatabase', 'InstrumentStore']
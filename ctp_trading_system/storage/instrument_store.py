@@ -0,0 +1,274 @@
+"""
+合约元数据持久化
+SQLite存储，按交易日保存合约信息、保证金率与手续费率
+"""
+
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from contextlib import contextmanager
+
+_DELIVERY_RE = re.compile(r'^[A-Za-z]+(\d{3,4})')
+
+
+def delivery_month(instrument_id: str, trading_day: str) -> str:
+    """
+    由合约代码推算交割月份
+
+    Args:
+        instrument_id: 合约代码 (rb2505 / SR505 / m2505-C-3000)
+        trading_day: 交易日 YYYYMMDD (郑商所三位年月按交易日补全年份)
+
+    Returns:
+        YYYYMM，无法推算时为空字符串
+    """
+    match = _DELIVERY_RE.match(instrument_id)
+    if not match:
+        return ""
+    digits = match.group(1)
+    year = int(trading_day[:4]) if len(trading_day) >= 4 else time.localtime().tm_year
+    if len(digits) == 3:
+        # 郑商所: 年份只有个位，取不早于当年的最近一年
+        full_year = year - year % 10 + int(digits[0])
+        if full_year < year:
+            full_year += 10
+    else:
+        full_year = year - year % 100 + int(digits[:2])
+    return f"{full_year:04d}{digits[-2:]}"
+
+
+class InstrumentStore:
+    """合约元数据库 (按交易日)"""
+
+    INSTRUMENT_FIELDS = (
+        'instrument_id', 'exchange_id', 'instrument_name', 'product_id',
+        'volume_multiple', 'price_tick', 'long_margin_ratio', 'short_margin_ratio', 'is_trading',
+    )
+    MARGIN_FIELDS = (
+        'long_margin_ratio_by_money', 'long_margin_ratio_by_volume',
+        'short_margin_ratio_by_money', 'short_margin_ratio_by_volume',
+    )
+    COMMISSION_FIELDS = (
+        'open_ratio_by_money', 'open_ratio_by_volume',
+        'close_ratio_by_money', 'close_ratio_by_volume',
+        'close_today_ratio_by_money', 'close_today_ratio_by_volume',
+    )
+
+    def __init__(self, db_path: str = None):
+        """
+        Args:
+            db_path: 数据库文件路径，默认为 ctp_trading_system/data/instruments.db
+        """
+        if db_path is None:
+            db_path = Path(__file__).parent.parent / "data" / "instruments.db"
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _init_db(self):
+        """初始化数据库表"""
+        with self._get_connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS trading_days (
+                    trading_day TEXT PRIMARY KEY,
+                    instrument_count INTEGER,
+                    updated_at REAL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS instruments (
+                    trading_day TEXT,
+                    instrument_id TEXT,
+                    exchange_id TEXT,
+                    instrument_name TEXT,
+                    product_id TEXT,
+                    volume_multiple INTEGER,
+                    price_tick REAL,
+                    long_margin_ratio REAL,
+                    short_margin_ratio REAL,
+                    is_trading INTEGER,
+                    delivery_month TEXT,
+                    PRIMARY KEY (trading_day, instrument_id)
+                )
+            ''')
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS margin_rates (
+                    trading_day TEXT,
+                    instrument_id TEXT,
+                    {', '.join(f'{name} REAL' for name in self.MARGIN_FIELDS)},
+                    PRIMARY KEY (trading_day, instrument_id)
+                )
+            ''')
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS commission_rates (
+                    trading_day TEXT,
+                    instrument_id TEXT,
+                    {', '.join(f'{name} REAL' for name in self.COMMISSION_FIELDS)},
+                    PRIMARY KEY (trading_day, instrument_id)
+                )
+            ''')
+
+            # 索引
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_inst_product ON instruments(trading_day, product_id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_inst_exchange ON instruments(trading_day, exchange_id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_inst_delivery ON instruments(trading_day, delivery_month)')
+
+            conn.commit()
+
+    @contextmanager
+    def _get_connection(self):
+        """获取数据库连接"""
+        conn = sqlite3.connect(str(self.db_path))
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # ==================== 交易日 ====================
+
+    def get_trading_days(self) -> List[str]:
+        """已保存合约信息的交易日 (升序)"""
+        with self._get_connection() as conn:
+            rows = conn.execute('SELECT trading_day FROM trading_days ORDER BY trading_day').fetchall()
+        return [row['trading_day'] for row in rows]
+
+    def has_trading_day(self, trading_day: str) -> bool:
+        """是否已保存该交易日的合约信息"""
+        with self._get_connection() as conn:
+            row = conn.execute('SELECT 1 FROM trading_days WHERE trading_day = ?',
+                               (trading_day,)).fetchone()
+        return row is not None
+
+    def purge(self, keep_days: int = 5) -> int:
+        """
+        删除较早交易日的数据
+
+        Args:
+            keep_days: 保留最近的交易日数
+
+        Returns:
+            删除的交易日数
+        """
+        days = self.get_trading_days()
+        expired = days[:-keep_days] if keep_days > 0 else days
+        if not expired:
+            return 0
+        with self._get_connection() as conn:
+            for table in ('instruments', 'margin_rates', 'commission_rates', 'trading_days'):
+                conn.executemany(f'DELETE FROM {table} WHERE trading_day = ?',
+                                 [(day,) for day in expired])
+            conn.commit()
+        return len(expired)
+
+    # ==================== 合约 ====================
+
+    def save_instruments(self, trading_day: str, instruments: Dict[str, dict]) -> int:
+        """
+        保存 (替换) 交易日的合约信息
+
+        Args:
+            trading_day: 交易日
+            instruments: CtpGateway.query_instruments 结果
+
+        Returns:
+            保存的合约数
+        """
+        rows = [
+            (trading_day, *[info.get(name) for name in self.INSTRUMENT_FIELDS],
+             delivery_month(info.get('instrument_id', ''), trading_day))
+            for info in instruments.values()
+        ]
+        columns = ('trading_day',) + self.INSTRUMENT_FIELDS + ('delivery_month',)
+        with self._get_connection() as conn:
+            conn.execute('DELETE FROM instruments WHERE trading_day = ?', (trading_day,))
+            conn.executemany(
+                f'INSERT INTO instruments ({", ".join(columns)}) '
+                f'VALUES ({", ".join("?" for _ in columns)})', rows)
+            conn.execute('INSERT OR REPLACE INTO trading_days VALUES (?, ?, ?)',
+                         (trading_day, len(rows), time.time()))
+            conn.commit()
+        return len(rows)
+
+    def load_instruments(self, trading_day: str) -> Dict[str, dict]:
+        """
+        读取交易日的合约信息
+
+        Returns:
+            instrument_id -> 合约信息 (字段同 CtpGateway.query_instruments，另含 delivery_month)
+        """
+        with self._get_connection() as conn:
+            rows = conn.execute('SELECT * FROM instruments WHERE trading_day = ?',
+                                (trading_day,)).fetchall()
+        return {row['instrument_id']: self._instrument_row(row) for row in rows}
+
+    def query_instruments(self, trading_day: str, product_id: Optional[str] = None,
+                          exchange_id: Optional[str] = None,
+                          delivery_month: Optional[str] = None) -> List[dict]:
+        """
+        按品种/交易所/交割月份查询合约 (走索引)
+
+        Args:
+            trading_day: 交易日
+            product_id: 品种代码
+            exchange_id: 交易所代码
+            delivery_month: 交割月份 YYYYMM
+
+        Returns:
+            合约信息列表 (按合约代码排序)
+        """
+        sql = 'SELECT * FROM instruments WHERE trading_day = ?'
+        params = [trading_day]
+        for column, value in (('product_id', product_id), ('exchange_id', exchange_id),
+                              ('delivery_month', delivery_month)):
+            if value is not None:
+                sql += f' AND {column} = ?'
+                params.append(value)
+        with self._get_connection() as conn:
+            rows = conn.execute(sql + ' ORDER BY instrument_id', params).fetchall()
+        return [self._instrument_row(row) for row in rows]
+
+    def _instrument_row(self, row: sqlite3.Row) -> dict:
+        info = {name: row[name] for name in self.INSTRUMENT_FIELDS}
+        info['is_trading'] = bool(info['is_trading'])
+        info['delivery_month'] = row['delivery_month']
+        return info
+
+    # ==================== 费率 ====================
+
+    def save_margin_rate(self, trading_day: str, rate: dict):
+        """保存保证金率 (字段同 CtpGateway.query_margin_rate)"""
+        self._save_rate('margin_rates', self.MARGIN_FIELDS, trading_day, rate)
+
+    def save_commission_rate(self, trading_day: str, rate: dict):
+        """保存手续费率 (字段同 CtpGateway.query_commission_rate，instrument_id 可为品种代码)"""
+        self._save_rate('commission_rates', self.COMMISSION_FIELDS, trading_day, rate)
+
+    def load_margin_rates(self, trading_day: str) -> Dict[str, dict]:
+        """读取交易日的保证金率 (instrument_id -> 费率)"""
+        return self._load_rates('margin_rates', self.MARGIN_FIELDS, trading_day)
+
+    def load_commission_rates(self, trading_day: str) -> Dict[str, dict]:
+        """读取交易日的手续费率 (instrument_id 或品种代码 -> 费率)"""
+        return self._load_rates('commission_rates', self.COMMISSION_FIELDS, trading_day)
+
+    def _save_rate(self, table: str, fields: tuple, trading_day: str, rate: dict):
+        columns = ('trading_day', 'instrument_id') + fields
+        with self._get_connection() as conn:
+            conn.execute(
+                f'INSERT OR REPLACE INTO {table} ({", ".join(columns)}) '
+                f'VALUES ({", ".join("?" for _ in columns)})',
+                (trading_day, rate['instrument_id'], *[rate.get(name) for name in fields]))
+            conn.commit()
+
+    def _load_rates(self, table: str, fields: tuple, trading_day: str) -> Dict[str, dict]:
+        with self._get_connection() as conn:
+            rows = conn.execute(f'SELECT * FROM {table} WHERE trading_day = ?',
+                                (trading_day,)).fetchall()
+        return {
+            row['instrument_id']: {'instrument_id': row['instrument_id'],
+                                   **{name: row[name] for name in fields}}
+            for row in rows
+        }
@@ -4,11 +4,12 @@ from .demo_strategy import DemoAutoStrategy, StrategyConfig, StrategyState
 from .h1e_tick import H1eTickStrategy, H1eConfig, IMBCalculator
 from .lstm_l2 import LSTML2Strategy, LSTMConfig, FeatureEngine, PositionManager
 from .strategy_manager import StrategyManager, StrategyType, StrategyAllocation
+from .tick_router import TickRouter
 
 __all__ = [
     'BaseStrategy',
     'DemoAutoStrategy', 'StrategyConfig', 'StrategyState',
     'H1eTickStrategy', 'H1eConfig', 'IMBCalculator',
     'LSTML2Strategy', 'LSTMConfig', 'FeatureEngine', 'PositionManager',
-    'StrategyManager', 'StrategyType', 'StrategyAllocation'
+    'StrategyManager', 'StrategyType', 'StrategyAllocation', 'TickRouter'
 ]
@@ -7,6 +7,7 @@ from typing import Optional, Dict, Any
 from datetime import datetime
 
 from ..core.ctp_gateway import CtpGateway, Direction, OffsetFlag
+from ..core.order_fast_path import now_ns
 from ..validator.order_validator import OrderValidator, ValidationResult
 from ..monitor.order_monitor import OrderMonitor
 from ..trade_logging.trade_logger import get_logger, TradeLogger
@@ -100,6 +101,7 @@ class BaseStrategy(ABC):
         Returns:
             报单引用，失败返回None
         """
+        signal_ns = now_ns()
         # 验证交易指令
         result = self.validator.validate_order(
             instrument_id=instrument_id,
@@ -122,7 +124,8 @@ class BaseStrategy(ABC):
             instrument_id=instrument_id,
             direction=Direction.BUY,
             price=price,
-            volume=volume
+            volume=volume,
+            signal_ns=signal_ns
         )
 
     def sell_open(self, instrument_id: str, price: float, volume: int) -> Optional[str]:
@@ -137,6 +140,7 @@ class BaseStrategy(ABC):
         Returns:
             报单引用，失败返回None
         """
+        signal_ns = now_ns()
         result = self.validator.validate_order(
             instrument_id=instrument_id,
             direction='1',  # 卖
@@ -156,7 +160,8 @@ class BaseStrategy(ABC):
             instrument_id=instrument_id,
             direction=Direction.SELL,
             price=price,
-            volume=volume
+            volume=volume,
+            signal_ns=signal_ns
         )
 
     def buy_close(self, instrument_id: str, price: float, volume: int,
@@ -173,6 +178,7 @@ class BaseStrategy(ABC):
         Returns:
             报单引用，失败返回None
         """
+        signal_ns = now_ns()
         result = self.validator.validate_order(
             instrument_id=instrument_id,
             direction='0',  # 买
@@ -193,7 +199,8 @@ class BaseStrategy(ABC):
             direction=Direction.BUY,
             price=price,
             volume=volume,
-            close_today=close_today
+            close_today=close_today,
+            signal_ns=signal_ns
         )
 
     def sell_close(self, instrument_id: str, price: float, volume: int,
@@ -210,6 +217,7 @@ class BaseStrategy(ABC):
         Returns:
             报单引用，失败返回None
         """
+        signal_ns = now_ns()
         result = self.validator.validate_order(
             instrument_id=instrument_id,
             direction='1',  # 卖
@@ -230,7 +238,8 @@ class BaseStrategy(ABC):
             direction=Direction.SELL,
             price=price,
             volume=volume,
-            close_today=close_today
+            close_today=close_today,
+            signal_ns=signal_ns
         )
 
     def cancel_order(self, instrument_id: str, order_ref: str) -> bool:
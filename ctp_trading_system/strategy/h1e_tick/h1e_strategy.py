@@ -24,6 +24,7 @@ import logging
 from .imb_calculator import IMBCalculator, IMBSignal
 from ...data import TickCache, TradeContext, ContextManager, L1Snapshot
 from ...data.trade_context import SignalContext, ExecutionContext
+from ...data.bar_aggregator import tick_epoch_ms, from_epoch_ms
 from ...risk import RiskEngine
 
 logger = logging.getLogger(__name__)
@@ -132,7 +133,7 @@ class H1eTickStrategy:
         self._daily_pnl = 0.0
         self._daily_trades = 0
         self._daily_stop_triggered = False
-        self._last_trade_date: Optional[datetime] = None
+        self._last_trading_day: Optional[str] = None
 
         # 回调
         self._log_callback: Optional[Callable] = None
@@ -219,26 +220,22 @@ class H1eTickStrategy:
             self._handle_holding_state(signal, tick_data)
 
     def _check_new_day(self, tick_data: dict):
-        """检查是否新交易日"""
-        try:
-            tick_time = tick_data.get('datetime', '')
-            if isinstance(tick_time, str) and tick_time:
-                dt = datetime.fromisoformat(tick_time.replace('Z', ''))
-            else:
-                dt = datetime.now()
-
-            if self._last_trade_date is None or self._last_trade_date.date() != dt.date():
-                # 新交易日，重置日内统计
-                if self._last_trade_date is not None:
-                    self._log("INFO", f"新交易日，上日收益: {self._daily_pnl*100:.4f}%")
-
-                self._daily_pnl = 0.0
-                self._daily_trades = 0
-                self._daily_stop_triggered = False
-                self._last_trade_date = dt
-                self._log("INFO", f"日内统计已重置")
-        except:
-            pass
+        """检查是否新交易日 (按交易日切换，夜盘归属下一交易日)"""
+        trading_day = tick_data.get('trading_day')
+        if not trading_day:
+            trading_day = from_epoch_ms(tick_epoch_ms(tick_data)).strftime('%Y%m%d')
+        if trading_day == self._last_trading_day:
+            return
+
+        # 新交易日，重置日内统计
+        if self._last_trading_day is not None:
+            self._log("INFO", f"新交易日，上日收益: {self._daily_pnl*100:.4f}%")
+
+        self._daily_pnl = 0.0
+        self._daily_trades = 0
+        self._daily_stop_triggered = False
+        self._last_trading_day = trading_day
+        self._log("INFO", f"日内统计已重置")
 
     def _handle_flat_state(self, signal: IMBSignal, tick_data: dict):
         """处理空仓状态"""
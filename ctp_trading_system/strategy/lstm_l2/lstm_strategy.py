@@ -153,10 +153,13 @@ class LSTML2Strategy:
 
         self._bar_aggregator = BarAggregator(on_bar_completed=self._on_bar_completed)
         self._bar_buffer = BarBuffer(maxlen=60)
+        # 特征序列与特征引擎使用同一份特征名 (与模型 input_dim 一致)
+        feature_names = self._feature_engine.get_feature_names()
         self._feature_cache = FeatureSequenceCache(
             sequence_length=self.config.seq_len,
-            feature_dim=18  # 18个特征
+            feature_dim=len(feature_names)
         )
+        self._feature_cache.set_feature_names(feature_names)
         self._l2_buffer = L2DepthBuffer()
         self._context_manager = ContextManager()
 
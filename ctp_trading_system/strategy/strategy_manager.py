@@ -7,9 +7,10 @@
 2. 手动切换策略
 3. 同时运行多策略
 4. 仓位分配控制
+5. 按合约路由Tick，并按策略订阅驱动行情订阅/退订
 """
 
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Iterable
 from enum import Enum
 from dataclasses import dataclass
 import logging
@@ -17,6 +18,7 @@ import logging
 from .h1e_tick import H1eTickStrategy, H1eConfig
 from .lstm_l2 import LSTML2Strategy, LSTMConfig
 from .demo_strategy import DemoAutoStrategy, StrategyConfig as DemoConfig
+from .tick_router import TickRouter
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +47,7 @@ class StrategyManager:
     2. 手动切换策略
     3. 同时运行多策略
     4. 仓位分配控制
+    5. 按合约路由Tick (策略启动时加入路由表，停止时移除)
     """
 
     def __init__(self, trading_system):
@@ -58,6 +61,14 @@ class StrategyManager:
         self._active_strategies: List[str] = []
         self._log_callback = None
 
+        # Tick路由: 合约/品种通配 -> 运行中的策略
+        self._router = TickRouter()
+        # 手动指定的订阅模式 (未指定时取策略配置的 instrument_id)
+        self._instrument_overrides: Dict[str, List[str]] = {}
+        # 行情网关及由本管理器发起订阅的合约
+        self._md_gateway = None
+        self._md_owned: set = set()
+
     def register_log_callback(self, callback):
         """注册日志回调"""
         self._log_callback = callback
@@ -145,6 +156,7 @@ class StrategyManager:
             success = strategy.start()
             if success:
                 self._active_strategies.append(name)
+                self._add_route(name)
                 self._log("INFO", f"策略启动成功: {name}")
             else:
                 self._log("ERROR", f"策略启动失败: {name}")
@@ -172,6 +184,7 @@ class StrategyManager:
             strategy.stop()
             if name in self._active_strategies:
                 self._active_strategies.remove(name)
+            self._md_unsubscribe(self._router.remove(name))
             self._log("INFO", f"策略已停止: {name}")
             return True
         except Exception as e:
@@ -253,18 +266,16 @@ class StrategyManager:
 
     def on_tick(self, tick_data: dict):
         """
-        Tick数据分发给活跃策略
+        Tick数据分发给订阅了该合约的活跃策略
 
         Args:
-            tick_data: CTP tick数据
+            tick_data: CTP tick数据 (MarketTick 或字典)
         """
-        for name in self._active_strategies:
-            strategy = self._strategies.get(name)
-            if strategy and hasattr(strategy, 'on_tick'):
-                try:
-                    strategy.on_tick(tick_data)
-                except Exception as e:
-                    self._log("ERROR", f"策略{name}处理tick异常: {e}")
+        for name, handler in self._router.route(tick_data.get('instrument_id', '')):
+            try:
+                handler(tick_data)
+            except Exception as e:
+                self._log("ERROR", f"策略{name}处理tick异常: {e}")
 
     def on_bar(self, bar_data: dict):
         """
@@ -281,6 +292,86 @@ class StrategyManager:
                 except Exception as e:
                     self._log("ERROR", f"策略{name}处理bar异常: {e}")
 
+    # ==================== 合约路由与行情订阅 ====================
+
+    def attach_md_gateway(self, md_gateway, policy=None):
+        """
+        连接行情网关: 注册tick回调，并订阅运行中策略所需的合约
+
+        之后策略启停会自动订阅/退订合约 (只退订由本管理器发起订阅的合约)
+
+        Args:
+            md_gateway: MdGateway 实例
+            policy: 投递策略，默认 DeliveryPolicy.EVERY_TICK
+        """
+        from ..core.md_dispatcher import DeliveryPolicy
+
+        self._md_gateway = md_gateway
+        md_gateway.register_market_data_callback(
+            self.on_tick, policy or DeliveryPolicy.EVERY_TICK, name="strategy_manager")
+        self.sync_subscriptions()
+
+    def sync_subscriptions(self):
+        """补订路由表中尚未订阅的合约 (行情登录/重连后调用)"""
+        self._md_subscribe(self._router.instruments())
+
+    def set_strategy_instruments(self, name: str, patterns: Iterable[str]):
+        """
+        指定策略的订阅模式 (合约代码或品种通配 "rb*")，运行中的策略立即生效
+
+        Args:
+            name: 策略名称
+            patterns: 订阅模式列表
+        """
+        self._instrument_overrides[name] = list(patterns)
+        if name in self._active_strategies:
+            self._add_route(name)
+
+    def get_strategy_instruments(self, name: str) -> List[str]:
+        """策略的订阅模式"""
+        if name in self._instrument_overrides:
+            return list(self._instrument_overrides[name])
+        strategy = self._strategies.get(name)
+        config = getattr(strategy, 'config', None)
+        instruments = getattr(config, 'instruments', None)
+        if instruments:
+            return list(instruments)
+        instrument_id = getattr(config, 'instrument_id', '')
+        return [instrument_id] if instrument_id else []
+
+    def get_routing_table(self) -> Dict[str, List[str]]:
+        """路由表 (合约或 "品种*" -> 策略名称)"""
+        return self._router.get_table()
+
+    def _add_route(self, name: str):
+        """将策略加入路由表 (无 on_tick 的策略不接收tick)"""
+        strategy = self._strategies.get(name)
+        if strategy is None or not hasattr(strategy, 'on_tick'):
+            return
+        added, released = self._router.add(
+            name, strategy.on_tick, self.get_strategy_instruments(name))
+        self._md_subscribe(added)
+        self._md_unsubscribe(released)
+
+    def _md_subscribe(self, instrument_ids: List[str]):
+        md = self._md_gateway
+        if md is None:
+            return
+        subscribed = set(md.get_subscribed())
+        missing = [i for i in instrument_ids if i not in subscribed]
+        if missing and md.subscribe(missing):
+            self._md_owned.update(missing)
+            self._log("INFO", f"订阅行情: {','.join(missing)}")
+
+    def _md_unsubscribe(self, instrument_ids: List[str]):
+        md = self._md_gateway
+        owned = [i for i in instrument_ids if i in self._md_owned]
+        if md is None or not owned:
+            return
+        if md.unsubscribe(owned):
+            self._md_owned.difference_update(owned)
+            self._log("INFO", f"退订行情: {','.join(owned)}")
+
     def stop_all(self):
         """停止所有策略"""
         for name in self._active_strategies.copy():
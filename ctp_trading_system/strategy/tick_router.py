@@ -0,0 +1,155 @@
+"""
+按合约路由Tick
+StrategyManager 用其将每个tick只分发给订阅了该合约的策略
+
+功能:
+- 合约精确订阅: "rb2505"
+- 品种通配订阅: "rb*" (品种代码不区分大小写，匹配 rb2505/rb2510 ...)
+- route: 每个合约的目标列表首次查询时解析并缓存，之后为一次字典查找
+- 订阅引用计数: add/remove 返回首次需要/不再需要的精确合约，用于驱动行情订阅
+"""
+
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Tuple
+
+_PRODUCT_RE = re.compile(r'[A-Za-z]*')
+
+
+def product_of(instrument_id: str) -> str:
+    """合约代码 -> 品种代码 (小写)"""
+    return _PRODUCT_RE.match(instrument_id).group(0).lower()
+
+
+class TickRouter:
+    """
+    合约 -> 订阅者路由表
+
+    用法:
+        router = TickRouter()
+        router.add("H1e_TICK", strategy.on_tick, ["rb2505"])   # 返回 (["rb2505"], [])
+        for name, handler in router.route("rb2505"):
+            handler(tick)
+        router.remove("H1e_TICK")                              # 返回 ["rb2505"]
+    """
+
+    def __init__(self):
+        # 订阅者 -> (处理函数, 订阅模式)
+        self._subscribers: Dict[str, Tuple[Callable, List[str]]] = {}
+        # 精确合约 -> 订阅者名称 (按注册顺序)
+        self._exact: Dict[str, List[str]] = {}
+        # 品种 -> 订阅者名称
+        self._products: Dict[str, List[str]] = {}
+        # 解析结果缓存: instrument_id -> ((name, handler), ...)，订阅变化时整体替换
+        self._routes: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse(pattern: str) -> Tuple[bool, str]:
+        """订阅模式 -> (是否品种通配, 键)"""
+        pattern = pattern.strip()
+        if pattern.endswith('*'):
+            return True, pattern[:-1].lower()
+        return False, pattern
+
+    def add(self, name: str, handler: Callable,
+            patterns: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        添加 (或替换) 订阅者
+
+        Args:
+            name: 订阅者名称
+            handler: tick 处理函数
+            patterns: 合约代码或品种通配 ("rb*")
+
+        Returns:
+            (新增的精确合约, 替换后不再有人订阅的精确合约)
+        """
+        patterns = [p for p in dict.fromkeys(p.strip() for p in patterns) if p]
+        with self._lock:
+            removed = self._remove_locked(name)
+            added = []
+            for pattern in patterns:
+                wildcard, key = self._parse(pattern)
+                table = self._products if wildcard else self._exact
+                names = table.setdefault(key, [])
+                if not wildcard and not names:
+                    added.append(key)
+                names.append(name)
+            self._subscribers[name] = (handler, patterns)
+            self._routes = {}
+
+        # 替换订阅时，仍被订阅的合约既不新增也不释放
+        return ([i for i in added if i not in removed],
+                [i for i in removed if i not in self._exact])
+
+    def remove(self, name: str) -> List[str]:
+        """
+        移除订阅者
+
+        Returns:
+            不再有人订阅的精确合约
+        """
+        with self._lock:
+            released = self._remove_locked(name)
+            self._routes = {}
+        return released
+
+    def _remove_locked(self, name: str) -> List[str]:
+        entry = self._subscribers.pop(name, None)
+        if entry is None:
+            return []
+        released = []
+        for pattern in entry[1]:
+            wildcard, key = self._parse(pattern)
+            table = self._products if wildcard else self._exact
+            names = table.get(key)
+            if names and name in names:
+                names.remove(name)
+                if not names:
+                    del table[key]
+                    if not wildcard:
+                        released.append(key)
+        return released
+
+    def route(self, instrument_id: str) -> tuple:
+        """
+        合约的订阅者列表
+
+        Returns:
+            ((name, handler), ...)，精确订阅在前，同一订阅者只出现一次
+        """
+        routes = self._routes
+        targets = routes.get(instrument_id)
+        if targets is None:
+            targets = self._resolve(instrument_id)
+            routes[instrument_id] = targets
+        return targets
+
+    def _resolve(self, instrument_id: str) -> tuple:
+        with self._lock:
+            names = list(self._exact.get(instrument_id, ()))
+            names += self._products.get(product_of(instrument_id), ())
+            subscribers = self._subscribers
+            return tuple((name, subscribers[name][0]) for name in dict.fromkeys(names))
+
+    # ==================== 查询 ====================
+
+    def instruments(self) -> List[str]:
+        """所有被精确订阅的合约"""
+        return list(self._exact)
+
+    def get_patterns(self, name: str) -> List[str]:
+        """订阅者的订阅模式"""
+        entry = self._subscribers.get(name)
+        return list(entry[1]) if entry else []
+
+    def get_table(self) -> Dict[str, List[str]]:
+        """路由表 (合约或 "品种*" -> 订阅者名称)"""
+        with self._lock:
+            table = {key: list(names) for key, names in self._exact.items()}
+            table.update({f"{key}*": list(names) for key, names in self._products.items()})
+        return table
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._subscribers
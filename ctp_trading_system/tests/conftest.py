@@ -1,9 +1,11 @@
 """
 Pytest配置和Fixtures
-用于Playwright自动化测试
+用于Playwright自动化测试，以及网关相关单元测试共用的API替身与网关工厂
 """
 import os
 import sys
+import threading
+import time
 import pytest
 
 # 添加项目路径
@@ -91,6 +93,224 @@ def record_result(request, test_results):
     })
 
 
+# ==================== 网关替身与Fixtures ====================
+
+class FakeTraderApi:
+    """
+    交易API替身 (不连接前置)
+
+    - 报单: 支持参数块 (args_type 非 None) 时走 req_order_insert_args，记录在 inserts
+    - 查询: 资金/持仓/投资者查询记录在 calls，应答在后台线程中分页推送
+    - 回报回调 (on_rtn_order_raw 等) 由网关 _setup_callbacks 挂载，测试直接调用
+    """
+
+    def __init__(self, args_type=None):
+        self.args_type = args_type
+        self.inserts = []
+        self.calls = []
+        self.released = False
+        self._lock = threading.Lock()
+
+    def _reply(self, pages, delay=0.01):
+        def run():
+            for callback_name, args in pages:
+                time.sleep(delay)
+                getattr(self, callback_name)(*args)
+        threading.Thread(target=run, daemon=True).start()
+
+    def _record(self, name, request_id):
+        with self._lock:
+            self.calls.append((name, request_id, time.monotonic()))
+
+    def supports_order_args(self):
+        return self.args_type is not None
+
+    def req_order_insert_args(self, args, request_id):
+        self.inserts.append(('args', bytes(args), request_id))
+        return 0
+
+    def req_order_insert(self, **kwargs):
+        self.inserts.append(('fields', kwargs))
+        return 0
+
+    def req_qry_trading_account(self, broker_id, investor_id, request_id):
+        self._record('account', request_id)
+        self._reply([('on_rsp_qry_trading_account',
+                      ('9999', '001', 1e6, 8e5, 0, 2e5, 0, 0, 10.0, 8e5, 0, '', request_id, True))],
+                    delay=0.05)
+        return 0
+
+    def req_qry_investor_position(self, broker_id, investor_id, instrument_id, request_id):
+        self._record('position', request_id)
+        pages = [('on_rsp_qry_investor_position',
+                  ('9999', '001', inst, ord('2'), 3, 1, 0, 0, 0, 0, 0, '', request_id, i == 2))
+                 for i, inst in enumerate(('rb2505', 'i2505', 'hc2505'))]
+        self._reply(pages)
+        return 0
+
+    def req_qry_investor(self, broker_id, investor_id, request_id):
+        self._record('investor', request_id)
+        self._reply([('on_rsp_error', (90, 'CTP:查询未就绪', request_id, True))])
+        return 0
+
+    def release(self):
+        self.released = True
+
+
+class FakeMdApi:
+    """行情API替身: 记录登录/订阅/退订请求，回调由测试直接调用"""
+
+    def __init__(self):
+        self.logins = 0
+        self.subscriptions = []
+        self.unsubscriptions = []
+
+    def req_user_login(self, **kwargs):
+        self.logins += 1
+        return 0
+
+    def subscribe_market_data(self, instrument_ids):
+        self.subscriptions.append(sorted(instrument_ids))
+        return 0
+
+    def unsubscribe_market_data(self, instrument_ids):
+        self.unsubscriptions.append(sorted(instrument_ids))
+        return 0
+
+    def release(self):
+        pass
+
+
+@pytest.fixture
+def trade_logger(tmp_path):
+    """初始化交易日志 (写入测试临时目录)"""
+    from ctp_trading_system.trade_logging.trade_logger import init_logger
+    return init_logger(str(tmp_path))
+
+
+@pytest.fixture
+def make_gateway(trade_logger):
+    """
+    CtpGateway 工厂 (测试结束时关闭)
+
+    用法:
+        gateway = make_gateway(query_rate=100)          # 关键字参数覆盖连接配置
+        gateway = make_gateway(api=counter)             # 使用自定义的交易API替身
+        gateway = make_gateway(attach=False)            # 不挂替身，由 connect() 创建API
+    """
+    from ctp_trading_system.config.settings import Settings
+    from ctp_trading_system.core.ctp_gateway import CtpGateway
+
+    gateways = []
+
+    def make(api=None, args_type=None, attach=True, **connection):
+        settings = Settings()
+        for name, value in connection.items():
+            setattr(settings.connection, name, value)
+        gateway = CtpGateway(settings)
+        gateways.append(gateway)
+        if attach:
+            if api is None:
+                api = FakeTraderApi(args_type)
+                # 与 connect() 一致: 按 API 是否支持参数块选择报单路径
+                gateway._order_templates.args_type = args_type
+            gateway._api = api
+            gateway._setup_callbacks()
+        return gateway
+
+    yield make
+    for gateway in gateways:
+        gateway.close()
+
+
+@pytest.fixture
+def make_md_gateway(trade_logger):
+    """
+    MdGateway 工厂: 模拟 connect 之后的状态 (测试结束时关闭)
+
+    主会话 (standby=True 时还有热备会话) 挂上 FakeMdApi 并安装回调
+    """
+    from ctp_trading_system.core.md_gateway import MdGateway, TickDeduper, _MdSession
+
+    gateways = []
+
+    def make(md_front="tcp://127.0.0.1:1", **kwargs):
+        gateway = MdGateway(md_front, **kwargs)
+        gateways.append(gateway)
+        sessions = [gateway._primary]
+        if gateway.standby:
+            gateway._standby = _MdSession("standby", gateway.front_selector.standby(exclude=md_front), "")
+            gateway._dedup = TickDeduper(gateway.dedup_window)
+            sessions.append(gateway._standby)
+        for session in sessions:
+            session.api = FakeMdApi()
+            gateway._setup_callbacks(session)
+        return gateway
+
+    yield make
+    for gateway in gateways:
+        gateway.close()
+
+
+@pytest.fixture
+def market_ticks():
+    """
+    MarketTick 序列工厂: 每 0.5 秒一个tick，价格/成交量逐个递增
+
+    用法:
+        ticks = market_ticks('rb2505', '20250110', 300, start_price=3500.0)
+    """
+    from ctp_trading_system.data.market_tick import MarketTick, TradingDayClock
+
+    def make(instrument_id, trading_day, n, start_price=3500.0):
+        clock = TradingDayClock()
+        ticks = []
+        for i in range(n):
+            seconds = 9 * 3600 + i // 2
+            ticks.append(MarketTick.from_dict({
+                'instrument_id': instrument_id, 'exchange_id': 'SHFE',
+                'last_price': start_price + i, 'volume': 100 + i,
+                'bid_price1': start_price + i - 1, 'ask_price1': start_price + i + 1,
+                'bid_volume1': i % 7, 'ask_volume1': i % 5,
+                'update_time': f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}",
+                'update_millisec': 500 * (i % 2),
+                'trading_day': trading_day, 'action_day': trading_day,
+            }, clock))
+        return ticks
+
+    return make
+
+
+@pytest.fixture
+def depth_books():
+    """
+    5档盘口tick字典序列工厂 (偶发撤单/冰山式量突变，偶发缺档)
+
+    用法:
+        books = depth_books(400, seed=11)
+    """
+    import numpy as np
+
+    def make(n, seed=11):
+        rng = np.random.default_rng(seed)
+        mid, ticks = 3500.0, []
+        for k in range(n):
+            mid += rng.choice([-1.0, 0.0, 0.0, 1.0])
+            tick = {'timestamp': 1_700_000_000 + 0.5 * k}
+            for level in range(1, 6):
+                scale = 0.2 if rng.random() < 0.1 else 1.0
+                tick[f'bid_price{level}'] = mid - level
+                tick[f'ask_price{level}'] = mid + level
+                tick[f'bid_volume{level}'] = int(rng.integers(1, 300) * scale)
+                tick[f'ask_volume{level}'] = int(rng.integers(1, 300) * scale)
+            if rng.random() < 0.05:
+                tick['ask_price5'] = 0.0      # 缺档
+            ticks.append(tick)
+        return ticks
+
+    return make
+
+
 # ==================== 辅助函数 ====================
 
 def wait_for_element(page, selector, timeout=5000):
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+账户资金测试
+验证账户快照的增量维护与柜台对账
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class TestAccountService:
+    """账户资金增量维护验证"""
+
+    INSTRUMENTS = {'rb2505': {'volume_multiple': 10, 'long_margin_ratio': 0.1,
+                              'short_margin_ratio': 0.1}}
+
+    def _service(self):
+        from ctp_trading_system.core.account_service import AccountService
+
+        service = AccountService(instrument_info=self.INSTRUMENTS.get)
+        service.set_commission_rate('rb', {'open_ratio_by_volume': 3.0, 'close_ratio_by_volume': 3.0,
+                                           'close_today_ratio_by_volume': 6.0})
+        service.apply_counter_state(
+            {'account_id': '001', 'balance': 1e6, 'available': 9e5, 'curr_margin': 1e5,
+             'frozen_cash': 0.0, 'close_profit': 0.0, 'position_profit': 0.0, 'commission': 0.0},
+            {'rb2505_2': {'instrument_id': 'rb2505', 'direction': '2', 'position': 2,
+                          'position_cost': 70000.0, 'use_margin': 7000.0}})
+        return service
+
+    def test_incremental_updates(self):
+        """报单冻结、成交保证金/手续费/平仓盈亏、行情持仓盈亏"""
+        service = self._service()
+        snap = service.get_snapshot()
+        assert snap['position_profit'] == 0.0 and service.is_reconciled()
+        assert service.get_snapshot() is snap
+
+        service.on_tick({'instrument_id': 'rb2505', 'last_price': 3510.0})
+        snap = service.get_snapshot()
+        assert snap['position_profit'] == 200.0
+        assert snap['balance'] == 1e6 + 200 and snap['available'] == 9e5 + 200
+
+        # 开仓委托冻结保证金与手续费，成交后释放
+        order = {'OrderRef': '7', 'InstrumentID': 'rb2505', 'Direction': '0', 'CombOffsetFlag': '0',
+                 'LimitPrice': 3500.0, 'VolumeTotal': 1, 'OrderStatus': '3'}
+        service.on_order(order)
+        snap = service.get_snapshot()
+        assert snap['frozen_margin'] == 3500.0 and snap['frozen_commission'] == 3.0
+        assert snap['available'] == 9e5 + 200 - 3503
+        service.on_order(dict(order, VolumeTotal=0, OrderStatus='0'))
+        trade = {'TradeID': 'T1', 'InstrumentID': 'rb2505', 'Direction': '0', 'OffsetFlag': '0',
+                 'Price': 3500.0, 'Volume': 1}
+        service.on_trade(trade)
+        snap = service.get_snapshot()
+        assert snap['frozen_margin'] == 0 and snap['curr_margin'] == 103500.0
+        assert snap['position_profit'] == 300.0 and snap['commission'] == 3.0
+
+        # 平今2手: 按均价计算平仓盈亏，按比例释放保证金
+        service.on_trade({'TradeID': 'T2', 'InstrumentID': 'rb2505', 'Direction': '1',
+                          'OffsetFlag': '3', 'Price': 3520.0, 'Volume': 2})
+        snap = service.get_snapshot()
+        assert snap['close_profit'] == 400.0 and snap['commission'] == 15.0
+        assert abs(snap['curr_margin'] - 96500.0) < 1e-6
+        assert snap['position_profit'] == 100.0
+        assert abs(snap['balance'] - (1e6 + 400 - 15 + 100)) < 1e-6
+        assert abs(snap['available'] - (9e5 + 485 + 3500)) < 1e-6
+
+        # 其他合约行情不触发重建
+        service.on_tick({'instrument_id': 'hc2505', 'last_price': 3300.0})
+        assert service.get_snapshot() is snap
+
+        print("[PASS] Account snapshot maintained incrementally")
+
+    def test_frozen_keyed_by_session(self):
+        """不同会话的同号报单分别冻结，撤销其中一笔不释放另一笔"""
+        service = self._service()
+        order = {'OrderRef': '5', 'InstrumentID': 'rb2505', 'Direction': '0', 'CombOffsetFlag': '0',
+                 'LimitPrice': 3500.0, 'VolumeTotal': 1, 'OrderStatus': '3', 'FrontID': 1}
+        service.on_order(dict(order, SessionID=1))
+        service.on_order(dict(order, SessionID=2))
+        assert service.get_snapshot()['frozen_margin'] == 7000.0
+
+        service.on_order(dict(order, SessionID=2, OrderStatus='5'))
+        snap = service.get_snapshot()
+        assert snap['frozen_margin'] == 3500.0 and snap['frozen_commission'] == 3.0
+        assert snap['available'] == 9e5 - 3503
+
+        print("[PASS] Frozen funds keyed by session")
+
+    def test_reconcile_skips_when_trades_arrive(self):
+        """对账期间有新成交时放弃结果，否则以柜台值为新基准"""
+        from types import SimpleNamespace
+
+        service = self._service()
+        account = {'account_id': '001', 'balance': 2e6, 'available': 1.5e6, 'curr_margin': 5e5}
+        trade_during_query = []
+
+        def future(value):
+            def result(timeout=None):
+                if trade_during_query:
+                    service.on_trade(trade_during_query.pop())
+                return value
+            return SimpleNamespace(result=result, ok=lambda: True)
+
+        service.gateway = SimpleNamespace(
+            is_logged_in=lambda: True,
+            submit_query_account=lambda: future(account),
+            submit_query_position=lambda: future({}),
+        )
+        trade_during_query.append({'TradeID': 'T9', 'InstrumentID': 'rb2505', 'Direction': '0',
+                                   'OffsetFlag': '0', 'Price': 3500.0, 'Volume': 1})
+        assert not service.reconcile()
+        assert service.get_snapshot()['balance'] != 2e6
+
+        assert service.reconcile()
+        snap = service.get_snapshot()
+        assert snap['balance'] == 2e6 and snap['available'] == 1.5e6
+        assert snap['curr_margin'] == 5e5 and snap['commission'] == 0.0
+
+        print("[PASS] Account reconcile verified")
+
+    def test_trade_ids_across_trading_days(self, make_gateway):
+        """重复成交由网关过滤；下一交易日同号成交照常计入手续费"""
+        from ctp_trading_system.core.account_service import AccountService
+
+        gateway = make_gateway()
+        service = AccountService(gateway, instrument_info=self.INSTRUMENTS.get)
+        service.set_commission_rate('rb', {'open_ratio_by_volume': 3.0})
+        api = gateway._api
+        trade = (b'9999', b'001', b'rb2505', b'1', b'u1', b'  88', b'0', b'0',
+                 3500.0, 1, b'20241016', b'09:00:02', b'  1001')
+
+        api.on_rsp_user_login('20241016', '09:00:00', '9999', '001', 1, 2, '1', 0, '', 1, True)
+        api.on_rtn_trade_raw(*trade)
+        api.on_rtn_trade_raw(*trade)
+        assert service.get_snapshot()['commission'] == 3.0
+
+        api.on_rsp_user_login('20241017', '20:50:00', '9999', '001', 1, 3, '1', 0, '', 2, True)
+        api.on_rtn_trade_raw(*trade)
+        assert service.get_snapshot()['commission'] == 6.0
+
+        print("[PASS] Same TradeID on the next trading day counted")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+批量撤单测试
+验证按流控速率流水线撤单、流控拒绝重排与超时 (本地模拟柜台)
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class TestCancelEngine:
+    """批量撤单引擎验证 (本地模拟柜台)"""
+
+    class _SimCounter:
+        """模拟柜台: 撤单按1秒滑动窗口流控 (超限返回-3)，撤单回报在后台线程延迟推送"""
+
+        def __init__(self, max_per_second, latency=0.005, drop=()):
+            import threading
+            from collections import deque
+            self.max_per_second = max_per_second
+            self.latency = latency
+            self.drop = set(drop)           # 这些报单的首次撤单没有回报
+            self.actions = []
+            self.rejects = 0
+            self.orders = {}
+            self._window = deque()
+            self._lock = threading.Lock()
+
+        def release(self):
+            pass
+
+        def place(self, order_ref, instrument_id, status=b'3'):
+            self.orders[order_ref] = instrument_id
+            self.push(order_ref, status)
+
+        def push(self, order_ref, status):
+            self.on_rtn_order_raw(b'9999', b'001', self.orders[order_ref].encode(), order_ref.encode(),
+                                  b'', b'0', b'0', 3500.0, 1, 0, status, b'', 1, 2, b'', b'', b'')
+
+        def req_order_action(self, **kwargs):
+            import threading
+            import time
+            now = time.monotonic()
+            with self._lock:
+                while self._window and now - self._window[0] >= 1.0:
+                    self._window.popleft()
+                if len(self._window) >= self.max_per_second:
+                    self.rejects += 1
+                    return -3
+                self._window.append(now)
+                order_ref = kwargs['order_ref']
+                self.actions.append((order_ref, now))
+                if order_ref in self.drop:
+                    self.drop.discard(order_ref)
+                    return 0
+            threading.Timer(self.latency, self.push, (order_ref, b'5')).start()
+            return 0
+
+    def _make_handler(self, make_gateway, counter, rate):
+        from ctp_trading_system.emergency.emergency_handler import EmergencyHandler
+
+        gateway = make_gateway(api=counter, order_action_rate=rate)
+        gateway._logged_in = True
+        handler = EmergencyHandler(gateway)
+        handler.cancel_engine.retry_interval = 0.2
+        return gateway, handler
+
+    def test_cancel_all_pipelined(self, make_gateway):
+        """按流控速率连续发送，无回报的报单重发，暂停交易后仍能撤单，报告 time_to_flat"""
+        counter = self._SimCounter(max_per_second=50, drop=('7',))
+        gateway, handler = self._make_handler(make_gateway, counter, rate=50)
+        for i in range(30):
+            counter.place(str(i), 'rb2505' if i % 2 else 'i2505')
+        counter.place('99', 'rb2505', status=b'0')       # 已全部成交，不在撤单目标中
+
+        handler.pause_trading("测试")
+        results = handler.cancel_all_orders("测试")
+        report = handler.get_last_cancel_report()
+
+        assert len(results) == 30 and all(results.values()) and '1:2:7' in results
+        assert gateway.get_working_orders() == {}
+        assert [ref for ref, _ in counter.actions].count('7') == 2
+        assert report['sent'] == 31 and report['retries'] == 1 and report['failed'] == []
+        assert counter.rejects == 0 and report['flow_control_rejects'] == 0
+        sends = [t for _, t in counter.actions[:30]]
+        assert min(b - a for a, b in zip(sends, sends[1:])) > 0.015
+        # 旧实现每笔之后固定等待0.1秒: 30笔至少3秒
+        assert report['time_to_flat'] < 1.5
+
+        print(f"[PASS] 30 orders flat in {report['time_to_flat'] * 1000:.0f}ms")
+
+    def test_flow_control_and_timeout(self, make_gateway):
+        """柜台流控拒绝(-3)后重排不计次数；始终无回报的报单在次数用尽后报告为失败"""
+        counter = self._SimCounter(max_per_second=5, drop=('3',))
+        gateway, handler = self._make_handler(make_gateway, counter, rate=100)
+        handler.cancel_engine.max_attempts = 1
+        handler.cancel_engine.timeout = 2.0
+        for i in range(8):
+            counter.place(str(i), 'rb2505')
+
+        results = handler.cancel_orders_by_instrument('rb2505')
+        report = handler.get_last_cancel_report()
+
+        assert counter.rejects > 0 and report['flow_control_rejects'] == counter.rejects
+        assert {key for key, ok in results.items() if not ok} == {'1:2:3'}
+        assert report['failed'] == ['1:2:3'] and report['time_to_flat'] is None
+        assert sorted(gateway.get_working_orders()) == [(1, 2, '3')]
+
+        print(f"[PASS] Flow control rejects retried ({counter.rejects})")
+
+    def test_deadline_sized_by_rate(self, make_gateway):
+        """撤单数超过 timeout*rate 时仍按速率全部发出，超时只用于等待回报"""
+        counter = self._SimCounter(max_per_second=1000)
+        gateway, handler = self._make_handler(make_gateway, counter, rate=100)
+        handler.cancel_engine.timeout = 0.1
+        for i in range(60):
+            counter.place(str(i), 'rb2505')
+
+        results = handler.cancel_all_orders("测试")
+        report = handler.get_last_cancel_report()
+
+        assert len(counter.actions) == 60 and len(results) == 60 and all(results.values())
+        assert report['failed'] == [] and report['time_to_flat'] > 0.5
+
+        print(f"[PASS] 60 cancels at 100/s flat in {report['time_to_flat'] * 1000:.0f}ms")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
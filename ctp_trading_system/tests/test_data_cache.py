@@ -0,0 +1,763 @@
+# -*- coding: utf-8 -*-
+"""
+数据缓存层一致性测试
+验证增量/向量化实现与原始批量实现的数值一致性
+"""
+
+import pytest
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+def _make_ticks(n: int, seed: int = 1):
+    """生成模拟tick序列 (随机游走价格 + 累计成交量 + 偶发大单)"""
+    from ctp_trading_system.data import TickData
+
+    rng = np.random.default_rng(seed)
+    price, volume = 3500.0, 10000
+    ticks = []
+    for _ in range(n):
+        price += rng.choice([-1.0, 0.0, 0.0, 1.0])
+        volume += int(rng.poisson(20)) + (500 if rng.random() < 0.02 else 0)
+        bid = price - rng.choice([0.0, 1.0])
+        ask = bid + rng.choice([1.0, 1.0, 2.0])
+        ticks.append(TickData(
+            last_price=price,
+            bid_price1=bid,
+            ask_price1=ask,
+            bid_volume1=int(rng.integers(0, 800)),
+            ask_volume1=int(rng.integers(0, 800)),
+            volume=volume
+        ))
+    return ticks
+
+
+def _assert_features_close(actual: dict, expected: dict, rtol: float = 1e-6, atol: float = 1e-9):
+    """逐特征比较 (NaN视为相等)"""
+    assert list(actual.keys()) == list(expected.keys())
+    for name, value in expected.items():
+        a, e = float(actual[name]), float(value)
+        if np.isnan(a) and np.isnan(e):
+            continue
+        assert np.isclose(a, e, rtol=rtol, atol=atol), f"{name}: {a} != {e}"
+
+
+class TestIncrementalTickFeatures:
+    """增量Tick特征引擎验证"""
+
+    def test_parity_with_batch(self):
+        """增量模式与批量实现逐tick一致 (含多次全量重建)"""
+        from ctp_trading_system.data import TickCache
+
+        incremental = TickCache(maxlen=120, incremental=True)
+        incremental._engine.resync_interval = 700
+        batch = TickCache(maxlen=120)
+
+        checked = 0
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for tick in _make_ticks(2000):
+                incremental.add_tick(tick)
+                batch.add_tick(tick)
+                if batch.is_ready():
+                    _assert_features_close(incremental.extract_features(),
+                                           batch._extract_features_batch())
+                    checked += 1
+
+        assert checked == 2000 - 120 + 1
+        print(f"[PASS] Incremental features match batch on {checked} windows")
+
+    def test_not_ready_and_clear(self):
+        """未满窗口返回空特征，clear后重新累积"""
+        from ctp_trading_system.data import TickCache
+
+        cache = TickCache(maxlen=30, incremental=True)
+        ticks = _make_ticks(80, seed=7)
+        for tick in ticks[:29]:
+            cache.add_tick(tick)
+        assert all(v == 0.0 for v in cache.extract_features().values())
+
+        cache.clear()
+        reference = TickCache(maxlen=30)
+        for tick in ticks[29:]:
+            cache.add_tick(tick)
+            reference.add_tick(tick)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            _assert_features_close(cache.extract_features(), reference.extract_features())
+
+        print("[PASS] Incremental engine reset verified")
+
+
+class TestColumnarTickCache:
+    """列式环形缓冲验证"""
+
+    def test_window_views_are_chronological(self):
+        """窗口视图按时间顺序且为零拷贝"""
+        from ctp_trading_system.data import TickCache
+
+        cache = TickCache(maxlen=50)
+        ticks = _make_ticks(137, seed=3)
+        for i, tick in enumerate(ticks):
+            tick.datetime = f"t{i}"
+            cache.add_tick(tick)
+
+        expected = ticks[-50:]
+        prices = cache.view('last_price')
+        assert np.array_equal(prices, [t.last_price for t in expected])
+        assert np.shares_memory(prices, cache._data)
+        assert not prices.flags.writeable
+        assert cache.window().shape == (50, 11)
+
+        # 兼容接口: get_ticks 按需重建对象
+        rebuilt = cache.get_ticks()
+        assert [t.to_dict() for t in rebuilt] == [t.to_dict() for t in expected]
+        assert cache.get_latest().datetime == "t136"
+
+        print("[PASS] Columnar ring buffer verified")
+
+    def test_add_from_ctp_matches_add_tick(self):
+        """add_from_ctp 与 add_tick 写入结果一致"""
+        from ctp_trading_system.data import TickCache
+
+        a, b = TickCache(maxlen=20), TickCache(maxlen=20)
+        for tick in _make_ticks(35, seed=5):
+            a.add_tick(tick)
+            b.add_from_ctp(tick.to_dict())
+
+        assert np.array_equal(a.window(), b.window())
+        assert a.calculate_imb() == b.calculate_imb()
+        assert a.calculate_volatility() == b.calculate_volatility()
+
+        print("[PASS] add_from_ctp path verified")
+
+
+class TestTickCacheRegistry:
+    """多合约注册表验证"""
+
+    def test_vectorized_metrics_match_per_instrument(self):
+        """向量化指标与逐合约 TickCache / IMBCalculator 结果一致"""
+        from ctp_trading_system.data import TickCache, TickCacheRegistry
+        from ctp_trading_system.strategy.h1e_tick import IMBCalculator
+
+        instruments = [f"rb25{i:02d}" for i in range(1, 13)]
+        registry = TickCacheRegistry(maxlen=60, capacity=4)   # 触发扩容
+        caches = {inst: TickCache(maxlen=60) for inst in instruments}
+        calcs = {inst: IMBCalculator() for inst in instruments}
+        signals = {}
+
+        streams = {inst: _make_ticks(50 + 7 * k, seed=k) for k, inst in enumerate(instruments)}
+        for step in range(max(len(s) for s in streams.values())):
+            for inst, ticks in streams.items():
+                if step >= len(ticks):
+                    continue
+                tick = dict(ticks[step].to_dict(), instrument_id=inst)
+                registry.on_tick(tick)
+                caches[inst].add_from_ctp(tick)
+                signals[inst] = calcs[inst].process_tick(tick)
+
+        metrics = registry.compute()
+        assert registry.instruments() == instruments
+        for row, inst in enumerate(instruments):
+            signal = signals[inst]
+            assert np.isclose(metrics['imb'][row], signal.imb_value)
+            assert metrics['depth'][row] == signal.total_depth
+            assert np.isclose(metrics['volatility'][row], signal.volatility)
+            assert np.isclose(metrics['imb_window'][row], caches[inst].calculate_imb())
+            assert np.isclose(metrics['mid_price'][row], signal.mid_price)
+            assert np.array_equal(registry.view(inst, 'last_price'), caches[inst].view('last_price'))
+
+        print(f"[PASS] Registry metrics match for {len(instruments)} instruments")
+
+
+class TestMultiTimeframeBarAggregator:
+    """多周期、按交易时段切分的Bar聚合验证"""
+
+    @staticmethod
+    def _stream(start: str, end: str, step_ms: int = 500):
+        """生成固定间隔的tick字典序列 (epoch_ms 时间戳)"""
+        from ctp_trading_system.data.bar_aggregator import to_epoch_ms
+        from datetime import datetime
+
+        t0 = to_epoch_ms(datetime.fromisoformat(start))
+        t1 = to_epoch_ms(datetime.fromisoformat(end))
+        ticks, volume, turnover = [], 1000, 1e7
+        for k, t in enumerate(range(t0, t1, step_ms)):
+            volume += 1 + k % 3
+            turnover += (1 + k % 3) * 35000.0
+            ticks.append({'epoch_ms': t, 'last_price': 3500.0 + (k % 7) - 3,
+                          'volume': volume, 'turnover': turnover, 'open_interest': 1e5})
+        return ticks
+
+    def test_hour_apart_ticks_are_different_bars(self):
+        """相隔整1小时的tick属于不同Bar"""
+        from ctp_trading_system.data import BarAggregator
+
+        agg = BarAggregator()
+        assert agg.on_tick({'last_price': 1.0, 'datetime': '2024-01-02 09:00:10'}) is None
+        bar = agg.on_tick({'last_price': 2.0, 'datetime': '2024-01-02 10:00:10'})
+        assert bar is not None and bar.datetime == '2024-01-02T09:00:00'
+        assert agg.get_current_bar().datetime == '2024-01-02T10:00:00'
+
+        print("[PASS] Epoch keyed bar boundaries verified")
+
+    def test_day_session_multi_timeframe(self):
+        """日盘: 多周期同时聚合，午休/小节休息不产生Bar，时段末截断"""
+        from ctp_trading_system.data import BarAggregator, BarInterval, sessions_for_instrument
+
+        batches = []
+        agg = BarAggregator(
+            intervals=['1m', '5m', '30m', BarInterval.seconds(15), '100tick', '500vol', '5e6amt'],
+            sessions=sessions_for_instrument('rb2505'),
+            on_bars_completed=batches.append
+        )
+        ticks = self._stream('2024-01-02 10:00:00', '2024-01-02 13:40:00')
+        bars = agg.on_ticks(ticks) + agg.flush()
+        assert batches == [bars[:-len(agg.intervals)], bars[-len(agg.intervals):]]
+
+        by_interval = {}
+        for bar in bars:
+            by_interval.setdefault(bar.interval, []).append(bar)
+
+        # 时间Bar不落在 10:15-10:30 和 11:30-13:30 休息时段
+        for name in ('15s', '1m', '5m', '30m'):
+            for bar in by_interval[name]:
+                hhmm = bar.datetime[11:16]
+                assert not ('10:15' <= hhmm < '10:30') and not ('11:30' <= hhmm < '13:30'), bar
+        # 30分钟Bar以时段起点对齐，10:00开始的Bar在10:15截断
+        assert [b.datetime[11:16] for b in by_interval['30m']] == ['10:00', '10:30', '11:00', '13:30']
+        assert len(by_interval['1m']) == 15 + 60 + 10
+        # 时段内tick全部计入Bar，各周期成交量合计一致
+        in_session = [t for t in ticks if agg._sessions.locate(t['epoch_ms'])]
+        for name, series in by_interval.items():
+            assert sum(b.tick_count for b in series) == len(in_session), name
+        volumes = {name: sum(b.volume for b in series) for name, series in by_interval.items()}
+        assert len(set(volumes.values())) == 1
+        assert all(b.tick_count == 100 for b in by_interval['100tick'][:-1])
+        assert all(b.volume >= 500 for b in by_interval['500vol'][:-1])
+        assert all(b.turnover >= 5e6 for b in by_interval['5000000amt'][:-1])
+
+        print(f"[PASS] {len(bars)} bars across {len(by_interval)} intervals")
+
+    def test_night_session_crosses_midnight(self):
+        """夜盘跨午夜: Bar连续切分，收盘后短时间内的tick并入最后一根Bar"""
+        from ctp_trading_system.data import BarAggregator, sessions_for_instrument
+
+        completed = []
+        agg = BarAggregator(on_bar_completed=completed.append, intervals=['15m', '1h'],
+                            sessions=sessions_for_instrument('au2506'))
+        ticks = self._stream('2024-01-02 23:40:00', '2024-01-03 00:20:00', step_ms=10_000)
+        ticks += self._stream('2024-01-03 02:29:50', '2024-01-03 02:30:02', step_ms=1_000)
+        ticks += self._stream('2024-01-03 02:40:00', '2024-01-03 02:41:00', step_ms=10_000)
+        agg.on_ticks(ticks)
+
+        assert [b.datetime for b in completed] == ['2024-01-02T23:30:00', '2024-01-02T23:45:00',
+                                                   '2024-01-03T00:00:00', '2024-01-03T00:15:00']
+        last = agg.get_current_bar()
+        assert last.datetime == '2024-01-03T02:15:00' and last.tick_count == 12
+        assert agg.flush(agg._builders[0].closes_at - 1) == []
+        # 15m与1h最后一根Bar都在02:30截断，到点一并完成
+        flushed = agg.flush(agg._builders[0].closes_at)
+        assert flushed[0] is last and flushed[1].datetime == '2024-01-03T02:00:00'
+        assert agg.get_current_bar('1h') is None
+
+        print("[PASS] Night session bars verified")
+
+
+class TestArrayL2DepthBuffer:
+    """数组化L2深度缓存验证"""
+
+    @staticmethod
+    def _reference(history):
+        """按原列表实现逐快照重算的冰山单/大单结果"""
+        bid = [sum(d.bid_volumes) for d in history]
+        ask = [sum(d.ask_volumes) for d in history]
+        b10, a10 = bid[-10:], ask[-10:]
+        count_b = sum(1 for i in range(1, 9) if b10[i] < b10[i-1] * 0.5 and b10[i+1] > b10[i] * 1.5)
+        count_a = sum(1 for i in range(1, 9) if a10[i] < a10[i-1] * 0.5 and a10[i+1] > a10[i] * 1.5)
+        return {
+            'bid_mean': np.mean(b10), 'bid_std': np.std(b10),
+            'ask_std': np.std(a10), 'ask_mean': np.mean(a10),
+            'bid_iceberg_count': count_b, 'ask_iceberg_count': count_a,
+            'large_bid_mean': np.mean(bid[-20:-1]), 'large_ask_mean': np.mean(ask[-20:-1]),
+        }
+
+    def test_window_statistics_match_list_implementation(self, depth_books):
+        """前缀和窗口统计与逐快照重算结果一致"""
+        from ctp_trading_system.data import L2DepthBuffer, L2Depth
+
+        buffer = L2DepthBuffer(max_history=30)
+        history = []
+        for tick in depth_books(400):
+            buffer.update_from_tick(tick)
+            history.append(L2Depth.from_ctp(tick))
+            if len(history) < 20:
+                continue
+            ref = self._reference(history)
+            iceberg = buffer.detect_iceberg()
+            assert np.isclose(iceberg['bid_iceberg_strength'], ref['bid_std'] / (ref['bid_mean'] + 1))
+            assert np.isclose(iceberg['ask_iceberg_strength'], ref['ask_std'] / (ref['ask_mean'] + 1))
+            assert iceberg['bid_iceberg_count'] == ref['bid_iceberg_count']
+            assert iceberg['ask_iceberg_count'] == ref['ask_iceberg_count']
+
+            large = buffer.detect_large_order()
+            current = history[-1]
+            assert large['has_large_bid'] == (sum(current.bid_volumes) > 3.0 * ref['large_bid_mean'])
+            assert large['has_large_ask'] == (sum(current.ask_volumes) > 3.0 * ref['large_ask_mean'])
+
+            assert buffer.get_snapshot() == current
+            assert np.isclose(buffer.get_obi(), (sum(current.bid_volumes) - sum(current.ask_volumes))
+                              / (sum(current.bid_volumes) + sum(current.ask_volumes)))
+
+        assert len(buffer) == 30 and buffer.window().shape == (30, 5, 2, 2)
+        assert np.allclose(buffer.get_level_means(10), buffer.window(10)[:, :, 1, :].mean(axis=0))
+
+        print("[PASS] L2 window statistics verified")
+
+    def test_multi_level_analytics(self):
+        """加权OBI / 微观价格 / 深度斜率 / 队列消耗速率"""
+        from ctp_trading_system.data import L2DepthBuffer
+
+        buffer = L2DepthBuffer(depletion_window=3)
+        assert buffer.get_microprice() == 0.0 and buffer.get_depletion_rates()['bid_depletion_per_tick'] == 0.0
+
+        base = {'bid_price1': 100.0, 'ask_price1': 101.0, 'bid_volume1': 30, 'ask_volume1': 10,
+                'bid_price2': 99.0, 'ask_price2': 102.0, 'bid_volume2': 50, 'ask_volume2': 10,
+                'timestamp': 1000.0}
+        buffer.update_from_tick(base)
+        assert np.isclose(buffer.get_weighted_obi(), (30 + 0.8 * 50 - 10 - 0.8 * 10) / (40 + 0.8 * 60))
+        assert np.isclose(buffer.get_microprice(), (100.0 * 10 + 101.0 * 30) / 40)
+        slope = buffer.get_depth_slope()
+        assert np.isclose(slope['bid_depth_slope'], 50.0) and np.isclose(slope['ask_depth_slope'], 10.0)
+
+        # 买一同价减少20，卖一整档被吃掉 (卖一上移)，再同价增加 (不计消耗)
+        buffer.update_from_tick(dict(base, bid_volume1=10, timestamp=1000.5))
+        buffer.update_from_tick(dict(base, bid_volume1=10, ask_price1=102.0, ask_volume1=10,
+                                     ask_price2=103.0, timestamp=1001.0))
+        buffer.update_from_tick(dict(base, bid_volume1=40, ask_price1=102.0, ask_volume1=10,
+                                     ask_price2=103.0, timestamp=1001.5))
+        rates = buffer.get_depletion_rates()
+        assert rates['bid_depletion_per_tick'] == 20 / 3 and rates['ask_depletion_per_tick'] == 10 / 3
+        assert np.isclose(rates['bid_depletion_per_sec'], 20 / 1.5)
+        assert np.isclose(rates['ask_depletion_per_sec'], 10 / 1.5)
+
+        features = buffer.get_features()
+        assert features['bid_depletion_rate'] == 20 / 3 and 'microprice' in features
+
+        print("[PASS] Multi-level L2 analytics verified")
+
+
+class TestFeatureSequenceCache:
+    """float32环形特征序列缓存验证"""
+
+    def test_parity_with_sklearn_transform(self):
+        """融合标准化结果与 sklearn scaler.transform 一致，且读取不复制"""
+        from sklearn.preprocessing import StandardScaler
+        from ctp_trading_system.data import FeatureSequenceCache
+
+        seq_len, dim = 10, 18
+        rng = np.random.default_rng(5)
+        names = FeatureSequenceCache.FEATURE_NAMES[:dim]
+        steps = [{name: float(v) for name, v in zip(names, rng.normal(3.0, 2.0, dim))}
+                 for _ in range(37)]
+        del steps[20][names[4]]          # 缺失特征补0
+
+        flat_scaler = StandardScaler().fit(rng.normal(3.0, 2.0, (200, seq_len * dim)))
+        feature_scaler = StandardScaler().fit(rng.normal(3.0, 2.0, (200, dim)))
+
+        flat_cache = FeatureSequenceCache(seq_len, dim)
+        flat_cache.set_scaler(flat_scaler)
+        feature_cache = FeatureSequenceCache(seq_len, dim)
+        window = []
+        for k, step in enumerate(steps):
+            flat_cache.add_features(step)
+            feature_cache.add_features(step)
+            if k == 15:
+                feature_cache.set_scaler(feature_scaler)     # 中途设置，已缓存数据重新标准化
+            window = (window + [[step.get(name, 0.0) for name in names]])[-seq_len:]
+            if not flat_cache.is_ready():
+                continue
+
+            matrix = np.array(window)
+            assert np.allclose(flat_cache.get_matrix(), matrix, rtol=1e-6)
+
+            x = flat_cache.get_lstm_input()
+            expected = flat_scaler.transform(matrix.reshape(1, -1)).reshape(1, seq_len, dim)
+            assert x.dtype == np.float32 and x.shape == (1, seq_len, dim)
+            assert np.allclose(x, expected, rtol=1e-5, atol=1e-5)
+            assert np.shares_memory(x, flat_cache._out)
+
+            if k >= 15:
+                x = feature_cache.get_lstm_input()
+                expected = feature_scaler.transform(matrix)[None]
+                assert np.allclose(x, expected, rtol=1e-5, atol=1e-5)
+                assert np.shares_memory(x, feature_cache._scaled) and x.flags.c_contiguous
+
+        print("[PASS] Fused standardization matches sklearn")
+
+
+class TestFeatureRegistry:
+    """声明式特征注册表验证"""
+
+    def test_lazy_subgraph_and_shared_intermediates(self):
+        """只计算请求子图，共享中间量每次求值只算一次"""
+        from ctp_trading_system.data import FeatureRegistry
+
+        registry = FeatureRegistry()
+        calls = {'returns': 0, 'expensive': 0}
+
+        @registry.intermediate('_returns', source='prices', window=5)
+        def _returns(ctx):
+            calls['returns'] += 1
+            return np.diff(ctx.source('prices')[-5:])
+
+        @registry.intermediate('_expensive', source='prices', window=50)
+        def _expensive(ctx):
+            calls['expensive'] += 1
+            return 0.0
+
+        registry.feature('ret_sum', deps=('_returns',))(lambda ctx: float(ctx['_returns'].sum()))
+        registry.feature('ret_max', deps=('_returns',))(lambda ctx: float(ctx['_returns'].max()))
+        registry.feature('slow', deps=('_expensive',))(lambda ctx: ctx['_expensive'])
+        registry.feature('combo', deps=('ret_sum', 'ret_max'))(lambda ctx: ctx['ret_sum'] - ctx['ret_max'])
+
+        plan = registry.plan(['combo', 'ret_max'])
+        assert plan.nodes == ['_returns', 'ret_sum', 'ret_max', 'combo']
+        assert plan.windows == {'prices': 5}
+        assert registry.plan(['combo', 'ret_max']) is plan
+
+        values = plan.evaluate({'prices': np.array([1.0, 3.0, 2.0, 6.0, 7.0])})
+        assert values == {'combo': 2.0, 'ret_max': 4.0}
+        assert calls == {'returns': 1, 'expensive': 0}
+        assert 'ret_sum' in registry and '_returns' not in registry
+
+        registry.feature('a', deps=('b',))(lambda ctx: 0)
+        registry.feature('b', deps=('a',))(lambda ctx: 0)
+        with pytest.raises(ValueError):
+            registry.plan(['a'])
+        with pytest.raises(KeyError):
+            registry.plan(['missing'])
+
+        print("[PASS] Lazy feature plan verified")
+
+    def test_builtin_feature_sets(self, depth_books):
+        """内置特征集合与 FeatureEngine / TickCache / L2DepthBuffer 一致"""
+        from ctp_trading_system.data import FEATURE_REGISTRY, TickCache, L2DepthBuffer
+        from ctp_trading_system.strategy.lstm_l2 import FeatureEngine
+
+        assert FEATURE_REGISTRY.feature_set('lstm_l2') == FeatureEngine().get_feature_names()
+        assert FEATURE_REGISTRY.unknown(FeatureEngine.FEATURE_NAMES) == []
+
+        # 未启用的特征组不进入求值计划
+        nodes = FeatureEngine(use_iceberg=False, use_large_order=False)._plan.nodes
+        assert '_l1_iceberg' not in nodes and '_l1_large_trades' not in nodes
+
+        cache = TickCache(maxlen=60, incremental=True)
+        for tick in _make_ticks(80):
+            cache.add_tick(tick)
+        tick_values = FEATURE_REGISTRY.plan(FEATURE_REGISTRY.feature_set('tick')).evaluate(
+            {'tick_cache': cache})
+        assert tick_values == {f'tick.{k}': v for k, v in cache.extract_features().items()}
+
+        depth = L2DepthBuffer()
+        for tick in depth_books(40):
+            depth.update_from_tick(tick)
+        depth_values = FEATURE_REGISTRY.plan(FEATURE_REGISTRY.feature_set('depth')).evaluate(
+            {'depth': depth})
+        expected = depth.get_features()
+        for name, value in depth_values.items():
+            assert np.isclose(value, expected[name[len('depth.'):]]), name
+
+        print(f"[PASS] {len(FEATURE_REGISTRY.names())} registered features verified")
+
+
+def _make_bars(n: int, seed: int = 3):
+    """生成模拟K线序列"""
+    from ctp_trading_system.strategy.lstm_l2.feature_engine import BarData
+
+    rng = np.random.default_rng(seed)
+    close, bars = 3500.0, []
+    for _ in range(n):
+        open_ = close
+        close = open_ + float(rng.choice([-3.0, -1.0, 0.0, 0.0, 1.0, 2.0]))
+        high = max(open_, close) + float(rng.integers(0, 3))
+        low = min(open_, close) - float(rng.integers(0, 3))
+        bars.append(BarData(open=open_, high=high, low=low, close=close,
+                            volume=int(rng.integers(0, 2000))))
+    return bars
+
+
+def _make_l1_ticks(n: int, seed: int = 4):
+    """生成一档行情字典 (挂单量随机跳变 + 偶发大额成交 + 累计成交量偶发归零)"""
+    rng = np.random.default_rng(seed)
+    price, volume, ticks = 3500.0, 0, []
+    for _ in range(n):
+        price += float(rng.choice([-1.0, 0.0, 1.0]))
+        if rng.random() < 0.03:
+            volume = 0
+        volume += int(rng.poisson(5)) + (int(rng.integers(200, 3000)) if rng.random() < 0.1 else 0)
+        ticks.append({'last_price': price, 'volume': volume,
+                      'bid_volume1': int(rng.integers(1, 300)), 'ask_volume1': int(rng.integers(1, 300))})
+    return ticks
+
+
+def _reference_lstm_features(bars: list, ticks: list) -> dict:
+    """原 FeatureEngine 的批量实现 (每次由Bar/tick列表重新计算)"""
+    closes = [b.close for b in bars]
+    volumes = [b.volume for b in bars]
+    latest = bars[-1]
+    f = {'open': latest.open, 'high': latest.high, 'low': latest.low, 'close': latest.close,
+         'volume': float(latest.volume)}
+    for period in (1, 5, 10):
+        base = closes[-period - 1]
+        f[f'return_{period}'] = (closes[-1] - base) / base if base > 0 else 0
+    deltas = np.diff(closes)
+    avg_gain = np.mean(np.where(deltas > 0, deltas, 0)[-14:])
+    avg_loss = np.mean(np.where(deltas < 0, -deltas, 0)[-14:])
+    f['rsi_14'] = 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+    avg_vol = np.mean(volumes[-20:]) if len(volumes) >= 20 else 0
+    f['volume_ratio'] = volumes[-1] / avg_vol if avg_vol > 0 else 1.0
+
+    if len(ticks) >= 10:
+        bid = [t['bid_volume1'] for t in ticks[-10:]]
+        ask = [t['ask_volume1'] for t in ticks[-10:]]
+        bid_drops = sum(bid[i] < bid[i-1] * 0.5 and bid[i+1] > bid[i] * 1.5 for i in range(1, 9))
+        ask_drops = sum(ask[i] < ask[i-1] * 0.5 and ask[i+1] > ask[i] * 1.5 for i in range(1, 9))
+        bid_strength = np.std(bid) / (np.mean(bid) + 1)
+        ask_strength = np.std(ask) / (np.mean(ask) + 1)
+    else:
+        bid_drops = ask_drops = 0
+        bid_strength = ask_strength = 0.0
+    f.update({'bid_iceberg_count': bid_drops, 'bid_iceberg_strength': bid_strength,
+              'ask_iceberg_count': ask_drops, 'ask_iceberg_strength': ask_strength,
+              'iceberg_imbalance': bid_strength - ask_strength,
+              'has_bid_iceberg': int(bid_drops > 0), 'has_ask_iceberg': int(ask_drops > 0)})
+
+    buys = sells = 0
+    if len(ticks) >= 20:
+        recent = ticks[-20:]
+        vols = [t['volume'] for t in recent]
+        threshold = np.mean(vols) * 3
+        for i in range(1, 20):
+            if vols[i] - vols[i-1] > threshold:
+                if recent[i]['last_price'] - recent[i-1]['last_price'] > 0:
+                    buys += 1
+                else:
+                    sells += 1
+    total = buys + sells
+    f.update({'large_buy_count': buys, 'large_sell_count': sells,
+              'large_order_ratio': total / 20 if len(ticks) >= 20 else 0.0,
+              'large_order_imbalance': (buys - sells) / total if total else 0})
+
+    returns = np.diff(closes) / np.array(closes[:-1])
+    for window in (5, 15, 30):
+        f[f'volatility_{window}'] = float(np.std(returns[-window:])) if len(returns) >= window else 0.0
+    f['volatility_ratio'] = f['volatility_5'] / f['volatility_15'] if f['volatility_15'] > 0 else 1.0
+    for window in (5, 15):
+        recent_bars = bars[-window:]
+        high, low = max(b.high for b in recent_bars), min(b.low for b in recent_bars)
+        f[f'price_range_{window}'] = (high - low) / closes[-1]
+    f['return_abs'] = abs(returns[-1])
+    return f
+
+
+class TestIncrementalIndicators:
+    """增量技术指标验证"""
+
+    def test_indicators_match_reference(self):
+        """EMA / MACD / Wilder RSI / 布林带 / 波动率与逐根重算的参考实现一致"""
+        from ctp_trading_system.data import EMA, MACD, RSI, Bollinger, RollingVolatility
+
+        closes = [b.close for b in _make_bars(3000)]
+        ema, macd, rsi = EMA(10), MACD(12, 26, 9), RSI(14, 'wilder')
+        rsi_sma, boll = RSI(14, 'sma'), Bollinger(20, 2.0)
+        vol = RollingVolatility((5, 30))
+
+        ref_ema = ref_fast = ref_slow = ref_signal = None
+        avg_gain = avg_loss = None
+        for i, close in enumerate(closes):
+            ema.update(close)
+            macd_value = macd.update(close)
+            rsi.update(close)
+            rsi_sma.update(close)
+            boll.update(close)
+            vol.update(close)
+
+            ref_ema = close if ref_ema is None else ref_ema + 2 / 11 * (close - ref_ema)
+            ref_fast = close if ref_fast is None else ref_fast + 2 / 13 * (close - ref_fast)
+            ref_slow = close if ref_slow is None else ref_slow + 2 / 27 * (close - ref_slow)
+            line = ref_fast - ref_slow
+            ref_signal = line if ref_signal is None else ref_signal + 2 / 10 * (line - ref_signal)
+            assert np.isclose(ema.value, ref_ema, rtol=1e-12)
+            assert np.allclose(macd_value, (line, ref_signal, line - ref_signal), rtol=1e-9, atol=1e-9)
+
+            deltas = np.diff(closes[:i + 1])
+            if len(deltas) == 14:
+                avg_gain = np.clip(deltas, 0, None).mean()
+                avg_loss = np.clip(-deltas, 0, None).mean()
+            elif len(deltas) > 14:
+                avg_gain = (avg_gain * 13 + max(deltas[-1], 0)) / 14
+                avg_loss = (avg_loss * 13 + max(-deltas[-1], 0)) / 14
+            if avg_gain is None:
+                assert rsi.value == 50.0 and not rsi.ready
+            else:
+                expected = 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+                assert np.isclose(rsi.value, expected, rtol=1e-9)
+
+            if len(deltas) >= 14:
+                gains = np.clip(deltas[-14:], 0, None).mean()
+                losses = np.clip(-deltas[-14:], 0, None).mean()
+                expected = 100.0 if losses == 0 else 100 - 100 / (1 + gains / losses)
+                assert np.isclose(rsi_sma.value, expected, rtol=1e-9)
+
+            window = np.array(closes[max(0, i - 19):i + 1])
+            upper, lower, pct = boll.value
+            assert np.isclose(upper, window.mean() + 2 * window.std(), rtol=1e-12)
+            assert np.isclose(lower, window.mean() - 2 * window.std(), rtol=1e-12)
+
+            returns = np.diff(closes[max(0, i - 30):i + 1]) / np.array(closes[max(0, i - 30):i])
+            for w in (5, 30):
+                expected = float(np.std(returns[-w:])) if len(returns) >= w else 0.0
+                assert np.isclose(vol.std(w), expected, rtol=1e-8, atol=1e-15)
+
+        print("[PASS] Incremental indicators match reference on 3000 bars")
+
+    def test_seed_equals_streaming(self):
+        """seed(history) 与逐根更新状态一致，且可继续增量更新"""
+        from ctp_trading_system.data import BarIndicators, L1OrderFlow
+
+        bars, ticks = _make_bars(200), _make_l1_ticks(200)
+        streamed = BarIndicators()
+        for bar in bars:
+            streamed.update(bar)
+        seeded = BarIndicators().seed(bars[:150])
+        for bar in bars[150:]:
+            seeded.update(bar)
+        for name in ('rsi_14', 'rsi_7', 'rsi_14_wilder', 'ema_10', 'ema_30', 'macd', 'bollinger'):
+            assert getattr(seeded, name).value == getattr(streamed, name).value, name
+        assert seeded.volatility.std(15) == streamed.volatility.std(15)
+        assert seeded.price_range(15) == streamed.price_range(15)
+
+        flow = L1OrderFlow().seed(ticks)
+        streamed_flow = L1OrderFlow()
+        for tick in ticks:
+            streamed_flow.update(tick)
+        assert flow.iceberg_features() == streamed_flow.iceberg_features()
+        assert flow.large_order_features() == streamed_flow.large_order_features()
+        # 最小窗口: 3个tick产生一个冰山单标志
+        small = L1OrderFlow(iceberg_window=3).seed(ticks[:50])
+        assert small.iceberg_features()['bid_iceberg_count'] in (0, 1)
+        with pytest.raises(ValueError):
+            L1OrderFlow(iceberg_window=2)
+
+        print("[PASS] Seeded indicators equal streaming state")
+
+    def test_feature_engine_matches_batch(self):
+        """FeatureEngine 增量特征与原批量实现逐根一致"""
+        from ctp_trading_system.strategy.lstm_l2 import FeatureEngine
+
+        bars, ticks = _make_bars(400), _make_l1_ticks(4000)
+        engine = FeatureEngine()
+        large_orders = icebergs = 0
+        for i, bar in enumerate(bars):
+            for tick in ticks[i * 10:(i + 1) * 10]:
+                engine.add_l2_data(tick)
+            engine.add_bar(bar)
+            if not engine.is_ready():
+                assert set(engine.calculate_features().values()) == {0.0}
+                continue
+            features = engine.calculate_features()
+            expected = _reference_lstm_features(bars[max(0, i - 59):i + 1], ticks[max(0, i * 10 - 90):(i + 1) * 10])
+            _assert_features_close(features, expected, rtol=1e-9, atol=1e-12)
+            large_orders += features['large_buy_count'] + features['large_sell_count']
+            icebergs += features['bid_iceberg_count']
+
+        # 随机数据需覆盖大单与冰山单分支
+        assert large_orders > 0 and icebergs > 0
+
+        # 预热后的引擎与逐根喂入一致
+        seeded = FeatureEngine()
+        seeded.seed_bars(bars)
+        seeded.seed_l2_data(ticks)
+        assert seeded.calculate_features() == engine.calculate_features()
+
+        print("[PASS] FeatureEngine incremental features match batch implementation")
+
+
+class TestFeatureBackfill:
+    """历史特征批量回填验证"""
+
+    def test_tick_backfill_matches_streaming(self):
+        """向量化回填与逐tick extract_features 一致 (含分块边界)"""
+        from ctp_trading_system.data import TickCache, backfill_tick_features
+
+        ticks = _make_ticks(700, seed=5)
+        names, matrix = backfill_tick_features(ticks, maxlen=120, chunk_size=97)
+        assert matrix.shape == (700, len(names))
+
+        cache = TickCache(maxlen=120)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for t, tick in enumerate(ticks):
+                cache.add_tick(tick)
+                _assert_features_close(dict(zip(names, matrix[t])), cache.extract_features())
+
+        print(f"[PASS] Tick backfill matches streaming on {len(ticks)} ticks")
+
+    def test_lstm_backfill_matches_feature_engine(self):
+        """Bar特征回填与逐Bar FeatureEngine 一致，tick按Bar对齐"""
+        from ctp_trading_system.data import backfill_lstm_features
+        from ctp_trading_system.strategy.lstm_l2 import FeatureEngine
+
+        bars, ticks = _make_bars(300), _make_l1_ticks(3000)
+        rng = np.random.default_rng(6)
+        tick_counts = np.sort(rng.integers(0, len(ticks), len(bars)))
+
+        names, matrix = backfill_lstm_features(bars, ticks, tick_counts)
+        engine, added = FeatureEngine(), 0
+        for i, bar in enumerate(bars):
+            while added < tick_counts[i]:
+                engine.add_l2_data(ticks[added])
+                added += 1
+            engine.add_bar(bar)
+            _assert_features_close(dict(zip(names, matrix[i])), engine.calculate_features(),
+                                   rtol=1e-9, atol=1e-12)
+
+        subset, sub_matrix = backfill_lstm_features(bars, names=['rsi_14', 'volatility_5'])
+        assert np.array_equal(sub_matrix, matrix[:, [names.index('rsi_14'), names.index('volatility_5')]])
+        with pytest.raises(KeyError):
+            backfill_lstm_features(bars, names=['tick.imb_mean'])
+        # 有tick时必须给出每根Bar的tick数，否则会用到Bar之后的tick
+        with pytest.raises(ValueError):
+            backfill_lstm_features(bars, ticks)
+        with pytest.raises(ValueError):
+            backfill_lstm_features(bars, ticks, tick_counts[:-1])
+
+        print("[PASS] LSTM backfill matches FeatureEngine bar by bar")
+
+    def test_backfill_days_process_pool(self):
+        """多交易日进程池回填与顺序执行结果相同"""
+        from ctp_trading_system.data import backfill_days, backfill_lstm_features
+
+        days = {f'2024010{d}': _make_ticks(300, seed=d) for d in range(2, 5)}
+        parallel = backfill_days(days, max_workers=2, maxlen=60)
+        serial = backfill_days(days, max_workers=1, maxlen=60)
+        assert list(parallel) == sorted(days)
+        for day in days:
+            assert np.array_equal(parallel[day][1], serial[day][1], equal_nan=True)
+
+        bar_days = {'20240102': (_make_bars(50, seed=1),), '20240103': (_make_bars(80, seed=2),)}
+        result = backfill_days(bar_days, func=backfill_lstm_features, max_workers=2)
+        assert result['20240103'][1].shape == (80, 28)
+
+        print("[PASS] Multi-day backfill verified")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+多前置故障切换测试
+验证前置测速排序、交易网关切换前置与行情热备去重
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class TestFrontFailover:
+    """多前置测速、故障切换与行情热备验证"""
+
+    @staticmethod
+    def _tick_args(instrument_id, update_time, millisec, volume, price):
+        args = [instrument_id, 'SHFE'] + [0.0] * 35 + [update_time, millisec, '20240105', '20240105']
+        args[2] = price
+        args[9] = volume
+        return args
+
+    def test_probe_ranking_and_failover(self):
+        """并行测速按 建连+登录 耗时排序，不可达前置排最后，失败后切换到下一个"""
+        import socket
+        from ctp_trading_system.core.front_selector import FrontSelector, parse_front
+
+        listeners = [socket.socket() for _ in range(2)]
+        for listener in listeners:
+            listener.bind(('127.0.0.1', 0))
+            listener.listen(8)
+        slow, fast = [f"tcp://127.0.0.1:{listener.getsockname()[1]}" for listener in listeners]
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))
+        dead = f"tcp://127.0.0.1:{closed.getsockname()[1]}"
+        closed.close()
+
+        login_seconds = {slow: 0.2, fast: 0.01}
+        selector = FrontSelector([dead, slow, fast], probe_timeout=1.0,
+                                 login_probe=lambda front, timeout: login_seconds[front])
+        assert selector.current() == dead          # 测速前按配置顺序
+        stats = selector.probe()
+        for listener in listeners:
+            listener.close()
+
+        assert [s.front for s in stats] == [fast, slow, dead]
+        assert selector.current() == fast
+        assert stats[0].login_ms == 10.0 and stats[2].connect_ms is None and stats[2].error
+        assert selector.standby(exclude=fast) == slow
+        assert parse_front(fast) == ('127.0.0.1', int(fast.rsplit(':', 1)[1]))
+
+        # 当前前置失败 -> 切换到次优；次优也失败 -> 回到失败次数少者
+        assert selector.mark_failed() == slow
+        assert selector.mark_failed() == fast
+        # 成功登录清零失败计数
+        selector.record(fast, login_ms=5.0)
+        assert selector.ranked()[0] == fast
+        # 更新前置列表保留已有测速结果
+        selector.set_fronts([fast, slow])
+        assert selector.ranked() == [fast, slow] and selector.get_stats()[0].login_ms == 5.0
+
+        print("[PASS] Fronts ranked by probe latency with failover")
+
+    def test_gateway_failover_front(self, make_gateway):
+        """交易网关按配置的前置列表切换，连接监测器报告当前前置"""
+        fronts = ["tcp://10.0.0.1:41205", "tcp://10.0.0.2:41205"]
+        gateway = make_gateway(trade_fronts=fronts)
+        assert gateway.config.get_trade_fronts() == fronts
+        assert gateway.front_selector.current() == fronts[0]
+
+        gateway._front = fronts[0]
+        assert gateway.failover_front() == fronts[1]
+        assert gateway.get_front_stats()['ranking'][-1]['failures'] == 1
+
+        # 只配置一个前置时不变
+        single = make_gateway()
+        single._front = single.front_selector.current()
+        assert single.failover_front() == single.config.trade_front
+
+        print("[PASS] Trade gateway fails over to next front")
+
+    def test_hot_standby_dedup(self, make_md_gateway):
+        """两路行情去重: 主会话断线期间由热备继续，行情无重复无缺失；重连后自动登录并补订"""
+        from ctp_trading_system.core import DeliveryPolicy
+
+        gateway = make_md_gateway("tcp://127.0.0.1:1", md_fronts=["tcp://127.0.0.1:1", "tcp://127.0.0.1:2"],
+                                  standby=True)
+        received = []
+        gateway.register_market_data_callback(received.append, DeliveryPolicy.INLINE)
+
+        # 模拟 connect/login 之后的两个会话
+        primary, standby = gateway._primary, gateway._standby
+        assert standby.front == "tcp://127.0.0.1:2"
+        for session in (primary, standby):
+            session.connected = session.logged_in = True
+        primary.auto_login = True
+        assert gateway.subscribe(['rb2405', 'i2405'])
+        assert primary.api.subscriptions == standby.api.subscriptions == [['i2405', 'rb2405']]
+
+        ticks = [self._tick_args('rb2405' if i % 2 else 'i2405', f"09:00:{i // 2:02d}", 500 * (i % 2),
+                                 i, 3500.0 + i) for i in range(40)]
+        # 主会话送达 0-19 后断线；热备滞后 3 个tick，持续送达全部行情
+        for i in range(40):
+            if i < 20:
+                primary.api.on_rtn_depth_market_data(*ticks[i])
+            elif i == 20:
+                primary.api.on_front_disconnected(0x1001)
+            if i >= 3:
+                standby.api.on_rtn_depth_market_data(*ticks[i - 3])
+        for args in ticks[37:]:
+            standby.api.on_rtn_depth_market_data(*args)
+
+        assert [tick.last_price for tick in received] == [3500.0 + i for i in range(40)]
+        # 两个会话各用自己的时间基准 (在各自的 SPI 线程上切换交易日)
+        assert primary.clock is not standby.clock
+        assert primary.clock.trading_day == standby.clock.trading_day is not None
+        assert gateway.is_logged_in() and not primary.logged_in
+        assert gateway.get_latest_tick('rb2405').last_price == 3539.0
+        sessions = {s['role']: s for s in gateway.get_feed_stats()['sessions']}
+        assert sessions['primary']['ticks'] == 20 and sessions['primary']['duplicates'] == 0
+        assert sessions['standby']['ticks'] == 40 and sessions['standby']['duplicates'] == 20
+
+        # CTP 自动重连后: 自动登录，登录成功后补订已订阅合约
+        primary.api.on_front_connected()
+        assert primary.api.logins == 1
+        primary.api.on_rsp_user_login('20240105', '09:00:21', '9999', '', 0, '', 1, 1)
+        assert primary.logged_in and primary.api.subscriptions[-1] == ['i2405', 'rb2405']
+
+        gateway.close()
+        assert not gateway.is_connected() and gateway.get_feed_stats()['sessions'][0]['role'] == 'primary'
+
+        print("[PASS] Hot-standby feed deduplicated across failover")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
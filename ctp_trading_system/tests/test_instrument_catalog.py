@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+合约目录测试
+验证按交易日落库的合约/费率缓存与后台刷新
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class TestInstrumentCatalog:
+    """按交易日缓存的合约目录验证"""
+
+    INSTRUMENTS = {
+        'rb2505': {'instrument_id': 'rb2505', 'exchange_id': 'SHFE', 'instrument_name': '螺纹钢2505',
+                   'product_id': 'rb', 'volume_multiple': 10, 'price_tick': 1.0,
+                   'long_margin_ratio': 0.1, 'short_margin_ratio': 0.1, 'is_trading': True},
+        'rb2510': {'instrument_id': 'rb2510', 'exchange_id': 'SHFE', 'instrument_name': '螺纹钢2510',
+                   'product_id': 'rb', 'volume_multiple': 10, 'price_tick': 1.0,
+                   'long_margin_ratio': 0.1, 'short_margin_ratio': 0.1, 'is_trading': True},
+        'SR505': {'instrument_id': 'SR505', 'exchange_id': 'CZCE', 'instrument_name': '白糖505',
+                  'product_id': 'SR', 'volume_multiple': 10, 'price_tick': 1.0,
+                  'long_margin_ratio': 0.07, 'short_margin_ratio': 0.07, 'is_trading': True},
+    }
+
+    def _gateway(self, logger, trading_day):
+        from types import SimpleNamespace
+
+        calls = {'instruments': 0, 'commission': 0}
+
+        def submit_query_instruments():
+            calls['instruments'] += 1
+            return SimpleNamespace(result=lambda timeout=None: dict(self.INSTRUMENTS),
+                                   ok=lambda: True, error_msg='')
+
+        def query_commission_rate(instrument_id, timeout=10):
+            calls['commission'] += 1
+            return {'instrument_id': 'rb', 'open_ratio_by_volume': 3.0, 'close_ratio_by_volume': 3.0,
+                    'close_today_ratio_by_volume': 6.0}
+
+        gateway = SimpleNamespace(
+            logger=logger,
+            instruments={},
+            get_trading_day=lambda: trading_day,
+            is_logged_in=lambda: True,
+            submit_query_instruments=submit_query_instruments,
+            query_commission_rate=query_commission_rate,
+        )
+        gateway.set_instruments = lambda instruments: setattr(gateway, 'instruments', instruments)
+        return gateway, calls
+
+    def test_store_round_trip_and_indexes(self, tmp_path):
+        """合约与费率按交易日落库，索引按品种/交易所/交割月份查询"""
+        from ctp_trading_system.storage.instrument_store import InstrumentStore, delivery_month
+
+        assert delivery_month('rb2505', '20241016') == '202505'
+        assert delivery_month('SR505', '20241016') == '202505'
+        assert delivery_month('SR001', '20291016') == '203001'
+        assert delivery_month('m2505-C-3000', '20241016') == '202505'
+
+        store = InstrumentStore(str(tmp_path / 'instruments.db'))
+        assert store.save_instruments('20241016', self.INSTRUMENTS) == 3
+        store.save_instruments('20241015', self.INSTRUMENTS)
+        loaded = store.load_instruments('20241016')
+        assert loaded['SR505']['delivery_month'] == '202505'
+        assert loaded['rb2505']['is_trading'] is True and loaded['rb2505']['volume_multiple'] == 10
+        assert [i['instrument_id'] for i in store.query_instruments('20241016', product_id='rb')] == \
+            ['rb2505', 'rb2510']
+        assert [i['instrument_id'] for i in store.query_instruments(
+            '20241016', delivery_month='202505')] == ['SR505', 'rb2505']
+
+        store.save_margin_rate('20241016', {'instrument_id': 'rb2505', 'long_margin_ratio_by_money': 0.12})
+        assert store.load_margin_rates('20241016')['rb2505']['long_margin_ratio_by_money'] == 0.12
+        assert store.load_margin_rates('20241015') == {}
+
+        assert store.purge(keep_days=1) == 1
+        assert store.get_trading_days() == ['20241016']
+
+        print("[PASS] Instrument store verified")
+
+    def test_catalog_uses_daily_cache(self, tmp_path, trade_logger):
+        """当日缓存命中不查询柜台；旧交易日缓存先用后台刷新；费率只查一次"""
+        from ctp_trading_system.storage.instrument_store import InstrumentStore
+        from ctp_trading_system.core.instrument_catalog import InstrumentCatalog
+
+        db_path = str(tmp_path / 'instruments.db')
+
+        # 冷启动: 同步查询并落库
+        gateway, calls = self._gateway(trade_logger, '20241016')
+        catalog = InstrumentCatalog(gateway, InstrumentStore(db_path))
+        rates = []
+        catalog.register_callback('commission_rate', lambda key, rate: rates.append(key))
+        assert len(catalog.load()) == 3 and calls['instruments'] == 1
+        assert gateway.instruments is catalog.instruments()
+        assert catalog.by_product('RB') == ['rb2505', 'rb2510']
+        assert catalog.by_exchange('CZCE') == ['SR505']
+        assert catalog.by_expiry('202505') == ['SR505', 'rb2505']
+        # 按品种返回的手续费率对同品种其他合约生效
+        assert catalog.get_commission_rate('rb2505')['open_ratio_by_volume'] == 3.0
+        assert catalog.get_commission_rate('rb2510') is not None
+        assert calls['commission'] == 1 and rates == ['rb']
+
+        # 同一交易日重启: 直接读库，费率也不再查询
+        gateway, calls = self._gateway(trade_logger, '20241016')
+        catalog = InstrumentCatalog(gateway, InstrumentStore(db_path))
+        assert len(catalog.load()) == 3 and calls['instruments'] == 0
+        assert catalog.get_commission_rate('rb2505') is not None and calls['commission'] == 0
+
+        # 新交易日: 先返回旧缓存，后台刷新后切换到当日
+        gateway, calls = self._gateway(trade_logger, '20241017')
+        catalog = InstrumentCatalog(gateway, InstrumentStore(db_path))
+        assert len(catalog.load()) == 3 and catalog.trading_day == '20241016'
+        catalog._refresh_thread.join(timeout=5)
+        assert calls['instruments'] == 1 and catalog.trading_day == '20241017'
+        assert catalog.store.get_trading_days() == ['20241016', '20241017']
+
+        print("[PASS] Instrument catalog cache verified")
+
+    def test_rates_during_background_refresh(self, tmp_path, trade_logger):
+        """旧交易日缓存在用、后台刷新未完成时查询的费率写入柜台当前交易日"""
+        import threading
+        from types import SimpleNamespace
+        from ctp_trading_system.storage.instrument_store import InstrumentStore
+        from ctp_trading_system.core.instrument_catalog import InstrumentCatalog
+
+        store = InstrumentStore(str(tmp_path / 'instruments.db'))
+        store.save_instruments('20241016', self.INSTRUMENTS)
+        gateway, calls = self._gateway(trade_logger, '20241017')
+        release = threading.Event()
+
+        def submit_query_instruments():
+            release.wait(5)
+            return SimpleNamespace(result=lambda timeout=None: dict(self.INSTRUMENTS),
+                                   ok=lambda: True, error_msg='')
+
+        gateway.submit_query_instruments = submit_query_instruments
+        gateway.query_margin_rate = lambda instrument_id, timeout=10: {
+            'instrument_id': instrument_id, 'long_margin_ratio_by_money': 0.12}
+        catalog = InstrumentCatalog(gateway, store)
+        catalog.load()
+        catalog.prefetch_rates(['rb2505']).join(timeout=5)
+        assert catalog.trading_day == '20241016' and catalog.get_margin_rate('rb2505') is not None
+        assert store.load_margin_rates('20241016') == {} and store.load_commission_rates('20241016') == {}
+        assert 'rb2505' in store.load_margin_rates('20241017')
+
+        release.set()
+        catalog._refresh_thread.join(timeout=5)
+        assert catalog.trading_day == '20241017'
+        assert catalog.get_margin_rate('rb2505')['long_margin_ratio_by_money'] == 0.12
+        assert catalog.get_commission_rate('rb2505') is not None and calls['commission'] == 1
+
+        print("[PASS] Rates stored under the current trading day during refresh")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
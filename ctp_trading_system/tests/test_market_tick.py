@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+标准化行情测试
+验证交易日时钟与网关构建的共享 MarketTick
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class TestMarketTick:
+    """标准化行情Tick验证"""
+
+    def test_trading_day_clock_night_session(self):
+        """夜盘跨午夜与周末: 周一交易日的夜盘在上周五晚"""
+        from ctp_trading_system.data import TradingDayClock
+        from ctp_trading_system.data.market_tick import format_epoch_ns
+
+        clock = TradingDayClock()
+        cases = [
+            ('21:00:00', 0, '2024-01-05T21:00:00.000'),
+            ('23:59:59', 500, '2024-01-05T23:59:59.500'),
+            ('00:00:00', 0, '2024-01-06T00:00:00.000'),
+            ('02:30:00', 0, '2024-01-06T02:30:00.000'),
+            ('08:59:00', 0, '2024-01-08T08:59:00.000'),
+            ('15:00:00', 0, '2024-01-08T15:00:00.000'),
+        ]
+        for update_time, millisec, expected in cases:
+            assert format_epoch_ns(clock.epoch_ns('20240108', update_time, millisec)) == expected
+        # 再次查询命中缓存，结果不变
+        assert format_epoch_ns(clock.epoch_ns('20240108', '00:00:00', 0)) == '2024-01-06T00:00:00.000'
+        assert format_epoch_ns(clock.epoch_ns('20240110', '21:30:00', 0)) == '2024-01-09T21:30:00.000'
+
+        print("[PASS] Trading day clock verified")
+
+    def test_trading_day_clock_concurrent_switch(self):
+        """两个线程交替使用不同交易日: 每个tick的时间戳都按自己的交易日计算"""
+        import sys
+        import threading
+        from ctp_trading_system.data import TradingDayClock
+
+        expected = {day: TradingDayClock().epoch_ns(day, '21:00:00', 0) for day in ('20240108', '20240109')}
+        clock, errors = TradingDayClock(), []
+
+        def run(day):
+            for _ in range(20000):
+                if clock.epoch_ns(day, '21:00:00', 0) != expected[day]:
+                    errors.append(day)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=run, args=(day,)) for day in expected]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        assert errors == []
+
+        print("[PASS] Trading day clock switch is atomic")
+
+    def test_gateway_builds_one_shared_tick(self, make_md_gateway):
+        """MdGateway 每个回调构建一个 MarketTick，下游模块共享"""
+        from ctp_trading_system.core import DeliveryPolicy
+        from ctp_trading_system.data import (
+            MarketTick, BarAggregator, TickCache, L1Snapshot, L2Depth
+        )
+        from ctp_trading_system.data.market_tick import MARKET_TICK_FIELDS
+
+        gateway = make_md_gateway("tcp://127.0.0.1:0")
+        api = gateway._primary.api
+        api.on_rsp_user_login('20240108', '20:55:00', '', '', 0, '', 1, True)
+
+        received = []
+        gateway.register_market_data_callback(received.append, DeliveryPolicy.INLINE)
+
+        def push(update_time, millisec, volume, trading_day):
+            values = {name: 0 for name in MARKET_TICK_FIELDS}
+            values.update(instrument_id='rb2505', exchange_id='SHFE', last_price=3500.0,
+                          bid_price1=3499.0, bid_volume1=10, ask_price1=3500.0, ask_volume1=20,
+                          volume=volume, update_time=update_time, update_millisec=millisec,
+                          trading_day=trading_day, action_day='20240105')
+            api.on_rtn_depth_market_data(*(values[name] for name in MARKET_TICK_FIELDS))
+
+        push('23:59:59', 500, 100, '20240108')
+        push('00:00:00', 0, 110, '20240105')     # 郑商所式自然日TradingDay，以登录交易日为准
+
+        tick = received[-1]
+        assert isinstance(tick, MarketTick) and gateway.get_latest_tick('rb2505') is tick
+        assert tick.trading_day == '20240108'
+        assert tick.datetime == '2024-01-06T00:00:00.000'
+        assert tick['volume'] == 110 and tick.get('missing', 1) == 1 and 'epoch_ns' in tick
+        assert gateway.get_market_data('rb2505')['epoch_ns'] == tick.epoch_ns
+
+        # 下游共享同一时间戳，不再回落到当前时间
+        agg = BarAggregator()
+        agg.on_tick(received[0])
+        bar = agg.on_tick(tick)
+        assert bar.datetime == '2024-01-05T23:59:00' and bar.epoch_ms == received[0].epoch_ms - 59_500
+        assert L1Snapshot.from_tick(tick).timestamp_ms == tick.epoch_ms
+        assert L2Depth.from_ctp(tick).timestamp_ms == tick.epoch_ms
+        cache = TickCache(maxlen=5)
+        cache.add_from_ctp(tick)
+        assert cache.get_latest().datetime == tick.datetime
+
+        print("[PASS] MarketTick shared across consumers")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+行情分发测试
+验证按投递策略隔离的行情消费者 (慢消费者不阻塞行情线程)
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class TestMdDispatcher:
+    """行情分发器验证"""
+
+    @staticmethod
+    def _tick(instrument_id, price):
+        from types import SimpleNamespace
+        return SimpleNamespace(instrument_id=instrument_id, last_price=price)
+
+    @staticmethod
+    def _wait(predicate, timeout=2.0):
+        import time
+        deadline = time.time() + timeout
+        while not predicate() and time.time() < deadline:
+            time.sleep(0.001)
+        return predicate()
+
+    def test_slow_consumer_does_not_block_publisher(self):
+        """慢消费者只在自己的队列中积压，逐tick消费者按序收到全部行情"""
+        import threading
+        import time
+        from ctp_trading_system.core.md_dispatcher import MdDispatcher, DeliveryPolicy
+
+        dispatcher = MdDispatcher()
+        gate = threading.Event()
+        strategy_ticks, ui_ticks, inline_ticks = [], [], []
+
+        def slow_ui(tick):
+            gate.wait(2)
+            ui_ticks.append(tick)
+
+        dispatcher.register(strategy_ticks.append, DeliveryPolicy.EVERY_TICK, name="strategy")
+        dispatcher.register(slow_ui, DeliveryPolicy.CONFLATE, name="ui")
+        dispatcher.register(inline_ticks.append, DeliveryPolicy.INLINE, name="cache")
+
+        ticks = [self._tick(f'rb240{i % 3}', 3500.0 + i) for i in range(300)]
+        dispatcher.publish(ticks[0])
+        # 等界面工作线程取走第一条并阻塞在回调中
+        assert self._wait(lambda: dispatcher.stats()['ui']['depth'] == 0)
+        start = time.perf_counter()
+        for tick in ticks[1:]:
+            dispatcher.publish(tick)
+        elapsed = time.perf_counter() - start
+        assert elapsed < 0.5
+        assert inline_ticks == ticks
+
+        assert self._wait(lambda: len(strategy_ticks) == 300)
+        assert strategy_ticks == ticks
+
+        # 界面消费者阻塞期间，每个合约只保留最新值
+        assert dispatcher.stats()['ui']['depth'] == 3
+        gate.set()
+        dispatcher.stop()
+        assert ui_ticks == [ticks[0], ticks[-2], ticks[-1], ticks[-3]]
+
+        stats = dispatcher.stats()
+        ui = stats['ui']
+        assert ui['received'] == 300 and ui['dropped'] == 0
+        assert ui['delivered'] == 4 and ui['conflated'] == 296
+        assert ui['lag_ms_max'] > 0 and ui['depth'] == 0 and ui['max_depth'] == 3
+        assert stats['strategy']['delivered'] == 300 and stats['strategy']['policy'] == 'EVERY_TICK'
+        assert stats['cache']['lag_ms_max'] < 50
+
+        print(f"[PASS] Publish 300 ticks in {elapsed * 1000:.1f}ms with a blocked consumer")
+
+    def test_bounded_queue_drops_oldest(self):
+        """逐tick队列满时丢弃最旧行情，异常计数不影响后续投递"""
+        import threading
+        from ctp_trading_system.core.md_dispatcher import MdDispatcher, DeliveryPolicy
+
+        dispatcher = MdDispatcher()
+        gate = threading.Event()
+        received = []
+
+        def consumer(tick):
+            gate.wait(2)
+            if tick.last_price == 9:
+                raise ValueError("bad tick")
+            received.append(tick.last_price)
+
+        name = dispatcher.register(consumer, DeliveryPolicy.EVERY_TICK, maxsize=4)
+        assert name in dispatcher.get_consumer_names()
+
+        dispatcher.publish(self._tick('rb2401', 0))
+        # 等工作线程取走第一条并阻塞在回调中
+        assert self._wait(lambda: dispatcher.stats()[name]['depth'] == 0)
+        for price in range(1, 11):
+            dispatcher.publish(self._tick('rb2401', price))
+        stats = dispatcher.stats()[name]
+        assert stats['depth'] == 4 and stats['max_depth'] == 4 and stats['dropped'] == 6
+
+        gate.set()
+        assert dispatcher.unregister(name, drain=True)
+        assert received == [0, 7, 8, 10]
+        assert dispatcher.get_consumer(name) is None and not dispatcher.unregister(name)
+
+        print("[PASS] Bounded queue drops oldest ticks")
+
+    def test_gateway_dispatch_policies(self, make_md_gateway):
+        """MdGateway 按投递策略注册消费者，关闭时投递完剩余行情"""
+        from ctp_trading_system.core import DeliveryPolicy
+
+        gateway = make_md_gateway("tcp://127.0.0.1:0")
+        inline, strategy = [], []
+        gateway.register_market_data_callback(inline.append, DeliveryPolicy.INLINE)
+        # 默认 EVERY_TICK: 独立队列，不在行情线程上回调
+        gateway.register_market_data_callback(strategy.append, name="strategy")
+
+        ticks = [self._tick('rb2405', 3500.0 + i) for i in range(100)]
+        for tick in ticks:
+            gateway._publish(tick)
+        assert inline == ticks
+        gateway.close()
+        assert strategy == ticks
+        assert gateway.get_latest_tick('rb2405') is ticks[-1]
+
+        stats = gateway.get_dispatch_stats()
+        assert stats['strategy']['delivered'] == 100 and stats['strategy']['dropped'] == 0
+        assert stats['strategy']['policy'] == 'EVERY_TICK'
+        assert gateway.unregister_market_data_callback('strategy')
+        assert 'strategy' not in gateway.get_dispatch_stats()
+
+        print("[PASS] MdGateway dispatch policies verified")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
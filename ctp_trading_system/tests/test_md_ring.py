@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+行情环形缓冲测试
+验证 C 侧写入的环形缓冲记录布局、批量读取与 MdGateway 环形缓冲分发
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class TestMdTickRing:
+    """行情环形缓冲验证 (合成生产者)"""
+
+    def test_layout_matches_c_header(self):
+        """结构化类型与 md_ring.h 的 MdTickRecord 字段顺序、大小一致"""
+        import re
+        from ctp_trading_system.ctp_api.md_ring import MD_TICK_DTYPE, MD_RING_HEADER_DTYPE
+
+        header = Path(__file__).parent.parent.parent / 'ctp_wrapper' / 'src' / 'md_ring.h'
+        text = header.read_text(encoding='utf-8')
+        body = re.search(r'typedef struct \{(.*?)\} MdTickRecord;', text, re.S).group(1)
+        sizes = {'uint64_t': 8, 'int64_t': 8, 'double': 8, 'int32_t': 4}
+        fields = re.findall(r'^\s*(uint64_t|int64_t|double|int32_t|char)\s+(\w+)(?:\[(\d+)\])?;', body, re.M)
+        assert [name for _, name, _ in fields] == list(MD_TICK_DTYPE.names)
+        for ctype, name, length in fields:
+            assert MD_TICK_DTYPE[name].itemsize == (int(length) if length else sizes[ctype]), name
+        assert MD_TICK_DTYPE.itemsize == 352 and MD_RING_HEADER_DTYPE.itemsize == 256
+
+        print("[PASS] Ring record layout matches md_ring.h")
+
+    def test_roundtrip_and_drop_when_full(self, depth_books):
+        """记录经环形缓冲转换为 MarketTick 与字典构建一致，缓冲满时丢弃并计数"""
+        from ctp_trading_system.ctp_api.md_ring import MdTickRing, encode_ticks
+        from ctp_trading_system.data import MarketTick, TradingDayClock
+        from ctp_trading_system.data.market_tick import ticks_from_records
+
+        ring = MdTickRing(capacity=6)
+        assert ring.capacity == 8 and ring.address % 64 == 0
+
+        books = depth_books(10)
+        for i, book in enumerate(books):
+            book.update(instrument_id='rb2405', exchange_id='SHFE', volume=100 + i,
+                        update_time=f'21:00:0{i}', update_millisec=500,
+                        trading_day='20240105', action_day='20240104')
+        assert ring.push(encode_ticks(books)) == 8
+        assert ring.dropped == 2 and len(ring) == 8
+
+        records = ring.drain(5)
+        assert list(records['seq']) == [1, 2, 3, 4, 5] and len(ring) == 3
+        records = np.concatenate((records, ring.drain()))
+        assert ring.push(encode_ticks(books[8:])) == 2     # 跨越环尾
+        records = np.concatenate((records, ring.drain()))
+        assert list(records['seq']) == list(range(1, 11))
+
+        clock = TradingDayClock()
+        ticks = ticks_from_records(records[:8], clock)
+        for tick, book in zip(ticks, books):
+            expected = MarketTick.from_dict(book, TradingDayClock())
+            assert tick.to_dict() == expected.to_dict()
+
+        # 交易日下限与回调模式一致
+        late = ticks_from_records(records[:1], TradingDayClock(), min_trading_day='20240108')
+        assert late[0].trading_day == '20240108'
+
+        print("[PASS] Ring roundtrip and overflow verified")
+
+    def test_threaded_synthetic_producer(self):
+        """生产者线程持续写入，消费者按批读取: 序号连续、数据无丢失无重复"""
+        import threading
+        from ctp_trading_system.ctp_api.md_ring import MdTickRing, MD_TICK_DTYPE
+
+        total = 20000
+        ring = MdTickRing(capacity=256)
+        source = np.zeros(total, dtype=MD_TICK_DTYPE)
+        source['last_price'] = np.arange(total, dtype=np.float64)
+
+        def produce():
+            rng = np.random.default_rng(7)
+            sent = 0
+            while sent < total:
+                batch = source[sent:sent + int(rng.integers(1, 50))]
+                room = ring.capacity - len(ring)
+                sent += ring.push(batch[:room]) if room else 0
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        received = []
+        count = 0
+        while count < total:
+            records = ring.drain(100)
+            received.append(records)
+            count += len(records)
+        producer.join()
+
+        records = np.concatenate(received)
+        assert ring.dropped == 0
+        assert np.array_equal(records['seq'], np.arange(1, total + 1))
+        assert np.array_equal(records['last_price'], source['last_price'])
+
+        print(f"[PASS] {total} records through ring with no loss")
+
+    def test_gateway_ring_dispatch(self, make_md_gateway):
+        """MdGateway 环形缓冲模式: 批量回调 + 逐tick回调 + 行情缓存"""
+        import threading
+        import time
+        from ctp_trading_system.ctp_api.md_ring import MdTickRing, encode_ticks
+
+        gateway = make_md_gateway("tcp://127.0.0.1:0", use_ring=True)
+        gateway._trading_day = '20240105'
+        batches, ticks = [], []
+        gateway.register_tick_batch_callback(batches.append)
+        gateway.register_market_data_callback(ticks.append)
+
+        # 模拟 connect 中挂接成功后的状态
+        gateway._ring = ring = MdTickRing(capacity=64)
+        gateway._ring_thread = threading.Thread(target=gateway._ring_loop, daemon=True)
+        gateway._ring_thread.start()
+        assert gateway.is_ring_mode()
+
+        rows = [{'instrument_id': f'rb240{i % 2}', 'last_price': 3500.0 + i, 'volume': i,
+                 'update_time': '21:30:00', 'update_millisec': i, 'trading_day': '20240104'}
+                for i in range(50)]
+        ring.push(encode_ticks(rows))
+        deadline = time.time() + 2
+        while len(ticks) < 50 and time.time() < deadline:
+            time.sleep(0.001)
+        gateway._stop_ring()
+
+        assert sum(len(b) for b in batches) == 50
+        assert [t.last_price for t in ticks] == [row['last_price'] for row in rows]
+        assert all(t.trading_day == '20240105' for t in ticks)
+        assert ticks[0].datetime == '2024-01-04T21:30:00.000'
+        assert gateway.get_latest_tick('rb2401') is ticks[-1]
+        assert not gateway.is_ring_mode()
+
+        print("[PASS] MdGateway ring dispatch verified")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
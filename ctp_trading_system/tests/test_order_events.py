@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+报单回报测试
+验证报单/成交事件、有界报单存储与撤单目标
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class TestOrderEvents:
+    """报单/成交回报事件与报单存储验证"""
+
+    @staticmethod
+    def _order_fields(order_ref, status, instrument=b'rb2505', msg='全部成交'):
+        return (b'9999', b'001', instrument, order_ref, b'u1', b'0', b'3', 3500.0, 0, 2,
+                status, b'  1001', 1, 2, b'20241016', b'09:00:01', msg.encode('gbk'))
+
+    def test_lazy_fields_and_dict_compat(self):
+        """原始字节构建，少用字段首次读取时解码，合约代码驻留"""
+        from ctp_trading_system.core.order_events import OrderEvent, TradeEvent
+
+        order = OrderEvent(*self._order_fields(b'7', b'0'))
+        assert order._status_msg == '全部成交'.encode('gbk')
+        assert order['StatusMsg'] == '全部成交' and order._status_msg == '全部成交'
+        assert (order.order_ref, order.direction, order.offset, order.status) == ('7', '0', '3', '0')
+        assert order.get('UserID') == 'u1' and order.get('Missing', 1) == 1 and 'OrderRef' in order
+        assert OrderEvent(*self._order_fields(b'8', b'3')).instrument_id is order.instrument_id
+        with pytest.raises(AttributeError):
+            order.extra = 1
+
+        as_dict = order.to_dict()
+        assert as_dict['InsertTime'] == '09:00:01' and as_dict['OrderSysID'] == '  1001'
+        assert set(as_dict) == set(order.keys())
+
+        trade = TradeEvent(b'9999', b'001', b'rb2505', b'7', b'u1', b'  88', b'1', b'0',
+                           3500.0, 2, b'20241016', b'09:00:02', b'  1001')
+        assert (trade['TradeID'], trade['Direction'], trade['OffsetFlag']) == ('  88', '1', '0')
+        assert trade.get('TradeTime') == '09:00:02' and trade.instrument_id is order.instrument_id
+        # 旧接口传入已解码的 str 也可构建
+        assert OrderEvent('9999', '001', 'rb2505', '9', '', '1', '0', 1.0, 1, 0,
+                          '3', '', 1, 2, '', '', '').direction == '1'
+
+        print("[PASS] Order/trade events verified")
+
+    def test_bounded_store(self):
+        """终态报单移出在途表，只保留最近 max_done 笔，每笔只写一次流水"""
+        from ctp_trading_system.core.order_events import OrderEvent
+        from ctp_trading_system.core.order_store import OrderStore
+
+        journal = []
+        store = OrderStore(max_done=3, journal=journal.append)
+        for i in range(10):
+            ref = str(i).encode()
+            assert not store.update(OrderEvent(*self._order_fields(ref, b'3')))
+            assert store.update(OrderEvent(*self._order_fields(ref, b'5' if i % 2 else b'0')))
+        store.update(OrderEvent(*self._order_fields(b'10', b'1')))
+
+        assert store.live_count() == 1 and len(store) == 4
+        assert list(store.keys()) == [(1, 2, '7'), (1, 2, '8'), (1, 2, '9'), (1, 2, '10')]
+        assert '2' not in store and store.get('2') is None and store['9'].status == '5'
+        assert store[(1, 2, '9')] is store['9'] and (1, 3, '9') not in store
+        assert [order.order_ref for order in journal] == [str(i) for i in range(10)]
+
+        # 终态后的迟到/重复回报不回到在途表，也不重复写流水
+        assert not store.update(OrderEvent(*self._order_fields(b'9', b'3')))
+        assert not store.update(OrderEvent(*self._order_fields(b'9', b'5')))
+        assert store.live_count() == 1 and len(journal) == 10
+        assert store.get_stats() == {"live": 1, "recent_done": 3, "archived": 10}
+
+        print("[PASS] Bounded order store verified")
+
+    def test_gateway_raw_returns(self, tmp_path, make_gateway):
+        """网关以原始字节回报构建事件，回调共享同一对象，终态报单写入交易日志"""
+        gateway = make_gateway(order_archive_size=2)
+
+        orders, trades = [], []
+        gateway.register_callback("on_order", orders.append)
+        gateway.register_callback("on_trade", trades.append)
+        gateway._api.on_rtn_order_raw(*self._order_fields(b'1', b'3', msg='未成交'))
+        gateway._api.on_rtn_order_raw(*self._order_fields(b'1', b'0'))
+        gateway._api.on_rtn_trade_raw(b'9999', b'001', b'rb2505', b'1', b'u1', b'  88', b'0', b'3',
+                                      3500.0, 2, b'20241016', b'09:00:02', b'  1001')
+
+        assert gateway._orders['1'] is orders[-1] and gateway._orders.live_count() == 0
+        assert trades[0]['Volume'] == 2 and trades[0]['OrderRef'] == '1'
+        assert gateway._audit.flush()
+        gateway.close()
+        trade_log = next(tmp_path.glob('trade_*.log')).read_text(encoding='utf-8')
+        assert '"status_msg": "未成交"' in trade_log
+        assert trade_log.count('ORDER_ARCHIVE') == 1 and '"InsertTime": "09:00:01"' in trade_log
+        assert '"trade_id": "  88"' in trade_log
+
+        print("[PASS] Gateway raw order returns verified")
+
+
+    def test_store_indexes(self):
+        """在途/状态/OrderSysID 索引随回报增量维护，淘汰的终态报单同时移出索引"""
+        from ctp_trading_system.core.order_events import OrderEvent
+        from ctp_trading_system.core.order_store import OrderStore
+
+        def order(ref, status, instrument=b'rb2505', sys_id=b''):
+            fields = list(self._order_fields(ref, status, instrument))
+            fields[11] = sys_id
+            return OrderEvent(*fields)
+
+        store = OrderStore(max_done=1)
+        store.update(order(b'1', b'a'))
+        store.update(order(b'2', b'3', b'i2505', b'   202'))
+        store.update(order(b'3', b'3', b'rb2505', b'   203'))
+        store.update(order(b'1', b'3', b'rb2505', b'   201'))
+        assert sorted(store.live('rb2505')) == [(1, 2, '1'), (1, 2, '3')]
+        assert list(store.live('i2505')) == [(1, 2, '2')]
+        assert store.live('hc2505') == {} and sorted(store.live_instruments()) == ['i2505', 'rb2505']
+        assert sorted(o.order_ref for o in store.by_status('3').values()) == ['1', '2', '3']
+        assert store.by_status('a') == {}
+        assert store.get_by_sys_id('201').order_ref == '1'
+
+        store.update(order(b'2', b'1', b'i2505', b'   202'))
+        store.update(order(b'2', b'0', b'i2505', b'   202'))
+        assert store.live('i2505') == {} and store.live_instruments() == ['rb2505']
+        assert sorted(store.by_status('3')) == [(1, 2, '1'), (1, 2, '3')]
+        assert list(store.by_status('0')) == [(1, 2, '2')]
+        assert store.by_status('1') == {}
+        # 第二笔终态报单淘汰 '2'，其索引同时移除
+        store.update(order(b'3', b'5', b'rb2505', b'   203'))
+        assert store.by_status('0') == {} and store.get_by_sys_id('202') is None
+        assert list(store.live()) == [(1, 2, '1')] and store.get_by_sys_id('203').status == '5'
+
+        print("[PASS] Order store indexes verified")
+
+    def test_store_session_keys(self):
+        """报单按 (FrontID, SessionID, OrderRef) 存储，重新登录后同号报单互不覆盖"""
+        from ctp_trading_system.core.order_events import OrderEvent
+        from ctp_trading_system.core.order_store import OrderStore
+
+        def order(ref, status, session):
+            fields = list(self._order_fields(ref, status))
+            fields[13] = session
+            return OrderEvent(*fields)
+
+        store = OrderStore()
+        store.set_session(1, 2)
+        store.update(order(b'1', b'3', 2))
+        store.set_session(1, 5)
+        store.update(order(b'1', b'a', 5))
+        assert sorted(store.live()) == [(1, 2, '1'), (1, 5, '1')] and len(store) == 2
+        assert store['1'].session_id == 5 and store[(1, 2, '1')].status == '3'
+        assert store.resolve('1') == (1, 5, '1') and store.resolve('9') is None
+        # 当前会话没有该号报单时取最近一笔同号报单
+        store.set_session(1, 7)
+        assert store['1'].session_id == 5
+        assert store.update(order(b'1', b'5', 2))
+        assert list(store.live()) == [(1, 5, '1')] and store['1'].session_id == 2
+
+        print("[PASS] Order store session keys verified")
+
+    def test_emergency_cancel_targets(self, make_gateway):
+        """按合约/全部撤单只取在途报单，不再扫描当日全部报单"""
+        from ctp_trading_system.emergency.emergency_handler import EmergencyHandler
+
+        gateway = make_gateway()
+        gateway._logged_in = True
+        rtn = gateway._api.on_rtn_order_raw
+        rtn(*self._order_fields(b'1', b'3'))
+        rtn(*self._order_fields(b'2', b'0'))
+        rtn(*self._order_fields(b'3', b'1', b'i2505'))
+        rtn(*self._order_fields(b'4', b'a'))
+
+        gateway._front_id, gateway._session_id = 1, 2
+        handler = EmergencyHandler(gateway)
+        handler.register_pending_order('9', {"instrument_id": "hc2505"})
+        handler.register_pending_order('2', {"instrument_id": "rb2505"})
+        assert sorted(handler._get_pending_orders('rb2505')) == [(1, 2, '1'), (1, 2, '4')]
+        assert handler._get_pending_orders('rb2505')[(1, 2, '1')]['volume_total'] == 0
+        assert [key[2] for key in sorted(handler._get_all_pending_orders())] == ['1', '3', '4', '9']
+        assert list(handler._pending_orders) == [(1, 2, '9')]
+        assert handler._get_pending_orders('i2505')[(1, 2, '3')]['session_id'] == 2
+
+        # 另一会话的同号报单: 本会话 '1' 撤单终态不掩盖它，两笔分别作为撤单目标
+        fields = list(self._order_fields(b'1', b'3'))
+        fields[13] = 5
+        rtn(*fields)
+        rtn(*self._order_fields(b'1', b'5'))
+        rtn(*self._order_fields(b'1', b'3'))            # 终态之后的迟到回报
+        assert sorted(handler._get_pending_orders('rb2505')) == [(1, 2, '4'), (1, 5, '1')]
+        assert gateway.get_order('1').status == '5' and gateway.get_order('1', 1, 5).status == '3'
+
+        print("[PASS] Emergency cancel targets verified")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+报单快速路径测试
+验证预编码报单模板、参数块报单与异步审计日志
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class TestOrderFastPath:
+    """报单快速路径验证"""
+
+    def test_template_fields(self):
+        """模板复制后各字段与逐字段编码一致，原型不被修改"""
+        import ctypes
+        from ctp_trading_system.ctp_api import OrderInsertArgs
+        from ctp_trading_system.core.order_fast_path import OrderTemplateCache
+
+        assert ctypes.sizeof(OrderInsertArgs) == 144
+        cache = OrderTemplateCache(OrderInsertArgs)
+        cache.reset('9999', '001')
+        assert cache.warm_up(['rb2505', 'i2505']) == 2
+        template = cache.get('rb2505')
+        assert cache.get('rb2505') is template and cache.get('rb2505', '1') is not template
+
+        args = template.build(b'123', b'1', b'3', 3501.0, 7)
+        assert (args.broker_id, args.investor_id, args.instrument_id) == (b'9999', b'001', b'rb2505')
+        assert (args.order_ref, args.direction, args.offset_flag, args.hedge_flag) == (b'123', b'1', b'3', b'1')
+        assert (args.order_price_type, args.time_condition, args.volume_condition) == (b'2', b'3', b'1')
+        assert (args.price, args.volume, args.min_volume) == (3501.0, 7, 1)
+        proto = OrderInsertArgs.from_buffer_copy(template.proto)
+        assert proto.order_ref == b'' and proto.volume == 0
+
+        cache.reset('9999', '002')
+        assert len(cache) == 0 and cache.get('rb2505').build(b'1', b'0', b'0', 1.0, 1).investor_id == b'002'
+        assert OrderTemplateCache().get('rb2505') is None
+
+        print("[PASS] Order template fields verified")
+
+    def test_gateway_fast_path(self, tmp_path, make_gateway):
+        """登录后报单走参数块，order_ref 从 MaxOrderRef 续接，审计日志异步写入"""
+        from ctp_trading_system.ctp_api import OrderInsertArgs
+        from ctp_trading_system.core.ctp_gateway import Direction
+
+        gateway = make_gateway(args_type=OrderInsertArgs, broker_id='9999', investor_id='001')
+        api = gateway._api
+        gateway._api.on_rsp_user_login('20241016', '09:00:00', '9999', '001', 1, 2, '41',
+                                       0, '', 1, True)
+        assert gateway.is_logged_in()
+
+        refs = [gateway.open_position('rb2505', Direction.BUY, 3500.0, 2),
+                gateway.close_position('rb2505', Direction.SELL, 3510.0, 1, close_today=True)]
+        assert refs == ['42', '43']
+        assert [kind for kind, *_ in api.inserts] == ['args', 'args']
+        second = OrderInsertArgs.from_buffer_copy(api.inserts[1][1])
+        assert (second.order_ref, second.direction, second.offset_flag) == (b'43', b'1', b'3')
+        assert (second.instrument_id, second.price, second.volume) == (b'rb2505', 3510.0, 1)
+        assert api.inserts[0][2] != api.inserts[1][2]
+
+        assert gateway._audit.flush()
+        stats = gateway.get_order_latency()
+        assert stats['count'] == 2 and stats['fast_path'] and stats['audit_pending'] == 0
+        assert gateway._audit.written == 2
+        gateway.close()
+        trade_log = next(tmp_path.glob('trade_*.log')).read_text(encoding='utf-8')
+        assert '"order_ref": "42"' in trade_log and '"order_ref": "43"' in trade_log
+
+        print(f"[PASS] Fast path order latency p50={stats['p50_us']:.1f}us")
+
+    def test_gateway_fallback(self, make_gateway):
+        """wrapper 不支持参数块时回退到逐字段 ReqOrderInsert"""
+        from ctp_trading_system.core.ctp_gateway import Direction, CTP_API_AVAILABLE
+
+        if not CTP_API_AVAILABLE:
+            pytest.skip("CTP API 模块不可用")
+        gateway = make_gateway(broker_id='9999', investor_id='001')
+        api = gateway._api
+        gateway._logged_in = True
+
+        assert gateway.open_position('rb2505', Direction.SELL, 3500.0, 1) == '1'
+        kind, fields = api.inserts[0]
+        assert kind == 'fields' and fields['order_ref'] == '1' and fields['instrument_id'] == 'rb2505'
+        assert fields['broker_id'] == '9999' and fields['price'] == 3500.0
+        assert not gateway.get_order_latency()['fast_path']
+
+        print("[PASS] Order insert fallback verified")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+本地持仓簿测试
+验证成交/行情驱动的持仓与风控校验
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class TestPositionBook:
+    """本地持仓簿验证"""
+
+    INSTRUMENTS = {
+        'rb2505': {'exchange_id': 'SHFE', 'volume_multiple': 10,
+                   'long_margin_ratio': 0.1, 'short_margin_ratio': 0.1},
+        'm2505': {'exchange_id': 'DCE', 'volume_multiple': 10,
+                  'long_margin_ratio': 0.1, 'short_margin_ratio': 0.1},
+    }
+
+    @staticmethod
+    def _trade(trade_id, instrument_id, direction, offset, price, volume):
+        return {'TradeID': trade_id, 'InstrumentID': instrument_id, 'Direction': direction,
+                'OffsetFlag': offset, 'Price': price, 'Volume': volume}
+
+    def test_close_today_rules_and_avg_cost(self):
+        """上期所平今/平昨分别扣减今/昨仓，按各自均价计算平仓盈亏；大商所平仓先平昨"""
+        from ctp_trading_system.core.position_book import PositionBook
+
+        book = PositionBook(instrument_info=self.INSTRUMENTS.get)
+        book.load({
+            'rb2505_2': {'instrument_id': 'rb2505', 'direction': '2', 'position': 2,
+                         'yd_position': 2, 'today_position': 0, 'position_cost': 68000.0,
+                         'use_margin': 6800.0},
+            'm2505_3': {'instrument_id': 'm2505', 'direction': '3', 'position': 1,
+                        'yd_position': 1, 'today_position': 0, 'position_cost': 30000.0,
+                        'use_margin': 3000.0},
+        })
+        book.on_trade(self._trade('T1', 'rb2505', '0', '0', 3500.0, 2))
+        pos = book.get_position('rb2505', '2')
+        assert pos['position'] == 4 and pos['today_position'] == 2 and pos['yd_position'] == 2
+        assert pos['avg_price'] == 3450.0
+        assert book.closable('rb2505', '2', '3') == 2 and book.closable('rb2505', '2', '1') == 2
+
+        # 平今按今仓均价 3500，平昨按昨仓均价 3400
+        book.on_trade(self._trade('T2', 'rb2505', '1', '3', 3520.0, 1))
+        assert book.close_profit == 200.0
+        book.on_trade(self._trade('T3', 'rb2505', '1', '1', 3520.0, 2))
+        assert book.close_profit == 200.0 + 2400.0
+        pos = book.get_position('rb2505', '2')
+        assert pos['today_position'] == 1 and pos['yd_position'] == 0
+        assert abs(pos['use_margin'] - 3500.0) < 1e-6
+
+        # 大商所: 开今仓后平仓，先平昨仓；平完删除持仓
+        book.on_trade(self._trade('T4', 'm2505', '1', '0', 2900.0, 1))
+        book.on_trade(self._trade('T5', 'm2505', '0', '1', 2950.0, 1))
+        pos = book.get_position('m2505', '3')
+        assert pos['yd_position'] == 0 and pos['today_position'] == 1
+        assert book.close_profit == 2600.0 + 500.0
+        book.on_trade(self._trade('T6', 'm2505', '0', '1', 2950.0, 1))
+        assert book.get_position('m2505', '3') is None
+        assert book.total_volume() == 1
+
+        print("[PASS] Position book close-today rules verified")
+
+    def test_trade_ids_across_trading_days(self, make_gateway):
+        """重复成交由网关过滤；下一交易日的同号成交照常计入持仓"""
+        from ctp_trading_system.core.position_book import PositionBook
+
+        gateway = make_gateway()
+        book = PositionBook(gateway, instrument_info=self.INSTRUMENTS.get)
+        book.load({})
+        api = gateway._api
+        trade = (b'9999', b'001', b'rb2505', b'1', b'u1', b'  88', b'0', b'0',
+                 3500.0, 1, b'20241016', b'09:00:02', b'  1001')
+
+        api.on_rsp_user_login('20241016', '09:00:00', '9999', '001', 1, 2, '1', 0, '', 1, True)
+        api.on_rtn_trade_raw(*trade)
+        api.on_rtn_trade_raw(*trade)
+        assert book.get_position('rb2505', '2')['position'] == 1
+
+        # 夜盘进入下一交易日，柜台重新从 1 编号成交
+        api.on_rsp_user_login('20241017', '20:50:00', '9999', '001', 1, 3, '1', 0, '', 2, True)
+        api.on_rtn_trade_raw(*trade)
+        assert book.get_position('rb2505', '2')['position'] == 2
+
+        print("[PASS] Same TradeID on the next trading day counted")
+
+    def test_query_split_by_today_position(self):
+        """持仓查询按 TodayPosition/PositionDate 拆分今昨仓 (YdPosition 为上日静态持仓)"""
+        from ctp_trading_system.core.ctp_gateway import merge_positions, split_today_position
+        from ctp_trading_system.core.position_book import PositionBook
+
+        def row(position, yd_position, **kwargs):
+            today = split_today_position(position, yd_position, **kwargs)
+            return ('rb2505_2', {'instrument_id': 'rb2505', 'direction': '2', 'position': position,
+                                 'yd_position': position - today, 'today_position': today,
+                                 'position_cost': 3500.0 * 10 * position, 'use_margin': 0.0})
+
+        # 上期所: 今仓 4 手一条，历史仓一条 (上日 5 手已平 2 手)
+        merged = merge_positions([row(4, 0, today_position=4, position_date='1'),
+                                  row(3, 5, today_position=0, position_date='2')])['rb2505_2']
+        assert (merged['position'], merged['today_position'], merged['yd_position']) == (7, 4, 3)
+        # 旧版 wrapper 无 TodayPosition/PositionDate 时同样拆分正确
+        merged = merge_positions([row(4, 0), row(3, 5)])['rb2505_2']
+        assert (merged['today_position'], merged['yd_position']) == (4, 3)
+        # 其他交易所只有一条: 今仓取 TodayPosition
+        assert split_today_position(7, 5, today_position=4, position_date='1') == 4
+
+        book = PositionBook(instrument_info=self.INSTRUMENTS.get)
+        book.load({'rb2505_2': merged})
+        pos = book.get_position('rb2505', '2')
+        assert pos['today_position'] == 4 and pos['yd_position'] == 3
+        assert book.closable('rb2505', '2', '3') == 4 and book.closable('rb2505', '2', '1') == 3
+
+        print("[PASS] Position query split by TodayPosition/PositionDate")
+
+    def test_mark_to_market_and_readers(self):
+        """行情只重算该合约；验证器与风控直接读取持仓簿"""
+        from ctp_trading_system.core.position_book import PositionBook
+        from ctp_trading_system.validator.order_validator import OrderValidator, ValidationErrorType
+        from ctp_trading_system.risk import RiskEngine, RiskConfig
+        from ctp_trading_system.config.settings import Settings
+
+        book = PositionBook(instrument_info=self.INSTRUMENTS.get)
+        changes = []
+        book.add_listener(lambda: changes.append(1))
+        book.load({})
+        book.on_trade(self._trade('T1', 'rb2505', '0', '0', 3500.0, 2))
+        book.on_trade(self._trade('T2', 'm2505', '1', '0', 3000.0, 1))
+        assert not book.all_priced()
+
+        book.on_tick({'instrument_id': 'rb2505', 'last_price': 3510.0})
+        assert book.get_position('rb2505', '2')['position_profit'] == 200.0
+        assert book.get_position('m2505', '3')['position_profit'] == 0.0
+        book.on_tick({'instrument_id': 'm2505', 'last_price': 2990.0})
+        assert book.all_priced() and book.position_profit == 300.0
+        count = len(changes)
+        book.on_tick({'instrument_id': 'hc2505', 'last_price': 3300.0})
+        assert len(changes) == count
+        assert book.market_value() == 3510.0 * 20 + 2990.0 * 10
+
+        settings = Settings()
+        settings.instruments = self.INSTRUMENTS
+        validator = OrderValidator(settings)
+        validator.set_position_book(book)
+        # 上期所无昨仓时平仓 (平昨) 持仓不足，平今可平
+        result = validator.validate_position('rb2505', '1', 1, '1')
+        assert result.error_type == ValidationErrorType.INSUFFICIENT_POSITION
+        assert validator.validate_position('rb2505', '1', 2, '3').is_valid
+        assert not validator.validate_position('m2505', '0', 2).is_valid
+
+        engine = RiskEngine(RiskConfig(max_total_position=3))
+        engine.set_position_book(book)
+        assert engine.get_status()['total_position'] == 3
+        assert engine.get_remaining_capacity()['total_position_remaining'] == 0
+
+        print("[PASS] Position book mark-to-market verified")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+查询调度测试
+验证按流控速率发送、按 request_id 分页累积与网关并发查询
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class TestQueryScheduler:
+    """查询调度验证"""
+
+    def test_scheduler_flow_control(self):
+        """按每秒查询数发送，-3 流控拒绝后重试，分页累积到 is_last"""
+        import itertools
+        import time
+        from ctp_trading_system.core.query_scheduler import QueryScheduler, keyed_items
+
+        ids = itertools.count(1)
+        scheduler = QueryScheduler(lambda: next(ids), max_per_second=50, max_inflight=8)
+        sends, rejected = [], []
+
+        def make_send(name):
+            def send(request_id):
+                if name == 'b' and not rejected:
+                    rejected.append(request_id)
+                    return -3
+                sends.append((name, request_id, time.monotonic()))
+                return 0
+            return send
+
+        futures = [scheduler.submit(name, make_send(name), keyed_items, {}) for name in 'abcd']
+        deadline = time.time() + 2
+        while len(sends) < 4 and time.time() < deadline:
+            time.sleep(0.001)
+        assert [name for name, _, _ in sends] == ['a', 'b', 'c', 'd']
+        gaps = [b[2] - a[2] for a, b in zip(sends, sends[1:])]
+        assert min(gaps) >= 0.018
+        assert scheduler.get_stats()['retries'] == 1 and scheduler.inflight() == 4
+
+        # 分页乱序到达，各自累积
+        rid = {name: request_id for name, request_id, _ in sends}
+        assert not scheduler.on_response(rejected[0], ('x', 0), is_last=True)
+        for name in 'dcba':
+            scheduler.on_response(rid[name], (f'{name}1', 1), is_last=False)
+        for name in 'abcd':
+            scheduler.on_response(rid[name], (f'{name}2', 2), is_last=True)
+        assert [f.result(1) for f in futures] == [{f'{n}1': 1, f'{n}2': 2} for n in 'abcd']
+        assert scheduler.get_stats()['completed'] == 4
+        scheduler.stop()
+
+        print(f"[PASS] Flow-controlled sends, min gap {min(gaps) * 1000:.1f}ms")
+
+    def test_gateway_concurrent_queries(self, make_gateway):
+        """并发查询按 request_id 各自返回，相同查询合并，错误响应立即结束"""
+        import threading
+        import time
+
+        gateway = make_gateway(query_rate=100, query_max_inflight=4)
+        api = gateway._api
+        gateway._logged_in = True
+
+        results = {}
+
+        def run(name, func):
+            results.setdefault(name, []).append(func())
+
+        threads = [
+            threading.Thread(target=run, args=('account', gateway.query_account)),
+            threading.Thread(target=run, args=('account', gateway.query_account)),
+            threading.Thread(target=run, args=('position', gateway.query_position)),
+        ]
+        start = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        elapsed = time.monotonic() - start
+
+        assert sorted(name for name, _, _ in api.calls) == ['account', 'position']
+        assert results['account'][0] is results['account'][1]
+        assert results['account'][0]['available'] == 8e5
+        assert sorted(results['position'][0]) == ['hc2505_2', 'i2505_2', 'rb2505_2']
+        assert gateway._positions == results['position'][0]
+        # 两个查询同时在途，总耗时约等于较慢的一个
+        assert elapsed < 0.5
+
+        start = time.monotonic()
+        assert gateway.query_investor(timeout=5) is None
+        assert time.monotonic() - start < 1
+        stats = gateway.get_query_stats()
+        assert stats['completed'] == 2 and stats['failed'] == 1 and stats['inflight'] == 0
+
+        print(f"[PASS] Concurrent gateway queries in {elapsed * 1000:.0f}ms")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+断线快速恢复测试
+验证带抖动的退避、回调链式登录、前置切换重建与续传回报去重 (本地模拟交易前置)
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class _SimFront:
+    """模拟交易前置: init 后连上，认证/登录/结算确认在后台线程按固定延迟应答"""
+
+    instances = []
+
+    def __init__(self, latency=0.005):
+        self.latency = latency
+        self.requests = []
+        self.topics = []
+        self.fronts = []
+        self.released = False
+        _SimFront.instances.append(self)
+
+    def _reply(self, callback, *args):
+        import threading
+        threading.Timer(self.latency, callback, args).start()
+
+    def create_api(self, flow_path):
+        pass
+
+    def supports_order_args(self):
+        return False
+
+    def register_front(self, front):
+        self.fronts.append(front)
+
+    def subscribe_private_topic(self, resume_type):
+        self.topics.append(resume_type)
+
+    def subscribe_public_topic(self, resume_type):
+        self.topics.append(resume_type)
+
+    def init(self):
+        self._reply(lambda: self.on_front_connected())
+
+    def req_authenticate(self, **kwargs):
+        self.requests.append('auth')
+        self._reply(self.on_rsp_authenticate, '9999', '001', 'app', 0, '', kwargs['request_id'], True)
+        return 0
+
+    def req_user_login(self, **kwargs):
+        self.requests.append('login')
+        self._reply(self.on_rsp_user_login, '20241016', '09:00:00', '9999', '001', 1, 2, '41',
+                    0, '', kwargs['request_id'], True)
+        return 0
+
+    def req_settlement_info_confirm(self, **kwargs):
+        self.requests.append('confirm')
+        self._reply(self.on_rsp_settlement_info_confirm, '9999', '001', '20241016', '09:00:00',
+                    0, '', kwargs['request_id'], True)
+        return 0
+
+    def release(self):
+        self.released = True
+
+
+class TestReconnect:
+    """断线快速恢复验证 (本地模拟交易前置)"""
+
+    def _login(self, tmp_path, monkeypatch, make_gateway, **monitor_args):
+        from ctp_trading_system.core import ctp_gateway
+        from ctp_trading_system.monitor.connection_monitor import ConnectionMonitor
+
+        _SimFront.instances = []
+        monkeypatch.setattr(ctp_gateway, "CTPTraderApi", _SimFront)
+        gateway = make_gateway(attach=False, flow_path=str(tmp_path / "flow"),
+                               trade_fronts=["tcp://10.0.0.1:41205", "tcp://10.0.0.2:41205"])
+        gateway.front_selector.probed = True       # 不做网络测速
+        monitor = ConnectionMonitor(gateway, **monitor_args)
+        assert gateway.connect(timeout=2) and gateway.authenticate(timeout=2) and gateway.login(timeout=2)
+        assert gateway.is_auto_login()
+        return gateway, monitor
+
+    @staticmethod
+    def _wait_recovered(monitor, timeout=3.0):
+        """等待监测器记录到一次断线恢复 (登录回调在网关登录事件之后触发)"""
+        import time
+        deadline = time.time() + timeout
+        while monitor.get_recovery_stats()['count'] == 0 and time.time() < deadline:
+            time.sleep(0.005)
+        return monitor.get_recovery_stats()['count'] > 0
+
+    def test_backoff_jitter(self):
+        """带抖动的指数退避: 每次等待在 [上限/2, 上限]，上限翻倍且不超过 cap"""
+        import random
+        from ctp_trading_system.monitor.connection_monitor import ReconnectBackoff
+
+        backoff = ReconnectBackoff(base=0.5, cap=5.0, rng=random.Random(7))
+        delays = [backoff.next_delay() for _ in range(8)]
+        for n, delay in enumerate(delays):
+            ceiling = min(5.0, 0.5 * 2 ** n)
+            assert ceiling / 2 <= delay <= ceiling
+        assert len(set(delays[4:])) == 4           # 到达上限后仍有抖动
+        backoff.reset()
+        assert backoff.next_delay() <= 0.5
+
+        print("[PASS] Jittered exponential backoff")
+
+    def test_auto_reconnect_pipeline(self, tmp_path, monkeypatch, make_gateway):
+        """CTP API 自动重连后在回调中依次认证/登录/确认结算单，不重建 API，记录各阶段耗时"""
+        from ctp_trading_system.core.ctp_gateway import ResumeType
+        from ctp_trading_system.monitor.connection_monitor import ConnectionState
+
+        gateway, monitor = self._login(tmp_path, monkeypatch, make_gateway, backoff_base=2.0)
+        api = gateway._api
+        assert api.topics == [ResumeType.QUICK, ResumeType.QUICK]
+        monitor._running = True
+
+        api.on_front_disconnected(0x2001)
+        assert not gateway.is_logged_in()
+        api.init()                                  # CTP API 自动重连
+        assert gateway.wait_logged_in(2) and self._wait_recovered(monitor)
+
+        timing = gateway.get_recovery_timing()
+        assert list(timing['phases_ms']) == ['connected', 'auth_sent', 'authenticated',
+                                             'login_sent', 'logged_in']
+        assert not timing['recreated'] and timing['time_to_trading_ms'] < 1000
+        assert api.requests[-3:] == ['auth', 'login', 'confirm']
+        assert len(_SimFront.instances) == 1
+        assert monitor.get_current_state() == ConnectionState.LOGGED_IN
+        assert monitor.get_recovery_stats()['count'] == 1
+
+        monitor.stop()
+        gateway.close()
+        print(f"[PASS] Back to trading in {timing['time_to_trading_ms']:.1f}ms without recreating API")
+
+    def test_recreate_with_resume(self, tmp_path, monkeypatch, make_gateway):
+        """退避等待期内未自动恢复: 切换前置并重建 API，私有/公有流按 RESUME 续传"""
+        from ctp_trading_system.core.ctp_gateway import ResumeType
+
+        gateway, monitor = self._login(tmp_path, monkeypatch, make_gateway,
+                                       backoff_base=0.1, reconnect_interval=1)
+        first = gateway._api
+        first.init = lambda: None                   # 原前置不再可连
+        monitor._running = True
+
+        first.on_front_disconnected(0x1001)
+        assert self._wait_recovered(monitor)
+        assert gateway.is_logged_in() and first.released
+        second = gateway._api
+        assert second is not first and second.topics == [ResumeType.RESUME, ResumeType.RESUME]
+        assert second.fronts == ["tcp://10.0.0.2:41205"] and gateway.get_front() == second.fronts[0]
+        timing = monitor.get_status_report()['last_recovery']
+        assert timing['recreated'] and 'connecting' in timing['phases_ms']
+        assert monitor.get_reconnect_count() == 0
+
+        monitor.stop()
+        gateway.close()
+        print(f"[PASS] Recreated on next front with RESUME in {timing['time_to_trading_ms']:.0f}ms")
+
+    def test_resumed_duplicates_dropped(self, make_gateway):
+        """续传重发的报单 (按序号) 与成交 (按成交编号) 回报只处理一次"""
+        gateway = make_gateway()
+        orders, trades = [], []
+        gateway.register_callback("on_order", orders.append)
+        gateway.register_callback("on_trade", trades.append)
+        rtn_order, rtn_trade = gateway._api.on_rtn_order_raw, gateway._api.on_rtn_trade_raw
+
+        def fields(ref, status, traded):
+            return (b'9999', b'001', b'rb2505', ref, b'u1', b'0', b'0', 3500.0, 2, traded,
+                    status, b'  1001', 1, 2, b'20241016', b'09:00:01', b'')
+
+        trade = (b'9999', b'001', b'rb2505', b'1', b'u1', b'  88', b'0', b'0',
+                 3500.0, 2, b'20241016', b'09:00:02', b'  1001')
+        # 断线前
+        rtn_order(*fields(b'1', b'3', 0), sequence_no=1)
+        rtn_order(*fields(b'1', b'0', 2), sequence_no=2)
+        rtn_trade(*trade, sequence_no=7)
+        # 续传重发 + 新回报
+        rtn_order(*fields(b'1', b'3', 0), sequence_no=1)
+        rtn_order(*fields(b'1', b'0', 2), sequence_no=2)
+        rtn_trade(*trade, sequence_no=7)
+        rtn_order(*fields(b'2', b'3', 0), sequence_no=3)
+        # 旧版 wrapper 不带序号: 按状态判重
+        rtn_order(*fields(b'3', b'3', 0))
+        rtn_order(*fields(b'3', b'3', 0))
+
+        assert [(o.order_ref, o.status) for o in orders] == [('1', '3'), ('1', '0'), ('2', '3'), ('3', '3')]
+        assert len(trades) == 1 and gateway.get_order('1').status == '0'
+        assert gateway.get_return_stats() == {"dropped_orders": 3, "dropped_trades": 1}
+
+        print("[PASS] Resumed duplicate returns dropped")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
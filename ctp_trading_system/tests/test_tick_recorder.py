@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+行情落盘测试
+验证二进制行情落盘与内存映射读取
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class TestTickRecorder:
+    """行情落盘与内存映射读取验证"""
+
+    def test_record_and_mmap_read(self, tmp_path, make_md_gateway, market_ticks):
+        """经行情网关落盘，按交易日/合约分文件，读取为内存映射结构化数组，字段与原行情一致"""
+        from ctp_trading_system.data import TickRecorder, TickReader, TICK_RECORD_DTYPE
+
+        gateway = make_md_gateway()
+        recorder = TickRecorder(str(tmp_path / "ticks"), flush_interval=0.01)
+        recorder.attach(gateway)
+
+        rb = market_ticks('rb2505', '20250110', 300)
+        hc = market_ticks('hc2505', '20250110', 200, 3300.0)
+        rb_next = market_ticks('rb2505', '20250113', 50)
+        for a, b in zip(rb, hc):
+            gateway._publish(a)
+            gateway._publish(b)
+        for tick in rb[200:] + rb_next:
+            gateway._publish(tick)
+        recorder.stop()
+        stats = recorder.get_stats()
+        assert stats['recorded'] == 550 and stats['dropped'] == 0 and stats['open_files'] == 0
+
+        reader = TickReader(str(tmp_path / "ticks"))
+        assert reader.trading_days() == ['20250110', '20250113']
+        assert reader.instruments('20250110') == ['hc2505', 'rb2505']
+        records = reader.load('20250110', 'rb2505')
+        assert isinstance(records, np.memmap) and records.dtype == TICK_RECORD_DTYPE
+        assert len(records) == 300 and len(reader.load('20250113', 'rb2505')) == 50
+        np.testing.assert_array_equal(records['last_price'], [t.last_price for t in rb])
+        np.testing.assert_array_equal(records['epoch_ns'], [t.epoch_ns for t in rb])
+        assert (records['recv_ns'] > 0).all() and np.all(np.diff(records['epoch_ns']) > 0)
+
+        # 还原为 MarketTick 与原行情一致
+        restored = reader.to_ticks(reader.load('20250110', 'hc2505'))
+        assert [t.to_dict() for t in restored] == [t.to_dict() for t in hc]
+
+        print(f"[PASS] Recorded {stats['recorded']} ticks in {stats['batches']} batches")
+
+    def test_partial_tail_and_append(self, tmp_path, market_ticks):
+        """写入中断的不完整尾记录被读取忽略，重新打开时截断后续写"""
+        from ctp_trading_system.data import TickRecorder, TickReader
+        from ctp_trading_system.data.tick_recorder import tick_file_path
+
+        root = str(tmp_path / "ticks")
+        ticks = market_ticks('ag2506', '20250110', 20)
+        recorder = TickRecorder(root)
+        for tick in ticks[:10]:
+            recorder.on_tick(tick)
+        recorder.stop()
+
+        path = tick_file_path(root, '20250110', 'ag2506')
+        with open(path, 'ab') as f:
+            f.write(b'\x01' * 100)
+        reader = TickReader(root)
+        assert len(reader.load('20250110', 'ag2506')) == 10
+
+        recorder = TickRecorder(root)
+        for tick in ticks[10:]:
+            recorder.on_tick(tick)
+        recorder.stop()
+        records = reader.load('20250110', 'ag2506')
+        np.testing.assert_array_equal(records['volume'], [t.volume for t in ticks])
+        assert len(reader.load('20250110', 'missing')) == 0
+
+        print("[PASS] Partial tail record ignored and truncated on append")
+
+    def test_record_overhead(self, tmp_path, market_ticks):
+        """行情线程上的落盘开销只有入队，写盘线程按批编码写入"""
+        import time
+        from ctp_trading_system.data import TickRecorder, TickReader
+
+        ticks = []
+        for i, instrument_id in enumerate(['rb2505', 'hc2505', 'i2505', 'j2505', 'ag2506']):
+            ticks += market_ticks(instrument_id, '20250110', 4000, 1000.0 * (i + 1))
+        recorder = TickRecorder(str(tmp_path / "ticks"), flush_interval=0.05)
+        recorder.start()
+
+        on_tick = recorder.on_tick
+        start = time.perf_counter()
+        for tick in ticks:
+            on_tick(tick)
+        per_tick_us = (time.perf_counter() - start) / len(ticks) * 1e6
+        recorder.stop()
+
+        reader = TickReader(str(tmp_path / "ticks"))
+        assert sum(len(r) for r in reader.load_day('20250110').values()) == len(ticks)
+        assert per_tick_us < 20
+
+        print(f"[PASS] Recorder on_tick {per_tick_us:.2f}us/tick, "
+              f"{recorder.batches} batches, max batch write {recorder.write_ms_max:.1f}ms")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
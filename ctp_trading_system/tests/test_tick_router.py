@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+按合约路由Tick测试
+验证路由表的精确/品种通配订阅，以及策略启停驱动的行情订阅与退订
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+class TestTickRouting:
+    """按合约路由Tick验证"""
+
+    class _Strategy:
+        def __init__(self, instrument_id):
+            from types import SimpleNamespace
+            self.config = SimpleNamespace(instrument_id=instrument_id)
+            self.ticks = []
+
+        def start(self):
+            return True
+
+        def stop(self):
+            pass
+
+        def on_tick(self, tick):
+            self.ticks.append(tick['instrument_id'])
+
+    def test_router_exact_and_product(self):
+        """精确订阅与品种通配，订阅引用计数"""
+        from ctp_trading_system.strategy import TickRouter
+
+        router = TickRouter()
+        a, b = [], []
+        assert router.add('a', a.append, ['rb2505', 'rb2505', 'i2505']) == (['rb2505', 'i2505'], [])
+        assert router.add('b', b.append, ['RB*', 'rb2505']) == ([], [])
+        assert [n for n, _ in router.route('rb2505')] == ['a', 'b']
+        assert [n for n, _ in router.route('rb2510')] == ['b']
+        assert router.route('hc2505') == ()
+        assert router.route('rb2505') is router.route('rb2505')
+
+        # 替换订阅: i2505 释放，新增 j2505
+        assert router.add('a', a.append, ['rb2505', 'j2505']) == (['j2505'], ['i2505'])
+        assert router.remove('b') == []
+        assert router.remove('a') == ['rb2505', 'j2505']
+        assert router.route('rb2505') == () and router.get_table() == {}
+
+        print("[PASS] Tick router exact/product routing verified")
+
+    def test_strategy_manager_routes_and_drives_subscriptions(self, make_md_gateway):
+        """策略启停维护路由表并驱动行情订阅/退订"""
+        from ctp_trading_system.strategy import StrategyManager
+
+        manager = StrategyManager(trading_system=None)
+        h1e, lstm = self._Strategy('rb2505'), self._Strategy('rb2505')
+        demo = self._Strategy('IF2602')
+        manager._strategies.update(h1e=h1e, lstm=lstm, demo=demo)
+        md = make_md_gateway()
+        md._primary.logged_in = True
+        md.subscribe(['IF2602'])
+        manager.attach_md_gateway(md)
+        assert md.get_dispatch_stats()['strategy_manager']['policy'] == 'EVERY_TICK'
+
+        for name in ('h1e', 'lstm', 'demo'):
+            assert manager.start_strategy(name)
+        manager.set_strategy_instruments('lstm', ['rb*', 'hc2505'])
+        assert set(md.get_subscribed()) == {'rb2505', 'hc2505', 'IF2602'}
+        assert manager.get_routing_table() == {
+            'rb2505': ['h1e'], 'IF2602': ['demo'], 'hc2505': ['lstm'], 'rb*': ['lstm']}
+
+        for inst in ('rb2505', 'rb2510', 'hc2505', 'IF2602', 'au2506'):
+            manager.on_tick({'instrument_id': inst})
+        assert h1e.ticks == ['rb2505']
+        assert lstm.ticks == ['rb2505', 'rb2510', 'hc2505']
+        assert demo.ticks == ['IF2602']
+
+        # 只退订本管理器发起订阅的合约，他人订阅的 IF2602 保留
+        manager.stop_all()
+        assert set(md.get_subscribed()) == {'IF2602'}
+        assert md._primary.api.unsubscriptions == [['rb2505'], ['hc2505']]
+        manager.on_tick({'instrument_id': 'rb2505'})
+        assert h1e.ticks == ['rb2505'] and manager.get_routing_table() == {}
+
+        print("[PASS] StrategyManager tick routing verified")
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '-s'])
@@ -1,2 +1,3 @@
 # Logging module
 from .trade_logger import TradeLogger
+from .audit_writer import AsyncAuditWriter
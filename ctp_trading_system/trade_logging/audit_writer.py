@@ -0,0 +1,94 @@
+"""
+异步审计日志
+报单等热路径只把日志调用放入队列，由后台线程执行 TradeLogger 的格式化与写文件
+
+功能:
+- submit: 入队一次日志调用 (SimpleQueue，不在调用线程上持有 Python 锁)
+- 后台线程按提交顺序执行，日志内容与同步调用一致
+- flush: 等待已提交的日志全部写完；stop: 写完后退出线程
+"""
+
+import queue
+import threading
+from typing import Callable, Optional
+
+_STOP = object()
+
+
+class AsyncAuditWriter:
+    """
+    异步审计日志写入器
+
+    用法:
+        audit = AsyncAuditWriter()
+        audit.submit(logger.log_order_insert, instrument_id="rb2505", ...)
+        audit.flush()       # 测试或关闭前等待写完
+        audit.stop()
+    """
+
+    def __init__(self, name: str = "audit-writer", on_error: Optional[Callable] = None):
+        """
+        Args:
+            name: 线程名
+            on_error: 日志调用异常时的回调 (参数为异常)，None 时忽略
+        """
+        self.name = name
+        self.on_error = on_error
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.submitted = 0
+        self.written = 0
+        self.errors = 0
+
+    def submit(self, func: Callable, *args, **kwargs):
+        """入队一次日志调用"""
+        if self._thread is None:
+            self._start()
+        self.submitted += 1
+        self._queue.put((func, args, kwargs))
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        get = self._queue.get
+        while True:
+            item = get()
+            if item is _STOP:
+                return
+            func, args, kwargs = item
+            if isinstance(func, threading.Event):
+                func.set()
+                continue
+            try:
+                func(*args, **kwargs)
+                self.written += 1
+            except Exception as e:
+                self.errors += 1
+                if self.on_error:
+                    self.on_error(e)
+
+    def flush(self, timeout: float = 2.0) -> bool:
+        """等待已提交的日志写完"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put((done, (), {}))
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 2.0):
+        """写完队列中的日志后停止线程"""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def pending(self) -> int:
+        """待写入的日志数"""
+        return self._queue.qsize()
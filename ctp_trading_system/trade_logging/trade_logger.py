@@ -183,6 +183,13 @@ class TradeLogger:
             self._format_message("订单状态", data)
         )
 
+    def log_order_archive(self, order: Dict[str, Any]):
+        """记录终态报单 (报单流水，完整回报字段)"""
+        data = {"action": "ORDER_ARCHIVE", **order}
+        logger.bind(log_type=LogType.TRADE.value).info(
+            self._format_message("报单归档", data)
+        )
+
     # ==================== 系统日志 ====================
 
     def log_system(self, message: str, data: Optional[Dict[str, Any]] = None):
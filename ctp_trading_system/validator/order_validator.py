@@ -78,6 +78,8 @@ class OrderValidator:
         # 账户信息缓存（需要外部更新）
         self._account: Optional[dict] = None
         self._positions: Dict[str, dict] = {}
+        # 本地持仓簿（设置后持仓验证直接读取，不再依赖 update_positions）
+        self._position_book = None
 
         self.logger.log_system("交易指令验证器初始化完成")
 
@@ -94,6 +96,10 @@ class OrderValidator:
         """更新持仓信息"""
         self._positions = positions
 
+    def set_position_book(self, position_book):
+        """设置本地持仓簿 (core.position_book.PositionBook)"""
+        self._position_book = position_book
+
     # ==================== 完整验证 ====================
 
     def validate_order(self, instrument_id: str, direction: str, offset: str,
@@ -137,7 +143,7 @@ class OrderValidator:
             if not result.is_valid:
                 return result
         else:  # 平仓
-            result = self.validate_position(instrument_id, direction, volume)
+            result = self.validate_position(instrument_id, direction, volume, offset)
             if not result.is_valid:
                 return result
 
@@ -352,7 +358,7 @@ class OrderValidator:
     # ==================== 第18项：持仓不足检查 ====================
 
     def validate_position(self, instrument_id: str, direction: str,
-                          volume: int) -> ValidationResult:
+                          volume: int, offset: str = '1') -> ValidationResult:
         """
         验证持仓是否充足
         满足评估表第18项：持仓不足错误提示
@@ -361,11 +367,15 @@ class OrderValidator:
             instrument_id: 合约代码
             direction: 买卖方向（平仓方向）
             volume: 委托数量
+            offset: 开平标志（设置持仓簿时按平今/平昨规则计算可平手数）
 
         Returns:
             验证结果
         """
-        if not self._positions:
+        book = self._position_book
+        if book is not None and not book.is_loaded():
+            book = None
+        if book is None and not self._positions:
             self.logger.log_monitor("持仓信息未加载，跳过持仓验证")
             return ValidationResult(is_valid=True)
 
@@ -377,8 +387,11 @@ class OrderValidator:
             position_direction = '2'  # 多头
 
         position_key = f"{instrument_id}_{position_direction}"
-        position = self._positions.get(position_key, {})
-        available_position = position.get("position", 0)
+        if book is not None:
+            available_position = book.closable(instrument_id, position_direction, offset)
+        else:
+            position = self._positions.get(position_key, {})
+            available_position = position.get("position", 0)
 
         if volume > available_position:
             error_msg = f"持仓不足：平仓数量{volume}，可平持仓{available_position}"
@@ -125,9 +125,8 @@ def login(request: LoginRequest):
             # 确认结算单
             system.gateway.confirm_settlement(timeout=10)
 
-            # 查询合约
-            instruments = system.gateway.query_instruments(timeout=60)
-            system.validator.update_instruments(instruments)
+            # 加载合约 (当日缓存命中时不查询柜台)
+            instruments = system.instrument_catalog.load(timeout=60)
 
             # 启动连接监测
             system.connection_monitor.start()
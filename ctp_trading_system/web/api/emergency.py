@@ -4,10 +4,13 @@
 - 第20项：暂停交易功能
 - 第23项：部分撤单功能
 - 第24项：全部撤单功能
+
+撤单/紧急停止要等待撤单回报 (可能数秒)，在线程池中执行，不阻塞事件循环与 WebSocket 推送
 """
 from typing import Optional
 from pydantic import BaseModel
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 
 from ..app import get_trading_system
 from ..websocket import get_ws_manager
@@ -108,7 +111,8 @@ async def cancel_by_instrument(request: CancelByInstrumentRequest):
 
     try:
         reason = request.reason or f"撤销{request.instrument_id}所有订单"
-        results = system.emergency_handler.cancel_orders_by_instrument(
+        results = await run_in_threadpool(
+            system.emergency_handler.cancel_orders_by_instrument,
             instrument_id=request.instrument_id,
             reason=reason
         )
@@ -126,7 +130,8 @@ async def cancel_by_instrument(request: CancelByInstrumentRequest):
                 "instrument_id": request.instrument_id,
                 "total": total_count,
                 "success": success_count,
-                "results": results
+                "results": results,
+                "report": system.emergency_handler.get_last_cancel_report()
             }
         )
 
@@ -146,7 +151,7 @@ async def cancel_all_orders(request: EmergencyRequest):
 
     try:
         reason = request.reason or "全部撤单"
-        results = system.emergency_handler.cancel_all_orders(reason)
+        results = await run_in_threadpool(system.emergency_handler.cancel_all_orders, reason)
 
         success_count = sum(1 for v in results.values() if v)
         total_count = len(results)
@@ -160,7 +165,8 @@ async def cancel_all_orders(request: EmergencyRequest):
             message=f"全部撤单完成，成功{success_count}/{total_count}",
             data={
                 "total": total_count,
-                "success": success_count
+                "success": success_count,
+                "report": system.emergency_handler.get_last_cancel_report()
             }
         )
 
@@ -184,7 +190,7 @@ async def emergency_stop(request: EmergencyRequest):
 
         await ws.send_alert("CRITICAL", "紧急停止", f"正在执行紧急停止: {reason}")
 
-        system.emergency_handler.emergency_stop(reason)
+        await run_in_threadpool(system.emergency_handler.emergency_stop, reason)
 
         await ws.send_log("EMERGENCY", "CRITICAL", f"紧急停止已执行: {reason}")
         await ws.send_status("trading", {"paused": True, "emergency": True})
@@ -104,14 +104,18 @@ def open_position(request: OrderRequest):
             return OrderResponse(success=False, message="交易已暂停")
 
         if not request.skip_validation:
-            # 同步账户和持仓信息到验证器（用于资金/持仓验证）
+            # 同步账户信息到验证器（持仓由验证器直接读取持仓簿）
             try:
-                account = system.gateway.query_account(timeout=2)
+                if system.account_service.is_reconciled():
+                    account = system.account_service.get_snapshot()
+                else:
+                    account = system.gateway.query_account(timeout=2)
                 if account:
                     system.validator.update_account(account)
-                positions = system.gateway.query_position(timeout=2)
-                if positions:
-                    system.validator.update_positions(positions)
+                if not system.position_book.is_loaded():
+                    positions = system.gateway.query_position(timeout=2)
+                    if positions:
+                        system.validator.update_positions(positions)
             except:
                 pass
 
@@ -206,7 +210,7 @@ def close_position(request: OrderRequest):
             validation_result = system.validator.validate_order(
                 instrument_id=request.instrument_id,
                 direction=direction,
-                offset='1',
+                offset='3' if close_today else '1',
                 price=request.price,
                 volume=request.volume
             )
@@ -388,21 +392,18 @@ def get_orders():
     orders = getattr(system.gateway, '_orders', {})
 
     order_list = []
-    for order_ref, order in orders.items():
-        # 订单数据是字典格式，使用 .get() 访问
-        direction = order.get('Direction', '0') if isinstance(order, dict) else getattr(order, 'Direction', '0')
-        offset = order.get('CombOffsetFlag', '0') if isinstance(order, dict) else getattr(order, 'CombOffsetFlag', '0')
-        status = order.get('OrderStatus', '') if isinstance(order, dict) else getattr(order, 'OrderStatus', '')
-
+    for order in orders.values():
+        # 订单为 OrderEvent (兼容字典读取)，使用 .get() 访问
+        offset = order.get('CombOffsetFlag', '0')
         order_list.append({
-            "order_ref": order_ref,
-            "instrument_id": order.get('InstrumentID', '') if isinstance(order, dict) else getattr(order, 'InstrumentID', ''),
-            "direction": "buy" if direction == '0' else "sell",
+            "order_ref": order.get('OrderRef', ''),
+            "instrument_id": order.get('InstrumentID', ''),
+            "direction": "buy" if order.get('Direction', '0') == '0' else "sell",
             "offset": "open" if (offset[0] if offset else '0') == '0' else "close",
-            "price": order.get('LimitPrice', 0) if isinstance(order, dict) else getattr(order, 'LimitPrice', 0),
-            "volume": order.get('VolumeTotal', 0) if isinstance(order, dict) else getattr(order, 'VolumeTotalOriginal', 0),
-            "volume_traded": order.get('VolumeTraded', 0) if isinstance(order, dict) else getattr(order, 'VolumeTraded', 0),
-            "status": _get_order_status(status)
+            "price": order.get('LimitPrice', 0),
+            "volume": order.get('VolumeTotal', 0),
+            "volume_traded": order.get('VolumeTraded', 0),
+            "status": _get_order_status(order.get('OrderStatus', ''))
         })
 
     return {"orders": order_list}
@@ -457,7 +458,12 @@ def get_account():
     if not system._running:
         return {"success": False, "message": "系统未运行，请先登录"}
 
-    account = system.gateway.query_account(timeout=5)
+    # 已对账时读取本地资金快照，否则查询柜台
+    service = getattr(system, 'account_service', None)
+    if service is not None and service.is_reconciled():
+        account = service.get_snapshot()
+    else:
+        account = system.gateway.query_account(timeout=5)
 
     if account:
         return {
@@ -482,7 +488,11 @@ def get_positions():
     if not system._running:
         return {"success": False, "message": "系统未运行，请先登录"}
 
-    positions = system.gateway.query_position(timeout=5)
+    # 持仓簿已加载时直接读取（含均价与浮动盈亏），否则查询柜台
+    if system.position_book.is_loaded():
+        positions = system.position_book.get_positions()
+    else:
+        positions = system.gateway.query_position(timeout=5)
 
     if positions:
         return {
@@ -79,16 +79,16 @@ def queue_order_update(order: dict):
         _order_update_queue.append(order)
 
 
-def _on_order_callback(order_data: dict):
-    """网关订单回调 - 从同步CTP线程调用"""
+def _on_order_callback(order_data):
+    """网关订单回调 - 从同步CTP线程调用 (OrderEvent 构建后不再修改，无需复制)"""
     with _update_queue_lock:
-        _order_update_queue.append(order_data.copy())
+        _order_update_queue.append(order_data)
 
 
-def _on_trade_callback(trade_data: dict):
-    """网关成交回调 - 从同步CTP线程调用"""
+def _on_trade_callback(trade_data):
+    """网关成交回调 - 从同步CTP线程调用 (TradeEvent 构建后不再修改，无需复制)"""
     with _update_queue_lock:
-        _trade_update_queue.append(trade_data.copy())
+        _trade_update_queue.append(trade_data)
 
 
 def _on_error_callback(error_type: str, order_info: dict, error_info: dict):
@@ -144,7 +144,7 @@ async def _process_order_updates():
 
         # 处理订单更新
         for order in order_updates:
-            await ws.send_order_update(order)
+            await ws.send_order_update(order.to_dict() if hasattr(order, 'to_dict') else order)
             status_text = {
                 'a': '已提交', '0': '全部成交', '1': '部分成交',
                 '3': '未成交(排队中)', '5': '已撤单'
@@ -177,11 +177,11 @@ async def _process_order_updates():
                 f"委托编号={trade.get('OrderRef', '')}"
             )
 
-            # 成交后查询账户盈亏信息
+            # 成交后输出账户盈亏信息 (本地资金快照，不查询柜台)
             try:
                 system = get_trading_system()
                 if system and system._running:
-                    account = system.gateway.query_account(timeout=2)
+                    account = system.account_service.get_snapshot()
                     if account:
                         position_profit = account.get('position_profit', 0)
                         close_profit = account.get('close_profit', 0)
@@ -0,0 +1,53 @@
+#!/bin/sh
+# CTP MD Wrapper 编译脚本 (Linux g++)
+# 使用方法: CTP_LIB_DIR=<thostmduserapi_se.so 所在目录> ./build_md_linux.sh
+# 头文件使用 Sim/ 下的 v6.6.8 Linux API
+
+set -e
+
+ROOT_DIR=$(cd "$(dirname "$0")" && pwd)
+SRC_DIR="$ROOT_DIR/src"
+CTP_DIR="$ROOT_DIR/../Sim/v6.6.8_T1_20220520_api_tradeapi_linux64/v6.6.8_T1_20220520_api/v6.6.8_T1_20220520_api_tradeapi_se_linux64"
+CTP_LIB_DIR="${CTP_LIB_DIR:-$CTP_DIR}"
+OUT_DIR="$ROOT_DIR/python"
+
+echo "============================================"
+echo "CTP MD Wrapper Build Script (Linux)"
+echo "============================================"
+echo "Source Dir: $SRC_DIR"
+echo "CTP API Dir: $CTP_DIR"
+echo "CTP Lib Dir: $CTP_LIB_DIR"
+echo "Output Dir: $OUT_DIR"
+
+if [ ! -f "$CTP_DIR/ThostFtdcMdApi.h" ]; then
+    echo "ERROR: CTP MdApi headers not found!"
+    echo "Expected: $CTP_DIR/ThostFtdcMdApi.h"
+    exit 1
+fi
+
+if [ ! -f "$CTP_LIB_DIR/thostmduserapi_se.so" ]; then
+    echo "ERROR: thostmduserapi_se.so not found in $CTP_LIB_DIR"
+    exit 1
+fi
+
+mkdir -p "$OUT_DIR"
+
+echo
+echo "Compiling libctp_md_wrapper.so ..."
+
+g++ -std=c++11 -O2 -fPIC -shared \
+    -I"$SRC_DIR" \
+    -I"$CTP_DIR" \
+    "$SRC_DIR/ctp_md_wrapper.cpp" \
+    -L"$CTP_LIB_DIR" -l:thostmduserapi_se.so \
+    -Wl,-rpath,'$ORIGIN' \
+    -o "$OUT_DIR/libctp_md_wrapper.so"
+
+echo "Copying CTP MdApi library..."
+cp -f "$CTP_LIB_DIR/thostmduserapi_se.so" "$OUT_DIR/"
+
+echo
+echo "============================================"
+echo "Build successful!"
+echo "Output: $OUT_DIR/libctp_md_wrapper.so"
+echo "============================================"
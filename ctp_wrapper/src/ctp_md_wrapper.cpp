@@ -5,9 +5,83 @@
 
 #include "ctp_md_wrapper.h"
 #include "ThostFtdcMdApi.h"
+#include <atomic>
+#include <chrono>
 #include <cstring>
 #include <string>
 
+// ============================================================
+// 环形缓冲写入 (CTP 行情线程，单生产者)
+// ============================================================
+template <size_t N, size_t M>
+static inline void CopyField(char (&dst)[N], const char (&src)[M])
+{
+    const size_t n = (N - 1 < M) ? N - 1 : M;
+    memcpy(dst, src, strnlen(src, n));             // dst 已清零，截断后仍以 NUL 结尾
+}
+
+static void RingPush(MdRingHeader* ring, const CThostFtdcDepthMarketDataField* pData)
+{
+    const uint64_t head = ring->head;                      // 只有本线程写 head
+    const uint64_t tail = MD_RING_LOAD_ACQUIRE(&ring->tail);
+    if (head - tail >= ring->capacity) {
+        ring->dropped += 1;                                // 缓冲满: 丢弃，不阻塞 CTP 线程
+        return;
+    }
+
+    MdTickRecord* rec = MD_RING_RECORDS(ring) + (head & ring->mask);
+    memset(rec, 0, sizeof(MdTickRecord));
+    rec->seq = head + 1;
+    rec->recv_ns = std::chrono::duration_cast<std::chrono::nanoseconds>(
+        std::chrono::system_clock::now().time_since_epoch()).count();
+
+    rec->last_price = pData->LastPrice;
+    rec->pre_settlement_price = pData->PreSettlementPrice;
+    rec->pre_close_price = pData->PreClosePrice;
+    rec->pre_open_interest = pData->PreOpenInterest;
+    rec->open_price = pData->OpenPrice;
+    rec->highest_price = pData->HighestPrice;
+    rec->lowest_price = pData->LowestPrice;
+    rec->turnover = pData->Turnover;
+    rec->open_interest = pData->OpenInterest;
+    rec->close_price = pData->ClosePrice;
+    rec->settlement_price = pData->SettlementPrice;
+    rec->upper_limit_price = pData->UpperLimitPrice;
+    rec->lower_limit_price = pData->LowerLimitPrice;
+    rec->bid_price1 = pData->BidPrice1;
+    rec->ask_price1 = pData->AskPrice1;
+    rec->bid_price2 = pData->BidPrice2;
+    rec->ask_price2 = pData->AskPrice2;
+    rec->bid_price3 = pData->BidPrice3;
+    rec->ask_price3 = pData->AskPrice3;
+    rec->bid_price4 = pData->BidPrice4;
+    rec->ask_price4 = pData->AskPrice4;
+    rec->bid_price5 = pData->BidPrice5;
+    rec->ask_price5 = pData->AskPrice5;
+    rec->average_price = pData->AveragePrice;
+
+    rec->volume = pData->Volume;
+    rec->update_millisec = pData->UpdateMillisec;
+    rec->bid_volume1 = pData->BidVolume1;
+    rec->ask_volume1 = pData->AskVolume1;
+    rec->bid_volume2 = pData->BidVolume2;
+    rec->ask_volume2 = pData->AskVolume2;
+    rec->bid_volume3 = pData->BidVolume3;
+    rec->ask_volume3 = pData->AskVolume3;
+    rec->bid_volume4 = pData->BidVolume4;
+    rec->ask_volume4 = pData->AskVolume4;
+    rec->bid_volume5 = pData->BidVolume5;
+    rec->ask_volume5 = pData->AskVolume5;
+
+    CopyField(rec->instrument_id, pData->InstrumentID);
+    CopyField(rec->exchange_id, pData->ExchangeID);
+    CopyField(rec->update_time, pData->UpdateTime);
+    CopyField(rec->trading_day, pData->TradingDay);
+    CopyField(rec->action_day, pData->ActionDay);
+
+    MD_RING_STORE_RELEASE(&ring->head, head + 1);          // 发布: 记录内容先于 head 可见
+}
+
 // ============================================================
 // 内部包装类：实现CThostFtdcMdSpi接口
 // ============================================================
@@ -15,8 +89,9 @@ class MdSpiWrapper : public CThostFtdcMdSpi
 {
 public:
     MdCallbacks callbacks;
+    std::atomic<MdRingHeader*> ring;
 
-    MdSpiWrapper() {
+    MdSpiWrapper() : ring(nullptr) {
         memset(&callbacks, 0, sizeof(callbacks));
     }
 
@@ -119,6 +194,11 @@ public:
     virtual void OnRtnDepthMarketData(
         CThostFtdcDepthMarketDataField *pData) override
     {
+        MdRingHeader* r = ring.load(std::memory_order_acquire);
+        if (r && pData) {
+            RingPush(r, pData);
+            return;
+        }
         if (callbacks.on_rtn_depth_market_data && pData) {
             callbacks.on_rtn_depth_market_data(
                 pData->InstrumentID, pData->ExchangeID,
@@ -286,3 +366,35 @@ MD_WRAPPER_API int MdUnSubscribeMarketData(void* api,
     }
     return -1;
 }
+
+MD_WRAPPER_API int MdRingRecordSize() {
+    return (int)sizeof(MdTickRecord);
+}
+
+MD_WRAPPER_API int MdAttachRing(void* api, void* ring) {
+    if (!api || !ring) {
+        return -1;
+    }
+    MdRingHeader* header = static_cast<MdRingHeader*>(ring);
+    if (header->magic != MD_RING_MAGIC || header->version != MD_RING_VERSION
+        || header->record_size != sizeof(MdTickRecord)
+        || header->capacity == 0 || (header->capacity & (header->capacity - 1)) != 0
+        || header->mask != (uint64_t)header->capacity - 1) {
+        return -1;
+    }
+    MdApiWrapper* wrapper = static_cast<MdApiWrapper*>(api);
+    if (!wrapper->spi) {
+        return -1;
+    }
+    wrapper->spi->ring.store(header, std::memory_order_release);
+    return 0;
+}
+
+MD_WRAPPER_API void MdDetachRing(void* api) {
+    if (api) {
+        MdApiWrapper* wrapper = static_cast<MdApiWrapper*>(api);
+        if (wrapper->spi) {
+            wrapper->spi->ring.store(nullptr, std::memory_order_release);
+        }
+    }
+}
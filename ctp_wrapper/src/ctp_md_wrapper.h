@@ -6,6 +6,8 @@
 #ifndef CTP_MD_WRAPPER_H
 #define CTP_MD_WRAPPER_H
 
+#include "md_ring.h"
+
 #ifdef _WIN32
     #ifdef CTP_MD_WRAPPER_EXPORTS
         #define MD_WRAPPER_API __declspec(dllexport)
@@ -109,6 +111,18 @@ MD_WRAPPER_API int MdSubscribeMarketData(void* api,
 MD_WRAPPER_API int MdUnSubscribeMarketData(void* api,
     const char** instrument_ids, int count);
 
+// ============================================================
+// 环形缓冲模式 (见 md_ring.h)
+// 挂接后深度行情只写入环形缓冲，不再调用 on_rtn_depth_market_data
+// ============================================================
+MD_WRAPPER_API int MdRingRecordSize();
+
+/* 返回 0 成功，-1 头部校验失败 (magic/version/record_size/capacity) */
+MD_WRAPPER_API int MdAttachRing(void* api, void* ring);
+
+/* 恢复回调模式 (调用方须在 ReleaseMdApi 之后再释放缓冲内存) */
+MD_WRAPPER_API void MdDetachRing(void* api);
+
 #ifdef __cplusplus
 }
 #endif
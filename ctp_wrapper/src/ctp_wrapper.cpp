@@ -18,8 +18,12 @@ class TraderSpiWrapper : public CThostFtdcTraderSpi
 {
 public:
     TraderCallbacks callbacks;
+    OnRtnOrderSeqCallback on_rtn_order_seq;
+    OnRtnTradeSeqCallback on_rtn_trade_seq;
+    OnRspQryInvestorPositionExCallback on_rsp_qry_investor_position_ex;
 
-    TraderSpiWrapper() {
+    TraderSpiWrapper() : on_rtn_order_seq(nullptr), on_rtn_trade_seq(nullptr),
+                         on_rsp_qry_investor_position_ex(nullptr) {
         memset(&callbacks, 0, sizeof(callbacks));
     }
 
@@ -220,7 +224,7 @@ public:
 
     virtual void OnRtnOrder(CThostFtdcOrderField *pOrder) override
     {
-        if (callbacks.on_rtn_order) {
+        if (on_rtn_order_seq || callbacks.on_rtn_order) {
             const char* broker_id = pOrder ? pOrder->BrokerID : "";
             const char* investor_id = pOrder ? pOrder->InvestorID : "";
             const char* instrument_id = pOrder ? pOrder->InstrumentID : "";
@@ -239,6 +243,15 @@ public:
             const char* insert_time = pOrder ? pOrder->InsertTime : "";
             const char* status_msg = pOrder ? pOrder->StatusMsg : "";
 
+            if (on_rtn_order_seq) {
+                on_rtn_order_seq(
+                    broker_id, investor_id, instrument_id, order_ref,
+                    user_id, direction, offset_flag, price, volume_total, volume_traded,
+                    order_status, order_sys_id, front_id, session_id,
+                    insert_date, insert_time, status_msg,
+                    pOrder ? pOrder->SequenceNo : 0);
+                return;
+            }
             callbacks.on_rtn_order(
                 broker_id, investor_id, instrument_id, order_ref,
                 user_id, direction, offset_flag, price, volume_total, volume_traded,
@@ -249,7 +262,7 @@ public:
 
     virtual void OnRtnTrade(CThostFtdcTradeField *pTrade) override
     {
-        if (callbacks.on_rtn_trade) {
+        if (on_rtn_trade_seq || callbacks.on_rtn_trade) {
             const char* broker_id = pTrade ? pTrade->BrokerID : "";
             const char* investor_id = pTrade ? pTrade->InvestorID : "";
             const char* instrument_id = pTrade ? pTrade->InstrumentID : "";
@@ -264,6 +277,14 @@ public:
             const char* trade_time = pTrade ? pTrade->TradeTime : "";
             const char* order_sys_id = pTrade ? pTrade->OrderSysID : "";
 
+            if (on_rtn_trade_seq) {
+                on_rtn_trade_seq(
+                    broker_id, investor_id, instrument_id, order_ref,
+                    user_id, trade_id, direction, offset_flag,
+                    price, volume, trade_date, trade_time, order_sys_id,
+                    pTrade ? pTrade->SequenceNo : 0);
+                return;
+            }
             callbacks.on_rtn_trade(
                 broker_id, investor_id, instrument_id, order_ref,
                 user_id, trade_id, direction, offset_flag,
@@ -375,7 +396,7 @@ public:
         CThostFtdcRspInfoField *pRspInfo,
         int nRequestID, bool bIsLast) override
     {
-        if (callbacks.on_rsp_qry_investor_position) {
+        if (on_rsp_qry_investor_position_ex || callbacks.on_rsp_qry_investor_position) {
             const char* broker_id = pInvestorPosition ? pInvestorPosition->BrokerID : "";
             const char* investor_id = pInvestorPosition ? pInvestorPosition->InvestorID : "";
             const char* instrument_id = pInvestorPosition ? pInvestorPosition->InstrumentID : "";
@@ -389,6 +410,16 @@ public:
             int error_id = pRspInfo ? pRspInfo->ErrorID : 0;
             const char* error_msg = pRspInfo ? pRspInfo->ErrorMsg : "";
 
+            if (on_rsp_qry_investor_position_ex) {
+                on_rsp_qry_investor_position_ex(
+                    broker_id, investor_id, instrument_id, position_direction,
+                    position, yd_position, position_cost, open_cost,
+                    use_margin, frozen_margin,
+                    error_id, error_msg, nRequestID, bIsLast ? 1 : 0,
+                    pInvestorPosition ? pInvestorPosition->TodayPosition : 0,
+                    pInvestorPosition ? pInvestorPosition->PositionDate : '1');
+                return;
+            }
             callbacks.on_rsp_qry_investor_position(
                 broker_id, investor_id, instrument_id, position_direction,
                 position, yd_position, position_cost, open_cost,
@@ -731,6 +762,26 @@ CTP_API void RegisterCallbacks(void* api, TraderCallbacks* callbacks) {
     }
 }
 
+CTP_API void RegisterSequenceCallbacks(void* api,
+    OnRtnOrderSeqCallback on_rtn_order, OnRtnTradeSeqCallback on_rtn_trade) {
+    if (api) {
+        ApiWrapper* wrapper = static_cast<ApiWrapper*>(api);
+        if (wrapper->spi) {
+            wrapper->spi->on_rtn_order_seq = on_rtn_order;
+            wrapper->spi->on_rtn_trade_seq = on_rtn_trade;
+        }
+    }
+}
+
+CTP_API void RegisterPositionCallback(void* api, OnRspQryInvestorPositionExCallback on_rsp_qry_investor_position) {
+    if (api) {
+        ApiWrapper* wrapper = static_cast<ApiWrapper*>(api);
+        if (wrapper->spi) {
+            wrapper->spi->on_rsp_qry_investor_position_ex = on_rsp_qry_investor_position;
+        }
+    }
+}
+
 CTP_API void RegisterFront(void* api, const char* front_address) {
     if (api && front_address) {
         ApiWrapper* wrapper = static_cast<ApiWrapper*>(api);
@@ -936,6 +987,40 @@ CTP_API int ReqOrderInsert(void* api,
     return -1;
 }
 
+CTP_API int OrderInsertArgsSize()
+{
+    return (int)sizeof(OrderInsertArgs);
+}
+
+CTP_API int ReqOrderInsertArgs(void* api, const OrderInsertArgs* args, int request_id)
+{
+    if (api && args) {
+        ApiWrapper* wrapper = static_cast<ApiWrapper*>(api);
+        if (wrapper->api) {
+            CThostFtdcInputOrderField req = {0};
+            memcpy(req.BrokerID, args->broker_id, sizeof(req.BrokerID) - 1);
+            memcpy(req.InvestorID, args->investor_id, sizeof(req.InvestorID) - 1);
+            memcpy(req.InstrumentID, args->instrument_id, sizeof(req.InstrumentID) - 1);
+            memcpy(req.OrderRef, args->order_ref, sizeof(req.OrderRef) - 1);
+            req.Direction = args->direction;
+            req.CombOffsetFlag[0] = args->offset_flag;
+            req.CombHedgeFlag[0] = args->hedge_flag;
+            req.LimitPrice = args->price;
+            req.VolumeTotalOriginal = args->volume;
+            req.OrderPriceType = args->order_price_type;
+            req.TimeCondition = args->time_condition;
+            req.VolumeCondition = args->volume_condition;
+            req.MinVolume = args->min_volume;
+            req.ContingentCondition = THOST_FTDC_CC_Immediately;
+            req.ForceCloseReason = THOST_FTDC_FCC_NotForceClose;
+            req.IsAutoSuspend = 0;
+            req.UserForceClose = 0;
+            return wrapper->api->ReqOrderInsert(&req, request_id);
+        }
+    }
+    return -1;
+}
+
 CTP_API int ReqOrderAction(void* api,
     const char* broker_id, const char* investor_id,
     const char* instrument_id, const char* exchange_id,
@@ -101,6 +101,28 @@ typedef void (*OnRtnTradeCallback)(
     const char* trade_date, const char* trade_time,
     const char* order_sys_id);
 
+/* 带序号的报单/成交回报 (参数同上，末尾追加 SequenceNo)
+ * 由 RegisterSequenceCallbacks 注册，注册后替代 on_rtn_order / on_rtn_trade，
+ * 用于断线续传 (RESUME) 时按序号丢弃重复回报 */
+typedef void (*OnRtnOrderSeqCallback)(
+    const char* broker_id, const char* investor_id,
+    const char* instrument_id, const char* order_ref,
+    const char* user_id, char direction, char offset_flag,
+    double price, int volume_total, int volume_traded,
+    char order_status, const char* order_sys_id,
+    int front_id, int session_id,
+    const char* insert_date, const char* insert_time,
+    const char* status_msg, int sequence_no);
+
+typedef void (*OnRtnTradeSeqCallback)(
+    const char* broker_id, const char* investor_id,
+    const char* instrument_id, const char* order_ref,
+    const char* user_id, const char* trade_id,
+    char direction, char offset_flag,
+    double price, int volume,
+    const char* trade_date, const char* trade_time,
+    const char* order_sys_id, int sequence_no);
+
 typedef void (*OnErrRtnOrderInsertCallback)(
     const char* broker_id, const char* investor_id,
     const char* instrument_id, const char* order_ref,
@@ -275,6 +297,19 @@ typedef struct {
     OnRtnInstrumentStatusCallback on_rtn_instrument_status;
 } TraderCallbacks;
 
+/* 带今仓/持仓日期的持仓查询响应 (参数同 OnRspQryInvestorPositionCallback，
+ * 在 is_last 之后追加 TodayPosition、PositionDate)
+ * 由 RegisterPositionCallback 注册，注册后替代 on_rsp_qry_investor_position；
+ * YdPosition 是上日静态持仓，今/昨仓拆分以 TodayPosition、PositionDate ('1'今仓 '2'历史仓) 为准 */
+typedef void (*OnRspQryInvestorPositionExCallback)(
+    const char* broker_id, const char* investor_id,
+    const char* instrument_id, char position_direction,
+    int position, int yd_position,
+    double position_cost, double open_cost,
+    double use_margin, double frozen_margin,
+    int error_id, const char* error_msg, int request_id, int is_last,
+    int today_position, char position_date);
+
 // ============================================================
 // API 函数声明 - 基础
 // ============================================================
@@ -282,6 +317,11 @@ CTP_API void* CreateTraderApi(const char* flow_path);
 CTP_API void ReleaseTraderApi(void* api);
 CTP_API const char* GetApiVersion();
 CTP_API void RegisterCallbacks(void* api, TraderCallbacks* callbacks);
+/* 注册带序号的报单/成交回报 (传 NULL 恢复 TraderCallbacks 中的回调) */
+CTP_API void RegisterSequenceCallbacks(void* api,
+    OnRtnOrderSeqCallback on_rtn_order, OnRtnTradeSeqCallback on_rtn_trade);
+/* 注册带今仓/持仓日期的持仓查询响应 (传 NULL 恢复 TraderCallbacks 中的回调) */
+CTP_API void RegisterPositionCallback(void* api, OnRspQryInvestorPositionExCallback on_rsp_qry_investor_position);
 CTP_API void RegisterFront(void* api, const char* front_address);
 CTP_API void SubscribePrivateTopic(void* api, int resume_type);
 CTP_API void SubscribePublicTopic(void* api, int resume_type);
@@ -328,6 +368,30 @@ CTP_API int ReqOrderInsert(void* api,
     char order_price_type, char time_condition, char volume_condition,
     int request_id);
 
+/* 报单参数块 (快速路径)
+ * Python 端按合约预填 broker/investor/instrument，报单时只写可变字段后整块传入，
+ * 布局须与 ctp_api.OrderInsertArgs 一致 (144 字节) */
+typedef struct {
+    char broker_id[11];
+    char investor_id[13];
+    char instrument_id[81];
+    char order_ref[13];
+    char direction;
+    char offset_flag;
+    char hedge_flag;
+    char order_price_type;
+    char time_condition;
+    char volume_condition;
+    char reserved[4];
+    double price;
+    int volume;
+    int min_volume;
+} OrderInsertArgs;
+
+CTP_API int OrderInsertArgsSize();
+
+CTP_API int ReqOrderInsertArgs(void* api, const OrderInsertArgs* args, int request_id);
+
 CTP_API int ReqOrderAction(void* api,
     const char* broker_id, const char* investor_id,
     const char* instrument_id, const char* exchange_id,
@@ -0,0 +1,117 @@
+/**
+ * CTP 行情共享内存环形缓冲 (单生产者单消费者)
+ *
+ * 生产者: CTP 行情线程 (OnRtnDepthMarketData)，只复制定长记录，不进入Python、不持有GIL
+ * 消费者: Python 行情线程，按批读取为 NumPy 结构化数组 (见 ctp_api/md_ring.py)
+ *
+ * 内存由 Python 分配并初始化头部，C++ 通过 MdAttachRing 挂接:
+ *   [MdRingHeader 256字节][MdTickRecord × capacity]
+ *
+ * - capacity 为2的幂，下标 = 序号 & mask
+ * - head 只由生产者写 (release)，tail 只由消费者写，各占独立缓存行
+ * - 缓冲满时丢弃新记录并累加 dropped，从不阻塞 CTP 线程
+ *
+ * 修改任何结构须同步修改 MD_RING_VERSION 与 Python 端 dtype
+ */
+
+#ifndef CTP_MD_RING_H
+#define CTP_MD_RING_H
+
+#include <stdint.h>
+
+#define MD_RING_MAGIC 0x4E52444Du        /* "MDRN" */
+#define MD_RING_VERSION 1
+#define MD_RING_HEADER_SIZE 256
+
+/* ============================================================
+ * 行情记录 (352字节，字段名与 Python MarketTick 一致，无填充)
+ * ============================================================ */
+typedef struct {
+    uint64_t seq;                  /* 生产者序号，从1开始连续递增 */
+    int64_t recv_ns;               /* 收到行情的本机时间 (Unix纳秒) */
+
+    double last_price;
+    double pre_settlement_price;
+    double pre_close_price;
+    double pre_open_interest;
+    double open_price;
+    double highest_price;
+    double lowest_price;
+    double turnover;
+    double open_interest;
+    double close_price;
+    double settlement_price;
+    double upper_limit_price;
+    double lower_limit_price;
+    double bid_price1;
+    double ask_price1;
+    double bid_price2;
+    double ask_price2;
+    double bid_price3;
+    double ask_price3;
+    double bid_price4;
+    double ask_price4;
+    double bid_price5;
+    double ask_price5;
+    double average_price;
+
+    int32_t volume;
+    int32_t update_millisec;
+    int32_t bid_volume1;
+    int32_t ask_volume1;
+    int32_t bid_volume2;
+    int32_t ask_volume2;
+    int32_t bid_volume3;
+    int32_t ask_volume3;
+    int32_t bid_volume4;
+    int32_t ask_volume4;
+    int32_t bid_volume5;
+    int32_t ask_volume5;
+
+    char instrument_id[32];
+    char exchange_id[16];
+    char update_time[16];
+    char trading_day[16];
+    char action_day[16];
+} MdTickRecord;
+
+/* ============================================================
+ * 环形缓冲头部 (256字节，生产者/消费者字段分属不同缓存行)
+ * ============================================================ */
+typedef struct {
+    uint32_t magic;
+    uint32_t version;
+    uint32_t record_size;
+    uint32_t capacity;
+    uint64_t mask;
+    uint8_t reserved0[40];
+
+    uint64_t head;                 /* 已发布记录数 (生产者写) */
+    uint8_t reserved1[56];
+
+    uint64_t tail;                 /* 已消费记录数 (消费者写) */
+    uint8_t reserved2[56];
+
+    uint64_t dropped;              /* 缓冲满丢弃的记录数 (生产者写) */
+    uint8_t reserved3[56];
+} MdRingHeader;
+
+#ifdef __cplusplus
+static_assert(sizeof(MdTickRecord) == 352, "MdTickRecord layout changed");
+static_assert(sizeof(MdRingHeader) == MD_RING_HEADER_SIZE, "MdRingHeader layout changed");
+#endif
+
+/* 64位对齐读写的 acquire/release 语义 */
+#if defined(_MSC_VER)
+    /* MSVC x86/x64: volatile 读写具有 acquire/release 语义 (/volatile:ms) */
+    #define MD_RING_LOAD_ACQUIRE(p) (*(volatile uint64_t*)(p))
+    #define MD_RING_STORE_RELEASE(p, v) (*(volatile uint64_t*)(p) = (v))
+#else
+    #define MD_RING_LOAD_ACQUIRE(p) __atomic_load_n((p), __ATOMIC_ACQUIRE)
+    #define MD_RING_STORE_RELEASE(p, v) __atomic_store_n((p), (v), __ATOMIC_RELEASE)
+#endif
+
+#define MD_RING_RECORDS(header) \
+    ((MdTickRecord*)((uint8_t*)(header) + MD_RING_HEADER_SIZE))
+
+#endif // CTP_MD_RING_H